@@ -0,0 +1,218 @@
+"""
+Quản lý các job mô phỏng Monte Carlo chạy nền.
+
+Job được đưa vào một ThreadPoolExecutor có số worker giới hạn, nên các mô phỏng lớn không
+chiếm worker của Flask và số job chạy đồng thời không vượt quá giới hạn cấu hình. Mỗi job
+báo tiến độ (số đường đi đã xong, ETA) qua hàm callback của engine mô phỏng và có thể bị
+hủy: lần báo tiến độ kế tiếp sẽ ném SimulationCancelled để dừng mô phỏng.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from backtest_ai.simulation import SimulationCancelled
+
+logger = logging.getLogger(__name__)
+
+# Số job chạy đồng thời tối đa
+DEFAULT_JOB_WORKERS = 2
+
+# Số job đang chờ hoặc đang chạy tối đa; vượt quá sẽ bị từ chối
+DEFAULT_MAX_PENDING_JOBS = 32
+
+# Thời gian giữ kết quả của job đã kết thúc (giây)
+DEFAULT_JOB_TTL = 3600
+
+QUEUED = 'queued'
+RUNNING = 'running'
+COMPLETED = 'completed'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+FINISHED_STATES = (COMPLETED, FAILED, CANCELLED)
+
+
+class JobQueueFull(Exception):
+    """Số job đang chờ đã đạt giới hạn"""
+
+
+class SimulationJob:
+    """Trạng thái của một job mô phỏng"""
+
+    def __init__(self, total_paths: int):
+        self.id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.total_paths = int(total_paths)
+        self.completed_paths = 0
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.result: Optional[Any] = None
+        self.error: Optional[str] = None
+        self.cancel_event = threading.Event()
+
+    def report_progress(self, completed: int, total: int) -> None:
+        """Callback tiến độ truyền cho engine mô phỏng"""
+        self.completed_paths = int(completed)
+        self.total_paths = int(total)
+        if self.cancel_event.is_set():
+            raise SimulationCancelled()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Trạng thái job ở dạng JSON (không gồm kết quả)"""
+        now = time.time()
+        elapsed = None
+        eta = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or now) - self.started_at
+            if self.status == RUNNING and self.completed_paths > 0:
+                remaining = max(self.total_paths - self.completed_paths, 0)
+                eta = elapsed / self.completed_paths * remaining
+            elif self.status == COMPLETED:
+                eta = 0.0
+
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'completed_paths': self.completed_paths,
+            'total_paths': self.total_paths,
+            'progress': self.completed_paths / self.total_paths * 100 if self.total_paths else 0.0,
+            'elapsed_seconds': elapsed,
+            'eta_seconds': eta,
+            'created_at': self.created_at,
+            'error': self.error
+        }
+
+
+class JobManager:
+    """Hàng đợi job mô phỏng trên một pool thread có kích thước giới hạn"""
+
+    def __init__(
+        self,
+        max_workers: int = DEFAULT_JOB_WORKERS,
+        max_pending: int = DEFAULT_MAX_PENDING_JOBS,
+        ttl: float = DEFAULT_JOB_TTL
+    ):
+        """
+        Args:
+            max_workers: Số job chạy đồng thời tối đa
+            max_pending: Số job chưa kết thúc tối đa
+            ttl: Thời gian giữ job đã kết thúc (giây)
+        """
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(1, int(max_pending))
+        self.ttl = float(ttl)
+        self._jobs: Dict[str, SimulationJob] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @classmethod
+    def from_env(cls) -> 'JobManager':
+        """Tạo JobManager từ biến môi trường MONTE_CARLO_JOB_WORKERS, MONTE_CARLO_MAX_PENDING_JOBS"""
+        return cls(
+            max_workers=int(os.environ.get('MONTE_CARLO_JOB_WORKERS', DEFAULT_JOB_WORKERS)),
+            max_pending=int(os.environ.get('MONTE_CARLO_MAX_PENDING_JOBS', DEFAULT_MAX_PENDING_JOBS))
+        )
+
+    def submit(self, task: Callable[[Callable[[int, int], None]], Any], total_paths: int) -> SimulationJob:
+        """
+        Đưa một job vào hàng đợi
+
+        Args:
+            task: Hàm chạy mô phỏng, nhận callback tiến độ và trả về kết quả (dạng JSON)
+            total_paths: Tổng số đường đi dự kiến (dùng để tính tiến độ trước khi chạy)
+
+        Returns:
+            Job vừa tạo
+
+        Raises:
+            JobQueueFull: Nếu số job chưa kết thúc đã đạt max_pending
+        """
+        job = SimulationJob(total_paths)
+        with self._lock:
+            self._prune()
+            pending = sum(1 for j in self._jobs.values() if j.status not in FINISHED_STATES)
+            if pending >= self.max_pending:
+                raise JobQueueFull(f"Đã có {pending} job đang chờ, vui lòng thử lại sau")
+            self._jobs[job.id] = job
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix='monte-carlo-job')
+            self._executor.submit(self._run, job, task)
+
+        logger.info(f"Đã nhận job mô phỏng {job.id} ({total_paths} đường đi)")
+        return job
+
+    def add_completed(self, result: Any, total_paths: int) -> SimulationJob:
+        """Tạo job đã hoàn thành từ kết quả có sẵn (ví dụ kết quả lấy từ cache)"""
+        job = SimulationJob(total_paths)
+        job.status = COMPLETED
+        job.completed_paths = job.total_paths
+        job.started_at = job.finished_at = job.created_at
+        job.result = result
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id: str) -> Optional[SimulationJob]:
+        """Lấy job theo id (None nếu không tồn tại hoặc đã hết hạn)"""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[SimulationJob]:
+        """
+        Yêu cầu hủy một job
+
+        Job đang chờ được hủy ngay; job đang chạy dừng ở lần báo tiến độ kế tiếp.
+        """
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED_STATES:
+            return job
+        job.cancel_event.set()
+        with self._lock:
+            if job.status == QUEUED:
+                job.status = CANCELLED
+                job.finished_at = time.time()
+        return job
+
+    def _run(self, job: SimulationJob, task: Callable) -> None:
+        with self._lock:
+            if job.status == CANCELLED:
+                return
+            job.status = RUNNING
+            job.started_at = time.time()
+
+        try:
+            result = task(job.report_progress)
+        except SimulationCancelled:
+            job.status = CANCELLED
+            logger.info(f"Job mô phỏng {job.id} đã bị hủy")
+        except Exception as e:
+            job.error = str(e)
+            job.status = FAILED
+            logger.error(f"Lỗi khi chạy job mô phỏng {job.id}: {str(e)}")
+        else:
+            job.result = result
+            job.completed_paths = job.total_paths
+            job.status = COMPLETED
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self) -> None:
+        """Xóa các job đã kết thúc quá ttl giây (gọi khi đang giữ lock)"""
+        cutoff = time.time() - self.ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in FINISHED_STATES and job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+# Hàng đợi job dùng chung cho các endpoint Monte Carlo
+job_manager = JobManager.from_env()
@@ -4,19 +4,30 @@ Routes cho tính năng Monte Carlo Simulation.
 
 import os
 import json
+import hashlib
 import logging
 from typing import Dict, List, Any, Optional, Tuple
 
-try:
-    import numpy as np
-except ImportError:
-    logging.warning("NumPy not available. Using fallback for simulation.")
-    np = None  # Will be handled in the implementation
-
 from flask import Blueprint, request, jsonify, current_app
 
 # Import from models directly
 from models import db, ModelBackup
+from backtest_ai.jobs import COMPLETED, FINISHED_STATES, JobQueueFull, job_manager
+from backtest_ai.result_cache import make_cache_key, model_fingerprint, result_cache
+from backtest_ai.simulation import (
+    DEFAULT_MAX_PATHS,
+    DEFAULT_TOLERANCE,
+    BootstrapModel,
+    DailyPoissonModel,
+    ProgressCallback,
+    check_adaptive_budget,
+    check_sweep_size,
+    load_trade_returns,
+    request_workers,
+    run_adaptive_simulation,
+    run_parameter_sweep,
+    run_simulation
+)
 
 # Tạo Blueprint
 monte_carlo_bp = Blueprint('monte_carlo', __name__, url_prefix='/monte_carlo')
@@ -64,8 +75,133 @@ def api_get_models():
 def api_run_simulation():
     """Chạy mô phỏng Monte Carlo"""
     try:
-        data = request.json
+        prepared, error = _prepare_simulation(request.json)
+        if error:
+            message, status = error
+            return jsonify({
+                'success': False,
+                'message': message
+            }), status
+        
+        if prepared['use_cache']:
+            cached = result_cache.get(prepared['cache_key'])
+            if cached is not None:
+                response, age = cached
+                return jsonify({**response, 'cached': True, 'cache_age': age})
+        
+        response = _execute_simulation(prepared, workers=request_workers())
+        
+        return jsonify({**response, 'cached': False})
+    except Exception as e:
+        logging.error(f"Error running Monte Carlo simulation: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f"Error running simulation: {str(e)}"
+        }), 500
+
+
+@monte_carlo_bp.route('/api/jobs', methods=['POST'])
+def api_submit_job():
+    """Gửi mô phỏng Monte Carlo để chạy nền, trả về job id"""
+    try:
+        prepared, error = _prepare_simulation(request.json)
+        if error:
+            message, status = error
+            return jsonify({
+                'success': False,
+                'message': message
+            }), status
         
+        cached = result_cache.get(prepared['cache_key']) if prepared['use_cache'] else None
+        if cached is not None:
+            response, age = cached
+            job = job_manager.add_completed({**response, 'cached': True, 'cache_age': age},
+                                            prepared['total_paths'])
+        else:
+            job = job_manager.submit(lambda progress: _run_job(prepared, progress), prepared['total_paths'])
+        
+        return jsonify({
+            'success': True,
+            'job': job.to_dict()
+        }), 202
+    except JobQueueFull as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 429
+    except Exception as e:
+        logging.error(f"Error submitting Monte Carlo job: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f"Error submitting simulation job: {str(e)}"
+        }), 500
+
+
+@monte_carlo_bp.route('/api/jobs/<job_id>', methods=['GET'])
+def api_get_job(job_id):
+    """Lấy trạng thái và tiến độ của một job mô phỏng"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': f'Job {job_id} not found'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'job': job.to_dict()
+    })
+
+
+@monte_carlo_bp.route('/api/jobs/<job_id>/result', methods=['GET'])
+def api_get_job_result(job_id):
+    """Lấy kết quả của một job mô phỏng đã hoàn thành"""
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': f'Job {job_id} not found'
+        }), 404
+    
+    if job.status == COMPLETED:
+        return jsonify({**job.result, 'job': job.to_dict()})
+    
+    if job.status in FINISHED_STATES:
+        return jsonify({
+            'success': False,
+            'message': job.error or f'Job {job_id} was {job.status}',
+            'job': job.to_dict()
+        }), 409
+    
+    return jsonify({
+        'success': False,
+        'message': f'Job {job_id} is still {job.status}',
+        'job': job.to_dict()
+    }), 202
+
+
+@monte_carlo_bp.route('/api/jobs/<job_id>', methods=['DELETE'])
+@monte_carlo_bp.route('/api/jobs/<job_id>/cancel', methods=['POST'])
+def api_cancel_job(job_id):
+    """Hủy một job mô phỏng đang chờ hoặc đang chạy"""
+    job = job_manager.cancel(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': f'Job {job_id} not found'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'job': job.to_dict()
+    })
+
+
+@monte_carlo_bp.route('/api/sweep', methods=['POST'])
+def api_run_sweep():
+    """Quét lưới risk per trade x R:R trong một lần tính, trả về ma trận thống kê cho heatmap"""
+    try:
+        data = request.json
         if not data:
             return jsonify({
                 'success': False,
@@ -79,52 +215,217 @@ def api_run_simulation():
                 'message': 'Missing model_id parameter'
             }), 400
         
-        # Check if model exists
         model = ModelBackup.query.get(model_id)
         if not model:
             return jsonify({
-                'success': False, 
+                'success': False,
                 'message': f'Model with ID {model_id} not found'
             }), 404
         
-        # Get base win rate from model metrics
-        base_win_rate = 0.5  # Default
-        if model.metrics and 'win_rate' in model.metrics:
-            base_win_rate = float(model.metrics['win_rate']) / 100  # Convert from percentage
-        
-        # Parse parameters
-        params = {
-            'simulations': int(data.get('simulations', 1000)),
-            'initial_capital': float(data.get('initial_capital', 10000.0)),
-            'risk_per_trade': float(data.get('risk_per_trade', 1.0)) / 100,  # Convert from percentage
-            'trading_days': int(data.get('trading_days', 30)),
-            'trades_per_day': float(data.get('trades_per_day', 3.0)),
-            'base_win_rate': base_win_rate,
-            'win_rate_variance': float(data.get('win_rate_variance', 5.0)) / 100,  # Convert from percentage
-            'risk_reward_ratio': float(data.get('risk_reward_ratio', 1.5)),
-            'risk_reward_variance': float(data.get('risk_reward_variance', 0.2)),
-            'consider_fees': bool(data.get('consider_fees', True))
-        }
+        params = _parse_simulation_params(data, model)
+        risk_values = [float(v) / 100 for v in data.get('risk_per_trade_values', [0.5, 1.0, 2.0, 3.0])]  # Convert from percentage
+        rr_values = [float(v) for v in data.get('risk_reward_values', [1.0, 1.5, 2.0, 2.5, 3.0])]
+        # Sweeps run inside the request, so grid size x simulations x days is bounded up front
+        try:
+            check_sweep_size(len(risk_values) * len(rr_values), params['simulations'], params['trading_days'])
+        except ValueError as e:
+            return jsonify({
+                'success': False,
+                'message': str(e)
+            }), 400
         
-        # Run simulation
-        results = run_monte_carlo_simulation(**params)
+        use_cache = bool(data.get('use_cache', True))
+        cache_key = make_cache_key('monte_carlo.sweep', model=model_fingerprint(model), params=params,
+                                   risk_per_trade_values=risk_values, risk_reward_values=rr_values)
+        if use_cache:
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                response, age = cached
+                return jsonify({**response, 'cached': True, 'cache_age': age})
         
-        # Get AI analysis
-        analysis = analyze_monte_carlo_results(results, model.pair)
+        results = run_monte_carlo_sweep(
+            risk_values,
+            rr_values,
+            simulations=params['simulations'],
+            initial_capital=params['initial_capital'],
+            trading_days=params['trading_days'],
+            trades_per_day=params['trades_per_day'],
+            base_win_rate=params['base_win_rate'],
+            win_rate_variance=params['win_rate_variance'],
+            risk_reward_variance=params['risk_reward_variance'],
+            consider_fees=params['consider_fees'],
+            seed=params['seed']
+        )
         
-        return jsonify({
+        response = {
             'success': True,
-            'results': results,
-            'ai_analysis': analysis
-        })
+            'results': results
+        }
+        if use_cache:
+            result_cache.set(cache_key, response)
+        
+        return jsonify({**response, 'cached': False})
     except Exception as e:
-        logging.error(f"Error running Monte Carlo simulation: {str(e)}")
+        logging.error(f"Error running Monte Carlo sweep: {str(e)}")
         return jsonify({
             'success': False,
-            'message': f"Error running simulation: {str(e)}"
+            'message': f"Error running sweep: {str(e)}"
         }), 500
 
 
+def _prepare_simulation(data: Optional[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[str, int]]]:
+    """
+    Kiểm tra dữ liệu yêu cầu và chuẩn bị mọi thứ cần để chạy mô phỏng
+    
+    Mọi truy vấn database được thực hiện ở đây (trong request), nên phần chạy mô phỏng
+    có thể thực hiện ở thread khác.
+    
+    Args:
+        data: JSON của yêu cầu
+        
+    Returns:
+        Tuple (thông tin mô phỏng, None) hoặc (None, (thông báo lỗi, HTTP status))
+    """
+    if not data:
+        return None, ('Missing request data', 400)
+    
+    model_id = data.get('model_id')
+    if not model_id:
+        return None, ('Missing model_id parameter', 400)
+    
+    # Check if model exists
+    model = ModelBackup.query.get(model_id)
+    if not model:
+        return None, (f'Model with ID {model_id} not found', 404)
+    
+    params = _parse_simulation_params(data, model)
+    cache_parts = {'model': model_fingerprint(model), 'params': params}
+    trade_returns = None
+    bootstrap_params = None
+    
+    if data.get('mode') == 'bootstrap':
+        # Resample real trade returns from imported backtests instead of a synthetic win rate
+        strategy = data.get('strategy')
+        if not strategy:
+            return None, ('Missing strategy parameter for bootstrap mode', 400)
+        
+        trade_returns = load_trade_returns(db.session, strategy, data.get('pair', model.pair))
+        if trade_returns.size == 0:
+            return None, (f'No imported trades found for strategy {strategy}', 404)
+        
+        bootstrap_params = {
+            'n_trades': int(data['n_trades']) if data.get('n_trades') is not None else None,
+            'block_size': int(data.get('block_size', 1)),
+            'stake_fraction': float(data.get('stake_fraction', 100.0)) / 100,  # Convert from percentage
+            'consider_fees': bool(data.get('consider_fees', False))
+        }
+        # The imported trades are part of the key, so re-imports invalidate cached results
+        cache_parts['bootstrap'] = {
+            **bootstrap_params,
+            'trades': hashlib.sha256(trade_returns.tobytes()).hexdigest()
+        }
+    
+    if params['adaptive']:
+        total_paths = params['max_paths'] if params['max_paths'] is not None else DEFAULT_MAX_PATHS
+        # The whole final-equity distribution is kept in memory, so request budgets are bounded
+        try:
+            check_adaptive_budget(total_paths, params['time_budget'])
+        except ValueError as e:
+            return None, (str(e), 400)
+    else:
+        total_paths = params['simulations']
+    
+    return {
+        'pair': model.pair,
+        'params': params,
+        'trade_returns': trade_returns,
+        'bootstrap_params': bootstrap_params,
+        'total_paths': total_paths,
+        'use_cache': bool(data.get('use_cache', True)),
+        'cache_key': make_cache_key('monte_carlo.run_simulation', **cache_parts)
+    }, None
+
+
+def _parse_simulation_params(data: Dict[str, Any], model: ModelBackup) -> Dict[str, Any]:
+    """Đọc tham số mô phỏng từ JSON của yêu cầu (các giá trị phần trăm được chuyển sang thập phân)"""
+    # Get base win rate from model metrics
+    base_win_rate = 0.5  # Default
+    if model.metrics and 'win_rate' in model.metrics:
+        base_win_rate = float(model.metrics['win_rate']) / 100  # Convert from percentage
+    
+    return {
+        'simulations': int(data.get('simulations', 1000)),
+        'initial_capital': float(data.get('initial_capital', 10000.0)),
+        'risk_per_trade': float(data.get('risk_per_trade', 1.0)) / 100,  # Convert from percentage
+        'trading_days': int(data.get('trading_days', 30)),
+        'trades_per_day': float(data.get('trades_per_day', 3.0)),
+        'base_win_rate': base_win_rate,
+        'win_rate_variance': float(data.get('win_rate_variance', 5.0)) / 100,  # Convert from percentage
+        'risk_reward_ratio': float(data.get('risk_reward_ratio', 1.5)),
+        'risk_reward_variance': float(data.get('risk_reward_variance', 0.2)),
+        'consider_fees': bool(data.get('consider_fees', True)),
+        'seed': int(data['seed']) if data.get('seed') is not None else None,
+        'streaming': bool(data['streaming']) if data.get('streaming') is not None else None,
+        'adaptive': bool(data.get('adaptive', False)),
+        'tolerance': float(data.get('tolerance', DEFAULT_TOLERANCE * 100)) / 100,  # Convert from percentage
+        'max_paths': int(data['max_paths']) if data.get('max_paths') is not None else None,
+        'time_budget': float(data['time_budget']) if data.get('time_budget') is not None else None
+    }
+
+
+def _execute_simulation(
+    prepared: Dict[str, Any],
+    progress: Optional[ProgressCallback] = None,
+    workers: Optional[int] = None
+) -> Dict[str, Any]:
+    """Chạy mô phỏng đã chuẩn bị, phân tích kết quả và lưu phản hồi vào cache"""
+    params = prepared['params']
+    
+    # Run simulation
+    if prepared['trade_returns'] is not None:
+        results = run_bootstrap_simulation(
+            prepared['trade_returns'],
+            simulations=params['simulations'],
+            initial_capital=params['initial_capital'],
+            seed=params['seed'],
+            workers=workers,
+            streaming=params['streaming'],
+            adaptive=params['adaptive'],
+            tolerance=params['tolerance'],
+            max_paths=params['max_paths'],
+            time_budget=params['time_budget'],
+            progress=progress,
+            **prepared['bootstrap_params']
+        )
+    else:
+        results = run_monte_carlo_simulation(**params, workers=workers, progress=progress)
+    
+    # Get AI analysis
+    analysis = analyze_monte_carlo_results(results, prepared['pair'])
+    
+    response = {
+        'success': True,
+        'results': results,
+        'ai_analysis': analysis
+    }
+    if prepared['use_cache']:
+        result_cache.set(prepared['cache_key'], response)
+    
+    return response
+
+
+def _run_job(prepared: Dict[str, Any], progress: ProgressCallback) -> Dict[str, Any]:
+    """
+    Chạy mô phỏng của một job nền.
+    
+    Job chạy trong tiến trình hiện tại trên pool job có giới hạn (không tạo process pool riêng)
+    và luôn ở chế độ streaming, để tiến độ được báo và lệnh hủy được kiểm tra sau mỗi chunk
+    thay vì chỉ một lần khi chạy xong.
+    """
+    job_prepared = {**prepared, 'params': {**prepared['params'], 'streaming': True}}
+    return {**_execute_simulation(job_prepared, progress=progress, workers=1), 'cached': False}
+
+
 def run_monte_carlo_simulation(
     simulations: int = 1000,
     initial_capital: float = 10000.0,
@@ -135,10 +436,20 @@ def run_monte_carlo_simulation(
     win_rate_variance: float = 0.05,
     risk_reward_ratio: float = 1.5,
     risk_reward_variance: float = 0.1,
-    consider_fees: bool = True
+    consider_fees: bool = True,
+    seed: Optional[int] = None,
+    workers: Optional[int] = None,
+    streaming: Optional[bool] = None,
+    adaptive: bool = False,
+    tolerance: float = DEFAULT_TOLERANCE,
+    max_paths: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    progress: Optional[ProgressCallback] = None
 ) -> Dict[str, Any]:
     """
-    Chạy mô phỏng Monte Carlo cho chiến lược giao dịch
+    Chạy mô phỏng Monte Carlo cho chiến lược giao dịch.
+    
+    Sử dụng mô hình theo ngày (DailyPoissonModel) của engine mô phỏng dùng chung.
     
     Args:
         simulations: Số lần mô phỏng
@@ -151,134 +462,175 @@ def run_monte_carlo_simulation(
         risk_reward_ratio: Tỷ lệ rủi ro/phần thưởng
         risk_reward_variance: Độ biến thiên của tỷ lệ rủi ro/phần thưởng
         consider_fees: Xem xét phí giao dịch
+        seed: Seed cho bộ sinh số ngẫu nhiên (None = ngẫu nhiên)
+        workers: Số tiến trình cho các lần chạy lớn (None = số CPU)
+        streaming: Xử lý theo chunk, không giữ toàn bộ ma trận equity (None = tự động)
+        adaptive: Chạy theo lô cho tới khi trung vị, p10 và tỷ lệ thành công hội tụ
+                  (bỏ qua simulations)
+        tolerance: Nửa độ rộng khoảng tin cậy 95% tối đa ở chế độ adaptive
+                   (tỷ lệ vốn ban đầu / tỷ lệ thành công)
+        max_paths: Số đường đi tối đa ở chế độ adaptive (None = mặc định của engine)
+        time_budget: Thời gian chạy tối đa ở chế độ adaptive (giây)
+        progress: Hàm báo tiến độ (số đường đi đã xong, tổng số đường đi)
         
     Returns:
         Dictionary chứa kết quả mô phỏng
     """
-    # Tổng số giao dịch trong khoảng thời gian
-    total_trades = int(trading_days * trades_per_day)
-    
-    # Khởi tạo mảng để lưu trữ kết quả
-    all_equity_curves = np.zeros((simulations, trading_days + 1))
-    all_equity_curves[:, 0] = initial_capital  # Vốn ban đầu
-    
-    # Phí giao dịch (nếu được bật)
-    fee_rate = 0.001 if consider_fees else 0.0  # 0.1% phí giao dịch
-    
-    # Chạy các mô phỏng
-    for sim in range(simulations):
-        # Tạo tỷ lệ thắng ngẫu nhiên cho mô phỏng này, nằm trong phạm vi biến thiên
-        sim_win_rate = np.random.uniform(
-            base_win_rate - win_rate_variance,
-            base_win_rate + win_rate_variance
-        )
-        
-        # Tạo tỷ lệ R:R ngẫu nhiên cho mô phỏng này
-        sim_risk_reward = np.random.uniform(
-            risk_reward_ratio - risk_reward_variance,
-            risk_reward_ratio + risk_reward_variance
-        )
-        
-        # Tỷ lệ thắng trung bình mỗi ngày
-        daily_win_rate = np.random.normal(sim_win_rate, win_rate_variance / 3, trading_days)
-        daily_win_rate = np.clip(daily_win_rate, 0.1, 0.9)  # Giới hạn hợp lý
-        
-        # Khởi tạo vốn
-        equity = initial_capital
-        
-        # Mô phỏng từng ngày giao dịch
-        for day in range(trading_days):
-            # Số giao dịch trong ngày (dao động xung quanh giá trị trung bình)
-            day_trades = np.random.poisson(trades_per_day)
-            
-            # Tỷ lệ thắng cho ngày này
-            win_rate_today = daily_win_rate[day]
-            
-            # Vốn cuối ngày trước
-            prev_equity = equity
-            
-            # Mô phỏng các giao dịch trong ngày
-            for _ in range(day_trades):
-                # Số tiền rủi ro cho giao dịch này
-                risk_amount = equity * risk_per_trade
-                
-                # Xác định kết quả giao dịch (thắng/thua)
-                if np.random.random() < win_rate_today:
-                    # Thắng: cộng thêm (risk_amount * R:R - phí)
-                    win_amount = risk_amount * sim_risk_reward
-                    equity += win_amount - (win_amount * fee_rate)
-                else:
-                    # Thua: trừ đi (risk_amount + phí)
-                    equity -= risk_amount + (risk_amount * fee_rate)
-                
-                # Đảm bảo equity không thể âm
-                equity = max(0, equity)
-            
-            # Lưu kết quả cuối ngày vào đường cong equity
-            all_equity_curves[sim, day + 1] = equity
-    
-    # Tính các percentile cho đường cong equity
-    percentiles = {
-        'p10': np.percentile(all_equity_curves, 10, axis=0).tolist(),
-        'p25': np.percentile(all_equity_curves, 25, axis=0).tolist(),
-        'p50': np.percentile(all_equity_curves, 50, axis=0).tolist(),
-        'p75': np.percentile(all_equity_curves, 75, axis=0).tolist(),
-        'p90': np.percentile(all_equity_curves, 90, axis=0).tolist()
-    }
+    model = DailyPoissonModel(
+        trading_days=trading_days,
+        trades_per_day=trades_per_day,
+        risk_per_trade=risk_per_trade,
+        base_win_rate=base_win_rate,
+        win_rate_variance=win_rate_variance,
+        risk_reward_ratio=risk_reward_ratio,
+        risk_reward_variance=risk_reward_variance,
+        consider_fees=consider_fees
+    )
+    summary = _run_model(model, simulations, initial_capital, seed, workers, streaming,
+                         adaptive, tolerance, max_paths, time_budget, progress)
+    return _format_results(summary)
+
+
+def run_bootstrap_simulation(
+    trade_returns,
+    simulations: int = 1000,
+    initial_capital: float = 10000.0,
+    n_trades: Optional[int] = None,
+    block_size: int = 1,
+    stake_fraction: float = 1.0,
+    consider_fees: bool = False,
+    seed: Optional[int] = None,
+    workers: Optional[int] = None,
+    streaming: Optional[bool] = None,
+    adaptive: bool = False,
+    tolerance: float = DEFAULT_TOLERANCE,
+    max_paths: Optional[int] = None,
+    time_budget: Optional[float] = None,
+    progress: Optional[ProgressCallback] = None
+) -> Dict[str, Any]:
+    """
+    Chạy mô phỏng Monte Carlo bằng cách lấy mẫu lại lợi nhuận thực tế của các giao dịch.
     
-    # Tính các số liệu thống kê
-    final_equities = all_equity_curves[:, -1]
+    Sử dụng mô hình bootstrap (BootstrapModel) của engine mô phỏng dùng chung; kết quả có
+    cùng định dạng với run_monte_carlo_simulation.
     
-    # Lợi nhuận trung bình
-    mean_profit_abs = np.mean(final_equities - initial_capital)
-    mean_profit_pct = (mean_profit_abs / initial_capital) * 100
+    Args:
+        trade_returns: Mảng lợi nhuận của từng giao dịch (dạng thập phân, ví dụ 0.02 = +2%)
+        simulations: Số lần mô phỏng
+        initial_capital: Vốn ban đầu
+        n_trades: Số giao dịch trên mỗi đường đi (None = bằng số giao dịch thực tế)
+        block_size: Độ dài khối của block bootstrap (1 = lấy mẫu độc lập từng giao dịch)
+        stake_fraction: Tỷ lệ vốn đặt cược mỗi giao dịch
+        consider_fees: Trừ thêm phí giao dịch (lợi nhuận từ Freqtrade đã bao gồm phí)
+        seed: Seed cho bộ sinh số ngẫu nhiên (None = ngẫu nhiên)
+        workers: Số tiến trình cho các lần chạy lớn (None = số CPU)
+        streaming: Xử lý theo chunk, không giữ toàn bộ ma trận equity (None = tự động)
+        adaptive: Chạy theo lô cho tới khi kết quả hội tụ (bỏ qua simulations)
+        tolerance: Nửa độ rộng khoảng tin cậy 95% tối đa ở chế độ adaptive
+        max_paths: Số đường đi tối đa ở chế độ adaptive
+        time_budget: Thời gian chạy tối đa ở chế độ adaptive (giây)
+        progress: Hàm báo tiến độ (số đường đi đã xong, tổng số đường đi)
+        
+    Returns:
+        Dictionary chứa kết quả mô phỏng
+    """
+    model = BootstrapModel(
+        trade_returns,
+        n_trades=n_trades,
+        stake_fraction=stake_fraction,
+        consider_fees=consider_fees,
+        block_size=block_size
+    )
+    summary = _run_model(model, simulations, initial_capital, seed, workers, streaming,
+                         adaptive, tolerance, max_paths, time_budget, progress)
+    results = _format_results(summary)
+    results['parameters'] = summary['parameters']
+    return results
+
+
+def run_monte_carlo_sweep(
+    risk_per_trade_values: List[float],
+    risk_reward_values: List[float],
+    simulations: int = 1000,
+    initial_capital: float = 10000.0,
+    trading_days: int = 30,
+    trades_per_day: float = 3.0,
+    base_win_rate: float = 0.5,
+    win_rate_variance: float = 0.05,
+    risk_reward_variance: float = 0.1,
+    consider_fees: bool = True,
+    seed: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Chạy mô phỏng Monte Carlo cho mọi tổ hợp risk per trade x R:R.
     
-    # Tỷ lệ thành công
-    success_rate = (np.sum(final_equities >= initial_capital) / simulations) * 100
+    Mọi điểm lưới dùng chung các số ngẫu nhiên (common random numbers) của mô hình
+    DailyPoissonModel, nên so sánh giữa các điểm có phương sai thấp và cả lưới chỉ tốn
+    thêm phần tính hệ số, không phải sinh lại số ngẫu nhiên.
     
-    # Tính tỷ lệ drawdown tối đa
-    max_drawdowns = np.zeros(simulations)
-    for i in range(simulations):
-        curve = all_equity_curves[i]
-        peak = np.maximum.accumulate(curve)
-        drawdown = (peak - curve) / peak * 100
-        max_drawdowns[i] = np.max(drawdown)
+    Args:
+        risk_per_trade_values: Các giá trị rủi ro mỗi giao dịch (dạng thập phân)
+        risk_reward_values: Các giá trị R:R
+        simulations: Số lần mô phỏng cho mỗi điểm lưới
+        initial_capital: Vốn ban đầu
+        trading_days: Số ngày giao dịch để mô phỏng
+        trades_per_day: Số giao dịch trung bình mỗi ngày
+        base_win_rate: Tỷ lệ thắng cơ bản
+        win_rate_variance: Độ biến thiên của tỷ lệ thắng
+        risk_reward_variance: Độ biến thiên của tỷ lệ rủi ro/phần thưởng
+        consider_fees: Xem xét phí giao dịch
+        seed: Seed cho bộ sinh số ngẫu nhiên (None = ngẫu nhiên)
+        
+    Returns:
+        Dictionary gồm các trục của lưới và ma trận thống kê, xem run_parameter_sweep
+    """
+    model = DailyPoissonModel(
+        trading_days=trading_days,
+        trades_per_day=trades_per_day,
+        base_win_rate=base_win_rate,
+        win_rate_variance=win_rate_variance,
+        risk_reward_variance=risk_reward_variance,
+        consider_fees=consider_fees
+    )
+    return run_parameter_sweep(model, risk_per_trade_values, risk_reward_values,
+                               simulations, initial_capital, seed=seed)
+
+
+def _run_model(model, simulations, initial_capital, seed, workers, streaming,
+               adaptive, tolerance, max_paths, time_budget, progress=None) -> Dict[str, Any]:
+    """Chạy engine mô phỏng ở chế độ cố định số đường đi hoặc chế độ adaptive"""
+    if adaptive:
+        adaptive_options = {'max_paths': max_paths} if max_paths is not None else {}
+        return run_adaptive_simulation(model, initial_capital, seed=seed, tolerance=tolerance,
+                                       time_budget=time_budget, progress=progress, **adaptive_options)
+    return run_simulation(model, simulations, initial_capital, seed=seed,
+                          workers=workers, streaming=streaming, progress=progress)
+
+
+def _format_results(summary: Dict[str, Any]) -> Dict[str, Any]:
+    """Chuyển kết quả của engine sang định dạng phản hồi của endpoint"""
+    simulations = summary['simulations']
     
     # Tỷ lệ profit factor
-    winning_trades = np.sum(np.where(final_equities > initial_capital, 
-                                    final_equities - initial_capital, 0))
-    losing_trades = np.sum(np.where(final_equities < initial_capital, 
-                                   initial_capital - final_equities, 0))
-    profit_factor = winning_trades / losing_trades if losing_trades > 0 else float('inf')
-    
-    # Phân phối lợi nhuận cuối cùng
-    profit_percentiles = {
-        'p10': float(np.percentile(final_equities, 10)),
-        'p25': float(np.percentile(final_equities, 25)),
-        'p50': float(np.percentile(final_equities, 50)),
-        'p75': float(np.percentile(final_equities, 75)),
-        'p90': float(np.percentile(final_equities, 90))
-    }
-    
-    # Tạo một mẫu nhỏ hơn của phân phối cuối cùng để trả về (tối đa 1000 điểm)
-    sample_size = min(1000, simulations)
-    sample_indices = np.random.choice(simulations, sample_size, replace=False)
-    final_distribution_sample = final_equities[sample_indices].tolist()
+    gross_loss = summary['gross_loss']
+    profit_factor = summary['gross_profit'] / gross_loss if gross_loss > 0 else float('inf')
     
-    return {
-        'mean_profit_abs': float(mean_profit_abs),
-        'mean_profit_pct': float(mean_profit_pct),
-        'success_rate': float(success_rate),
+    results = {
+        'simulations': simulations,
+        'mean_profit_abs': summary['mean_profit_abs'],
+        'mean_profit_pct': summary['mean_profit_pct'],
+        'success_rate': summary['success_count'] / simulations * 100,
         'profit_factor': float(profit_factor),
-        'max_drawdown': {
-            'mean': float(np.mean(max_drawdowns)),
-            'median': float(np.median(max_drawdowns)),
-            'p90': float(np.percentile(max_drawdowns, 90))
-        },
-        'profit_percentiles': profit_percentiles,
-        'percentiles': percentiles,
-        'final_distribution': final_distribution_sample
+        'max_drawdown': summary['max_drawdown_pct'],
+        'drawdown': summary['drawdown'],
+        'profit_percentiles': summary['final_percentiles'],
+        'percentiles': summary['percentiles'],
+        'final_distribution': summary['final_distribution']
     }
+    if 'convergence' in summary:
+        results['convergence'] = summary['convergence']
+    
+    return results
 
 
 def analyze_monte_carlo_results(results: Dict[str, Any], pair: str) -> Dict[str, Any]:
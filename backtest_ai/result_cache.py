@@ -0,0 +1,213 @@
+"""
+Cache kết quả cho các endpoint mô phỏng Monte Carlo.
+
+Khóa cache là hash SHA-256 của dạng JSON chuẩn hóa (sắp xếp khóa) của mọi thành phần
+quyết định kết quả: endpoint, phiên bản mô hình (id, version, thời gian sửa file backup,
+metrics), toàn bộ tham số mô phỏng và seed. Cache gồm hai tầng:
+
+- Tầng bộ nhớ: LRU trong tiến trình, giới hạn theo số mục.
+- Tầng đĩa (tùy chọn): mỗi mục là một file JSON nén gzip, xóa các mục ít được dùng nhất
+  khi tổng dung lượng vượt giới hạn.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Số mục tối đa của tầng bộ nhớ
+DEFAULT_MAX_ENTRIES = 128
+
+# Dung lượng tối đa của tầng đĩa (byte)
+DEFAULT_MAX_DISK_BYTES = 256 * 1024 * 1024
+
+CACHE_FILE_SUFFIX = '.json.gz'
+
+
+def make_cache_key(namespace: str, **parts: Any) -> str:
+    """
+    Tạo khóa cache từ các thành phần của yêu cầu
+
+    Args:
+        namespace: Tên endpoint hoặc loại kết quả
+        **parts: Các thành phần quyết định kết quả (phải chuyển được sang JSON)
+
+    Returns:
+        Chuỗi hex SHA-256
+    """
+    canonical = json.dumps({'namespace': namespace, **parts}, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def model_fingerprint(model) -> Dict[str, Any]:
+    """
+    Phiên bản của một ModelBackup dùng trong khóa cache
+
+    Thời gian sửa file backup được đưa vào khóa nên khi mô hình được huấn luyện lại,
+    các kết quả cũ tự động không còn được dùng.
+    """
+    backup_path = model.backup_path
+    mtime = os.path.getmtime(backup_path) if backup_path and os.path.exists(backup_path) else None
+    return {
+        'model_id': model.id,
+        'version': model.version,
+        'backup_path': backup_path,
+        'mtime': mtime,
+        'metrics': model.metrics
+    }
+
+
+class ResultCache:
+    """Cache hai tầng (LRU trong bộ nhớ + file nén trên đĩa) cho kết quả dạng JSON"""
+
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        cache_dir: Optional[str] = None,
+        max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES
+    ):
+        """
+        Args:
+            max_entries: Số mục tối đa của tầng bộ nhớ (0 = tắt tầng bộ nhớ)
+            cache_dir: Thư mục của tầng đĩa (None = không dùng tầng đĩa)
+            max_disk_bytes: Dung lượng tối đa của tầng đĩa
+        """
+        self.max_entries = int(max_entries)
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = int(max_disk_bytes)
+        self._entries: 'OrderedDict[str, Tuple[float, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+        if self.cache_dir:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> 'ResultCache':
+        """Tạo cache từ biến môi trường MONTE_CARLO_CACHE_SIZE, MONTE_CARLO_CACHE_DIR, MONTE_CARLO_CACHE_DISK_MB"""
+        return cls(
+            max_entries=int(os.environ.get('MONTE_CARLO_CACHE_SIZE', DEFAULT_MAX_ENTRIES)),
+            cache_dir=os.environ.get('MONTE_CARLO_CACHE_DIR') or None,
+            max_disk_bytes=int(float(os.environ.get('MONTE_CARLO_CACHE_DISK_MB', DEFAULT_MAX_DISK_BYTES / 2 ** 20)) * 2 ** 20)
+        )
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        """
+        Lấy kết quả đã lưu
+
+        Returns:
+            Tuple (kết quả, tuổi tính bằng giây) hoặc None nếu không có trong cache
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None:
+            entry = self._read_disk(key)
+            if entry is None:
+                return None
+            self._remember(key, entry)
+
+        created_at, value = entry
+        return value, max(time.time() - created_at, 0.0)
+
+    def set(self, key: str, value: Any) -> None:
+        """Lưu kết quả (phải chuyển được sang JSON) vào cả hai tầng"""
+        entry = (time.time(), value)
+        self._remember(key, entry)
+        self._write_disk(key, entry)
+
+    def clear(self) -> None:
+        """Xóa toàn bộ cache"""
+        with self._lock:
+            self._entries.clear()
+        for path, _, _ in self._disk_files():
+            _remove_quietly(path)
+
+    def _remember(self, key: str, entry: Tuple[float, Any]) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + CACHE_FILE_SUFFIX)
+
+    def _read_disk(self, key: str) -> Optional[Tuple[float, Any]]:
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                data = json.load(f)
+            # Cập nhật thời gian truy cập để việc dọn dẹp xóa các mục ít dùng nhất trước
+            os.utime(path)
+            return data['created_at'], data['result']
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Bỏ qua file cache hỏng {path}: {str(e)}")
+            _remove_quietly(path)
+            return None
+
+    def _write_disk(self, key: str, entry: Tuple[float, Any]) -> None:
+        if not self.cache_dir:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump({'created_at': entry[0], 'result': entry[1]}, f)
+            # Ghi vào file tạm rồi đổi tên để tiến trình khác không đọc phải file ghi dở
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"Không thể ghi cache {path}: {str(e)}")
+            _remove_quietly(tmp_path)
+            return
+        self._evict_disk()
+
+    def _disk_files(self):
+        """Danh sách (đường dẫn, dung lượng, thời gian truy cập) của các file cache"""
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return []
+        files = []
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(CACHE_FILE_SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    files.append((entry.path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _evict_disk(self) -> None:
+        files = self._disk_files()
+        total = sum(size for _, size, _ in files)
+        if total <= self.max_disk_bytes:
+            return
+        for path, size, _ in sorted(files, key=lambda item: item[2]):
+            _remove_quietly(path)
+            total -= size
+            if total <= self.max_disk_bytes:
+                break
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+# Cache dùng chung cho các endpoint Monte Carlo
+result_cache = ResultCache.from_env()
@@ -114,8 +114,15 @@ def lazy_import():
 
 from freqtrade_integration.import_backtest import import_backtest_results, prepare_training_data, generate_training_features
 from freqtrade_integration.train_model import train_lightgbm_model, optimize_hyperparameters, save_model, register_model_in_database
+from freqtrade_integration.hyperparameter_tuning import DEFAULT_MAX_TRIALS, DEFAULT_TIME_BUDGET, SQLTrialStore
+from freqtrade_integration.training_orchestrator import normalize_job
 from freqtrade_integration.generate_ai_strategy import generate_ai_strategy
-from main import db, ModelBackup, TrainingConfig
+from models import db, ModelBackup, TrainingConfig, TuningTrial
+from backtest_ai.result_cache import make_cache_key, model_fingerprint, result_cache
+from backtest_ai.simulation import (
+    DEFAULT_MAX_PATHS, DEFAULT_TOLERANCE, PerTradeModel, check_adaptive_budget, request_workers,
+    run_adaptive_simulation, run_simulation
+)
 
 # Sử dụng Blueprint đã được tạo trong __init__.py
 from backtest_ai import backtest_ai_bp
@@ -139,13 +146,20 @@ def api_import_backtest():
         directory = data.get('directory', '')
         filter_strategy = data.get('filter_strategy')
         overwrite = data.get('overwrite', False)
+        workers = int(data.get('workers', 1))
+        
+        if workers < 1 or workers > (os.cpu_count() or 1):
+            return jsonify({
+                'success': False,
+                'message': f'Số workers phải nằm trong khoảng 1-{os.cpu_count() or 1}'
+            }), 400
         
         # Chuẩn hóa đường dẫn (thay ~ bằng home directory)
         if directory.startswith('~'):
             directory = os.path.expanduser(directory)
         
         # Import dữ liệu backtest
-        results = import_backtest_results(directory, filter_strategy)
+        results = import_backtest_results(directory, filter_strategy, workers=workers)
         
         return jsonify({
             'success': True,
@@ -163,7 +177,7 @@ def api_import_backtest():
 def api_get_imported_data():
     """API lấy thông tin về dữ liệu đã import"""
     try:
-        from freqtrade_integration.import_backtest import BacktestResult
+        from freqtrade_integration.import_backtest import BacktestResult, BacktestTrade
         
         # Kết nối database
         from sqlalchemy import create_engine, func
@@ -177,17 +191,22 @@ def api_get_imported_data():
         strategies_data = session.query(
             BacktestResult.strategy_name,
             func.count(BacktestResult.id).label('files'),
-            func.count(BacktestResult.trades_data).label('trades'),
             func.count(func.distinct(BacktestResult.pair)).label('pairs'),
             func.max(BacktestResult.import_date).label('last_import')
         ).group_by(BacktestResult.strategy_name).all()
         
+        # Số giao dịch của mỗi chiến lược trong bảng backtest_trades
+        trade_counts = dict(session.query(
+            BacktestTrade.strategy_name,
+            func.count(BacktestTrade.id)
+        ).group_by(BacktestTrade.strategy_name).all())
+        
         strategies = []
         for s in strategies_data:
             strategies.append({
                 'strategy': s.strategy_name,
                 'files': s.files,
-                'trades': s.trades,
+                'trades': trade_counts.get(s.strategy_name, 0),
                 'pairs': s.pairs,
                 'lastImport': s.last_import.strftime('%Y-%m-%d %H:%M') if s.last_import else ''
             })
@@ -359,6 +378,14 @@ def api_train_model():
         use_feature_selection = data.get('use_feature_selection', True)
         register_in_db = data.get('register_in_db', True)
         use_gpu = data.get('use_gpu', False)
+        tuning_max_trials = int(data.get('tuning_max_trials', DEFAULT_MAX_TRIALS))
+        tuning_time_budget = float(data.get('tuning_time_budget', DEFAULT_TIME_BUDGET))
+        
+        if tuning_max_trials < 1 or tuning_time_budget < 0:
+            return jsonify({
+                'success': False,
+                'message': 'tuning_max_trials phải >= 1 và tuning_time_budget phải >= 0'
+            }), 400
         
         # Chuẩn bị dữ liệu huấn luyện từ kết quả backtest
         training_data = None
@@ -392,7 +419,10 @@ def api_train_model():
         # Tối ưu hyperparameters nếu được yêu cầu
         params = None
         if optimize:
-            params = optimize_hyperparameters(X, y)
+            params = optimize_hyperparameters(
+                X, y, max_trials=tuning_max_trials, time_budget=tuning_time_budget,
+                store=SQLTrialStore(db.session, TuningTrial), study_name=f"{'+'.join(sorted(strategies))}:{pair}"
+            )
         
         # Huấn luyện mô hình
         additional_params = {}
@@ -433,6 +463,161 @@ def api_train_model():
             'message': f'Lỗi khi huấn luyện mô hình: {str(e)}'
         }), 500
 
+@backtest_ai_bp.route('/api/train_models', methods=['POST'])
+def api_train_models():
+    """API thêm nhiều job huấn luyện vào hàng đợi (mỗi job là một nhóm chiến lược và một cặp giao dịch)"""
+    try:
+        data = request.json or {}
+        specs = data.get('jobs', [])
+        register_in_db = data.get('register_in_db', True)
+        defaults = {
+            key: data[key]
+            for key in ('timeframe', 'min_trades', 'optimize', 'tuning_max_trials', 'tuning_time_budget')
+            if key in data
+        }
+        if 'optimize_hyperparams' in data:
+            defaults['optimize'] = data['optimize_hyperparams']
+        
+        if not isinstance(specs, list) or not specs:
+            return jsonify({
+                'success': False,
+                'message': 'Cần danh sách jobs, mỗi job gồm strategies và pair'
+            }), 400
+        
+        if not isinstance(register_in_db, bool):
+            return jsonify({
+                'success': False,
+                'message': 'register_in_db phải là true hoặc false'
+            }), 400
+        
+        try:
+            jobs = [normalize_job(spec, defaults) for spec in specs]
+        except (TypeError, ValueError) as e:
+            return jsonify({
+                'success': False,
+                'message': f'Job không hợp lệ: {str(e)}'
+            }), 400
+        
+        # Huấn luyện chạy trên các worker của hàng đợi, không chạy trong HTTP request
+        queue = _training_queue()
+        queued = [queue.enqueue({**job, 'register_in_db': register_in_db}) for job in jobs]
+        
+        return jsonify({
+            'success': True,
+            'message': f'Đã thêm {len(queued)} job huấn luyện vào hàng đợi',
+            'job_ids': [job['job_id'] for job in queued],
+            'jobs': queued,
+            **_worker_status(queue, queued[0])
+        }), 202
+    except Exception as e:
+        logger.error(f"Lỗi khi thêm các job huấn luyện: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Lỗi khi thêm các job huấn luyện: {str(e)}'
+        }), 500
+
+def _training_queue():
+    """Hàng đợi job huấn luyện trên database của ứng dụng"""
+    # Import khi cần để `python -m backtest_ai.training_queue` không nạp module này hai lần
+    from backtest_ai.training_queue import TrainingQueue
+    return TrainingQueue(db.engine)
+
+def _worker_status(queue, job):
+    """Số worker huấn luyện còn heartbeat, kèm cảnh báo nếu job đang chờ mà không có worker nào"""
+    from backtest_ai.jobs import QUEUED
+    active_workers = queue.active_workers()
+    status = {'active_workers': active_workers}
+    if active_workers == 0 and job['status'] == QUEUED:
+        status['warning'] = ('Không có worker huấn luyện nào đang chạy; job sẽ chờ trong hàng đợi cho tới khi '
+                             'khởi động `python -m backtest_ai.training_queue`')
+    return status
+
+@backtest_ai_bp.route('/api/training_jobs', methods=['POST'])
+def api_submit_training_job():
+    """API thêm job huấn luyện vào hàng đợi chạy nền, trả về job id"""
+    try:
+        data = dict(request.json or {})
+        if 'optimize_hyperparams' in data:
+            data['optimize'] = data.pop('optimize_hyperparams')
+        register_in_db = data.pop('register_in_db', True)
+        if not isinstance(register_in_db, bool):
+            return jsonify({
+                'success': False,
+                'message': 'register_in_db phải là true hoặc false'
+            }), 400
+        spec = {
+            key: data[key]
+            for key in ('strategies', 'strategy', 'pair', 'timeframe', 'min_trades', 'optimize',
+                        'tuning_max_trials', 'tuning_time_budget', 'model_name')
+            if key in data
+        }
+        
+        try:
+            job = normalize_job(spec)
+        except (TypeError, ValueError) as e:
+            return jsonify({
+                'success': False,
+                'message': f'Job không hợp lệ: {str(e)}'
+            }), 400
+        job['register_in_db'] = register_in_db
+        
+        queue = _training_queue()
+        job = queue.enqueue(job)
+        return jsonify({
+            'success': True,
+            'job': job,
+            **_worker_status(queue, job)
+        }), 202
+    except Exception as e:
+        logger.error(f"Lỗi khi thêm job huấn luyện: {str(e)}")
+        return jsonify({
+            'success': False,
+            'message': f'Lỗi khi thêm job huấn luyện: {str(e)}'
+        }), 500
+
+@backtest_ai_bp.route('/api/training_jobs', methods=['GET'])
+def api_list_training_jobs():
+    """API lấy danh sách các job huấn luyện mới nhất"""
+    limit = request.args.get('limit', 50, type=int)
+    return jsonify({
+        'success': True,
+        'jobs': _training_queue().list_jobs(limit=max(1, min(limit, 500)))
+    })
+
+@backtest_ai_bp.route('/api/training_jobs/<int:job_id>', methods=['GET'])
+def api_get_training_job(job_id):
+    """API lấy trạng thái, tiến độ và log mới của một job huấn luyện (log có id > after)"""
+    queue = _training_queue()
+    job = queue.get(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': f'Không tìm thấy job {job_id}'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'job': job,
+        'logs': queue.logs(job_id, after=request.args.get('after', 0, type=int)),
+        **_worker_status(queue, job)
+    })
+
+@backtest_ai_bp.route('/api/training_jobs/<int:job_id>', methods=['DELETE'])
+@backtest_ai_bp.route('/api/training_jobs/<int:job_id>/cancel', methods=['POST'])
+def api_cancel_training_job(job_id):
+    """API hủy một job huấn luyện đang chờ hoặc đang chạy"""
+    job = _training_queue().cancel(job_id)
+    if job is None:
+        return jsonify({
+            'success': False,
+            'message': f'Không tìm thấy job {job_id}'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'job': job
+    })
+
 @backtest_ai_bp.route('/api/models', methods=['GET'])
 def api_get_models():
     """API lấy danh sách các mô hình AI đã huấn luyện"""
@@ -679,6 +864,21 @@ def api_run_monte_carlo():
         win_rate_variance = data.get('win_rate_variance', 5.0) / 100.0  # Chuyển từ % sang decimal
         risk_reward_variance = data.get('risk_reward_variance', 10.0) / 100.0  # Chuyển từ % sang decimal
         consider_fees = data.get('consider_fees', True)
+        adaptive = data.get('adaptive', False)
+        tolerance = data.get('tolerance', DEFAULT_TOLERANCE * 100) / 100.0  # Chuyển từ % sang decimal
+        max_paths = data.get('max_paths')
+        time_budget = data.get('time_budget')
+        
+        # Vốn cuối cùng của mọi đường đi được giữ trong bộ nhớ, nên ngân sách adaptive bị giới hạn
+        if adaptive:
+            try:
+                check_adaptive_budget(int(max_paths) if max_paths is not None else DEFAULT_MAX_PATHS,
+                                      float(time_budget) if time_budget is not None else None)
+            except ValueError as e:
+                return jsonify({
+                    'success': False,
+                    'message': str(e)
+                }), 400
         
         # Lấy thông tin mô hình từ database
         model = ModelBackup.query.get(model_id)
@@ -693,28 +893,47 @@ def api_run_monte_carlo():
         base_win_rate = model.metrics.get('positive_rate', 0.5) if model.metrics else 0.5
         risk_reward_ratio = 1.5  # Giá trị mặc định
         
+        params = {
+            'simulations': simulations,
+            'initial_capital': initial_capital,
+            'risk_per_trade': risk_per_trade,
+            'trading_days': trading_days,
+            'trades_per_day': trades_per_day,
+            'base_win_rate': base_win_rate,
+            'win_rate_variance': win_rate_variance,
+            'risk_reward_ratio': risk_reward_ratio,
+            'risk_reward_variance': risk_reward_variance,
+            'consider_fees': consider_fees,
+            'adaptive': adaptive,
+            'tolerance': tolerance,
+            'max_paths': max_paths,
+            'time_budget': time_budget
+        }
+        
+        # Trả về kết quả đã tính nếu cùng mô hình (và phiên bản) với cùng tham số
+        use_cache = data.get('use_cache', True)
+        cache_key = make_cache_key('backtest_ai.run_monte_carlo', model=model_fingerprint(model), params=params)
+        if use_cache:
+            cached = result_cache.get(cache_key)
+            if cached is not None:
+                response, age = cached
+                return jsonify({**response, 'cached': True, 'cache_age': age})
+        
         # Chạy mô phỏng Monte Carlo
-        mc_results = run_monte_carlo_simulation(
-            simulations=simulations,
-            initial_capital=initial_capital,
-            risk_per_trade=risk_per_trade,
-            trading_days=trading_days,
-            trades_per_day=trades_per_day,
-            base_win_rate=base_win_rate,
-            win_rate_variance=win_rate_variance,
-            risk_reward_ratio=risk_reward_ratio,
-            risk_reward_variance=risk_reward_variance,
-            consider_fees=consider_fees
-        )
+        mc_results = run_monte_carlo_simulation(**params, workers=request_workers())
         
         # Phân tích kết quả và tạo đề xuất AI
         ai_analysis = analyze_monte_carlo_results(mc_results, model.pair)
         
-        return jsonify({
+        response = {
             'success': True,
             'results': mc_results,
             'ai_analysis': ai_analysis
-        })
+        }
+        if use_cache:
+            result_cache.set(cache_key, response)
+        
+        return jsonify({**response, 'cached': False})
     except Exception as e:
         logger.error(f"Lỗi khi chạy mô phỏng Monte Carlo: {str(e)}")
         return jsonify({
@@ -792,6 +1011,9 @@ def api_run_auto_backtest():
 
 # Hàm phụ trợ
 
+# Số điểm tối đa của phân phối vốn cuối cùng trả về cho biểu đồ Monte Carlo
+FINAL_DISTRIBUTION_LIMIT = 10000
+
 def run_monte_carlo_simulation(
     simulations: int = 1000,
     initial_capital: float = 10000.0,
@@ -802,10 +1024,18 @@ def run_monte_carlo_simulation(
     win_rate_variance: float = 0.05,
     risk_reward_ratio: float = 1.5,
     risk_reward_variance: float = 0.1,
-    consider_fees: bool = True
+    consider_fees: bool = True,
+    seed: Optional[int] = 42,
+    workers: Optional[int] = None,
+    adaptive: bool = False,
+    tolerance: float = DEFAULT_TOLERANCE,
+    max_paths: Optional[int] = None,
+    time_budget: Optional[float] = None
 ) -> Dict[str, Any]:
     """
-    Chạy mô phỏng Monte Carlo cho chiến lược giao dịch
+    Chạy mô phỏng Monte Carlo cho chiến lược giao dịch.
+    
+    Sử dụng mô hình theo giao dịch (PerTradeModel) của engine mô phỏng dùng chung.
     
     Args:
         simulations: Số lần mô phỏng
@@ -818,113 +1048,62 @@ def run_monte_carlo_simulation(
         risk_reward_ratio: Tỷ lệ rủi ro/phần thưởng
         risk_reward_variance: Độ biến thiên của tỷ lệ rủi ro/phần thưởng
         consider_fees: Xem xét phí giao dịch
+        seed: Seed cho bộ sinh số ngẫu nhiên
+        workers: Số tiến trình cho các lần chạy lớn (None = số CPU)
+        adaptive: Chạy theo lô cho tới khi trung vị, p10 và tỷ lệ thành công hội tụ
+                  (bỏ qua simulations)
+        tolerance: Nửa độ rộng khoảng tin cậy 95% tối đa ở chế độ adaptive
+                   (tỷ lệ vốn ban đầu / tỷ lệ thành công)
+        max_paths: Số đường đi tối đa ở chế độ adaptive (None = mặc định của engine)
+        time_budget: Thời gian chạy tối đa ở chế độ adaptive (giây)
         
     Returns:
         Dictionary chứa kết quả mô phỏng
     """
-    # Import các thư viện cần thiết
-    lazy_import()
-    
-    np.random.seed(42)  # Đặt seed để có kết quả có thể lặp lại
+    model = PerTradeModel(
+        trading_days=trading_days,
+        trades_per_day=trades_per_day,
+        risk_per_trade=risk_per_trade,
+        base_win_rate=base_win_rate,
+        win_rate_variance=win_rate_variance,
+        risk_reward_ratio=risk_reward_ratio,
+        risk_reward_variance=risk_reward_variance,
+        consider_fees=consider_fees
+    )
     
-    # Phí giao dịch (%)
-    fee_percentage = 0.001 if consider_fees else 0.0  # 0.1% phí mặc định
+    # Seed cố định để có kết quả có thể lặp lại (không thay đổi trạng thái np.random toàn cục).
+    # Phân phối vốn cuối cùng được giới hạn để bộ nhớ không tăng theo số mô phỏng
+    if adaptive:
+        adaptive_options = {'max_paths': max_paths} if max_paths is not None else {}
+        summary = run_adaptive_simulation(model, initial_capital, seed=seed, tolerance=tolerance,
+                                          time_budget=time_budget,
+                                          final_sample_size=FINAL_DISTRIBUTION_LIMIT, **adaptive_options)
+    else:
+        summary = run_simulation(model, simulations, initial_capital, seed=seed,
+                                 final_sample_size=FINAL_DISTRIBUTION_LIMIT, workers=workers)
+    simulations = summary['simulations']
     
     # Số giao dịch tổng cộng
-    total_trades = int(trading_days * trades_per_day)
-    
-    # Mảng lưu các đường cong vốn
-    equity_curves = np.zeros((simulations, total_trades + 1))
-    equity_curves[:, 0] = initial_capital  # Vốn ban đầu
-    
-    # Thực hiện mô phỏng
-    for sim in range(simulations):
-        # Biến đổi tỷ lệ thắng cho mỗi mô phỏng
-        sim_win_rate = max(0.1, min(0.9, base_win_rate + np.random.uniform(-win_rate_variance, win_rate_variance)))
-        
-        # Vốn hiện tại
-        current_capital = initial_capital
-        
-        for t in range(total_trades):
-            # Số tiền rủi ro cho giao dịch này
-            risk_amount = current_capital * risk_per_trade
-            
-            # Biến đổi tỷ lệ rủi ro/phần thưởng cho mỗi giao dịch
-            trade_rr = max(0.5, risk_reward_ratio + np.random.uniform(-risk_reward_variance, risk_reward_variance))
-            
-            # Số tiền tiềm năng kiếm được
-            reward_amount = risk_amount * trade_rr
-            
-            # Xác định kết quả giao dịch
-            is_win = np.random.random() < sim_win_rate
-            
-            if is_win:
-                # Thắng
-                current_capital += reward_amount - (fee_percentage * (current_capital + reward_amount))
-            else:
-                # Thua
-                current_capital -= risk_amount + (fee_percentage * (current_capital - risk_amount))
-            
-            # Giới hạn tối thiểu cho vốn
-            current_capital = max(0.0, current_capital)
-            
-            # Lưu vốn hiện tại
-            equity_curves[sim, t + 1] = current_capital
-    
-    # Tính toán các chỉ số
-    final_capitals = equity_curves[:, -1]
-    mean_profit = np.mean(final_capitals) - initial_capital
-    mean_profit_pct = (mean_profit / initial_capital) * 100
-    
-    # Tính drawdown tối đa
-    max_drawdowns = np.zeros(simulations)
-    for sim in range(simulations):
-        curve = equity_curves[sim]
-        drawdowns = np.maximum.accumulate(curve) - curve
-        max_drawdowns[sim] = np.max(drawdowns)
-    mean_max_drawdown = np.mean(max_drawdowns)
-    
-    # Tính profit factor (tổng lợi nhuận / tổng thua lỗ)
-    profitable_sims = np.sum(final_capitals > initial_capital)
-    success_rate = (profitable_sims / simulations) * 100
-    
-    # Tính Sharpe ratio (đơn giản hóa)
-    returns = (final_capitals - initial_capital) / initial_capital
-    sharpe_ratio = np.mean(returns) / np.std(returns) if np.std(returns) > 0 else 0
-    
-    # Tính expected value
-    expected_value = mean_profit / total_trades
-    
-    # Tính profit factor (đơn giản hóa)
-    profit_factor = np.sum(np.where(final_capitals > initial_capital, final_capitals - initial_capital, 0)) / \
-                   np.sum(np.where(final_capitals < initial_capital, initial_capital - final_capitals, 1))
-    
-    # Tạo kết quả phân vị (10, 25, 50, 75, 90)
-    percentiles = np.percentile(equity_curves, [10, 25, 50, 75, 90], axis=0)
+    total_trades = model.n_steps
+    mean_profit = summary['mean_profit_abs']
     
-    # Tạo mẫu một số đường cong để hiển thị
-    sample_indices = np.random.choice(simulations, min(20, simulations), replace=False)
-    sample_curves = equity_curves[sample_indices].tolist()
+    # Tính profit factor (đơn giản hóa): mỗi mô phỏng không lỗ đóng góp 1 vào mẫu số
+    profit_factor = summary['gross_profit'] / (summary['gross_loss'] + simulations - summary['losing_count'])
     
     # Kết quả trả về
     results = {
-        'mean_profit': float(mean_profit),
-        'mean_profit_pct': float(mean_profit_pct),
-        'max_drawdown': float(mean_max_drawdown),
-        'success_rate': float(success_rate),
-        'sharpe_ratio': float(sharpe_ratio),
-        'expected_value': float(expected_value),
+        'mean_profit': mean_profit,
+        'mean_profit_pct': summary['mean_profit_pct'],
+        'max_drawdown': summary['max_drawdown_abs']['mean'],
+        'drawdown': summary['drawdown'],
+        'success_rate': summary['profitable_count'] / simulations * 100,
+        'sharpe_ratio': summary['sharpe_ratio'],
+        'expected_value': mean_profit / total_trades if total_trades else 0.0,
         'profit_factor': float(profit_factor),
-        'percentiles': {
-            'p10': percentiles[0].tolist(),
-            'p25': percentiles[1].tolist(),
-            'p50': percentiles[2].tolist(),
-            'p75': percentiles[3].tolist(),
-            'p90': percentiles[4].tolist()
-        },
-        'sample_curves': sample_curves,
+        'percentiles': summary['percentiles'],
+        'sample_curves': summary['sample_curves'],
         'initial_capital': initial_capital,
-        'final_distribution': final_capitals.tolist(),
+        'final_distribution': summary['final_distribution'],
         'parameters': {
             'simulations': simulations,
             'initial_capital': initial_capital,
@@ -938,6 +1117,8 @@ def run_monte_carlo_simulation(
             'consider_fees': consider_fees
         }
     }
+    if adaptive:
+        results['convergence'] = summary['convergence']
     
     return results
 
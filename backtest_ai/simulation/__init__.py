@@ -0,0 +1,77 @@
+"""
+Engine mô phỏng Monte Carlo dùng chung cho các blueprint Backtest AI và Monte Carlo.
+Các mô hình đường đi (theo giao dịch, theo ngày với Poisson, bootstrap) có thể thay thế
+cho nhau; mọi tối ưu hóa của engine áp dụng cho cả hai endpoint.
+"""
+from .models import PathModel, WinRateModel, DailyPoissonModel, PerTradeModel, BootstrapModel
+from .drawdown import drawdown_profile, duration_histogram, histogram_stats, summarize_drawdowns
+from .sketch import QuantileSketch
+from .trades import trade_returns_from_records, load_trade_returns
+from .summary import MAX_CURVE_POINTS, PERCENTILES, PathSummary
+from .engine import (
+    DEFAULT_SHARD_SIZE,
+    DEFAULT_CHUNK_CELLS,
+    EXACT_MAX_CELLS,
+    DEFAULT_REQUEST_WORKERS,
+    ProgressCallback,
+    SimulationCancelled,
+    plan_shards,
+    request_workers,
+    simulate_paths,
+    summarize_paths,
+    run_simulation
+)
+from .convergence import (
+    DEFAULT_TOLERANCE,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_MAX_PATHS,
+    MAX_ADAPTIVE_PATHS,
+    MAX_TIME_BUDGET,
+    check_adaptive_budget,
+    estimate_standard_errors,
+    run_adaptive_simulation
+)
+from .sweep import MAX_GRID_POINTS, MAX_SWEEP_PATHS, MAX_SWEEP_STEPS, SWEEP_METRICS, check_sweep_size, run_parameter_sweep
+
+__all__ = [
+    'PathModel',
+    'WinRateModel',
+    'DailyPoissonModel',
+    'PerTradeModel',
+    'BootstrapModel',
+    'drawdown_profile',
+    'duration_histogram',
+    'histogram_stats',
+    'summarize_drawdowns',
+    'QuantileSketch',
+    'trade_returns_from_records',
+    'load_trade_returns',
+    'MAX_CURVE_POINTS',
+    'PERCENTILES',
+    'PathSummary',
+    'DEFAULT_SHARD_SIZE',
+    'DEFAULT_CHUNK_CELLS',
+    'EXACT_MAX_CELLS',
+    'DEFAULT_REQUEST_WORKERS',
+    'ProgressCallback',
+    'SimulationCancelled',
+    'plan_shards',
+    'request_workers',
+    'simulate_paths',
+    'summarize_paths',
+    'run_simulation',
+    'DEFAULT_TOLERANCE',
+    'DEFAULT_BATCH_SIZE',
+    'DEFAULT_MAX_PATHS',
+    'MAX_ADAPTIVE_PATHS',
+    'MAX_TIME_BUDGET',
+    'check_adaptive_budget',
+    'estimate_standard_errors',
+    'run_adaptive_simulation',
+    'MAX_GRID_POINTS',
+    'MAX_SWEEP_PATHS',
+    'MAX_SWEEP_STEPS',
+    'SWEEP_METRICS',
+    'check_sweep_size',
+    'run_parameter_sweep'
+]
@@ -0,0 +1,175 @@
+"""
+Mô phỏng Monte Carlo thích ứng: chạy theo từng lô cho tới khi kết quả hội tụ.
+
+Sau mỗi lô, sai số chuẩn của các thống kê mục tiêu (trung vị và p10 của vốn cuối cùng,
+tỷ lệ thành công) được ước lượng từ toàn bộ vốn cuối cùng đã sinh. Mô phỏng dừng khi
+nửa độ rộng khoảng tin cậy 95% của mọi thống kê nhỏ hơn tolerance, hoặc khi hết ngân
+sách số đường đi / thời gian.
+"""
+import logging
+import math
+import time
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .engine import DEFAULT_CHUNK_CELLS, ProgressCallback, simulate_paths
+from .models import PathModel
+from .summary import PERCENTILES, PathSummary
+
+logger = logging.getLogger(__name__)
+
+# Nửa độ rộng khoảng tin cậy tối đa mặc định (tỷ lệ so với vốn ban đầu / tỷ lệ thành công)
+DEFAULT_TOLERANCE = 0.01
+
+# Số đường đi của mỗi lô và ngân sách số đường đi mặc định
+DEFAULT_BATCH_SIZE = 2000
+DEFAULT_MAX_PATHS = 200000
+
+# Giới hạn ngân sách nhận từ yêu cầu: vốn cuối cùng của mọi đường đi được giữ trong bộ nhớ
+MAX_ADAPTIVE_PATHS = 1_000_000
+MAX_TIME_BUDGET = 600.0
+
+# Hệ số z của khoảng tin cậy 95%
+Z_95 = 1.959964
+
+
+def estimate_standard_errors(final_equities: np.ndarray, initial_capital: float) -> Dict[str, float]:
+    """
+    Ước lượng sai số chuẩn của trung vị, p10 vốn cuối cùng và tỷ lệ thành công
+
+    Sai số của quantile dùng khoảng tin cậy không tham số theo thống kê thứ tự: quantile q
+    nằm giữa các quantile mẫu q ± z * sqrt(q(1-q)/n) với xác suất ~95%.
+
+    Args:
+        final_equities: Vốn cuối cùng của các đường đi đã sinh
+        initial_capital: Vốn ban đầu
+
+    Returns:
+        Dictionary gồm median_final_equity, p10_final_equity (cùng đơn vị với vốn)
+        và success_rate (điểm phần trăm)
+    """
+    n = final_equities.size
+    success = float(np.mean(final_equities >= initial_capital))
+
+    errors = {}
+    for key, q in (('median_final_equity', 0.5), ('p10_final_equity', 0.1)):
+        delta = Z_95 * math.sqrt(q * (1 - q) / n)
+        low, high = np.quantile(final_equities, [max(q - delta, 0.0), min(q + delta, 1.0)])
+        errors[key] = float((high - low) / (2 * Z_95))
+    errors['success_rate'] = math.sqrt(success * (1 - success) / n) * 100
+    return errors
+
+
+def check_adaptive_budget(max_paths: int, time_budget: Optional[float] = None) -> None:
+    """
+    Kiểm tra ngân sách của một lần chạy thích ứng
+
+    Raises:
+        ValueError: Nếu max_paths nằm ngoài 1..MAX_ADAPTIVE_PATHS hoặc time_budget không nằm
+            trong (0, MAX_TIME_BUDGET]
+    """
+    if not 1 <= max_paths <= MAX_ADAPTIVE_PATHS:
+        raise ValueError(f"max_paths phải nằm trong khoảng 1..{MAX_ADAPTIVE_PATHS}")
+    if time_budget is not None and not 0 < time_budget <= MAX_TIME_BUDGET:
+        raise ValueError(f"time_budget phải lớn hơn 0 và không vượt quá {MAX_TIME_BUDGET:g} giây")
+
+
+def run_adaptive_simulation(
+    model: PathModel,
+    initial_capital: float = 10000.0,
+    seed: Optional[int] = None,
+    tolerance: float = DEFAULT_TOLERANCE,
+    max_paths: int = DEFAULT_MAX_PATHS,
+    time_budget: Optional[float] = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+    final_sample_size: Optional[int] = 1000,
+    curve_sample_size: int = 20,
+    chunk_cells: int = DEFAULT_CHUNK_CELLS,
+    progress: Optional[ProgressCallback] = None
+) -> Dict[str, Any]:
+    """
+    Chạy mô phỏng theo lô cho tới khi các thống kê mục tiêu hội tụ
+
+    Args:
+        model: Mô hình sinh đường đi
+        initial_capital: Vốn ban đầu
+        seed: Seed cho bộ sinh số ngẫu nhiên (None = ngẫu nhiên)
+        tolerance: Nửa độ rộng khoảng tin cậy 95% tối đa, tính theo tỷ lệ vốn ban đầu cho
+                   trung vị/p10 vốn cuối cùng và theo tỷ lệ cho tỷ lệ thành công
+                   (0.01 = ±1% vốn, ±1 điểm phần trăm)
+        max_paths: Số đường đi tối đa
+        time_budget: Thời gian chạy tối đa (giây, None = không giới hạn)
+        batch_size: Số đường đi của mỗi lô
+        final_sample_size: Số điểm tối đa của phân phối vốn cuối cùng (None = toàn bộ)
+        curve_sample_size: Số đường cong mẫu để hiển thị
+        chunk_cells: Số ô (đường đi x bước) tối đa của một chunk
+        progress: Hàm báo tiến độ (số đường đi đã xong, max_paths), được gọi sau mỗi chunk;
+                  có thể ném SimulationCancelled để dừng mô phỏng
+
+    Returns:
+        Dictionary cùng định dạng với run_simulation, thêm khóa 'convergence' gồm số đường
+        đi thực tế, số lô, lý do dừng và sai số chuẩn đạt được
+
+    Raises:
+        ValueError: Nếu ngân sách vượt giới hạn (xem check_adaptive_budget)
+    """
+    started = time.monotonic()
+    max_paths = int(max_paths)
+    check_adaptive_budget(max_paths, time_budget)
+    batch_size = max(1, min(int(batch_size), max_paths))
+    chunk_paths = max(1, chunk_cells // (model.n_steps + 1))
+
+    # Mỗi lô có luồng số ngẫu nhiên riêng, nên kết quả với cùng seed không phụ thuộc thời gian chạy
+    seed_sequence = np.random.SeedSequence(seed)
+    summary = PathSummary(model.n_steps, initial_capital, final_sample_size, curve_sample_size)
+    final_equities = np.empty(max_paths)
+    threshold = tolerance / Z_95
+
+    batches = 0
+    stop_reason = 'max_paths'
+    errors: Dict[str, float] = {}
+    while summary.count < max_paths:
+        rng = np.random.default_rng(seed_sequence.spawn(1)[0])
+        n_paths = min(batch_size, max_paths - summary.count)
+        for start in range(0, n_paths, chunk_paths):
+            equity = simulate_paths(model, min(chunk_paths, n_paths - start), initial_capital, rng)
+            final_equities[summary.count:summary.count + equity.shape[0]] = equity[:, -1]
+            summary.add_paths(equity, rng)
+            if progress is not None:
+                progress(summary.count, max_paths)
+        batches += 1
+
+        errors = estimate_standard_errors(final_equities[:summary.count], initial_capital)
+        # Cần ít nhất hai lô để tránh dừng sớm do một lô đầu tiên tình cờ ít phân tán
+        if batches >= 2 and (
+            errors['median_final_equity'] / initial_capital <= threshold
+            and errors['p10_final_equity'] / initial_capital <= threshold
+            and errors['success_rate'] / 100 <= threshold
+        ):
+            stop_reason = 'converged'
+            break
+        if time_budget is not None and time.monotonic() - started >= time_budget:
+            stop_reason = 'time_budget'
+            break
+
+    elapsed = time.monotonic() - started
+    logger.info(f"Mô phỏng thích ứng dừng sau {summary.count} đường đi ({batches} lô, {stop_reason})")
+
+    result = summary.to_dict()
+    # Phân phối vốn cuối cùng được giữ đầy đủ, nên percentile cuối cùng là chính xác
+    final_percentiles = np.percentile(final_equities[:summary.count], PERCENTILES)
+    result['final_percentiles'] = {
+        f'p{p}': float(final_percentiles[i]) for i, p in enumerate(PERCENTILES)
+    }
+    result['convergence'] = {
+        'converged': stop_reason == 'converged',
+        'stop_reason': stop_reason,
+        'paths_used': int(summary.count),
+        'batches': batches,
+        'elapsed_seconds': elapsed,
+        'tolerance': tolerance,
+        'standard_errors': errors
+    }
+    result['parameters'] = model.parameters()
+    return result
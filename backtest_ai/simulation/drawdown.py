@@ -0,0 +1,128 @@
+"""
+Phân tích drawdown vector hóa cho một hoặc nhiều đường cong equity.
+
+Mọi chỉ số được tính cho toàn bộ ma trận (n_paths, n_points) trong một lượt theo trục 1,
+không lặp qua từng đường đi, nên dùng được cho cả kết quả Monte Carlo lẫn đường cong
+equity của một backtest đơn lẻ.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+
+
+def drawdown_profile(equity: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Tính drawdown, thời gian drawdown và thời gian hồi phục cho từng đường cong equity
+
+    Args:
+        equity: Mảng (n_paths, n_points) hoặc một đường cong (n_points,)
+
+    Returns:
+        Dictionary gồm các mảng, mỗi phần tử ứng với một đường đi:
+            max_drawdown_pct: Drawdown tối đa (% so với đỉnh)
+            max_drawdown_abs: Drawdown tối đa (giá trị tuyệt đối)
+            max_duration: Số bước dài nhất liên tục nằm dưới đỉnh
+            recovery_steps: Số bước từ đáy của drawdown lớn nhất tới khi lấy lại đỉnh
+                            (NaN nếu chưa hồi phục)
+            ulcer_index: Căn bậc hai của trung bình bình phương drawdown (%)
+        và episode_durations: độ dài của mọi đợt drawdown trên tất cả đường đi
+    """
+    equity = np.atleast_2d(np.asarray(equity, dtype=np.float64))
+    n_paths, n_points = equity.shape
+    steps = np.arange(n_points)
+
+    # Đỉnh tích lũy và độ sâu drawdown
+    peaks = np.maximum.accumulate(equity, axis=1)
+    drawdowns_abs = peaks - equity
+    drawdowns_pct = np.divide(drawdowns_abs, peaks, out=np.zeros_like(drawdowns_abs), where=peaks > 0)
+    drawdowns_pct *= 100
+
+    # Vị trí đỉnh gần nhất (tính đến t) và vị trí hồi phục gần nhất (từ t trở đi)
+    underwater = drawdowns_abs > 0
+    last_peak = np.maximum.accumulate(np.where(underwater, 0, steps), axis=1)
+    next_peak = np.minimum.accumulate(np.where(underwater, n_points, steps)[:, ::-1], axis=1)[:, ::-1]
+
+    # Thời gian đã nằm dưới đỉnh tại mỗi bước
+    durations = steps - last_peak
+
+    # Thời gian hồi phục sau đáy của drawdown lớn nhất
+    rows = np.arange(n_paths)
+    trough = np.argmax(drawdowns_pct, axis=1)
+    recovery_index = next_peak[rows, trough]
+    recovery_steps = np.where(recovery_index < n_points, recovery_index - trough, np.nan).astype(np.float64)
+    recovery_steps[drawdowns_abs[rows, trough] == 0] = 0.0
+
+    # Mỗi đợt drawdown kết thúc tại bước cuối cùng còn nằm dưới đỉnh
+    episode_end = underwater.copy()
+    episode_end[:, :-1] &= ~underwater[:, 1:]
+
+    return {
+        'max_drawdown_pct': drawdowns_pct.max(axis=1),
+        'max_drawdown_abs': drawdowns_abs.max(axis=1),
+        'max_duration': durations.max(axis=1),
+        'recovery_steps': recovery_steps,
+        'ulcer_index': np.sqrt(np.mean(drawdowns_pct * drawdowns_pct, axis=1)),
+        'episode_durations': durations[episode_end]
+    }
+
+
+def duration_histogram(durations: np.ndarray, n_points: int) -> np.ndarray:
+    """
+    Đếm số lần xuất hiện của từng độ dài drawdown (0..n_points - 1 bước)
+
+    Histogram có độ dài cố định nên có thể cộng trực tiếp giữa các shard mô phỏng.
+    """
+    return np.bincount(np.asarray(durations, dtype=np.int64), minlength=n_points)[:n_points]
+
+
+def histogram_stats(counts: np.ndarray) -> Dict[str, Optional[float]]:
+    """Trung bình, trung vị, p90 và giá trị lớn nhất của một histogram số nguyên"""
+    counts = np.asarray(counts)
+    total = int(counts.sum())
+    if total == 0:
+        return {'mean': None, 'median': None, 'p90': None, 'max': None}
+
+    values = np.arange(counts.size)
+    cumulative = np.cumsum(counts)
+    median, p90 = (int(np.searchsorted(cumulative, np.floor(q * (total - 1)), side='right'))
+                   for q in (0.5, 0.9))
+    return {
+        'mean': float(np.dot(values, counts) / total),
+        'median': float(median),
+        'p90': float(p90),
+        'max': float(values[counts > 0][-1])
+    }
+
+
+def summarize_drawdowns(profile: Dict[str, np.ndarray], n_points: int) -> Dict[str, object]:
+    """
+    Tổng hợp kết quả drawdown_profile thành các thống kê có thể trả về qua JSON
+
+    Args:
+        profile: Kết quả của drawdown_profile
+        n_points: Số điểm trên mỗi đường cong equity
+
+    Returns:
+        Dictionary gồm ulcer index, thời gian drawdown, thời gian hồi phục và phân phối
+        độ dài các đợt drawdown
+    """
+    recovery = profile['recovery_steps']
+    recovered = recovery[~np.isnan(recovery)]
+    episode_counts = duration_histogram(profile['episode_durations'], n_points)
+
+    return {
+        'ulcer_index': _array_stats(profile['ulcer_index']),
+        'max_duration': histogram_stats(duration_histogram(profile['max_duration'], n_points)),
+        'recovery_steps': histogram_stats(duration_histogram(recovered, n_points)),
+        'recovered_rate': float(recovered.size / recovery.size * 100) if recovery.size else 0.0,
+        'duration_distribution': np.trim_zeros(episode_counts, 'b').tolist()
+    }
+
+
+def _array_stats(values: np.ndarray) -> Dict[str, float]:
+    """Trung bình, trung vị và p90 của một mảng giá trị"""
+    return {
+        'mean': float(np.mean(values)),
+        'median': float(np.median(values)),
+        'p90': float(np.percentile(values, 90))
+    }
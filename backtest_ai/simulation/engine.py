@@ -0,0 +1,316 @@
+"""
+Engine mô phỏng Monte Carlo: sinh đường đi equity từ một PathModel và tổng hợp thống kê.
+
+Các lần chạy lớn được chia thành các shard có kích thước cố định. Mỗi shard có luồng số
+ngẫu nhiên độc lập sinh từ SeedSequence.spawn, được chạy trên ProcessPoolExecutor và trả về
+một PathSummary; các tóm tắt được gộp theo thứ tự shard nên kết quả với cùng seed không
+phụ thuộc vào số worker.
+
+Trong chế độ streaming, mỗi shard được xử lý theo từng chunk đường đi có kích thước cố định
+và chỉ cập nhật các sketch/tổng tích lũy, nên bộ nhớ đỉnh không phụ thuộc vào số mô phỏng.
+"""
+import logging
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from .drawdown import drawdown_profile, summarize_drawdowns
+from .models import PathModel
+from .summary import PERCENTILES, PathSummary
+
+logger = logging.getLogger(__name__)
+
+# Số đường đi tối đa của một shard
+DEFAULT_SHARD_SIZE = 100000
+
+# Số ô (đường đi x bước) tối đa của một chunk trong chế độ streaming (~8 MB float64)
+DEFAULT_CHUNK_CELLS = 1000000
+
+# Quá ngưỡng số ô này, run_simulation tự chuyển sang chế độ streaming
+EXACT_MAX_CELLS = 5000000
+
+# Số tiến trình mặc định của các lần chạy đồng bộ trong HTTP request (MONTE_CARLO_REQUEST_WORKERS)
+DEFAULT_REQUEST_WORKERS = 2
+
+# Hàm báo tiến độ: nhận (số đường đi đã xong, tổng số đường đi)
+ProgressCallback = Callable[[int, int], None]
+
+
+class SimulationCancelled(Exception):
+    """Được hàm báo tiến độ ném ra để dừng một lần mô phỏng đang chạy"""
+
+
+def request_workers() -> int:
+    """
+    Số tiến trình cho một lần mô phỏng chạy trong HTTP request
+
+    Mỗi request chỉ dùng vài core để các request đồng thời không chiếm hết CPU; tất cả core
+    (workers=None) chỉ được dùng khi người gọi yêu cầu rõ ràng, ví dụ từ dòng lệnh.
+    """
+    return max(1, int(os.environ.get('MONTE_CARLO_REQUEST_WORKERS', DEFAULT_REQUEST_WORKERS)))
+
+
+def simulate_paths(
+    model: PathModel,
+    simulations: int,
+    initial_capital: float,
+    rng: np.random.Generator
+) -> np.ndarray:
+    """
+    Sinh ma trận đường cong equity
+
+    Args:
+        model: Mô hình sinh đường đi
+        simulations: Số đường đi
+        initial_capital: Vốn ban đầu
+        rng: Bộ sinh số ngẫu nhiên
+
+    Returns:
+        Mảng (simulations, n_steps + 1), cột đầu tiên là vốn ban đầu
+    """
+    factors = model.sample_factors(rng, simulations)
+
+    equity = np.empty((simulations, factors.shape[1] + 1))
+    equity[:, 0] = initial_capital
+    np.cumprod(factors, axis=1, out=equity[:, 1:])
+    equity[:, 1:] *= initial_capital
+    return equity
+
+
+def summarize_paths(
+    equity: np.ndarray,
+    initial_capital: float,
+    rng: np.random.Generator,
+    final_sample_size: Optional[int] = 1000,
+    curve_sample_size: int = 20
+) -> Dict[str, Any]:
+    """
+    Tổng hợp thống kê từ ma trận đường cong equity
+
+    Args:
+        equity: Mảng (simulations, n_steps + 1)
+        initial_capital: Vốn ban đầu
+        rng: Bộ sinh số ngẫu nhiên (dùng để chọn mẫu trả về)
+        final_sample_size: Số điểm tối đa của phân phối vốn cuối cùng (None = toàn bộ)
+        curve_sample_size: Số đường cong mẫu để hiển thị
+
+    Returns:
+        Dictionary chứa các thống kê dùng chung cho mọi endpoint
+    """
+    simulations = equity.shape[0]
+    final_equities = equity[:, -1]
+    profits = final_equities - initial_capital
+    returns = profits / initial_capital
+
+    # Drawdown của từng đường đi, tính cho toàn bộ ma trận cùng lúc
+    profile = drawdown_profile(equity)
+
+    # Percentile theo từng bước (trên bản chuyển vị liên tục trong bộ nhớ
+    # để phép partition không phải nhảy cóc qua các hàng)
+    curve_percentiles = np.percentile(np.ascontiguousarray(equity.T), PERCENTILES, axis=1)
+    final_percentiles = np.percentile(final_equities, PERCENTILES)
+
+    # Mẫu của phân phối vốn cuối cùng và một số đường cong để hiển thị
+    if final_sample_size is None or final_sample_size >= simulations:
+        final_sample = final_equities
+    else:
+        final_sample = final_equities[rng.choice(simulations, final_sample_size, replace=False)]
+    curve_indices = rng.choice(simulations, min(curve_sample_size, simulations), replace=False)
+
+    std_return = float(np.std(returns))
+
+    return {
+        'simulations': int(simulations),
+        'n_steps': int(equity.shape[1] - 1),
+        'initial_capital': float(initial_capital),
+        'mean_profit_abs': float(np.mean(profits)),
+        'mean_profit_pct': float(np.mean(returns) * 100),
+        'std_return': std_return,
+        'sharpe_ratio': float(np.mean(returns) / std_return) if std_return > 0 else 0.0,
+        'success_count': int(np.sum(final_equities >= initial_capital)),
+        'profitable_count': int(np.sum(final_equities > initial_capital)),
+        'losing_count': int(np.sum(final_equities < initial_capital)),
+        'gross_profit': float(np.sum(profits[profits > 0])),
+        'gross_loss': float(-np.sum(profits[profits < 0])),
+        'max_drawdown_pct': _distribution_stats(profile['max_drawdown_pct']),
+        'max_drawdown_abs': _distribution_stats(profile['max_drawdown_abs']),
+        'drawdown': summarize_drawdowns(profile, equity.shape[1]),
+        'percentiles': {
+            f'p{p}': curve_percentiles[i].tolist() for i, p in enumerate(PERCENTILES)
+        },
+        'final_percentiles': {
+            f'p{p}': float(final_percentiles[i]) for i, p in enumerate(PERCENTILES)
+        },
+        'final_distribution': final_sample.tolist(),
+        'sample_curves': equity[curve_indices].tolist()
+    }
+
+
+def run_simulation(
+    model: PathModel,
+    simulations: int = 1000,
+    initial_capital: float = 10000.0,
+    seed: Optional[int] = None,
+    final_sample_size: Optional[int] = 1000,
+    curve_sample_size: int = 20,
+    workers: Optional[int] = 1,
+    shard_size: int = DEFAULT_SHARD_SIZE,
+    streaming: Optional[bool] = None,
+    chunk_cells: int = DEFAULT_CHUNK_CELLS,
+    progress: Optional[ProgressCallback] = None
+) -> Dict[str, Any]:
+    """
+    Chạy mô phỏng Monte Carlo với một mô hình đường đi
+
+    Ở chế độ chính xác, toàn bộ đường đi được sinh trong một ma trận và thống kê được tính
+    chính xác. Ở chế độ streaming, các đường đi được chia thành shard (chạy song song trên
+    workers tiến trình), mỗi shard được xử lý theo chunk và thống kê được gộp bằng các sketch
+    quantile, nên ma trận equity đầy đủ không bao giờ được tạo ra.
+
+    Args:
+        model: Mô hình sinh đường đi (DailyPoissonModel, PerTradeModel, BootstrapModel, ...)
+        simulations: Số lần mô phỏng
+        initial_capital: Vốn ban đầu
+        seed: Seed cho bộ sinh số ngẫu nhiên (None = ngẫu nhiên)
+        final_sample_size: Số điểm tối đa của phân phối vốn cuối cùng (None = toàn bộ)
+        curve_sample_size: Số đường cong mẫu để hiển thị
+        workers: Số tiến trình worker (None = số CPU, 1 = chạy trong tiến trình hiện tại)
+        shard_size: Số đường đi tối đa của một shard
+        streaming: Bật chế độ streaming (None = tự bật khi vượt shard_size hoặc EXACT_MAX_CELLS)
+        chunk_cells: Số ô (đường đi x bước) tối đa của một chunk trong chế độ streaming
+        progress: Hàm báo tiến độ, được gọi sau mỗi chunk (hoặc mỗi shard khi chạy song song);
+                  có thể ném SimulationCancelled để dừng mô phỏng
+
+    Returns:
+        Dictionary chứa các thống kê, xem summarize_paths
+    """
+    if streaming is None:
+        cells = simulations * (model.n_steps + 1)
+        streaming = simulations > shard_size or cells > EXACT_MAX_CELLS
+
+    if not streaming:
+        rng = np.random.default_rng(seed)
+        equity = simulate_paths(model, simulations, initial_capital, rng)
+        summary = summarize_paths(equity, initial_capital, rng, final_sample_size, curve_sample_size)
+        if progress is not None:
+            progress(simulations, simulations)
+    else:
+        summary = _run_sharded(
+            model, simulations, initial_capital, seed, final_sample_size, curve_sample_size,
+            workers, shard_size, chunk_cells, progress
+        ).to_dict()
+
+    summary['parameters'] = model.parameters()
+    return summary
+
+
+def plan_shards(simulations: int, shard_size: int = DEFAULT_SHARD_SIZE) -> List[int]:
+    """
+    Chia số mô phỏng thành các shard có kích thước gần bằng nhau, không vượt quá shard_size.
+    Cách chia chỉ phụ thuộc vào simulations và shard_size, không phụ thuộc vào số worker.
+    """
+    n_shards = max(1, math.ceil(simulations / shard_size))
+    base, extra = divmod(simulations, n_shards)
+    return [base + (1 if i < extra else 0) for i in range(n_shards)]
+
+
+def _run_sharded(
+    model: PathModel,
+    simulations: int,
+    initial_capital: float,
+    seed: Optional[int],
+    final_sample_size: Optional[int],
+    curve_sample_size: int,
+    workers: Optional[int],
+    shard_size: int,
+    chunk_cells: int,
+    progress: Optional[ProgressCallback] = None
+) -> PathSummary:
+    """Chạy các shard (tuần tự hoặc trên process pool) và gộp tóm tắt theo thứ tự shard"""
+    sizes = plan_shards(simulations, shard_size)
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+    chunk_paths = max(1, chunk_cells // (model.n_steps + 1))
+    options = (initial_capital, final_sample_size, curve_sample_size, chunk_paths)
+
+    workers = min(workers or os.cpu_count() or 1, len(sizes))
+    logger.info(f"Chạy {simulations} mô phỏng trên {len(sizes)} shard với {workers} worker")
+
+    offsets = np.cumsum([0] + sizes[:-1]).tolist()
+
+    if workers <= 1:
+        summaries = (
+            _run_shard(model, size, shard_seed, *options, progress=_offset_progress(progress, offset, simulations))
+            for size, shard_seed, offset in zip(sizes, seeds, offsets)
+        )
+        return _merge_all(summaries)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        summaries = executor.map(
+            _run_shard,
+            [model] * len(sizes), sizes, seeds,
+            *[[option] * len(sizes) for option in options]
+        )
+        try:
+            return _merge_all(_report_shards(summaries, sizes, progress, simulations))
+        except SimulationCancelled:
+            # Hủy các shard chưa bắt đầu thay vì chờ chạy hết
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+
+
+def _run_shard(
+    model: PathModel,
+    n_paths: int,
+    seed_sequence: np.random.SeedSequence,
+    initial_capital: float,
+    final_sample_size: Optional[int],
+    curve_sample_size: int,
+    chunk_paths: int,
+    progress: Optional[Callable[[int], None]] = None
+) -> PathSummary:
+    """Sinh và tóm tắt một shard đường đi theo từng chunk (chạy trong tiến trình worker)"""
+    rng = np.random.default_rng(seed_sequence)
+    summary = PathSummary(model.n_steps, initial_capital, final_sample_size, curve_sample_size)
+    for start in range(0, n_paths, chunk_paths):
+        equity = simulate_paths(model, min(chunk_paths, n_paths - start), initial_capital, rng)
+        summary.add_paths(equity, rng)
+        if progress is not None:
+            progress(summary.count)
+    return summary
+
+
+def _offset_progress(progress: Optional[ProgressCallback], offset: int, total: int):
+    """Chuyển tiến độ trong một shard thành tiến độ của toàn bộ lần chạy"""
+    if progress is None:
+        return None
+    return lambda done: progress(offset + done, total)
+
+
+def _report_shards(summaries, sizes: List[int], progress: Optional[ProgressCallback], total: int):
+    """Báo tiến độ mỗi khi một shard chạy song song hoàn thành"""
+    done = 0
+    for size, summary in zip(sizes, summaries):
+        done += size
+        if progress is not None:
+            progress(done, total)
+        yield summary
+
+
+def _merge_all(summaries) -> PathSummary:
+    """Gộp các tóm tắt shard theo thứ tự"""
+    merged = None
+    for summary in summaries:
+        merged = summary if merged is None else merged.merge(summary)
+    return merged
+
+
+def _distribution_stats(values: np.ndarray) -> Dict[str, float]:
+    """Trung bình, trung vị và p90 của một phân phối"""
+    return {
+        'mean': float(np.mean(values)),
+        'median': float(np.median(values)),
+        'p90': float(np.percentile(values, 90))
+    }
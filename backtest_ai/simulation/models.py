@@ -0,0 +1,286 @@
+"""
+Các mô hình sinh đường đi (path model) cho mô phỏng Monte Carlo.
+
+Mỗi mô hình sinh ra ma trận hệ số tăng trưởng vốn có kích thước (n_paths, n_steps):
+equity sau bước t bằng equity trước đó nhân với hệ số của bước t. Hệ số bằng 0
+nghĩa là tài khoản đã cháy và sẽ giữ nguyên ở 0 cho các bước sau.
+"""
+import copy
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+
+class PathModel:
+    """Lớp cơ sở cho các mô hình sinh đường đi equity"""
+
+    # Tên mô hình, dùng khi ghi log và trong tham số trả về
+    name = 'base'
+
+    @property
+    def n_steps(self) -> int:
+        """Số bước (ngày hoặc giao dịch) trên mỗi đường đi"""
+        raise NotImplementedError
+
+    def sample_factors(self, rng: np.random.Generator, n_paths: int) -> np.ndarray:
+        """
+        Sinh hệ số tăng trưởng vốn cho n_paths đường đi
+
+        Args:
+            rng: Bộ sinh số ngẫu nhiên NumPy
+            n_paths: Số đường đi cần sinh
+
+        Returns:
+            Mảng (n_paths, n_steps) các hệ số >= 0
+        """
+        raise NotImplementedError
+
+    def parameters(self) -> dict:
+        """Tham số của mô hình, dùng để báo cáo kết quả"""
+        return {'model': self.name}
+
+    def with_parameters(self, **changes: Any) -> 'PathModel':
+        """Bản sao của mô hình với một số tham số được thay đổi"""
+        model = copy.copy(self)
+        for name, value in changes.items():
+            if not hasattr(model, name):
+                raise ValueError(f"Mô hình {self.name} không có tham số {name}")
+            setattr(model, name, type(getattr(model, name))(value))
+        return model
+
+
+class WinRateModel(PathModel):
+    """
+    Lớp cơ sở cho các mô hình tham số hóa bằng tỷ lệ thắng, R:R và rủi ro mỗi giao dịch
+    """
+
+    def __init__(
+        self,
+        trading_days: int = 30,
+        trades_per_day: float = 3.0,
+        risk_per_trade: float = 0.01,
+        base_win_rate: float = 0.5,
+        win_rate_variance: float = 0.05,
+        risk_reward_ratio: float = 1.5,
+        risk_reward_variance: float = 0.1,
+        consider_fees: bool = True
+    ):
+        self.trading_days = int(trading_days)
+        self.trades_per_day = float(trades_per_day)
+        self.risk_per_trade = float(risk_per_trade)
+        self.base_win_rate = float(base_win_rate)
+        self.win_rate_variance = float(win_rate_variance)
+        self.risk_reward_ratio = float(risk_reward_ratio)
+        self.risk_reward_variance = float(risk_reward_variance)
+        self.consider_fees = bool(consider_fees)
+
+    @property
+    def fee_rate(self) -> float:
+        return 0.001 if self.consider_fees else 0.0  # 0.1% phí giao dịch
+
+    def sample_factors(self, rng: np.random.Generator, n_paths: int) -> np.ndarray:
+        return self.factors_from_outcomes(self.sample_outcomes(rng, n_paths))
+
+    def sample_outcomes(self, rng: np.random.Generator, n_paths: int) -> Dict[str, np.ndarray]:
+        """
+        Sinh phần ngẫu nhiên của các đường đi, không phụ thuộc risk_per_trade và risk_reward_ratio
+
+        Cùng một kết quả có thể được dùng lại cho nhiều giá trị của hai tham số này
+        (common random numbers), ví dụ khi quét lưới tham số.
+
+        Returns:
+            Dictionary các mảng ngẫu nhiên, dùng làm đầu vào cho factors_from_outcomes
+        """
+        raise NotImplementedError
+
+    def factors_from_outcomes(self, outcomes: Dict[str, np.ndarray]) -> np.ndarray:
+        """
+        Chuyển kết quả của sample_outcomes thành hệ số tăng trưởng vốn (n_paths, n_steps)
+        với risk_per_trade và risk_reward_ratio hiện tại của mô hình
+        """
+        raise NotImplementedError
+
+    def log_factors_from_outcomes(self, outcomes: Dict[str, np.ndarray]) -> np.ndarray:
+        """Logarit của factors_from_outcomes (-inf khi tài khoản cháy)"""
+        with np.errstate(divide='ignore'):
+            return np.log(self.factors_from_outcomes(outcomes))
+
+    def parameters(self) -> dict:
+        return {
+            'model': self.name,
+            'trading_days': self.trading_days,
+            'trades_per_day': self.trades_per_day,
+            'risk_per_trade': self.risk_per_trade,
+            'base_win_rate': self.base_win_rate,
+            'win_rate_variance': self.win_rate_variance,
+            'risk_reward_ratio': self.risk_reward_ratio,
+            'risk_reward_variance': self.risk_reward_variance,
+            'consider_fees': self.consider_fees
+        }
+
+
+class DailyPoissonModel(WinRateModel):
+    """
+    Mô hình theo ngày: số giao dịch mỗi ngày theo phân phối Poisson, tỷ lệ thắng
+    và R:R biến thiên theo từng mô phỏng, tỷ lệ thắng dao động theo từng ngày.
+    Phí được tính trên số tiền thắng/thua của mỗi giao dịch.
+    """
+
+    name = 'daily_poisson'
+
+    @property
+    def n_steps(self) -> int:
+        return self.trading_days
+
+    def sample_outcomes(self, rng: np.random.Generator, n_paths: int) -> Dict[str, np.ndarray]:
+        # Tỷ lệ thắng và độ lệch R:R ngẫu nhiên cho từng mô phỏng, nằm trong phạm vi biến thiên
+        sim_win_rate = rng.uniform(
+            self.base_win_rate - self.win_rate_variance,
+            self.base_win_rate + self.win_rate_variance,
+            size=n_paths
+        )
+        risk_reward_offset = rng.uniform(-self.risk_reward_variance, self.risk_reward_variance, size=n_paths)
+
+        # Tỷ lệ thắng từng ngày của từng mô phỏng, giới hạn hợp lý
+        daily_win_rate = rng.standard_normal((n_paths, self.trading_days))
+        daily_win_rate *= self.win_rate_variance / 3
+        daily_win_rate += sim_win_rate[:, None]
+        np.clip(daily_win_rate, 0.1, 0.9, out=daily_win_rate)
+
+        # Số giao dịch mỗi ngày ~ Poisson(trades_per_day), mỗi giao dịch thắng với xác suất
+        # win_rate_today. Theo tính chất tách của phân phối Poisson, số lệnh thắng và số lệnh
+        # thua là hai biến Poisson độc lập với tham số trades_per_day * p và trades_per_day * (1 - p)
+        # Lưu dạng float để các lần tính hệ số (có thể nhiều lần khi quét lưới) không phải chuyển kiểu
+        wins = rng.poisson(self.trades_per_day * daily_win_rate).astype(np.float64)
+        losses = rng.poisson(self.trades_per_day * (1.0 - daily_win_rate)).astype(np.float64)
+
+        return {'risk_reward_offset': risk_reward_offset, 'wins': wins, 'losses': losses}
+
+    def factors_from_outcomes(self, outcomes: Dict[str, np.ndarray]) -> np.ndarray:
+        return np.exp(self.log_factors_from_outcomes(outcomes))
+
+    def log_factors_from_outcomes(self, outcomes: Dict[str, np.ndarray]) -> np.ndarray:
+        fee_rate = self.fee_rate
+        wins = outcomes['wins']
+        losses = outcomes['losses']
+        sim_risk_reward = self.risk_reward_ratio + outcomes['risk_reward_offset']
+
+        # Hệ số nhân vốn cho một lệnh thắng / thua
+        win_factor = 1.0 + self.risk_per_trade * sim_risk_reward * (1.0 - fee_rate)
+        loss_factor = 1.0 - self.risk_per_trade * (1.0 + fee_rate)
+
+        # Hệ số của ngày = win_factor^wins * loss_factor^losses, tính trong không gian log
+        log_factors = wins * np.log(win_factor)[:, None]
+        if loss_factor > 0:
+            log_factors += losses * np.log(loss_factor)
+        else:
+            # Equity không thể âm: một lệnh thua với rủi ro >= 100% vốn làm cháy tài khoản
+            log_factors[losses > 0] = -np.inf
+
+        return log_factors
+
+
+class PerTradeModel(WinRateModel):
+    """
+    Mô hình theo giao dịch: một số giao dịch cố định (trading_days * trades_per_day),
+    tỷ lệ thắng biến thiên theo từng mô phỏng và R:R biến thiên theo từng giao dịch.
+    Phí được tính trên toàn bộ vốn sau mỗi giao dịch.
+    """
+
+    name = 'per_trade'
+
+    @property
+    def n_steps(self) -> int:
+        # Số giao dịch tổng cộng
+        return int(self.trading_days * self.trades_per_day)
+
+    def sample_outcomes(self, rng: np.random.Generator, n_paths: int) -> Dict[str, np.ndarray]:
+        n_trades = self.n_steps
+
+        # Biến đổi tỷ lệ thắng cho mỗi mô phỏng
+        sim_win_rate = np.clip(
+            self.base_win_rate + rng.uniform(-self.win_rate_variance, self.win_rate_variance, n_paths),
+            0.1, 0.9
+        )
+
+        # Biến đổi tỷ lệ rủi ro/phần thưởng cho mỗi giao dịch
+        risk_reward_offset = rng.uniform(-self.risk_reward_variance, self.risk_reward_variance, (n_paths, n_trades))
+
+        is_win = rng.random((n_paths, n_trades)) < sim_win_rate[:, None]
+
+        return {'risk_reward_offset': risk_reward_offset, 'is_win': is_win}
+
+    def factors_from_outcomes(self, outcomes: Dict[str, np.ndarray]) -> np.ndarray:
+        trade_rr = outcomes['risk_reward_offset'] + self.risk_reward_ratio
+        np.maximum(trade_rr, 0.5, out=trade_rr)
+
+        # Thắng: vốn * (1 + r * R:R), thua: vốn * (1 - r); phí tính trên vốn sau giao dịch
+        factors = np.where(outcomes['is_win'], 1.0 + self.risk_per_trade * trade_rr, 1.0 - self.risk_per_trade)
+        factors *= 1.0 - self.fee_rate
+        np.maximum(factors, 0.0, out=factors)
+
+        return factors
+
+
+class BootstrapModel(PathModel):
+    """
+    Mô hình bootstrap: lấy mẫu có hoàn lại từ lợi nhuận thực tế của các giao dịch
+    (dạng thập phân, ví dụ 0.02 = +2%) và áp dụng lên phần vốn đặt cược mỗi giao dịch.
+
+    Với block_size > 1, mô hình dùng block bootstrap vòng (circular block bootstrap):
+    mỗi đường đi ghép các khối block_size giao dịch liên tiếp bắt đầu tại vị trí ngẫu nhiên,
+    nên giữ được chuỗi thắng/thua và sự phụ thuộc giữa các giao dịch gần nhau.
+    """
+
+    name = 'bootstrap'
+
+    def __init__(
+        self,
+        trade_returns: Sequence[float],
+        n_trades: Optional[int] = None,
+        stake_fraction: float = 1.0,
+        consider_fees: bool = False,
+        block_size: int = 1
+    ):
+        self.trade_returns = np.ascontiguousarray(trade_returns, dtype=np.float64)
+        if self.trade_returns.size == 0:
+            raise ValueError("Cần ít nhất một giao dịch để chạy bootstrap")
+        self.n_trades = int(n_trades) if n_trades else int(self.trade_returns.size)
+        self.stake_fraction = float(stake_fraction)
+        self.consider_fees = bool(consider_fees)
+        self.block_size = max(1, min(int(block_size), self.trade_returns.size))
+
+        # Hệ số tăng trưởng của từng giao dịch được tính sẵn một lần, khi lấy mẫu chỉ còn
+        # phép gather trên mảng liên tục
+        self._factors = np.maximum(1.0 + self.stake_fraction * (self.trade_returns - self.fee_rate), 0.0)
+
+    @property
+    def n_steps(self) -> int:
+        return self.n_trades
+
+    @property
+    def fee_rate(self) -> float:
+        return 0.001 if self.consider_fees else 0.0
+
+    def sample_factors(self, rng: np.random.Generator, n_paths: int) -> np.ndarray:
+        size = self.trade_returns.size
+        if self.block_size == 1:
+            indices = rng.integers(0, size, size=(n_paths, self.n_trades))
+        else:
+            # Chỉ số của từng khối: vị trí bắt đầu ngẫu nhiên + độ lệch trong khối, quay vòng
+            n_blocks = -(-self.n_trades // self.block_size)
+            starts = rng.integers(0, size, size=(n_paths, n_blocks, 1))
+            indices = starts + np.arange(self.block_size)
+            indices %= size
+            indices = indices.reshape(n_paths, -1)[:, :self.n_trades]
+        return np.take(self._factors, indices)
+
+    def parameters(self) -> dict:
+        return {
+            'model': self.name,
+            'n_trades': self.n_trades,
+            'sample_size': int(self.trade_returns.size),
+            'stake_fraction': self.stake_fraction,
+            'consider_fees': self.consider_fees,
+            'block_size': self.block_size
+        }
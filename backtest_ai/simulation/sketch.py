@@ -0,0 +1,116 @@
+"""
+Quantile sketch có thể gộp (mergeable) cho các kết quả mô phỏng Monte Carlo.
+
+Sketch chia trục giá trị dương thành các bucket theo thang log (giống DDSketch):
+bucket i chứa các giá trị trong (gamma^(i-1), gamma^i] với gamma = (1 + a) / (1 - a),
+nên sai số tương đối của mỗi quantile không vượt quá a. Mỗi bucket lưu số lượng và
+tổng giá trị, quantile trả về giá trị trung bình của bucket chứa rank tương ứng.
+Gộp hai sketch chỉ là cộng các mảng đếm, nên kết quả không phụ thuộc vào cách chia shard.
+"""
+import math
+from typing import Sequence
+
+import numpy as np
+
+
+class QuantileSketch:
+    """Sketch quantile theo thang log cho một hoặc nhiều cột (ví dụ: từng bước thời gian)"""
+
+    def __init__(
+        self,
+        n_columns: int = 1,
+        relative_accuracy: float = 0.002,
+        min_value: float = 1e-4,
+        max_value: float = 1e4
+    ):
+        """
+        Args:
+            n_columns: Số cột được theo dõi độc lập
+            relative_accuracy: Sai số tương đối tối đa của quantile
+            min_value: Giá trị dương nhỏ nhất được phân biệt (nhỏ hơn sẽ gộp vào bucket đầu)
+            max_value: Giá trị lớn nhất được phân biệt (lớn hơn sẽ gộp vào bucket cuối)
+        """
+        self.n_columns = int(n_columns)
+        self.relative_accuracy = float(relative_accuracy)
+        self.min_value = float(min_value)
+        self.max_value = float(max_value)
+
+        gamma = (1 + self.relative_accuracy) / (1 - self.relative_accuracy)
+        self._log_gamma = math.log(gamma)
+        self._offset = math.floor(math.log(self.min_value) / self._log_gamma)
+        # Bucket 0 dành cho các giá trị <= 0 (ví dụ tài khoản đã cháy)
+        self.n_buckets = math.ceil(math.log(self.max_value) / self._log_gamma) - self._offset + 1
+
+        self.counts = np.zeros((self.n_columns, self.n_buckets), dtype=np.int64)
+        self.sums = np.zeros((self.n_columns, self.n_buckets), dtype=np.float64)
+
+    @property
+    def count(self) -> int:
+        """Số giá trị đã thêm vào mỗi cột"""
+        return int(self.counts[0].sum()) if self.n_columns else 0
+
+    def empty_like(self) -> 'QuantileSketch':
+        """Tạo sketch rỗng có cùng cấu hình"""
+        return QuantileSketch(self.n_columns, self.relative_accuracy, self.min_value, self.max_value)
+
+    def update(self, values: np.ndarray) -> None:
+        """
+        Thêm một lô giá trị vào sketch
+
+        Args:
+            values: Mảng (m,) nếu sketch có một cột, hoặc (m, n_columns)
+        """
+        values = np.asarray(values, dtype=np.float64).reshape(-1, self.n_columns)
+        if values.shape[0] == 0:
+            return
+
+        positive = values > 0
+        indices = np.zeros(values.shape, dtype=np.int64)
+        logs = np.log(values, where=positive, out=np.zeros(values.shape))
+        np.ceil(logs / self._log_gamma, out=logs)
+        logs -= self._offset
+        np.clip(logs, 1, self.n_buckets - 1, out=logs)
+        np.copyto(indices, logs, where=positive, casting='unsafe')
+
+        # Chỉ số phẳng theo cột để cập nhật toàn bộ ma trận đếm bằng một lần bincount
+        indices += np.arange(self.n_columns, dtype=np.int64) * self.n_buckets
+        size = self.n_columns * self.n_buckets
+        self.counts += np.bincount(indices.ravel(), minlength=size).reshape(self.counts.shape)
+        self.sums += np.bincount(indices.ravel(), weights=values.ravel(), minlength=size).reshape(self.sums.shape)
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        """Gộp một sketch khác (cùng cấu hình) vào sketch này"""
+        if self.counts.shape != other.counts.shape or self._offset != other._offset:
+            raise ValueError("Không thể gộp hai sketch có cấu hình khác nhau")
+        self.counts += other.counts
+        self.sums += other.sums
+        return self
+
+    def quantiles(self, percentiles: Sequence[float]) -> np.ndarray:
+        """
+        Ước lượng các percentile cho từng cột
+
+        Args:
+            percentiles: Các mức percentile (0-100)
+
+        Returns:
+            Mảng (len(percentiles), n_columns)
+        """
+        cumulative = np.cumsum(self.counts, axis=1)
+        total = cumulative[:, -1]
+        means = np.divide(self.sums, self.counts, out=np.zeros_like(self.sums), where=self.counts > 0)
+        columns = np.arange(self.n_columns)
+
+        result = np.zeros((len(percentiles), self.n_columns))
+        for i, percentile in enumerate(percentiles):
+            # Rank theo quy ước của np.percentile (nội suy tuyến tính, lấy rank dưới)
+            rank = np.floor(percentile / 100.0 * (total - 1))
+            bucket = np.sum(cumulative <= rank[:, None], axis=1)
+            np.minimum(bucket, self.n_buckets - 1, out=bucket)
+            result[i] = means[columns, bucket]
+        return result
+
+    def mean(self) -> np.ndarray:
+        """Giá trị trung bình chính xác của từng cột"""
+        total = self.counts.sum(axis=1)
+        return np.divide(self.sums.sum(axis=1), total, out=np.zeros(self.n_columns), where=total > 0)
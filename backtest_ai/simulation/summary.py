@@ -0,0 +1,214 @@
+"""
+Tóm tắt có thể gộp (mergeable) của một nhóm đường đi equity.
+
+Mỗi shard mô phỏng tạo một PathSummary gồm các tổng tích lũy (lợi nhuận, số mô phỏng
+thành công, tổng lãi/lỗ cho profit factor), các sketch quantile cho đường cong equity,
+vốn cuối cùng và drawdown, cùng mẫu ngẫu nhiên theo khóa ưu tiên. Gộp các shard theo
+thứ tự cố định cho kết quả giống nhau bất kể số worker.
+"""
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from .drawdown import drawdown_profile, duration_histogram, histogram_stats
+from .sketch import QuantileSketch
+
+# Các mức percentile trả về cho đường cong equity và phân phối vốn cuối cùng
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Sai số tương đối mặc định của các sketch quantile
+SKETCH_ACCURACY = 0.005
+
+# Số điểm kiểm tra tối đa của đường cong equity được theo dõi bằng sketch; đường đi dài hơn
+# (ví dụ bootstrap hàng nghìn giao dịch) được lấy mẫu tại các bước cách đều rồi nội suy lại
+MAX_CURVE_POINTS = 256
+
+
+def curve_checkpoints(n_steps: int, max_points: int = MAX_CURVE_POINTS) -> np.ndarray:
+    """Các bước (gồm bước đầu và bước cuối) tại đó percentile của đường cong equity được theo dõi"""
+    if n_steps + 1 <= max_points:
+        return np.arange(n_steps + 1)
+    return np.unique(np.linspace(0, n_steps, max_points).round().astype(np.int64))
+
+
+class PathSummary:
+    """Các thống kê tích lũy của một nhóm đường đi, có thể gộp với nhóm khác"""
+
+    def __init__(
+        self,
+        n_steps: int,
+        initial_capital: float,
+        final_sample_size: Optional[int] = 1000,
+        curve_sample_size: int = 20
+    ):
+        self.n_steps = int(n_steps)
+        self.initial_capital = float(initial_capital)
+        self.final_sample_size = final_sample_size
+        self.curve_sample_size = int(curve_sample_size)
+
+        self.count = 0
+        self.sum_return = 0.0
+        self.sum_return_sq = 0.0
+        self.success_count = 0
+        self.profitable_count = 0
+        self.losing_count = 0
+        self.gross_profit = 0.0
+        self.gross_loss = 0.0
+
+        equity_range = dict(min_value=initial_capital * 1e-3, max_value=initial_capital * 1e3)
+        self.curve_steps = curve_checkpoints(self.n_steps)
+        self.curve_sketch = QuantileSketch(self.curve_steps.size, SKETCH_ACCURACY, **equity_range)
+        self.final_sketch = QuantileSketch(1, SKETCH_ACCURACY, **equity_range)
+        self.drawdown_pct_sketch = QuantileSketch(1, SKETCH_ACCURACY, min_value=1e-4, max_value=100.0)
+        self.drawdown_abs_sketch = QuantileSketch(1, SKETCH_ACCURACY, **equity_range)
+        self.ulcer_sketch = QuantileSketch(1, SKETCH_ACCURACY, min_value=1e-4, max_value=100.0)
+
+        # Histogram số nguyên theo số bước: thời gian drawdown dài nhất, thời gian hồi phục
+        # của drawdown lớn nhất và độ dài của mọi đợt drawdown
+        self.max_duration_counts = np.zeros(self.n_steps + 1, dtype=np.int64)
+        self.recovery_counts = np.zeros(self.n_steps + 1, dtype=np.int64)
+        self.episode_counts = np.zeros(self.n_steps + 1, dtype=np.int64)
+
+        # Mẫu ngẫu nhiên không hoàn lại: giữ các phần tử có khóa ngẫu nhiên nhỏ nhất
+        self._final_keys = np.empty(0)
+        self._final_values = np.empty(0)
+        self._curve_keys = np.empty(0)
+        self._curves = np.empty((0, self.n_steps + 1))
+
+    def add_paths(self, equity: np.ndarray, rng: np.random.Generator) -> 'PathSummary':
+        """
+        Thêm một ma trận đường cong equity vào tóm tắt
+
+        Args:
+            equity: Mảng (n_paths, n_steps + 1)
+            rng: Bộ sinh số ngẫu nhiên dùng để tạo khóa chọn mẫu
+        """
+        initial_capital = self.initial_capital
+        final_equities = equity[:, -1]
+        profits = final_equities - initial_capital
+        returns = profits / initial_capital
+
+        self.count += equity.shape[0]
+        self.sum_return += float(np.sum(returns))
+        self.sum_return_sq += float(np.sum(returns * returns))
+        self.success_count += int(np.sum(final_equities >= initial_capital))
+        self.profitable_count += int(np.sum(final_equities > initial_capital))
+        self.losing_count += int(np.sum(final_equities < initial_capital))
+        self.gross_profit += float(np.sum(profits[profits > 0]))
+        self.gross_loss += float(-np.sum(profits[profits < 0]))
+
+        # Drawdown của từng đường đi
+        n_points = self.n_steps + 1
+        profile = drawdown_profile(equity)
+        recovery = profile['recovery_steps']
+        self.drawdown_abs_sketch.update(profile['max_drawdown_abs'])
+        self.drawdown_pct_sketch.update(profile['max_drawdown_pct'])
+        self.ulcer_sketch.update(profile['ulcer_index'])
+        self.max_duration_counts += duration_histogram(profile['max_duration'], n_points)
+        self.recovery_counts += duration_histogram(recovery[~np.isnan(recovery)], n_points)
+        self.episode_counts += duration_histogram(profile['episode_durations'], n_points)
+
+        self.curve_sketch.update(equity[:, self.curve_steps])
+        self.final_sketch.update(final_equities)
+
+        keys = rng.random(equity.shape[0])
+        self._keep_final_sample(keys, final_equities)
+        self._keep_curve_sample(keys, equity)
+        return self
+
+    def merge(self, other: 'PathSummary') -> 'PathSummary':
+        """Gộp tóm tắt của một shard khác vào tóm tắt này"""
+        self.count += other.count
+        self.sum_return += other.sum_return
+        self.sum_return_sq += other.sum_return_sq
+        self.success_count += other.success_count
+        self.profitable_count += other.profitable_count
+        self.losing_count += other.losing_count
+        self.gross_profit += other.gross_profit
+        self.gross_loss += other.gross_loss
+
+        self.curve_sketch.merge(other.curve_sketch)
+        self.final_sketch.merge(other.final_sketch)
+        self.drawdown_pct_sketch.merge(other.drawdown_pct_sketch)
+        self.drawdown_abs_sketch.merge(other.drawdown_abs_sketch)
+        self.ulcer_sketch.merge(other.ulcer_sketch)
+        self.max_duration_counts += other.max_duration_counts
+        self.recovery_counts += other.recovery_counts
+        self.episode_counts += other.episode_counts
+
+        self._keep_final_sample(other._final_keys, other._final_values)
+        self._keep_curve_sample(other._curve_keys, other._curves)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Chuyển tóm tắt sang cùng định dạng với engine.summarize_paths"""
+        mean_return = self.sum_return / self.count
+        std_return = float(np.sqrt(max(self.sum_return_sq / self.count - mean_return ** 2, 0.0)))
+
+        curve_percentiles = self.curve_sketch.quantiles(PERCENTILES)
+        if self.curve_steps.size < self.n_steps + 1:
+            steps = np.arange(self.n_steps + 1)
+            curve_percentiles = np.array([np.interp(steps, self.curve_steps, row) for row in curve_percentiles])
+        final_percentiles = self.final_sketch.quantiles(PERCENTILES)[:, 0]
+
+        return {
+            'simulations': int(self.count),
+            'n_steps': self.n_steps,
+            'initial_capital': self.initial_capital,
+            'mean_profit_abs': float(mean_return * self.initial_capital),
+            'mean_profit_pct': float(mean_return * 100),
+            'std_return': std_return,
+            'sharpe_ratio': float(mean_return / std_return) if std_return > 0 else 0.0,
+            'success_count': int(self.success_count),
+            'profitable_count': int(self.profitable_count),
+            'losing_count': int(self.losing_count),
+            'gross_profit': float(self.gross_profit),
+            'gross_loss': float(self.gross_loss),
+            'max_drawdown_pct': _sketch_stats(self.drawdown_pct_sketch),
+            'max_drawdown_abs': _sketch_stats(self.drawdown_abs_sketch),
+            'drawdown': {
+                'ulcer_index': _sketch_stats(self.ulcer_sketch),
+                'max_duration': histogram_stats(self.max_duration_counts),
+                'recovery_steps': histogram_stats(self.recovery_counts),
+                'recovered_rate': float(self.recovery_counts.sum() / self.count * 100),
+                'duration_distribution': np.trim_zeros(self.episode_counts, 'b').tolist()
+            },
+            'percentiles': {
+                f'p{p}': curve_percentiles[i].tolist() for i, p in enumerate(PERCENTILES)
+            },
+            'final_percentiles': {
+                f'p{p}': float(final_percentiles[i]) for i, p in enumerate(PERCENTILES)
+            },
+            'final_distribution': self._final_values.tolist(),
+            'sample_curves': self._curves.tolist()
+        }
+
+    def _keep_final_sample(self, keys: np.ndarray, values: np.ndarray) -> None:
+        keys = np.concatenate([self._final_keys, keys])
+        values = np.concatenate([self._final_values, values])
+        if self.final_sample_size is not None and keys.size > self.final_sample_size:
+            keep = np.argpartition(keys, self.final_sample_size - 1)[:self.final_sample_size]
+            keys, values = keys[keep], values[keep]
+        self._final_keys, self._final_values = keys, values
+
+    def _keep_curve_sample(self, keys: np.ndarray, curves: np.ndarray) -> None:
+        # Chỉ sao chép các đường cong có khả năng lọt vào mẫu, tránh nối cả ma trận
+        if keys.size > self.curve_sample_size:
+            candidates = np.argpartition(keys, self.curve_sample_size - 1)[:self.curve_sample_size]
+            keys, curves = keys[candidates], curves[candidates]
+        keys = np.concatenate([self._curve_keys, keys])
+        curves = np.concatenate([self._curves, curves])
+        if keys.size > self.curve_sample_size:
+            keep = np.argpartition(keys, self.curve_sample_size - 1)[:self.curve_sample_size]
+            keys, curves = keys[keep], curves[keep]
+        self._curve_keys, self._curves = keys, curves
+
+
+def _sketch_stats(sketch: QuantileSketch) -> Dict[str, float]:
+    """Trung bình, trung vị và p90 từ một sketch một cột"""
+    median, p90 = sketch.quantiles((50, 90))[:, 0]
+    return {
+        'mean': float(sketch.mean()[0]),
+        'median': float(median),
+        'p90': float(p90)
+    }
@@ -0,0 +1,151 @@
+"""
+Quét lưới tham số risk_per_trade x risk_reward_ratio bằng common random numbers.
+
+Phần ngẫu nhiên của các đường đi (số lệnh thắng/thua, tỷ lệ thắng, độ lệch R:R) không phụ
+thuộc vào hai tham số được quét, nên chỉ được sinh một lần cho mỗi chunk và dùng lại cho mọi
+điểm trên lưới. Nhờ vậy chi phí của cả lưới chỉ lớn hơn một lần chạy đơn lẻ ở phần tính hệ số
+và thống kê, đồng thời khác biệt giữa các điểm lưới có phương sai thấp hơn nhiều so với
+các lần chạy độc lập.
+"""
+import logging
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from .engine import DEFAULT_CHUNK_CELLS, ProgressCallback
+from .models import WinRateModel
+
+logger = logging.getLogger(__name__)
+
+# Số điểm lưới tối đa của một lần quét
+MAX_GRID_POINTS = 100
+
+# Tổng số đường đi tối đa của một lần quét (điểm lưới x simulations); mỗi đường đi giữ
+# hai giá trị float64 cho đến khi tính thống kê
+MAX_SWEEP_PATHS = 1_000_000
+
+# Tổng số bước tối đa của một lần quét (điểm lưới x simulations x số bước), giới hạn thời gian tính
+MAX_SWEEP_STEPS = 200_000_000
+
+# Các thống kê trả về cho từng điểm lưới (mỗi thống kê là một ma trận cho heatmap)
+SWEEP_METRICS = (
+    'mean_profit_pct',
+    'median_final_equity',
+    'p10_final_equity',
+    'success_rate',
+    'ruin_rate',
+    'median_max_drawdown_pct',
+    'sharpe_ratio'
+)
+
+
+def check_sweep_size(grid_points: int, simulations: int, n_steps: int) -> None:
+    """
+    Kiểm tra kích thước của một lần quét
+
+    Raises:
+        ValueError: Nếu lưới rỗng hoặc vượt quá MAX_GRID_POINTS, simulations < 1, hoặc tổng số
+            đường đi / số bước vượt quá MAX_SWEEP_PATHS / MAX_SWEEP_STEPS
+    """
+    if grid_points < 1:
+        raise ValueError("Lưới tham số không được rỗng")
+    if grid_points > MAX_GRID_POINTS:
+        raise ValueError(f"Lưới tham số vượt quá {MAX_GRID_POINTS} điểm")
+    if simulations < 1:
+        raise ValueError("Số lần mô phỏng phải >= 1")
+    if grid_points * simulations > MAX_SWEEP_PATHS:
+        raise ValueError(f"Số điểm lưới x số lần mô phỏng vượt quá {MAX_SWEEP_PATHS}")
+    if grid_points * simulations * max(1, n_steps) > MAX_SWEEP_STEPS:
+        raise ValueError(f"Số điểm lưới x số lần mô phỏng x số bước vượt quá {MAX_SWEEP_STEPS}")
+
+
+def run_parameter_sweep(
+    model: WinRateModel,
+    risk_per_trade_values: Sequence[float],
+    risk_reward_values: Sequence[float],
+    simulations: int = 1000,
+    initial_capital: float = 10000.0,
+    seed: Optional[int] = None,
+    chunk_cells: int = DEFAULT_CHUNK_CELLS,
+    progress: Optional[ProgressCallback] = None
+) -> Dict[str, Any]:
+    """
+    Đánh giá mọi tổ hợp risk_per_trade x risk_reward_ratio trên cùng một tập số ngẫu nhiên
+
+    Args:
+        model: Mô hình gốc (DailyPoissonModel hoặc PerTradeModel); các tham số khác giữ nguyên
+        risk_per_trade_values: Các giá trị rủi ro mỗi giao dịch (hàng của ma trận)
+        risk_reward_values: Các giá trị R:R (cột của ma trận)
+        simulations: Số đường đi cho mỗi điểm lưới
+        initial_capital: Vốn ban đầu
+        seed: Seed cho bộ sinh số ngẫu nhiên (None = ngẫu nhiên)
+        chunk_cells: Số ô (đường đi x bước) tối đa của một chunk
+        progress: Hàm báo tiến độ (số đường đi đã xong, simulations)
+
+    Returns:
+        Dictionary gồm các trục của lưới và ma trận (len(risk), len(R:R)) cho mỗi thống kê
+
+    Raises:
+        ValueError: Nếu kích thước lần quét vượt giới hạn (xem check_sweep_size)
+    """
+    risk_values = [float(v) for v in risk_per_trade_values]
+    rr_values = [float(v) for v in risk_reward_values]
+    simulations = int(simulations)
+    check_sweep_size(len(risk_values) * len(rr_values), simulations, model.n_steps)
+
+    shape = (len(risk_values), len(rr_values))
+    grid_models = [
+        [model.with_parameters(risk_per_trade=risk, risk_reward_ratio=rr) for rr in rr_values]
+        for risk in risk_values
+    ]
+
+    # Chỉ giữ hai giá trị vô hướng cho mỗi đường đi và mỗi điểm lưới
+    final_equities = np.empty(shape + (simulations,))
+    max_drawdowns = np.empty(shape + (simulations,))
+
+    rng = np.random.default_rng(seed)
+    chunk_paths = max(1, chunk_cells // (model.n_steps + 1))
+    for start in range(0, simulations, chunk_paths):
+        n_paths = min(chunk_paths, simulations - start)
+        outcomes = model.sample_outcomes(rng, n_paths)
+
+        for i in range(shape[0]):
+            for j in range(shape[1]):
+                # Làm việc trong không gian log: log equity là tổng tích lũy của log hệ số,
+                # drawdown tối đa = 1 - exp(min(log equity - đỉnh log equity)), đỉnh tính cả vốn ban đầu
+                log_equity = grid_models[i][j].log_factors_from_outcomes(outcomes)
+                np.cumsum(log_equity, axis=1, out=log_equity)
+                peaks = np.maximum.accumulate(log_equity, axis=1)
+                np.maximum(peaks, 0.0, out=peaks)
+                with np.errstate(invalid='ignore'):
+                    deepest = np.min(log_equity - peaks, axis=1)
+                final_equities[i, j, start:start + n_paths] = initial_capital * np.exp(log_equity[:, -1])
+                max_drawdowns[i, j, start:start + n_paths] = -np.expm1(deepest) * 100
+
+        if progress is not None:
+            progress(start + n_paths, simulations)
+
+    logger.info(f"Đã quét {shape[0]}x{shape[1]} điểm lưới với {simulations} đường đi mỗi điểm")
+
+    returns = final_equities / initial_capital - 1.0
+    std_returns = returns.std(axis=2)
+    mean_returns = returns.mean(axis=2)
+    metrics = {
+        'mean_profit_pct': mean_returns * 100,
+        'median_final_equity': np.median(final_equities, axis=2),
+        'p10_final_equity': np.percentile(final_equities, 10, axis=2),
+        'success_rate': np.mean(final_equities >= initial_capital, axis=2) * 100,
+        'ruin_rate': np.mean(final_equities <= 0, axis=2) * 100,
+        'median_max_drawdown_pct': np.median(max_drawdowns, axis=2),
+        'sharpe_ratio': np.divide(mean_returns, std_returns, out=np.zeros(shape), where=std_returns > 0)
+    }
+
+    return {
+        'rows': {'parameter': 'risk_per_trade', 'values': risk_values},
+        'columns': {'parameter': 'risk_reward_ratio', 'values': rr_values},
+        'simulations': int(simulations),
+        'initial_capital': float(initial_capital),
+        'common_random_numbers': True,
+        'metrics': {name: metrics[name].tolist() for name in SWEEP_METRICS},
+        'parameters': model.parameters()
+    }
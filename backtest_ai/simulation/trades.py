@@ -0,0 +1,87 @@
+"""
+Nạp lợi nhuận của từng giao dịch từ kết quả backtest đã import để chạy bootstrap.
+
+Lợi nhuận được gom một lần thành mảng NumPy float64 liên tục theo thứ tự thời gian
+(thứ tự này cần cho block bootstrap); sau đó mô phỏng chỉ làm việc trên mảng này.
+"""
+from typing import Any, Dict, Iterable, Optional
+
+import numpy as np
+
+# Các khóa lợi nhuận theo tỷ lệ trong dữ liệu giao dịch của Freqtrade, theo thứ tự ưu tiên.
+# Ở định dạng export cũ, 'profit_percent' cũng là tỷ lệ (0.01 = +1%)
+RETURN_KEYS = ('profit_ratio', 'profit_percent')
+
+
+def trade_returns_from_records(trades: Iterable[Dict[str, Any]], pair: Optional[str] = None) -> np.ndarray:
+    """
+    Trích xuất lợi nhuận (dạng thập phân) từ danh sách giao dịch
+
+    Args:
+        trades: Danh sách giao dịch (trades_data của BacktestResult)
+        pair: Chỉ lấy giao dịch của cặp này (None = tất cả)
+
+    Returns:
+        Mảng float64 liên tục, giữ nguyên thứ tự giao dịch
+    """
+    returns = []
+    for trade in trades or []:
+        if pair and trade.get('pair') not in (None, pair):
+            continue
+        for key in RETURN_KEYS:
+            value = trade.get(key)
+            if value is not None:
+                returns.append(float(value))
+                break
+    return np.ascontiguousarray(returns, dtype=np.float64)
+
+
+def load_trade_returns(session, strategy_name: str, pair: Optional[str] = None) -> np.ndarray:
+    """
+    Nạp lợi nhuận của mọi giao dịch đã import cho một chiến lược (và cặp giao dịch)
+
+    Chỉ hai cột lợi nhuận được đọc từ bảng backtest_trades; kết quả import cũ chỉ có
+    trades_data vẫn được đọc từ cột JSON (một lần cho mỗi file backtest).
+
+    Args:
+        session: SQLAlchemy session kết nối tới database chứa bảng backtest_results
+        strategy_name: Tên chiến lược
+        pair: Cặp giao dịch (None = tất cả các cặp)
+
+    Returns:
+        Mảng float64 liên tục, sắp theo thời gian mở lệnh
+    """
+    from sqlalchemy import func
+
+    from freqtrade_integration.import_backtest import BacktestResult, BacktestTrade
+
+    query = session.query(BacktestTrade.profit_ratio, BacktestTrade.profit_percent).filter(
+        BacktestTrade.strategy_name == strategy_name
+    )
+    if pair:
+        query = query.filter(BacktestTrade.pair == pair)
+    rows = query.order_by(BacktestTrade.open_date, BacktestTrade.id).all()
+    if rows:
+        # Ưu tiên profit_ratio như RETURN_KEYS; bỏ giao dịch không có cả hai giá trị
+        values = np.array(rows, dtype=np.float64).reshape(-1, 2)
+        returns = np.where(np.isnan(values[:, 0]), values[:, 1], values[:, 0])
+        return np.ascontiguousarray(returns[~np.isnan(returns)])
+
+    query = session.query(BacktestResult.trades_data).filter(BacktestResult.strategy_name == strategy_name)
+    if pair:
+        query = query.filter(BacktestResult.pair == pair)
+    else:
+        # Import cũ lưu toàn bộ giao dịch của file vào bản ghi của từng cặp giao dịch,
+        # nên chỉ đọc trades_data của một bản ghi cho mỗi file
+        first_per_file = session.query(func.min(BacktestResult.id)).filter(
+            BacktestResult.strategy_name == strategy_name
+        ).group_by(BacktestResult.file_path)
+        query = query.filter(BacktestResult.id.in_(first_per_file))
+
+    chunks = [
+        trade_returns_from_records(trades_data, pair)
+        for (trades_data,) in query.order_by(BacktestResult.start_date, BacktestResult.id)
+    ]
+    if not chunks:
+        return np.empty(0)
+    return np.ascontiguousarray(np.concatenate(chunks))
@@ -0,0 +1,638 @@
+"""
+Hàng đợi job huấn luyện bền vững, lưu trong database (SQLite/PostgreSQL).
+
+Web server chỉ thêm job vào bảng training_job. Các tiến trình worker (python -m backtest_ai.training_queue)
+nhận job bằng một câu UPDATE có điều kiện (mỗi job chỉ được một worker nhận), chạy run_training_job và
+ghi lại tiến độ (giai đoạn, vòng boosting, loss trên tập validation), log (bảng training_job_log) và kết
+quả. Vì trạng thái nằm trong database, job không bị mất khi web server khởi động lại; job đang chạy của
+một worker đã dừng (không còn heartbeat) được đưa lại vào hàng đợi.
+
+Hủy job: job đang chờ bị hủy ngay; job đang chạy được đánh dấu cancel_requested, worker phát hiện qua
+heartbeat và dừng ở lần báo tiến độ kế tiếp (sau cấu hình hoặc vòng boosting hiện tại).
+
+Dừng worker (SIGTERM/SIGINT): job đang chạy được trả lại hàng đợi ngay (không tính là một lần thử),
+thay vì chờ hết thời gian mất heartbeat.
+"""
+import os
+import argparse
+import logging
+import multiprocessing
+import signal
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import create_engine, delete, func, select, update
+from sqlalchemy.orm import sessionmaker
+
+from backtest_ai.jobs import CANCELLED, COMPLETED, FAILED, QUEUED, RUNNING
+from freqtrade_integration.training_orchestrator import (
+    TrainingCancelled, normalize_job, plan_workers, register_result, run_training_job
+)
+from models import ModelBackup, TrainingJob, TrainingJobLog, TrainingWorker
+
+logger = logging.getLogger(__name__)
+
+# Thời gian chờ giữa hai lần tìm job mới khi hàng đợi trống (giây)
+DEFAULT_POLL_INTERVAL = 2.0
+
+# Chu kỳ worker ghi heartbeat và kiểm tra yêu cầu hủy (giây)
+DEFAULT_HEARTBEAT_INTERVAL = 5.0
+
+# Job đang chạy không có heartbeat lâu hơn thời gian này được coi là worker đã dừng (giây)
+DEFAULT_STALE_TIMEOUT = 120.0
+
+# Khoảng thời gian tối thiểu giữa hai lần ghi tiến độ và log vào database (giây)
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# Số lần nhận job tối đa; job vẫn mất heartbeat sau số lần này bị đánh dấu thất bại
+MAX_ATTEMPTS = 3
+
+# Số dòng log tối đa trả về trong một lần đọc
+DEFAULT_LOG_LIMIT = 500
+
+# Khoảng tiến độ (%) của từng giai đoạn huấn luyện
+STAGE_RANGES = {
+    'preparing': (0.0, 10.0),
+    'tuning': (10.0, 60.0),
+    'training': (60.0, 98.0),
+    'saving': (98.0, 100.0)
+}
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class WorkerStopped(BaseException):
+    """Được ném ra khi tiến trình worker nhận SIGTERM/SIGINT (không bị bắt bởi except Exception)"""
+
+
+def _raise_worker_stopped(signum, frame) -> None:
+    # Bỏ qua các tín hiệu tiếp theo (ví dụ SIGINT rồi SIGTERM) để việc trả job về hàng đợi không bị ngắt
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    raise WorkerStopped(signal.Signals(signum).name)
+
+
+def default_database_url() -> str:
+    """DATABASE_URL, hoặc database SQLite mặc định của ứng dụng web (trong thư mục instance)"""
+    return os.environ.get('DATABASE_URL') or 'sqlite:///' + os.path.join(PROJECT_ROOT, 'instance', 'aitradestrategist.db')
+
+
+def _isoformat(value: Optional[datetime]) -> Optional[str]:
+    return value.isoformat() if value is not None else None
+
+
+def job_to_dict(job: TrainingJob) -> Dict[str, Any]:
+    """Trạng thái job ở dạng JSON"""
+    elapsed = None
+    if job.started_at is not None:
+        elapsed = ((job.finished_at or datetime.now()) - job.started_at).total_seconds()
+    return {
+        'job_id': job.id,
+        'status': job.status,
+        'spec': job.spec,
+        'stage': job.stage,
+        'progress': job.progress,
+        'details': job.details,
+        'result': job.result,
+        'error': job.error,
+        'cancel_requested': job.cancel_requested,
+        'worker_id': job.worker_id,
+        'attempts': job.attempts,
+        'created_at': _isoformat(job.created_date),
+        'started_at': _isoformat(job.started_at),
+        'finished_at': _isoformat(job.finished_at),
+        'elapsed_seconds': elapsed
+    }
+
+
+class TrainingQueue:
+    """Thao tác trên bảng training_job / training_job_log"""
+
+    def __init__(self, engine):
+        """
+        Args:
+            engine: SQLAlchemy engine của database chứa các bảng (ví dụ db.engine của ứng dụng Flask)
+        """
+        self.engine = engine
+        self.Session = sessionmaker(bind=engine, expire_on_commit=False)
+
+    @classmethod
+    def from_url(cls, db_url: Optional[str] = None) -> 'TrainingQueue':
+        """Tạo hàng đợi trên database db_url (mặc định default_database_url()) và tạo bảng nếu chưa có"""
+        engine = create_engine(db_url or default_database_url())
+        for model in (ModelBackup, TrainingJob, TrainingJobLog, TrainingWorker):
+            model.__table__.create(engine, checkfirst=True)
+        return cls(engine)
+
+    def enqueue(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Thêm một job (đã chuẩn hóa bởi normalize_job) vào hàng đợi"""
+        with self.Session() as session:
+            job = TrainingJob(status=QUEUED, spec=spec, progress=0.0, cancel_requested=False, attempts=0,
+                              created_date=datetime.now())
+            session.add(job)
+            session.commit()
+            logger.info(f"Đã thêm job huấn luyện {job.id} ({spec.get('pair')}) vào hàng đợi")
+            return job_to_dict(job)
+
+    def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """Lấy job theo id (None nếu không tồn tại)"""
+        with self.Session() as session:
+            job = session.get(TrainingJob, job_id)
+            return job_to_dict(job) if job is not None else None
+
+    def list_jobs(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Các job mới nhất"""
+        with self.Session() as session:
+            jobs = session.scalars(select(TrainingJob).order_by(TrainingJob.id.desc()).limit(limit))
+            return [job_to_dict(job) for job in jobs]
+
+    def logs(self, job_id: int, after: int = 0, limit: int = DEFAULT_LOG_LIMIT) -> List[Dict[str, Any]]:
+        """Các dòng log của job có id lớn hơn after (để đọc tiếp từ lần trước)"""
+        with self.Session() as session:
+            rows = session.scalars(
+                select(TrainingJobLog)
+                .where(TrainingJobLog.job_id == job_id, TrainingJobLog.id > after)
+                .order_by(TrainingJobLog.id)
+                .limit(limit)
+            )
+            return [
+                {'id': row.id, 'created_at': _isoformat(row.created_date), 'level': row.level, 'message': row.message}
+                for row in rows
+            ]
+
+    def cancel(self, job_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Yêu cầu hủy một job
+
+        Job đang chờ được hủy ngay; job đang chạy dừng ở lần báo tiến độ kế tiếp của worker.
+        """
+        with self.Session() as session:
+            cancelled = session.execute(
+                update(TrainingJob)
+                .where(TrainingJob.id == job_id, TrainingJob.status == QUEUED)
+                .values(status=CANCELLED, cancel_requested=True, finished_at=datetime.now())
+            ).rowcount
+            if not cancelled:
+                session.execute(
+                    update(TrainingJob)
+                    .where(TrainingJob.id == job_id, TrainingJob.status == RUNNING)
+                    .values(cancel_requested=True)
+                )
+            session.commit()
+        return self.get(job_id)
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Nhận job đang chờ lâu nhất
+
+        Việc nhận là một UPDATE có điều kiện status = 'queued', nên khi nhiều worker cùng nhận một job
+        chỉ một worker thành công; các worker còn lại thử job kế tiếp.
+        """
+        with self.Session() as session:
+            candidates = session.scalars(
+                select(TrainingJob.id).where(TrainingJob.status == QUEUED).order_by(TrainingJob.id).limit(10)
+            ).all()
+            for job_id in candidates:
+                now = datetime.now()
+                claimed = session.execute(
+                    update(TrainingJob)
+                    .where(TrainingJob.id == job_id, TrainingJob.status == QUEUED)
+                    .values(status=RUNNING, worker_id=worker_id, attempts=TrainingJob.attempts + 1,
+                            started_at=now, heartbeat_at=now, stage=None, progress=0.0, details=None)
+                ).rowcount
+                session.commit()
+                if claimed:
+                    return self.get(job_id)
+        return None
+
+    def worker_heartbeat(self, worker_id: str) -> None:
+        """Ghi heartbeat của một worker (tạo bản ghi worker nếu chưa có)"""
+        now = datetime.now()
+        with self.Session() as session:
+            worker = session.get(TrainingWorker, worker_id)
+            if worker is None:
+                session.add(TrainingWorker(worker_id=worker_id, started_at=now, heartbeat_at=now))
+            else:
+                worker.heartbeat_at = now
+            session.commit()
+
+    def remove_worker(self, worker_id: str) -> None:
+        """Xóa bản ghi của worker khi worker dừng"""
+        with self.Session() as session:
+            session.execute(delete(TrainingWorker).where(TrainingWorker.worker_id == worker_id))
+            session.commit()
+
+    def active_workers(self, timeout: float = DEFAULT_STALE_TIMEOUT) -> int:
+        """Số worker có heartbeat trong khoảng timeout giây gần nhất"""
+        since = datetime.now() - timedelta(seconds=timeout)
+        with self.Session() as session:
+            return session.scalar(
+                select(func.count()).select_from(TrainingWorker).where(TrainingWorker.heartbeat_at >= since)
+            )
+
+    def requeue_stale(self, timeout: float = DEFAULT_STALE_TIMEOUT) -> int:
+        """
+        Đưa lại vào hàng đợi các job đang chạy mà worker đã dừng (không còn heartbeat)
+
+        Job đã được yêu cầu hủy thì chuyển sang cancelled; job đã được nhận MAX_ATTEMPTS lần thì
+        chuyển sang failed.
+
+        Returns:
+            Số job được đưa lại vào hàng đợi
+        """
+        now = datetime.now()
+        stale = (TrainingJob.status == RUNNING, TrainingJob.heartbeat_at < now - timedelta(seconds=timeout))
+        with self.Session() as session:
+            session.execute(
+                update(TrainingJob).where(*stale, TrainingJob.cancel_requested.is_(True))
+                .values(status=CANCELLED, finished_at=now)
+            )
+            session.execute(
+                update(TrainingJob).where(*stale, TrainingJob.attempts >= MAX_ATTEMPTS)
+                .values(status=FAILED, finished_at=now, error=f'Worker dừng khi đang chạy job ({MAX_ATTEMPTS} lần)')
+            )
+            requeued = session.execute(
+                update(TrainingJob).where(*stale).values(status=QUEUED, worker_id=None)
+            ).rowcount
+            session.commit()
+        if requeued:
+            logger.warning(f"Đã đưa lại {requeued} job huấn luyện vào hàng đợi (worker không còn heartbeat)")
+        return requeued
+
+    def report(
+        self,
+        job_id: int,
+        worker_id: str,
+        stage: Optional[str] = None,
+        progress: Optional[float] = None,
+        details: Optional[Dict[str, Any]] = None,
+        logs: Optional[List[tuple]] = None
+    ) -> bool:
+        """
+        Ghi heartbeat, tiến độ và log của job đang chạy
+
+        Args:
+            job_id: Id job
+            worker_id: Worker đang chạy job
+            stage, progress, details: Tiến độ hiện tại (bỏ qua nếu None)
+            logs: Các dòng log mới (thời điểm, level, nội dung)
+
+        Returns:
+            True nếu worker phải dừng job (đã bị yêu cầu hủy hoặc không còn thuộc worker này)
+        """
+        values = {'heartbeat_at': datetime.now()}
+        if stage is not None:
+            values['stage'] = stage
+        if progress is not None:
+            values['progress'] = progress
+        if details is not None:
+            values['details'] = details
+        with self.Session() as session:
+            owned = session.execute(
+                update(TrainingJob)
+                .where(TrainingJob.id == job_id, TrainingJob.worker_id == worker_id, TrainingJob.status == RUNNING)
+                .values(**values)
+            ).rowcount
+            session.execute(
+                update(TrainingWorker).where(TrainingWorker.worker_id == worker_id)
+                .values(heartbeat_at=values['heartbeat_at'])
+            )
+            if logs:
+                session.add_all(
+                    TrainingJobLog(job_id=job_id, created_date=created, level=level, message=message)
+                    for created, level, message in logs
+                )
+            cancel_requested = session.scalar(select(TrainingJob.cancel_requested).where(TrainingJob.id == job_id))
+            session.commit()
+        return not owned or bool(cancel_requested)
+
+    def release(self, job_id: int, worker_id: str) -> None:
+        """
+        Trả job đang chạy về hàng đợi khi worker dừng giữa chừng
+
+        Lần nhận job này không được tính vào số lần thử; job đã được yêu cầu hủy thì chuyển sang cancelled.
+        """
+        running = (TrainingJob.id == job_id, TrainingJob.worker_id == worker_id, TrainingJob.status == RUNNING)
+        with self.Session() as session:
+            cancelled = session.execute(
+                update(TrainingJob).where(*running, TrainingJob.cancel_requested.is_(True))
+                .values(status=CANCELLED, finished_at=datetime.now())
+            ).rowcount
+            if not cancelled:
+                session.execute(
+                    update(TrainingJob).where(*running)
+                    .values(status=QUEUED, worker_id=None, attempts=TrainingJob.attempts - 1)
+                )
+            session.commit()
+        logger.info(f"Đã trả job huấn luyện {job_id} về hàng đợi (worker {worker_id} dừng)")
+
+    def finish(
+        self,
+        job_id: int,
+        worker_id: str,
+        status: str,
+        result: Optional[Dict[str, Any]] = None,
+        error: Optional[str] = None
+    ) -> None:
+        """Ghi trạng thái cuối cùng của job"""
+        values = {'status': status, 'result': result, 'error': error, 'finished_at': datetime.now()}
+        if status == COMPLETED:
+            values.update({'stage': 'completed', 'progress': 100.0})
+        with self.Session() as session:
+            session.execute(
+                update(TrainingJob)
+                .where(TrainingJob.id == job_id, TrainingJob.worker_id == worker_id, TrainingJob.status == RUNNING)
+                .values(**values)
+            )
+            session.commit()
+
+
+class JobReporter(logging.Handler):
+    """
+    Nhận sự kiện tiến độ và log của một job, ghi vào database theo lô
+
+    Dùng làm callback progress của run_training_job và làm logging handler trong khi job chạy.
+    """
+
+    def __init__(self, queue: TrainingQueue, job_id: int, worker_id: str,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL):
+        super().__init__(level=logging.INFO)
+        self.setFormatter(logging.Formatter('%(name)s - %(message)s'))
+        self.queue = queue
+        self.job_id = job_id
+        self.worker_id = worker_id
+        self.flush_interval = float(flush_interval)
+        self.cancelled = threading.Event()
+        self.stage: Optional[str] = None
+        self.progress_value = 0.0
+        self.details: Optional[Dict[str, Any]] = None
+        self._records: List[tuple] = []
+        self._state_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def emit(self, record: logging.LogRecord) -> None:
+        try:
+            message = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self._state_lock:
+            self._records.append((datetime.fromtimestamp(record.created), record.levelname, message))
+
+    def progress(self, event: Dict[str, Any]) -> None:
+        """
+        Callback tiến độ cho run_training_job
+
+        Raises:
+            TrainingCancelled: Nếu job đã bị yêu cầu hủy
+        """
+        if self.cancelled.is_set():
+            raise TrainingCancelled()
+        stage = event.get('stage')
+        start, end = STAGE_RANGES.get(stage, (self.progress_value, self.progress_value))
+        iteration, total = event.get('iteration'), event.get('total')
+        fraction = min(iteration / total, 1.0) if iteration and total else 0.0
+        with self._state_lock:
+            stage_changed = stage != self.stage
+            self.stage = stage
+            self.progress_value = max(self.progress_value, start + (end - start) * fraction)
+            self.details = event
+        if stage_changed or time.monotonic() - self._last_flush >= self.flush_interval:
+            self.flush()
+        if self.cancelled.is_set():
+            raise TrainingCancelled()
+
+    def flush(self) -> None:
+        """Ghi tiến độ và log đang chờ vào database (đồng thời là heartbeat)"""
+        with self._flush_lock:
+            with self._state_lock:
+                records, self._records = self._records, []
+                stage, progress, details = self.stage, self.progress_value, self.details
+            try:
+                stop = self.queue.report(self.job_id, self.worker_id, stage, progress, details, records)
+            except Exception as e:
+                # Lỗi database tạm thời không làm dừng việc huấn luyện; log được giữ lại cho lần sau
+                with self._state_lock:
+                    self._records[:0] = records
+                logger.debug(f"Không thể ghi tiến độ job {self.job_id}: {str(e)}")
+                return
+            self._last_flush = time.monotonic()
+            if stop:
+                self.cancelled.set()
+
+
+def _heartbeat_loop(reporter: JobReporter, stop: threading.Event, interval: float) -> None:
+    while not stop.wait(interval):
+        reporter.flush()
+
+
+def execute_job(
+    queue: TrainingQueue,
+    job: Dict[str, Any],
+    worker_id: str,
+    num_threads: Optional[int] = None,
+    heartbeat_interval: float = DEFAULT_HEARTBEAT_INTERVAL
+) -> str:
+    """
+    Chạy một job đã nhận và ghi kết quả
+
+    Returns:
+        Trạng thái cuối cùng của job
+    """
+    job_id = job['job_id']
+    reporter = JobReporter(queue, job_id, worker_id)
+    # Ghi log mức INFO của mọi module vào log của job, kể cả khi logging chưa được cấu hình
+    root = logging.getLogger()
+    root_level = root.level
+    root.setLevel(min(root_level or logging.WARNING, logging.INFO))
+    root.addHandler(reporter)
+    stop_heartbeat = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat_loop, args=(reporter, stop_heartbeat, heartbeat_interval),
+                                 name=f'training-job-{job_id}-heartbeat', daemon=True)
+    heartbeat.start()
+
+    status, result, error = FAILED, None, None
+    stopped = False
+    try:
+        logger.info(f"Worker {worker_id} bắt đầu job huấn luyện {job_id} (lần {job['attempts']})")
+        spec = job['spec']
+        result = run_training_job(normalize_job(spec), num_threads, progress=reporter.progress)
+        if result['success']:
+            if spec.get('register_in_db', True):
+                with queue.Session() as session:
+                    result['registered'] = register_result(result, session=session)
+            status = COMPLETED
+        else:
+            error = result['message']
+        logger.info(f"Job huấn luyện {job_id}: {result['message']}")
+    except TrainingCancelled:
+        status = CANCELLED
+        logger.info(f"Job huấn luyện {job_id} đã bị hủy")
+    except WorkerStopped:
+        stopped = True
+        raise
+    except Exception as e:
+        error = str(e)
+        logger.error(f"Lỗi khi chạy job huấn luyện {job_id}: {str(e)}")
+    finally:
+        stop_heartbeat.set()
+        heartbeat.join()
+        root.removeHandler(reporter)
+        root.setLevel(root_level)
+        reporter.flush()
+        if stopped:
+            queue.release(job_id, worker_id)
+        else:
+            queue.finish(job_id, worker_id, status, result, error)
+    return status
+
+
+def run_worker(
+    db_url: Optional[str] = None,
+    worker_id: Optional[str] = None,
+    num_threads: Optional[int] = None,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    stale_timeout: float = DEFAULT_STALE_TIMEOUT,
+    max_jobs: Optional[int] = None,
+    exit_when_idle: bool = False,
+    exit_with_parent: bool = False
+) -> int:
+    """
+    Vòng lặp của một worker: nhận job từ hàng đợi và chạy lần lượt
+
+    Args:
+        db_url: Database của hàng đợi (mặc định default_database_url())
+        worker_id: Tên worker (mặc định host:pid:ngẫu nhiên)
+        num_threads: Số thread LightGBM cho mỗi job
+        poll_interval: Thời gian chờ khi hàng đợi trống (giây)
+        stale_timeout: Thời gian mất heartbeat để đưa job của worker khác trở lại hàng đợi (giây)
+        max_jobs: Dừng sau số job này (None = không giới hạn)
+        exit_when_idle: Dừng khi hàng đợi trống
+        exit_with_parent: Dừng khi tiến trình cha (ví dụ web server) đã kết thúc
+
+    Returns:
+        Số job đã chạy
+    """
+    queue = TrainingQueue.from_url(db_url)
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+    parent = os.getppid()
+    logger.info(f"Worker huấn luyện {worker_id} bắt đầu ({num_threads or 'tất cả'} thread LightGBM)")
+
+    done = 0
+    last_heartbeat = None
+    try:
+        while max_jobs is None or done < max_jobs:
+            if exit_with_parent and os.getppid() != parent:
+                break
+            try:
+                # Heartbeat của worker rảnh; trong khi chạy job, heartbeat được ghi cùng tiến độ (report)
+                if last_heartbeat is None or time.monotonic() - last_heartbeat >= DEFAULT_HEARTBEAT_INTERVAL:
+                    queue.worker_heartbeat(worker_id)
+                    last_heartbeat = time.monotonic()
+                queue.requeue_stale(stale_timeout)
+                job = queue.claim(worker_id)
+            except Exception as e:
+                logger.error(f"Lỗi khi đọc hàng đợi huấn luyện: {str(e)}")
+                job = None
+            if job is None:
+                if exit_when_idle:
+                    break
+                time.sleep(poll_interval)
+                continue
+            execute_job(queue, job, worker_id, num_threads)
+            done += 1
+    except WorkerStopped as e:
+        logger.info(f"Worker huấn luyện {worker_id} nhận {e}, đang dừng")
+
+    try:
+        queue.remove_worker(worker_id)
+    except Exception as e:
+        logger.error(f"Lỗi khi xóa heartbeat của worker {worker_id}: {str(e)}")
+    logger.info(f"Worker huấn luyện {worker_id} dừng sau {done} job")
+    return done
+
+
+def _worker_process(db_url: Optional[str], num_threads: int, exit_with_parent: bool) -> None:
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    # process.terminate() gửi SIGTERM; Ctrl+C gửi SIGINT tới cả nhóm tiến trình
+    signal.signal(signal.SIGTERM, _raise_worker_stopped)
+    signal.signal(signal.SIGINT, _raise_worker_stopped)
+    run_worker(db_url, num_threads=num_threads, exit_with_parent=exit_with_parent)
+
+
+def start_workers(workers: int, db_url: Optional[str] = None, exit_with_parent: bool = False) -> List[multiprocessing.Process]:
+    """
+    Khởi động các tiến trình worker
+
+    Số thread LightGBM của mỗi worker được chia theo số worker để tổng số thread không vượt quá số core.
+    Khi tiến trình worker nhận SIGTERM (process.terminate()), job đang chạy được trả lại hàng đợi.
+    """
+    workers, threads = plan_workers(workers, workers)
+    # Dùng spawn: OpenMP của LightGBM không an toàn sau fork
+    context = multiprocessing.get_context('spawn')
+    processes = []
+    for i in range(workers):
+        process = context.Process(target=_worker_process, args=(db_url, threads, exit_with_parent),
+                                  name=f'training-worker-{i}', daemon=True)
+        process.start()
+        processes.append(process)
+    return processes
+
+
+def parse_args():
+    """Phân tích tham số dòng lệnh"""
+    parser = argparse.ArgumentParser(description="Chạy worker cho hàng đợi job huấn luyện")
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Số tiến trình worker (mỗi worker chạy một job tại một thời điểm)"
+    )
+
+    parser.add_argument(
+        "--database-url",
+        type=str,
+        default=None,
+        help="Database của hàng đợi (mặc định DATABASE_URL hoặc database SQLite của ứng dụng web)"
+    )
+
+    parser.add_argument(
+        "--exit-with-parent",
+        action="store_true",
+        help="Dừng khi tiến trình cha kết thúc (dùng khi web server khởi động worker)"
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    """Hàm chính"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    args = parse_args()
+    parent = os.getppid()
+
+    # Worker con luôn dừng theo tiến trình này, kể cả khi tiến trình này bị kill không kịp dọn dẹp
+    processes = start_workers(args.workers, args.database_url, exit_with_parent=True)
+    signal.signal(signal.SIGTERM, _raise_worker_stopped)
+    try:
+        while any(process.is_alive() for process in processes):
+            if args.exit_with_parent and os.getppid() != parent:
+                break
+            time.sleep(DEFAULT_POLL_INTERVAL)
+    except (KeyboardInterrupt, WorkerStopped):
+        logger.info("Đang dừng các worker huấn luyện")
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Theo dõi thư mục kết quả backtest của Freqtrade và import các file mới ngay khi chúng xuất hiện.
+
+Trên Linux, thay đổi trong thư mục được nhận qua inotify (gọi trực tiếp libc bằng ctypes,
+không cần thư viện ngoài); nếu inotify không dùng được, thư mục được quét định kỳ. Một file
+chỉ được import khi đã không thay đổi trong khoảng debounce giây và có nội dung JSON trọn vẹn,
+nên các file đang được Freqtrade ghi dở sẽ không bị import. Việc import dùng manifest của
+import_backtest_results, nên chỉ file mới hoặc đã thay đổi được ghi vào database.
+"""
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+import threading
+import time
+import zipfile
+from typing import Callable, Dict, Optional, Set, Tuple
+
+try:
+    from import_backtest import find_backtest_files, import_backtest_results, is_backtest_file
+except ImportError:
+    # Khi được import như một module của package (ví dụ từ backtest_ai.routes)
+    from freqtrade_integration.import_backtest import find_backtest_files, import_backtest_results, is_backtest_file
+
+logger = logging.getLogger(__name__)
+
+# Thời gian (giây) một file phải không thay đổi trước khi được import
+DEFAULT_DEBOUNCE = 2.0
+
+# Chu kỳ kiểm tra (giây) của vòng theo dõi và của chế độ quét định kỳ
+DEFAULT_POLL_INTERVAL = 1.0
+
+# Các sự kiện inotify được theo dõi (xem inotify(7))
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_INOTIFY_EVENT = struct.Struct('iIII')
+
+
+class InotifySource:
+    """Nguồn thay đổi dùng inotify của Linux"""
+
+    def __init__(self, directory: str):
+        libc_name = ctypes.util.find_library('c') or 'libc.so.6'
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("libc không hỗ trợ inotify")
+
+        self.directory = directory
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "Không thể khởi tạo inotify")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), mask) < 0:
+            error = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(error, f"Không thể theo dõi {directory}")
+
+    def wait(self, timeout: float) -> Optional[Set[str]]:
+        """
+        Chờ tối đa timeout giây và trả về các file đã thay đổi
+
+        Returns:
+            Tập đường dẫn đã thay đổi, hoặc None nếu hàng đợi sự kiện bị tràn (cần quét lại)
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed = set()
+        offset = 0
+        while offset + _INOTIFY_EVENT.size <= len(data):
+            _, mask, _, length = _INOTIFY_EVENT.unpack_from(data, offset)
+            offset += _INOTIFY_EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            if name:
+                changed.add(os.path.join(self.directory, os.fsdecode(name)))
+        return changed
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class PollingSource:
+    """Nguồn thay đổi dự phòng: so sánh kích thước và thời gian sửa của các file sau mỗi lần quét"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    snapshot[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        except FileNotFoundError:
+            pass
+        return snapshot
+
+    def wait(self, timeout: float) -> Optional[Set[str]]:
+        """Chờ timeout giây rồi trả về các file mới hoặc đã thay đổi kể từ lần quét trước"""
+        time.sleep(timeout)
+        snapshot = self._scan()
+        changed = {path for path, state in snapshot.items() if self._snapshot.get(path) != state}
+        self._snapshot = snapshot
+        return changed
+
+    def close(self) -> None:
+        pass
+
+
+def is_complete_json(file_path: str) -> bool:
+    """
+    Kiểm tra nhanh file kết quả đã được ghi xong
+
+    File JSON phải kết thúc bằng '}' (bỏ qua khoảng trắng); archive .zip phải có central
+    directory. File nén .json.gz/.json.zst không kiểm tra được nếu không giải nén toàn bộ,
+    nên chỉ dựa vào debounce.
+    """
+    name = file_path.lower()
+    if name.endswith('.zip'):
+        return zipfile.is_zipfile(file_path)
+    if name.endswith(('.gz', '.zst')):
+        return os.path.exists(file_path)
+    try:
+        with open(file_path, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            size = f.tell()
+            f.seek(max(size - 64, 0))
+            tail = f.read().rstrip()
+    except OSError:
+        return False
+    return tail.endswith(b'}')
+
+
+def watch_backtest_directory(
+    directory: str,
+    filter_strategy: Optional[str] = None,
+    workers: int = 1,
+    debounce: float = DEFAULT_DEBOUNCE,
+    poll_interval: float = DEFAULT_POLL_INTERVAL,
+    use_inotify: bool = True,
+    stop_event: Optional[threading.Event] = None,
+    on_import: Optional[Callable[[Dict[str, int]], None]] = None
+) -> None:
+    """
+    Theo dõi thư mục và import các file kết quả backtest mới hoặc đã thay đổi
+
+    Args:
+        directory: Thư mục chứa kết quả backtest
+        filter_strategy: Chỉ import kết quả của chiến lược này (tùy chọn)
+        workers: Số tiến trình phân tích file song song
+        debounce: Thời gian (giây) file phải không thay đổi trước khi được import
+        poll_interval: Chu kỳ kiểm tra (giây)
+        use_inotify: Dùng inotify nếu có (False = luôn quét định kỳ)
+        stop_event: Sự kiện để dừng theo dõi (None = chạy đến khi bị ngắt)
+        on_import: Hàm nhận kết quả của mỗi lần import
+    """
+    stop_event = stop_event or threading.Event()
+    os.makedirs(directory, exist_ok=True)
+
+    source = None
+    if use_inotify:
+        try:
+            source = InotifySource(directory)
+            logger.info(f"Theo dõi {directory} bằng inotify")
+        except (OSError, AttributeError) as e:
+            logger.warning(f"Không dùng được inotify ({str(e)}), chuyển sang quét định kỳ")
+    if source is None:
+        source = PollingSource(directory)
+        logger.info(f"Theo dõi {directory} bằng cách quét mỗi {poll_interval} giây")
+
+    # Các file chờ import: đường dẫn -> thời điểm thay đổi gần nhất
+    pending: Dict[str, float] = {}
+
+    def import_files(files):
+        summary = import_backtest_results(directory, filter_strategy, workers=workers, files=files)
+        if on_import is not None:
+            on_import(summary)
+
+    try:
+        # Import các file đã có (file đã import được manifest bỏ qua mà không cần đọc)
+        import_files(find_backtest_files(directory))
+
+        while not stop_event.is_set():
+            changed = source.wait(poll_interval)
+            now = time.monotonic()
+            if changed is None:
+                logger.warning("Hàng đợi sự kiện inotify bị tràn, quét lại toàn bộ thư mục")
+                changed = set(find_backtest_files(directory))
+            for path in changed:
+                if is_backtest_file(path):
+                    pending[path] = now
+
+            ready = []
+            for path, changed_at in list(pending.items()):
+                if not os.path.exists(path):
+                    del pending[path]
+                elif now - changed_at >= debounce and is_complete_json(path):
+                    ready.append(path)
+            if not ready:
+                continue
+
+            try:
+                import_files(ready)
+            except Exception as e:
+                # Giữ lại để thử lại sau debounce giây
+                logger.error(f"Lỗi khi import {len(ready)} file mới: {str(e)}")
+                for path in ready:
+                    pending[path] = now
+            else:
+                for path in ready:
+                    pending.pop(path, None)
+    finally:
+        source.close()
@@ -0,0 +1,232 @@
+"""
+Ghi hàng loạt (bulk insert) cho việc import kết quả backtest.
+
+Cách ghi được chọn theo dialect của database:
+
+- PostgreSQL (psycopg2 hoặc psycopg 3): COPY ... FROM STDIN ở định dạng text, mỗi lô chỉ
+  tốn một lượt trao đổi với server.
+- SQLite: câu lệnh INSERT ... VALUES nhiều dòng, số dòng mỗi câu lệnh được giới hạn theo số
+  tham số tối đa của SQLite. Câu lệnh được tạo trực tiếp (giá trị vẫn được chuyển đổi bằng
+  bind processor của kiểu cột) vì biên dịch insert().values với hàng chục nghìn tham số
+  bằng SQLAlchemy chậm hơn cả việc ghi.
+- Các dialect khác: executemany của SQLAlchemy.
+
+Mọi thao tác chạy trong transaction hiện tại của session; việc commit do người gọi quyết định.
+"""
+import io
+import json
+import math
+import sqlite3
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+from sqlalchemy import Boolean, Integer, Table, insert
+
+# Số dòng mặc định của mỗi lô ghi
+DEFAULT_ROW_BATCH_SIZE = 5000
+
+# Số tham số tối đa trong một câu lệnh SQLite (SQLITE_MAX_VARIABLE_NUMBER)
+SQLITE_MAX_VARIABLES = 32766 if sqlite3.sqlite_version_info >= (3, 32, 0) else 999
+
+
+def _dialect(session) -> Tuple[str, str]:
+    dialect = session.get_bind().dialect
+    return dialect.name, dialect.driver
+
+
+def _sqlite_rows_per_statement(columns: Sequence[str], batch_size: int) -> int:
+    return max(1, min(batch_size, SQLITE_MAX_VARIABLES // max(len(columns), 1)))
+
+
+def copy_text_value(value: Any) -> str:
+    """
+    Chuyển một giá trị sang định dạng text của lệnh COPY trong PostgreSQL
+
+    NULL được ghi là \\N; dấu gạch chéo ngược, tab và xuống dòng được escape.
+    """
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, float):
+        if math.isnan(value):
+            return 'NaN'
+        if math.isinf(value):
+            return 'Infinity' if value > 0 else '-Infinity'
+        return repr(value)
+    if isinstance(value, (datetime, date)):
+        text = value.isoformat()
+    elif isinstance(value, (dict, list)):
+        text = json.dumps(value)
+    else:
+        text = str(value)
+    return (
+        text.replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+        .replace('\r', '\\r')
+    )
+
+
+def _coerce_row(table: Table, columns: Sequence[str], row: Dict[str, Any]) -> List[Any]:
+    """Giá trị của một dòng theo thứ tự cột, ép kiểu số nguyên/boolean theo kiểu của cột"""
+    values = []
+    for column in columns:
+        value = row.get(column)
+        column_type = table.c[column].type
+        if value is not None:
+            if isinstance(column_type, Boolean):
+                value = bool(value)
+            elif isinstance(column_type, Integer) and isinstance(value, float) and math.isfinite(value):
+                value = int(value)
+        values.append(value)
+    return values
+
+
+def _copy_rows(session, table: Table, columns: Sequence[str], rows: Sequence[Dict[str, Any]]) -> None:
+    """Ghi các dòng bằng COPY FROM STDIN trên kết nối DBAPI của session"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(copy_text_value(value) for value in _coerce_row(table, columns, row)))
+        buffer.write('\n')
+    buffer.seek(0)
+
+    column_list = ', '.join(f'"{column}"' for column in columns)
+    statement = f'COPY "{table.name}" ({column_list}) FROM STDIN'
+    cursor = session.connection().connection.cursor()
+    try:
+        if hasattr(cursor, 'copy_expert'):
+            # psycopg2
+            cursor.copy_expert(statement, buffer)
+        else:
+            # psycopg 3
+            with cursor.copy(statement) as copy:
+                copy.write(buffer.getvalue())
+    finally:
+        cursor.close()
+
+
+def _insert_values_rows(session, table: Table, columns: Sequence[str], rows: Sequence[Dict[str, Any]], batch_size: int) -> None:
+    """Ghi các dòng bằng câu lệnh INSERT ... VALUES nhiều dòng (paramstyle qmark của sqlite3)"""
+    dialect = session.get_bind().dialect
+    processors = [table.c[column].type.bind_processor(dialect) for column in columns]
+    preparer = dialect.identifier_preparer
+    head = (
+        f"INSERT INTO {preparer.format_table(table)} "
+        f"({', '.join(preparer.quote(column) for column in columns)}) VALUES "
+    )
+    placeholder = '(' + ', '.join('?' * len(columns)) + ')'
+    step = _sqlite_rows_per_statement(columns, batch_size)
+
+    cursor = session.connection().connection.cursor()
+    try:
+        for start in range(0, len(rows), step):
+            chunk = rows[start:start + step]
+            params = []
+            for row in chunk:
+                for column, process in zip(columns, processors):
+                    value = row.get(column)
+                    params.append(process(value) if process is not None and value is not None else value)
+            cursor.execute(head + ', '.join([placeholder] * len(chunk)), params)
+    finally:
+        cursor.close()
+
+
+def bulk_insert(session, table: Table, rows: Sequence[Dict[str, Any]], batch_size: int = DEFAULT_ROW_BATCH_SIZE) -> int:
+    """
+    Ghi các dòng vào bảng theo lô
+
+    Args:
+        session: SQLAlchemy session (ghi trong transaction hiện tại)
+        table: Bảng đích (ví dụ BacktestTrade.__table__)
+        rows: Các dòng dạng dictionary, cùng tập khóa
+        batch_size: Số dòng tối đa của mỗi lô
+
+    Returns:
+        Số dòng đã ghi
+    """
+    if not rows:
+        return 0
+    columns = list(rows[0].keys())
+    name, driver = _dialect(session)
+
+    if name == 'postgresql' and driver in ('psycopg2', 'psycopg'):
+        for start in range(0, len(rows), batch_size):
+            _copy_rows(session, table, columns, rows[start:start + batch_size])
+    elif name == 'sqlite' and driver == 'pysqlite':
+        _insert_values_rows(session, table, columns, rows, batch_size)
+    else:
+        for start in range(0, len(rows), batch_size):
+            session.execute(insert(table), list(rows[start:start + batch_size]))
+    return len(rows)
+
+
+def insert_returning(session, table: Table, rows: Sequence[Dict[str, Any]], returning: Iterable[str]) -> List[Tuple]:
+    """
+    Ghi các dòng bằng câu lệnh INSERT nhiều dòng và trả về các cột được yêu cầu
+
+    Dùng cho các bảng cần khóa chính vừa sinh (ví dụ backtest_results, để gắn giao dịch).
+    Thứ tự các dòng trả về không được đảm bảo, nên nên trả về kèm các cột định danh dòng.
+
+    Args:
+        session: SQLAlchemy session (ghi trong transaction hiện tại)
+        table: Bảng đích
+        rows: Các dòng dạng dictionary, cùng tập khóa
+        returning: Tên các cột cần trả về
+
+    Returns:
+        Danh sách tuple giá trị các cột returning của mỗi dòng đã ghi
+    """
+    if not rows:
+        return []
+    returning_columns = [table.c[column] for column in returning]
+    columns = list(rows[0].keys())
+    name, _ = _dialect(session)
+    step = _sqlite_rows_per_statement(columns, len(rows)) if name == 'sqlite' else len(rows)
+
+    if not session.get_bind().dialect.insert_returning:
+        # Database không hỗ trợ RETURNING: ghi từng dòng để lấy khóa chính
+        result = []
+        for row in rows:
+            primary_key = session.execute(insert(table).values(row)).inserted_primary_key
+            values = dict(row, **dict(zip((c.name for c in table.primary_key.columns), primary_key)))
+            result.append(tuple(values.get(column.name) for column in returning_columns))
+        return result
+
+    result = []
+    for start in range(0, len(rows), step):
+        statement = insert(table).values(list(rows[start:start + step])).returning(*returning_columns)
+        result.extend(tuple(row) for row in session.execute(statement))
+    return result
+
+
+class BulkInserter:
+    """Bộ đệm gom các dòng của một bảng và ghi bằng bulk_insert mỗi khi đủ một lô"""
+
+    def __init__(self, session, table: Table, batch_size: int = DEFAULT_ROW_BATCH_SIZE):
+        """
+        Args:
+            session: SQLAlchemy session (ghi trong transaction hiện tại)
+            table: Bảng đích
+            batch_size: Số dòng của mỗi lô ghi
+        """
+        self.session = session
+        self.table = table
+        self.batch_size = max(1, int(batch_size))
+        self.written = 0
+        self._rows: List[Dict[str, Any]] = []
+
+    def add(self, row: Dict[str, Any]) -> None:
+        """Thêm một dòng; tự ghi khi bộ đệm đủ một lô"""
+        self._rows.append(row)
+        if len(self._rows) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> int:
+        """Ghi các dòng còn trong bộ đệm"""
+        if not self._rows:
+            return 0
+        written = bulk_insert(self.session, self.table, self._rows, self.batch_size)
+        self.written += written
+        self._rows = []
+        return written
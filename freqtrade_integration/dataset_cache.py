@@ -0,0 +1,171 @@
+"""
+Cache file nhị phân của lightgbm.Dataset đã xây dựng.
+
+Xây dựng một lgb.Dataset (tìm ngưỡng chia bin cho từng feature rồi chia bin toàn bộ dữ liệu)
+chiếm phần lớn thời gian trên dữ liệu lớn. Sau lần xây dựng đầu tiên, Dataset được lưu bằng
+save_binary (gồm dữ liệu đã chia bin, nhãn và bin mapper của từng feature); các lần huấn luyện
+hoặc tối ưu hyperparameters sau trên cùng dữ liệu đọc lại file này và bỏ qua bước chia bin.
+
+Khóa cache là hash của dữ liệu (ma trận, nhãn, tên feature), các tham số ảnh hưởng đến việc chia
+bin, phiên bản LightGBM và khóa của Dataset tham chiếu (với tập validation, vì bin của tập
+validation phải khớp với tập train).
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import lightgbm as lgb
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Dung lượng tối đa của cache (byte); các file ít được dùng nhất bị xóa trước
+DEFAULT_MAX_DISK_BYTES = 2 * 1024 ** 3
+
+CACHE_FILE_SUFFIX = '.lgb.bin'
+
+# Các tham số LightGBM quyết định cách chia bin của Dataset
+DATASET_PARAM_NAMES = (
+    'max_bin', 'max_bin_by_feature', 'min_data_in_bin', 'bin_construct_sample_cnt', 'data_random_seed',
+    'feature_pre_filter', 'min_data_in_leaf', 'use_missing', 'zero_as_missing', 'linear_tree',
+    'categorical_feature', 'forcedbins_filename'
+)
+
+
+def dataset_params(params: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Các tham số liên quan đến việc chia bin trong params của lightgbm.train"""
+    return {name: params[name] for name in DATASET_PARAM_NAMES if params and name in params}
+
+
+def default_cache_dir() -> Optional[str]:
+    """Thư mục cache từ biến môi trường LIGHTGBM_DATASET_CACHE_DIR (chuỗi rỗng = tắt cache)"""
+    cache_dir = os.environ.get('LIGHTGBM_DATASET_CACHE_DIR', os.path.join(os.getcwd(), 'cache', 'lightgbm_datasets'))
+    return cache_dir or None
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class DatasetCache:
+    """Cache các lightgbm.Dataset đã xây dựng dưới dạng file nhị phân"""
+
+    def __init__(self, cache_dir: str, max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES):
+        """
+        Args:
+            cache_dir: Thư mục lưu cache
+            max_disk_bytes: Dung lượng tối đa của cache
+        """
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = int(max_disk_bytes)
+
+    @classmethod
+    def from_env(cls) -> Optional['DatasetCache']:
+        """Tạo cache theo LIGHTGBM_DATASET_CACHE_DIR, hoặc None nếu cache bị tắt"""
+        cache_dir = default_cache_dir()
+        return cls(cache_dir) if cache_dir else None
+
+    def make_key(self, data: np.ndarray, label: np.ndarray, feature_names: Optional[List[str]],
+                 params: Dict[str, Any], reference: Optional[lgb.Dataset] = None) -> str:
+        """Khóa cache của một Dataset"""
+        digest = hashlib.sha256()
+        digest.update(json.dumps({
+            'shape': list(data.shape),
+            'features': feature_names,
+            'params': params,
+            'reference': getattr(reference, 'cache_key', None),
+            'lightgbm': lgb.__version__
+        }, sort_keys=True, default=str).encode('utf-8'))
+        digest.update(data.tobytes())
+        digest.update(label.tobytes())
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key + CACHE_FILE_SUFFIX)
+
+    def dataset(
+        self,
+        X,
+        label,
+        params: Optional[Dict[str, Any]] = None,
+        reference: Optional[lgb.Dataset] = None,
+        feature_name: Optional[List[str]] = None
+    ) -> lgb.Dataset:
+        """
+        Dataset cho dữ liệu: đọc từ cache nếu có, nếu không thì xây dựng và lưu lại
+
+        Args:
+            X: Ma trận features
+            label: Nhãn
+            params: Tham số của lightgbm.train (chỉ các tham số chia bin được dùng)
+            reference: Dataset train (khi tạo tập validation)
+            feature_name: Tên các feature (mặc định lấy từ cột của X nếu là DataFrame)
+
+        Returns:
+            lgb.Dataset đã được xây dựng, có thuộc tính cache_key
+        """
+        if feature_name is None and hasattr(X, 'columns'):
+            feature_name = [str(column) for column in X.columns]
+        data = np.ascontiguousarray(X, dtype=np.float64)
+        label = np.ascontiguousarray(label, dtype=np.float64)
+        binning = dataset_params(params)
+        key = self.make_key(data, label, feature_name, binning, reference)
+        # Số thread không ảnh hưởng đến kết quả chia bin nên không thuộc khóa cache
+        if params and params.get('num_threads'):
+            binning['num_threads'] = params['num_threads']
+        path = self._path(key)
+
+        if os.path.exists(path):
+            try:
+                dataset = lgb.Dataset(path, params=binning, reference=reference, free_raw_data=False).construct()
+                dataset.cache_key = key
+                # Cập nhật thời gian truy cập để việc dọn dẹp xóa các file ít dùng nhất trước
+                os.utime(path)
+                return dataset
+            except (OSError, lgb.basic.LightGBMError) as e:
+                logger.warning(f"Bỏ qua file Dataset hỏng {path}: {str(e)}")
+                _remove_quietly(path)
+
+        dataset = lgb.Dataset(
+            data, label=label, params=binning, reference=reference,
+            feature_name=feature_name or 'auto'
+        ).construct()
+        dataset.cache_key = key
+        self._write(dataset, path)
+        return dataset
+
+    def _write(self, dataset: lgb.Dataset, path: str) -> None:
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            dataset.save_binary(tmp_path)
+            # Ghi vào file tạm rồi đổi tên để tiến trình khác không đọc phải file ghi dở
+            os.replace(tmp_path, path)
+        except (OSError, lgb.basic.LightGBMError) as e:
+            logger.warning(f"Không thể lưu Dataset vào cache {path}: {str(e)}")
+            _remove_quietly(tmp_path)
+            return
+        self._evict()
+
+    def _evict(self) -> None:
+        files = []
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if entry.name.endswith(CACHE_FILE_SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    files.append((entry.path, stat.st_size, stat.st_mtime))
+        total = sum(size for _, size, _ in files)
+        for path, size, _ in sorted(files, key=lambda item: item[2]):
+            if total <= self.max_disk_bytes:
+                break
+            _remove_quietly(path)
+            total -= size
@@ -14,6 +14,11 @@ import string
 import random
 import shutil
 
+try:
+    from trade_features import DEFAULT_ROLLING_WINDOW, DURATION_BUCKET_EDGES
+except ImportError:
+    from freqtrade_integration.trade_features import DEFAULT_ROLLING_WINDOW, DURATION_BUCKET_EDGES
+
 # Thiết lập logging
 logging.basicConfig(
     level=logging.INFO,
@@ -110,6 +115,7 @@ from typing import Dict, List, Tuple, Optional
 from freqtrade.strategy import IStrategy, IntParameter, DecimalParameter
 from freqtrade.strategy import CategoricalParameter
 from freqtrade.strategy.interface import IStrategy
+from freqtrade.persistence import Trade
 import talib.abstract as ta
 import logging
 from pathlib import Path
@@ -194,7 +200,44 @@ class {strategy_name}(IStrategy):
         
         return dataframe
     
-    def extract_features(self, dataframe: pd.DataFrame, row_index: int) -> pd.DataFrame:
+    def recent_trade_features(self, pair: str, as_of) -> Dict[str, float]:
+        \"\"\"
+        Features từ lịch sử giao dịch, tính như lúc huấn luyện: {DEFAULT_ROLLING_WINDOW} giao dịch
+        gần nhất của cặp giao dịch đã đóng lệnh trước thời điểm vào lệnh as_of
+        \"\"\"
+        features = {{
+            'trade_recent_win_rate': np.nan,
+            'trade_recent_profit_mean': np.nan,
+            'trade_recent_duration_bucket': np.nan,
+            'trade_recent_open_rate': np.nan
+        }}
+        try:
+            trades = Trade.get_trades_proxy(pair=pair, is_open=False)
+        except Exception as e:
+            logger.warning(f"Không đọc được lịch sử giao dịch của {{pair}}: {{e}}")
+            return features
+
+        as_of = pd.Timestamp(as_of)
+        if as_of.tzinfo is None:
+            as_of = as_of.tz_localize('UTC')
+        closed = sorted(
+            (trade for trade in trades if trade.close_date is not None and pd.Timestamp(trade.close_date_utc) <= as_of),
+            key=lambda trade: trade.close_date_utc
+        )[-{DEFAULT_ROLLING_WINDOW}:]
+        if not closed:
+            return features
+
+        # close_profit là tỷ lệ lợi nhuận, cùng đơn vị với profit_percent trong file backtest
+        profits = [trade.close_profit for trade in closed if trade.close_profit is not None]
+        if profits:
+            features['trade_recent_win_rate'] = float(np.mean([profit > 0 for profit in profits]))
+            features['trade_recent_profit_mean'] = float(np.mean(profits))
+        minutes = np.mean([(trade.close_date - trade.open_date).total_seconds() / 60 for trade in closed])
+        features['trade_recent_duration_bucket'] = float(np.searchsorted({list(DURATION_BUCKET_EDGES)}, minutes, side='right'))
+        features['trade_recent_open_rate'] = float(np.mean([trade.open_rate for trade in closed]))
+        return features
+
+    def extract_features(self, dataframe: pd.DataFrame, row_index: int, pair: Optional[str] = None) -> pd.DataFrame:
         \"\"\"
         Trích xuất các features cần thiết để dự đoán với mô hình AI
         \"\"\"
@@ -213,6 +256,7 @@ class {strategy_name}(IStrategy):
         else:
             # Trích xuất theo feature names từ mô hình
             features = {{}}
+            recent = None
             for feature in feature_names:
                 if feature.startswith('param_'):
                     param_name = feature[6:]  # Bỏ tiền tố 'param_'
@@ -227,12 +271,32 @@ class {strategy_name}(IStrategy):
                         else:
                             # Gán giá trị mặc định nếu không tìm thấy
                             features[feature] = 0
-        
+                elif feature == 'trade_entry_hour' and 'date' in dataframe.columns:
+                    features[feature] = dataframe['date'].iloc[row_index].hour
+                elif feature == 'trade_entry_weekday' and 'date' in dataframe.columns:
+                    features[feature] = dataframe['date'].iloc[row_index].weekday()
+                elif feature.startswith('trade_') and pair is not None and 'date' in dataframe.columns:
+                    # Features từ lịch sử giao dịch đã đóng của bot, như lúc huấn luyện
+                    if recent is None:
+                        recent = self.recent_trade_features(pair, dataframe['date'].iloc[row_index])
+                    if feature == 'trade_open_rate_vs_recent':
+                        # Giá vào lệnh là giá đóng của nến phát tín hiệu
+                        recent_open_rate = recent['trade_recent_open_rate']
+                        features[feature] = (
+                            dataframe['close'].iloc[row_index] / recent_open_rate - 1.0
+                            if recent_open_rate > 0 else np.nan
+                        )
+                    else:
+                        features[feature] = recent.get(feature, np.nan)
+                else:
+                    # Feature không tính được: để trống, LightGBM xử lý như giá trị thiếu
+                    features[feature] = np.nan
+
         # Chuyển thành DataFrame để dễ xử lý
         features_df = pd.DataFrame([features])
         return features_df
     
-    def predict_with_ai(self, dataframe: pd.DataFrame, row_index: int) -> float:
+    def predict_with_ai(self, dataframe: pd.DataFrame, row_index: int, pair: Optional[str] = None) -> float:
         \"\"\"
         Sử dụng mô hình AI để dự đoán xác suất giao dịch thành công
         \"\"\"
@@ -241,7 +305,7 @@ class {strategy_name}(IStrategy):
             
         try:
             # Trích xuất features
-            features = self.extract_features(dataframe, row_index)
+            features = self.extract_features(dataframe, row_index, pair)
             
             # Chuẩn hóa dữ liệu nếu có scaler
             if self.scaler is not None:
@@ -277,7 +341,7 @@ class {strategy_name}(IStrategy):
         for index, row in dataframe.iterrows():
             # Chỉ áp dụng cho các hàng cuối cùng (để tránh dự đoán lại dữ liệu lịch sử)
             if index >= len(dataframe) - 10:
-                prediction = self.predict_with_ai(dataframe, index)
+                prediction = self.predict_with_ai(dataframe, index, metadata.get('pair'))
                 
                 # Đánh dấu tín hiệu mua nếu xác suất cao hơn ngưỡng
                 if prediction > self.ai_threshold.value:
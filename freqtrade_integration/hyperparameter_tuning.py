@@ -0,0 +1,392 @@
+"""
+Tối ưu hyperparameters LightGBM bằng Hyperband (successive halving theo số vòng boosting).
+
+Thay vì huấn luyện đầy đủ mọi tổ hợp của một lưới tham số, mỗi nhánh (bracket) của Hyperband
+lấy mẫu ngẫu nhiên n cấu hình, huấn luyện tất cả với ít vòng boosting, giữ lại 1/eta cấu hình
+có AUC tốt nhất trên tập validation rồi huấn luyện tiếp với số vòng gấp eta lần, cho đến
+max_rounds. Mô hình của các cấu hình được giữ lại được huấn luyện tiếp (Booster.update) chứ
+không huấn luyện lại từ đầu, và AUC được LightGBM cập nhật dần trên tập validation.
+
+Việc tìm kiếm dừng khi hết số cấu hình (max_trials) hoặc hết thời gian (time_budget); kết quả
+là cấu hình tốt nhất đã đánh giá.
+
+Các cấu hình đã thử có thể được lưu lại (SQLTrialStore) theo study (chiến lược, cặp giao dịch,
+features). Lần tìm kiếm sau của cùng study bắt đầu từ các cấu hình tốt nhất đã biết, và nếu
+dữ liệu không đổi (cùng dấu vân tay) thì AUC đã lưu được dùng lại thay vì huấn luyện lại.
+"""
+import hashlib
+import json
+import logging
+import math
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+try:
+    from dataset_cache import DatasetCache
+except ImportError:
+    from freqtrade_integration.dataset_cache import DatasetCache
+
+logger = logging.getLogger(__name__)
+
+# Số cấu hình tối đa được thử
+DEFAULT_MAX_TRIALS = 60
+
+# Thời gian tối đa (giây) cho việc tìm kiếm
+DEFAULT_TIME_BUDGET = 300.0
+
+# Số vòng boosting của nấc thấp nhất và cao nhất (bằng num_boost_round khi huấn luyện)
+DEFAULT_MIN_ROUNDS = 25
+DEFAULT_MAX_ROUNDS = 500
+
+# Tỷ lệ loại bỏ của mỗi nấc: giữ lại 1/eta cấu hình, số vòng tăng eta lần
+DEFAULT_ETA = 3
+
+# Tham số cố định của mô hình (định dạng của lightgbm.train)
+BASE_PARAMS = {
+    'objective': 'binary',
+    'metric': 'binary_logloss',
+    'boosting_type': 'gbdt',
+    'verbose': -1
+}
+
+# Số cấu hình tốt nhất của các lần tìm kiếm trước được thử lại đầu tiên (khởi động ấm)
+WARM_START_CONFIGS = 5
+
+# Không gian tìm kiếm: tên tham số -> (kiểu phân phối, giá trị nhỏ nhất, giá trị lớn nhất)
+SEARCH_SPACE = {
+    'num_leaves': ('int_log', 15, 127),
+    'learning_rate': ('log', 0.01, 0.2),
+    'feature_fraction': ('uniform', 0.6, 1.0),
+    'bagging_fraction': ('uniform', 0.6, 1.0),
+    'lambda_l1': ('uniform', 0.0, 0.5),
+    'lambda_l2': ('uniform', 0.0, 0.5),
+}
+
+
+def sample_params(rng: np.random.Generator, space: Dict[str, tuple] = SEARCH_SPACE) -> Dict[str, Any]:
+    """Lấy ngẫu nhiên một cấu hình từ không gian tìm kiếm"""
+    params = {}
+    for name, (kind, low, high) in space.items():
+        if kind == 'int_log':
+            params[name] = int(round(math.exp(rng.uniform(math.log(low), math.log(high)))))
+        elif kind == 'log':
+            params[name] = float(math.exp(rng.uniform(math.log(low), math.log(high))))
+        else:
+            params[name] = float(rng.uniform(low, high))
+    return params
+
+
+def hyperband_brackets(min_rounds: int, max_rounds: int, eta: int) -> List[List[tuple]]:
+    """
+    Lịch của các nhánh Hyperband
+
+    Returns:
+        Danh sách nhánh; mỗi nhánh là danh sách nấc (số cấu hình, số vòng boosting)
+    """
+    s_max = int(math.floor(math.log(max_rounds / min_rounds, eta) + 1e-9))
+    brackets = []
+    for s in range(s_max, -1, -1):
+        n = int(math.ceil((s_max + 1) / (s + 1) * eta ** s))
+        rungs = []
+        for i in range(s + 1):
+            rungs.append((max(1, n // eta ** i), int(round(max_rounds * eta ** (i - s)))))
+        brackets.append(rungs)
+    return brackets
+
+
+def params_key(params: Dict[str, Any]) -> str:
+    """Khóa định danh một cấu hình (JSON chuẩn hóa)"""
+    return json.dumps(params, sort_keys=True, separators=(',', ':'))
+
+
+def data_fingerprint(X, y, seed: Optional[int] = None) -> str:
+    """
+    Dấu vân tay của dữ liệu tìm kiếm (nội dung X, y và seed chia dữ liệu)
+
+    Điểm AUC đã lưu chỉ được dùng lại khi dấu vân tay trùng khớp.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([list(map(str, getattr(X, 'columns', []))), seed]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(pd.DataFrame(X), index=False).to_numpy().tobytes())
+    digest.update(pd.util.hash_pandas_object(pd.Series(np.asarray(y)), index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def make_study_key(study_name: str, feature_names: List[str]) -> str:
+    """Khóa của một study: tên (chiến lược, cặp giao dịch) và danh sách features"""
+    canonical = json.dumps({'study': study_name, 'features': list(map(str, feature_names))}, sort_keys=True)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+def warm_start(prior_trials: List[Dict[str, Any]], fingerprint: str, limit: int = WARM_START_CONFIGS) -> tuple:
+    """
+    Chuẩn bị khởi động ấm từ các cấu hình đã thử (kết quả của SQLTrialStore.load)
+
+    Returns:
+        Tuple (initial_configs, known_scores) cho HyperbandTuner: các cấu hình tốt nhất (ưu tiên
+        cấu hình đã được huấn luyện nhiều vòng nhất) và AUC đã biết trên cùng dữ liệu
+    """
+    ranked = sorted(
+        (trial for trial in prior_trials if trial['score'] is not None),
+        key=lambda trial: (trial['rounds'], trial['score']),
+        reverse=True
+    )
+    initial_configs, seen = [], set()
+    for trial in ranked:
+        key = params_key(trial['params'])
+        if key not in seen:
+            seen.add(key)
+            initial_configs.append(trial['params'])
+        if len(initial_configs) >= limit:
+            break
+
+    known_scores: Dict[str, Dict[int, float]] = {}
+    for trial in prior_trials:
+        if trial['data_fingerprint'] == fingerprint:
+            known_scores.setdefault(params_key(trial['params']), {}).update(trial['scores'])
+    return initial_configs, known_scores
+
+
+class HyperbandTuner:
+    """Tìm hyperparameters LightGBM bằng Hyperband trên một cặp tập train/validation"""
+
+    def __init__(
+        self,
+        X_train,
+        y_train,
+        X_valid,
+        y_valid,
+        max_trials: int = DEFAULT_MAX_TRIALS,
+        time_budget: float = DEFAULT_TIME_BUDGET,
+        min_rounds: int = DEFAULT_MIN_ROUNDS,
+        max_rounds: int = DEFAULT_MAX_ROUNDS,
+        eta: int = DEFAULT_ETA,
+        seed: Optional[int] = None,
+        initial_configs: Optional[List[Dict[str, Any]]] = None,
+        known_scores: Optional[Dict[str, Dict[int, float]]] = None,
+        dataset_cache: Optional[DatasetCache] = None,
+        num_threads: Optional[int] = None,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        """
+        Args:
+            X_train, y_train: Dữ liệu huấn luyện
+            X_valid, y_valid: Dữ liệu đánh giá (AUC)
+            max_trials: Số cấu hình tối đa được thử
+            time_budget: Thời gian tối đa (giây, 0 = không giới hạn)
+            min_rounds: Số vòng boosting của nấc thấp nhất
+            max_rounds: Số vòng boosting của nấc cao nhất
+            eta: Tỷ lệ loại bỏ của mỗi nấc (>= 2)
+            seed: Seed cho việc lấy mẫu cấu hình và LightGBM
+            initial_configs: Các cấu hình được thử trước các cấu hình ngẫu nhiên (khởi động ấm)
+            known_scores: AUC đã biết trên cùng dữ liệu: params_key -> {số vòng: AUC}; các điểm
+                này không cần huấn luyện lại
+            dataset_cache: Cache các lgb.Dataset đã chia bin (tùy chọn)
+            num_threads: Số thread LightGBM cho mỗi lần huấn luyện (mặc định: tất cả các core)
+            progress: Callback nhận {'stage': 'tuning', 'iteration', 'total', 'rounds', 'score', 'best_score'}
+                sau mỗi lần đánh giá một cấu hình; exception từ callback dừng việc tìm kiếm
+        """
+        self.max_trials = max(1, int(max_trials))
+        self.time_budget = float(time_budget)
+        self.min_rounds = max(1, int(min_rounds))
+        self.max_rounds = max(self.min_rounds, int(max_rounds))
+        self.eta = max(2, int(eta))
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.initial_configs = list(initial_configs or [])
+        self.known_scores = known_scores or {}
+        self.num_threads = num_threads
+        self.progress = progress
+
+        # Các cấu hình chỉ khác nhau ở tham số cây nên mọi lần thử dùng chung một cặp Dataset đã chia bin
+        if dataset_cache is not None:
+            self.train_set = dataset_cache.dataset(X_train, y_train, BASE_PARAMS)
+            self.valid_set = dataset_cache.dataset(X_valid, y_valid, BASE_PARAMS, reference=self.train_set)
+        else:
+            self.train_set = lgb.Dataset(np.asarray(X_train, dtype=float), label=np.asarray(y_train), free_raw_data=False)
+            self.valid_set = lgb.Dataset(
+                np.asarray(X_valid, dtype=float), label=np.asarray(y_valid), reference=self.train_set, free_raw_data=False
+            )
+
+        # Các cấu hình đã thử: params, nấc (số vòng) đã đánh giá, AUC theo từng nấc, thời gian huấn luyện
+        self.trials: List[Dict[str, Any]] = []
+        self._deadline = None
+
+    def _out_of_time(self) -> bool:
+        return self._deadline is not None and time.monotonic() >= self._deadline
+
+    def _next_params(self) -> Dict[str, Any]:
+        if self.initial_configs:
+            return self.initial_configs.pop(0)
+        return sample_params(self.rng)
+
+    def _start_trial(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        trial = {
+            'params': params, 'key': params_key(params), 'rounds': 0, 'score': None, 'scores': {},
+            'booster': None, 'trained_rounds': 0, 'finished': False, 'duration': 0.0, 'trained': False
+        }
+        self.trials.append(trial)
+        return trial
+
+    def _create_booster(self, params: Dict[str, Any]):
+        booster_params = dict(BASE_PARAMS, **params, metric='auc', bagging_freq=1)
+        if self.seed is not None:
+            booster_params['seed'] = self.seed
+        if self.num_threads:
+            booster_params['num_threads'] = self.num_threads
+        booster = lgb.Booster(booster_params, self.train_set)
+        booster.add_valid(self.valid_set, 'valid')
+        return booster
+
+    def _advance(self, trial: Dict[str, Any], rounds: int) -> None:
+        """Huấn luyện tiếp một cấu hình đến rounds vòng (hoặc dùng AUC đã biết) và cập nhật AUC"""
+        trial['rounds'] = rounds
+        known = self.known_scores.get(trial['key'], {}).get(rounds)
+        if known is not None:
+            trial['score'] = trial['scores'][rounds] = known
+            self._report(trial)
+            return
+
+        started = time.monotonic()
+        if trial['booster'] is None:
+            trial['booster'] = self._create_booster(trial['params'])
+            trial['trained_rounds'] = 0
+            trial['finished'] = False
+        booster = trial['booster']
+        while trial['trained_rounds'] < rounds and not trial['finished']:
+            # update() trả về True khi không thể tách thêm (mô hình đã hội tụ)
+            trial['finished'] = booster.update()
+            trial['trained_rounds'] += 1
+        trial['score'] = trial['scores'][rounds] = float(booster.eval_valid()[0][2])
+        trial['duration'] += time.monotonic() - started
+        trial['trained'] = True
+        self._report(trial)
+
+    def _report(self, trial: Dict[str, Any]) -> None:
+        if self.progress is None:
+            return
+        scores = [t['score'] for t in self.trials if t['score'] is not None]
+        self.progress({
+            'stage': 'tuning', 'iteration': len(self.trials), 'total': self.max_trials,
+            'rounds': trial['rounds'], 'score': trial['score'], 'best_score': max(scores) if scores else None
+        })
+
+    def run(self) -> Optional[Dict[str, Any]]:
+        """
+        Chạy tìm kiếm
+
+        Returns:
+            Cấu hình tốt nhất {'params', 'rounds', 'score'} (kể cả trong known_scores) hoặc None nếu
+            chưa đánh giá được cấu hình nào
+        """
+        start = time.monotonic()
+        self._deadline = start + self.time_budget if self.time_budget > 0 else None
+        brackets = hyperband_brackets(self.min_rounds, self.max_rounds, self.eta)
+
+        while len(self.trials) < self.max_trials and not self._out_of_time():
+            for rungs in brackets:
+                remaining = self.max_trials - len(self.trials)
+                if remaining <= 0 or self._out_of_time():
+                    break
+                survivors = [self._start_trial(self._next_params()) for _ in range(min(rungs[0][0], remaining))]
+                for i, (_, rounds) in enumerate(rungs):
+                    for trial in survivors:
+                        if self._out_of_time():
+                            break
+                        self._advance(trial, rounds)
+                    evaluated = [trial for trial in survivors if trial['score'] is not None]
+                    if i + 1 == len(rungs) or self._out_of_time():
+                        break
+                    # Giữ lại 1/eta cấu hình tốt nhất cho nấc tiếp theo
+                    keep = max(1, len(evaluated) // self.eta)
+                    survivors = sorted(evaluated, key=lambda trial: trial['score'], reverse=True)[:keep]
+                    kept = {id(trial) for trial in survivors}
+                    for trial in evaluated:
+                        if id(trial) not in kept:
+                            trial['booster'] = None
+                for trial in survivors:
+                    trial['booster'] = None
+
+        evaluated = [trial for trial in self.trials if trial['score'] is not None]
+        logger.info(
+            f"Hyperband: đã thử {len(self.trials)} cấu hình ({sum(not t['trained'] for t in evaluated)} dùng lại kết quả cũ), "
+            f"{sum(trial['trained_rounds'] for trial in self.trials)} vòng boosting trong {time.monotonic() - start:.1f} giây"
+        )
+        # Mọi nấc đã đánh giá đều là ứng viên, kể cả điểm trên cùng dữ liệu từ các lần trước
+        candidates = [
+            {'params': trial['params'], 'rounds': rounds, 'score': score}
+            for trial in evaluated for rounds, score in trial['scores'].items()
+        ]
+        for key, scores in self.known_scores.items():
+            for rounds, score in scores.items():
+                candidates.append({'params': json.loads(key), 'rounds': rounds, 'score': score})
+        if not candidates:
+            return None
+        return max(candidates, key=lambda candidate: candidate['score'])
+
+
+class SQLTrialStore:
+    """Lưu và đọc các cấu hình đã thử trong bảng tuning_trial (models.TuningTrial)"""
+
+    def __init__(self, session, model=None):
+        """
+        Args:
+            session: SQLAlchemy session (ví dụ db.session của Flask-SQLAlchemy)
+            model: Lớp model của bảng (mặc định models.TuningTrial)
+        """
+        if model is None:
+            from models import TuningTrial as model
+        self.session = session
+        self.model = model
+
+    def load(self, study_key: str) -> List[Dict[str, Any]]:
+        """
+        Các cấu hình đã thử của một study, gộp theo cấu hình và dấu vân tay dữ liệu
+
+        Returns:
+            Danh sách {'params', 'data_fingerprint', 'rounds', 'score', 'scores'}
+        """
+        merged: Dict[tuple, Dict[str, Any]] = {}
+        rows = self.session.query(self.model).filter(self.model.study_key == study_key).order_by(self.model.id)
+        for row in rows:
+            key = (params_key(row.params), row.data_fingerprint)
+            entry = merged.setdefault(key, {
+                'params': row.params, 'data_fingerprint': row.data_fingerprint, 'rounds': 0, 'score': None, 'scores': {}
+            })
+            entry['scores'].update({int(rounds): score for rounds, score in (row.scores or {}).items()})
+            if row.score is not None and row.rounds >= entry['rounds']:
+                entry['rounds'], entry['score'] = row.rounds, row.score
+        return list(merged.values())
+
+    def save(self, study_key: str, study_name: str, fingerprint: str, trials: List[Dict[str, Any]]) -> int:
+        """
+        Lưu các cấu hình vừa được huấn luyện (bỏ qua các cấu hình chỉ dùng lại kết quả cũ)
+
+        Returns:
+            Số cấu hình đã lưu
+        """
+        saved = 0
+        for trial in trials:
+            if not trial['trained'] or trial['score'] is None:
+                continue
+            self.session.add(self.model(
+                study_key=study_key,
+                study_name=study_name,
+                data_fingerprint=fingerprint,
+                params=trial['params'],
+                rounds=trial['rounds'],
+                score=trial['score'],
+                scores={str(rounds): score for rounds, score in trial['scores'].items()},
+                duration=trial['duration']
+            ))
+            saved += 1
+        try:
+            self.session.commit()
+        except Exception:
+            self.session.rollback()
+            raise
+        return saved
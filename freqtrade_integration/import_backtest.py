@@ -4,19 +4,54 @@ Script nhập dữ liệu từ kết quả backtest của Freqtrade để huấn
 Kết quả backtest chứa thông tin quý giá về hiệu suất chiến lược trong điều kiện lịch sử.
 """
 import os
-import json
 import argparse
 import logging
+import fnmatch
 import glob
-from datetime import datetime
-from typing import Dict, List, Optional, Any, Union
+import gzip
+import hashlib
+import io
+import itertools
+import pickle
+import queue
+import shutil
+import tempfile
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from functools import partial
+from typing import Callable, Dict, Iterator, List, Optional, Any, TextIO, Tuple, Union
 
+import numpy as np
 import pandas as pd
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, Boolean, JSON
+from sqlalchemy import (
+    create_engine, select, text, Column, Integer, BigInteger, String, Float, DateTime, Boolean, JSON, ForeignKey, Index
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
+try:
+    import zstandard
+except ImportError:
+    # Chỉ cần khi import file .json.zst
+    zstandard = None
+
+try:
+    from bulk_write import DEFAULT_ROW_BATCH_SIZE, BulkInserter, bulk_insert, insert_returning
+    from json_stream import JsonStreamReader
+    from trade_features import DEFAULT_ROLLING_WINDOW, build_trade_features
+    from training_cache import TrainingDataCache
+except ImportError:
+    # Khi được import như một module của package (ví dụ từ backtest_ai.routes)
+    from freqtrade_integration.bulk_write import DEFAULT_ROW_BATCH_SIZE, BulkInserter, bulk_insert, insert_returning
+    from freqtrade_integration.json_stream import JsonStreamReader
+    from freqtrade_integration.trade_features import DEFAULT_ROLLING_WINDOW, build_trade_features
+    from freqtrade_integration.training_cache import TrainingDataCache
+
 # Tải biến môi trường
 load_dotenv()
 
@@ -27,6 +62,76 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Số file tối đa được ghi trong một transaction khi import
+IMPORT_BATCH_SIZE = 20
+
+# Số giao dịch trong mỗi nhóm khi đọc streaming
+TRADE_CHUNK_SIZE = 5000
+
+# Số dòng mỗi lần lấy từ database khi chuẩn bị dữ liệu huấn luyện (yield_per)
+TRAINING_FETCH_SIZE = 10000
+
+# Các cột giao dịch trong dữ liệu huấn luyện: tên cột DataFrame -> cột của backtest_trades
+TRAINING_TRADE_COLUMNS = (
+    ('trade_id', 'trade_id'),
+    ('pair', 'pair'),
+    ('open_time', 'open_date'),
+    ('close_time', 'close_date'),
+    ('open_rate', 'open_rate'),
+    ('close_rate', 'close_rate'),
+    ('profit_percent', 'profit_percent'),
+    ('profit_abs', 'profit_abs'),
+    ('trade_duration', 'trade_duration'),
+)
+
+# Tham số chiến lược dạng số của các kết quả backtest có giao dịch của (chiến lược, cặp giao dịch),
+# lọc bằng hàm JSON của database; giá trị boolean được chuyển thành 1/0
+_TRAINING_RESULT_FILTER = (
+    "r.id IN (SELECT DISTINCT backtest_result_id FROM backtest_trades "
+    "WHERE strategy_name = :strategy_name AND pair = :pair)"
+)
+_NUMERIC_PARAMETERS_SQL = {
+    'sqlite': (
+        "SELECT r.id, p.key, p.value FROM backtest_results AS r, json_each(r.parameters) AS p "
+        f"WHERE {_TRAINING_RESULT_FILTER} AND p.type IN ('integer', 'real', 'true', 'false') "
+        "ORDER BY r.id, p.id"
+    ),
+    'postgresql': (
+        "SELECT r.id, p.key, CASE json_typeof(p.value) "
+        "WHEN 'boolean' THEN CASE WHEN p.value::text = 'true' THEN 1.0 ELSE 0.0 END "
+        "ELSE p.value::text::double precision END "
+        "FROM backtest_results AS r CROSS JOIN LATERAL json_each(r.parameters::json) WITH ORDINALITY AS p(key, value, position) "
+        f"WHERE {_TRAINING_RESULT_FILTER} AND json_typeof(p.value) IN ('number', 'boolean') "
+        "ORDER BY r.id, p.position"
+    ),
+}
+
+# Các cột của một giao dịch khi worker phân tích gửi cho luồng ghi (pair có thể là None)
+TRADE_VALUE_COLUMNS = (
+    'pair', 'trade_id', 'open_date', 'close_date', 'open_rate', 'close_rate',
+    'profit_ratio', 'profit_percent', 'profit_abs', 'trade_duration'
+)
+
+# Các phần nhỏ của file backtest được giải mã đầy đủ; 'trades' được đọc riêng theo từng nhóm
+BACKTEST_SECTIONS = (
+    'strategy', 'timeframe', 'backtest_start_time', 'backtest_end_time',
+    'strategy_parameters', 'strategy_comparison', 'strategy_comparison_per_pair'
+)
+
+# Mẫu tên file kết quả backtest: JSON thuần, JSON nén gzip/zstd và archive zip của Freqtrade
+BACKTEST_FILE_PATTERNS = ('*.json', '*.json.gz', '*.json.zst', '*.zip')
+
+# File phụ Freqtrade ghi kèm kết quả backtest (không chứa kết quả)
+BACKTEST_SIDECAR_SUFFIXES = ('.meta.json', '_config.json')
+
+# Trạng thái của từng file khi import
+IMPORT_STATUS_IMPORTED = 'imported'
+IMPORT_STATUS_SKIPPED = 'skipped'
+IMPORT_STATUS_FAILED = 'failed'
+
+# Callback tiến độ: (số file đã xử lý, tổng số file, đường dẫn file, trạng thái)
+ImportProgressCallback = Callable[[int, int, str, str], None]
+
 # Tạo base model
 Base = declarative_base()
 
@@ -55,7 +160,7 @@ class BacktestResult(Base):
     parameters = Column(JSON, nullable=True)   # Tham số chiến lược đã sử dụng
     
     # Thông tin file backup
-    file_path = Column(String(255), nullable=False)
+    file_path = Column(String(255), nullable=False, index=True)
     import_date = Column(DateTime, nullable=False, default=datetime.now)
     is_used_for_training = Column(Boolean, default=False)
     
@@ -63,70 +168,281 @@ class BacktestResult(Base):
     used_by_model_id = Column(Integer, nullable=True)
 
 
+class BacktestTrade(Base):
+    """Một giao dịch của kết quả backtest (mỗi giao dịch lưu đúng một lần)"""
+    __tablename__ = 'backtest_trades'
+    __table_args__ = (
+        Index('ix_backtest_trades_strategy_pair_open_date', 'strategy_name', 'pair', 'open_date'),
+    )
+    
+    id = Column(Integer, primary_key=True)
+    backtest_result_id = Column(Integer, ForeignKey('backtest_results.id', ondelete='CASCADE'), nullable=False, index=True)
+    strategy_name = Column(String(100), nullable=False)
+    pair = Column(String(50), nullable=False)
+    trade_id = Column(Integer, nullable=True)
+    
+    # Thời gian (UTC) và giá vào/ra lệnh
+    open_date = Column(DateTime, nullable=True)
+    close_date = Column(DateTime, nullable=True)
+    open_rate = Column(Float, nullable=True)
+    close_rate = Column(Float, nullable=True)
+    
+    # Kết quả giao dịch
+    profit_ratio = Column(Float, nullable=True)
+    profit_percent = Column(Float, nullable=True)
+    profit_abs = Column(Float, nullable=True)
+    trade_duration = Column(Integer, nullable=True)  # Phút
+
+
+class BacktestImportManifest(Base):
+    """Manifest các file backtest đã import, dùng để import tăng dần"""
+    __tablename__ = 'backtest_import_manifest'
+    
+    id = Column(Integer, primary_key=True)
+    file_path = Column(String(255), nullable=False, unique=True)
+    content_hash = Column(String(64), nullable=False, index=True)  # SHA-256 của nội dung file
+    
+    # Dùng để kiểm tra nhanh file không đổi mà không cần đọc nội dung
+    file_size = Column(BigInteger, nullable=False)
+    file_mtime_ns = Column(BigInteger, nullable=False)
+    
+    import_date = Column(DateTime, nullable=False, default=datetime.now)
+
+
+class BacktestImportSkip(Base):
+    """Các file backtest đã phân tích nhưng không import (lỗi, hoặc bị lọc theo chiến lược)"""
+    __tablename__ = 'backtest_import_skips'
+    
+    id = Column(Integer, primary_key=True)
+    file_path = Column(String(255), nullable=False, unique=True)
+    
+    # File chỉ được phân tích lại khi kích thước hoặc thời gian sửa thay đổi
+    file_size = Column(BigInteger, nullable=False)
+    file_mtime_ns = Column(BigInteger, nullable=False)
+    
+    # Chiến lược của file; None nếu file không phân tích được
+    strategy_name = Column(String(100), nullable=True)
+    import_date = Column(DateTime, nullable=False, default=datetime.now)
+
+
+def is_backtest_file(file_path: str) -> bool:
+    """File có phải là file kết quả backtest cần import (theo BACKTEST_FILE_PATTERNS) không"""
+    name = os.path.basename(file_path)
+    if name.startswith('.') or name.endswith(BACKTEST_SIDECAR_SUFFIXES):
+        return False
+    return any(fnmatch.fnmatch(name, pattern) for pattern in BACKTEST_FILE_PATTERNS)
+
+
+def find_backtest_files(directory: str) -> List[str]:
+    """Danh sách (đã sắp xếp) các file kết quả backtest trong thư mục"""
+    return sorted(path for path in glob.glob(os.path.join(directory, '*')) if is_backtest_file(path))
+
+
+def _zip_result_member(archive: zipfile.ZipFile, file_path: str) -> str:
+    """Chọn file JSON kết quả trong archive zip (ưu tiên file cùng tên với archive)"""
+    expected = os.path.splitext(os.path.basename(file_path))[0] + '.json'
+    members = [
+        name for name in archive.namelist()
+        if name.endswith('.json') and is_backtest_file(name)
+    ]
+    for name in members:
+        if os.path.basename(name) == expected:
+            return name
+    if not members:
+        raise ValueError(f"Không tìm thấy kết quả backtest trong archive {file_path}")
+    return members[0]
+
+
+class _HashingReader(io.RawIOBase):
+    """File nhị phân chỉ đọc tuần tự, cập nhật hash với mọi byte được đọc"""
+
+    def __init__(self, raw, digest):
+        self._raw = raw
+        self._digest = digest
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        size = self._raw.readinto(buffer)
+        if size:
+            self._digest.update(memoryview(buffer)[:size])
+        return size
+
+    def drain(self) -> None:
+        """Đọc phần còn lại của file (chưa được giải mã) để hash phủ toàn bộ nội dung"""
+        for block in iter(lambda: self._raw.read(1 << 20), b''):
+            self._digest.update(block)
+
+
+@contextmanager
+def open_backtest_file(file_path: str, digest=None) -> Iterator[TextIO]:
+    """
+    Mở file kết quả backtest ở dạng văn bản
+    
+    File nén (.json.gz, .json.zst) và archive .zip được giải nén dần trong lúc đọc,
+    không giải nén ra đĩa.
+    
+    Args:
+        file_path: Đường dẫn file
+        digest: Đối tượng hashlib (tùy chọn) được cập nhật với nội dung của file trên đĩa. Với
+            file JSON và file nén, hash được tính trong chính lượt đọc này; archive zip cần đọc
+            ngẫu nhiên nên được hash bằng một lượt đọc riêng.
+    """
+    name = file_path.lower()
+    if name.endswith('.zip'):
+        if digest is not None:
+            _update_digest(digest, file_path)
+        with zipfile.ZipFile(file_path) as archive:
+            with archive.open(_zip_result_member(archive, file_path)) as raw:
+                yield io.TextIOWrapper(raw, encoding='utf-8')
+        return
+    
+    with open(file_path, 'rb') as raw:
+        source = _HashingReader(raw, digest) if digest is not None else raw
+        if name.endswith('.gz'):
+            with gzip.GzipFile(fileobj=source, mode='rb') as f:
+                yield io.TextIOWrapper(f, encoding='utf-8')
+        elif name.endswith('.zst'):
+            if zstandard is None:
+                raise ValueError("Cần cài đặt gói zstandard để đọc file .json.zst")
+            with zstandard.ZstdDecompressor().stream_reader(source) as reader:
+                yield io.TextIOWrapper(reader, encoding='utf-8')
+        else:
+            yield io.TextIOWrapper(io.BufferedReader(source) if digest is not None else raw, encoding='utf-8')
+        if digest is not None:
+            source.drain()
+
+
+# Engine (kèm connection pool) đã tạo cho mỗi DATABASE_URL, dùng lại giữa các lần kết nối
+_engines: Dict[str, Any] = {}
+_engines_lock = threading.Lock()
+
+
 def connect_to_database():
     """Kết nối đến database"""
     db_url = os.getenv('DATABASE_URL')
     if not db_url:
         raise ValueError("Không tìm thấy DATABASE_URL trong biến môi trường")
     
-    engine = create_engine(db_url)
-    Base.metadata.create_all(engine)
+    with _engines_lock:
+        engine = _engines.get(db_url)
+        if engine is None:
+            engine = create_engine(db_url)
+            Base.metadata.create_all(engine)
+            _engines[db_url] = engine
     Session = sessionmaker(bind=engine)
     return Session()
 
 
-def parse_backtest_file(file_path: str) -> Dict[str, Any]:
+def _read_backtest_sections(file_path: str, include_trades: bool) -> Dict[str, Any]:
+    """
+    Đọc streaming các phần cần thiết của file backtest
+
+    Chỉ các phần nhỏ (tên chiến lược, thời gian, tham số, strategy_comparison...) được giải mã;
+    mảng 'trades' được bỏ qua mà không giải mã nếu include_trades là False. Việc đọc dừng
+    ngay khi đã có đủ các phần cần thiết.
+    """
+    wanted = set(BACKTEST_SECTIONS)
+    if include_trades:
+        wanted.add('trades')
+    
+    data = {}
+    with open_backtest_file(file_path) as f:
+        reader = JsonStreamReader(f)
+        for key in reader.iter_object():
+            if key in wanted:
+                data[key] = reader.read_value()
+                wanted.discard(key)
+                if not wanted:
+                    break
+            else:
+                reader.skip_value()
+    return data
+
+
+def iter_backtest_trades(file_path: str, chunk_size: int = TRADE_CHUNK_SIZE) -> Iterator[List[Dict[str, Any]]]:
+    """
+    Đọc streaming các giao dịch của một file backtest theo từng nhóm
+    
+    Args:
+        file_path: Đường dẫn tới file kết quả backtest (JSON, .json.gz, .json.zst hoặc .zip)
+        chunk_size: Số giao dịch tối đa trong mỗi nhóm
+        
+    Returns:
+        Iterator trả về các danh sách giao dịch; bộ nhớ chỉ giữ một nhóm tại một thời điểm
+    """
+    with open_backtest_file(file_path) as f:
+        reader = JsonStreamReader(f)
+        for key in reader.iter_object():
+            if key == 'trades':
+                yield from reader.iter_array_chunks(chunk_size)
+                return
+            reader.skip_value()
+
+
+def _backtest_summary(data: Dict[str, Any], file_path: str) -> Optional[Dict[str, Any]]:
+    """Dữ liệu tổng quan của một file backtest từ các phần đã đọc (None nếu không hợp lệ)"""
+    # Kiểm tra dữ liệu hợp lệ
+    if 'strategy' not in data or 'strategy_comparison' not in data:
+        logger.error(f"Định dạng dữ liệu backtest không hợp lệ trong {file_path}")
+        return None
+    
+    # Lấy thông tin chiến lược
+    strategy_info = data['strategy_comparison'][0] if data['strategy_comparison'] else None
+    if not strategy_info:
+        logger.error(f"Không tìm thấy thông tin chiến lược trong {file_path}")
+        return None
+    
+    # Chuẩn bị dữ liệu trả về
+    result = {
+        'strategy_name': data['strategy'],
+        'file_path': file_path,
+        'timeframe': data.get('timeframe', 'unknown'),
+        'start_date': datetime.fromtimestamp(data.get('backtest_start_time', 0)),
+        'end_date': datetime.fromtimestamp(data.get('backtest_end_time', 0)),
+        'parameters': data.get('strategy_parameters', {}),
+        
+        # Metrics từ strategy_comparison
+        'profit_percent': strategy_info.get('profit_total_pct', 0.0),
+        'profit_abs': strategy_info.get('profit_total', 0.0),
+        'trades_count': strategy_info.get('trades', 0),
+        'win_rate': strategy_info.get('win_ratio', 0.0) * 100,  # Chuyển sang phần trăm
+        'risk_reward_ratio': strategy_info.get('risk_reward_ratio', 0.0),
+        'average_duration': strategy_info.get('avg_duration', ''),
+    }
+    
+    # Xử lý dữ liệu các cặp giao dịch
+    pairs_data = data.get('strategy_comparison_per_pair', [])
+    pairs = []
+    for pair_data in pairs_data:
+        pairs.append(pair_data.get('key', 'UNKNOWN'))
+    
+    result['pairs'] = pairs
+    
+    return result
+
+
+def parse_backtest_file(file_path: str, include_trades: bool = True) -> Dict[str, Any]:
     """
     Phân tích file kết quả backtest của Freqtrade
     
+    File được đọc streaming (kể cả file nén và archive zip) nên không cần nạp toàn bộ
+    nội dung vào bộ nhớ.
+    
     Args:
-        file_path: Đường dẫn tới file JSON chứa kết quả backtest
+        file_path: Đường dẫn tới file kết quả backtest (JSON, .json.gz, .json.zst hoặc .zip)
+        include_trades: Đọc cả danh sách giao dịch; nếu False, trades_data là None và
+            giao dịch được đọc sau bằng iter_backtest_trades
         
     Returns:
         Dictionary chứa dữ liệu đã xử lý
     """
     try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        
-        # Kiểm tra dữ liệu hợp lệ
-        if not isinstance(data, dict) or 'strategy' not in data or 'strategy_comparison' not in data:
-            logger.error(f"Định dạng dữ liệu backtest không hợp lệ trong {file_path}")
-            return None
-        
-        # Lấy thông tin chiến lược
-        strategy_info = data['strategy_comparison'][0] if data['strategy_comparison'] else None
-        if not strategy_info:
-            logger.error(f"Không tìm thấy thông tin chiến lược trong {file_path}")
-            return None
-        
-        # Chuẩn bị dữ liệu trả về
-        result = {
-            'strategy_name': data['strategy'],
-            'file_path': file_path,
-            'timeframe': data.get('timeframe', 'unknown'),
-            'start_date': datetime.fromtimestamp(data.get('backtest_start_time', 0)),
-            'end_date': datetime.fromtimestamp(data.get('backtest_end_time', 0)),
-            'parameters': data.get('strategy_parameters', {}),
-            'trades_data': data.get('trades', []),
-            
-            # Metrics từ strategy_comparison
-            'profit_percent': strategy_info.get('profit_total_pct', 0.0),
-            'profit_abs': strategy_info.get('profit_total', 0.0),
-            'trades_count': strategy_info.get('trades', 0),
-            'win_rate': strategy_info.get('win_ratio', 0.0) * 100,  # Chuyển sang phần trăm
-            'risk_reward_ratio': strategy_info.get('risk_reward_ratio', 0.0),
-            'average_duration': strategy_info.get('avg_duration', ''),
-        }
-        
-        # Xử lý dữ liệu các cặp giao dịch
-        pairs_data = data.get('strategy_comparison_per_pair', [])
-        pairs = []
-        for pair_data in pairs_data:
-            pairs.append(pair_data.get('key', 'UNKNOWN'))
-        
-        result['pairs'] = pairs
-        
+        data = _read_backtest_sections(file_path, include_trades)
+        result = _backtest_summary(data, file_path)
+        if result is not None:
+            result['trades_data'] = data.get('trades', []) if include_trades else None
         return result
     
     except Exception as e:
@@ -134,130 +450,603 @@ def parse_backtest_file(file_path: str) -> Dict[str, Any]:
         return None
 
 
-def import_backtest_results(directory: str, filter_strategy: Optional[str] = None):
+def _trade_values(trade: Dict[str, Any]) -> Tuple:
+    """Giá trị của một giao dịch theo TRADE_VALUE_COLUMNS (thời gian đã chuyển sang datetime)"""
+    return (
+        trade.get('pair'),
+        trade.get('trade_id'),
+        _parse_trade_date(trade.get('open_date', trade.get('open_timestamp'))),
+        _parse_trade_date(trade.get('close_date', trade.get('close_timestamp'))),
+        trade.get('open_rate'),
+        trade.get('close_rate'),
+        trade.get('profit_ratio'),
+        trade.get('profit_percent'),
+        trade.get('profit_abs'),
+        trade.get('trade_duration')
+    )
+
+
+def iter_spooled_trades(spool_path: str) -> Iterator[List[Tuple]]:
+    """Đọc lần lượt các nhóm giao dịch (theo TRADE_VALUE_COLUMNS) do parse_backtest_for_import ghi"""
+    with open(spool_path, 'rb') as spool:
+        while True:
+            try:
+                yield pickle.load(spool)
+            except EOFError:
+                return
+
+
+def parse_backtest_for_import(
+    file_path: str,
+    spool_dir: str,
+    filter_strategy: Optional[str] = None,
+    chunk_size: int = TRADE_CHUNK_SIZE
+) -> Optional[Dict[str, Any]]:
     """
-    Import tất cả kết quả backtest từ một thư mục
+    Phân tích một file backtest để import, trong một lượt đọc (chạy trong worker của pool)
+    
+    Trong cùng lượt đọc (và giải nén), worker tính hash SHA-256 của file, giải mã các phần tổng
+    quan và giải mã toàn bộ giao dịch thành các tuple theo TRADE_VALUE_COLUMNS, ghi theo từng
+    nhóm chunk_size vào một file spool trong spool_dir. Luồng ghi chỉ còn đọc file spool và ghi
+    vào database.
     
     Args:
-        directory: Thư mục chứa kết quả backtest
-        filter_strategy: Chỉ import kết quả của chiến lược này (tùy chọn)
+        file_path: Đường dẫn file kết quả backtest
+        spool_dir: Thư mục chứa file spool
+        filter_strategy: Nếu tên chiến lược (đọc trước mảng trades) khác giá trị này thì
+            giao dịch được bỏ qua mà không giải mã
+        chunk_size: Số giao dịch trong mỗi nhóm của file spool
+        
+    Returns:
+        Dữ liệu tổng quan kèm content_hash, trades_spool (đường dẫn, hoặc None nếu giao dịch
+        bị bỏ qua) và spooled_trades; None nếu file không hợp lệ
     """
-    # Tìm tất cả file json trong thư mục
-    files = glob.glob(os.path.join(directory, '*.json'))
-    if not files:
-        logger.warning(f"Không tìm thấy file backtest nào trong {directory}")
+    digest = hashlib.sha256()
+    fd, spool_path = tempfile.mkstemp(prefix='trades-', suffix='.pickle', dir=spool_dir)
+    try:
+        data, spooled, skipped = {}, 0, False
+        with os.fdopen(fd, 'wb') as spool, open_backtest_file(file_path, digest) as f:
+            reader = JsonStreamReader(f)
+            for key in reader.iter_object():
+                if key == 'trades':
+                    if filter_strategy and data.get('strategy', filter_strategy) != filter_strategy:
+                        skipped = True
+                        reader.skip_value()
+                        continue
+                    for chunk in reader.iter_array_chunks(chunk_size):
+                        pickle.dump([_trade_values(trade) for trade in chunk], spool, protocol=pickle.HIGHEST_PROTOCOL)
+                        spooled += len(chunk)
+                elif key in BACKTEST_SECTIONS:
+                    data[key] = reader.read_value()
+                else:
+                    reader.skip_value()
+        
+        result = _backtest_summary(data, file_path)
+        if result is None:
+            _remove_file_quietly(spool_path)
+            return None
+        if skipped:
+            _remove_file_quietly(spool_path)
+            spool_path = None
+        result.update({'content_hash': digest.hexdigest(), 'trades_spool': spool_path, 'spooled_trades': spooled})
+        return result
+    except Exception as e:
+        _remove_file_quietly(spool_path)
+        logger.error(f"Lỗi khi phân tích file backtest {file_path}: {str(e)}")
+        return None
+
+
+def _remove_file_quietly(path: Optional[str]) -> None:
+    if not path:
         return
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def _update_digest(digest, file_path: str) -> None:
+    """Cập nhật hash với nội dung file (đọc theo từng khối)"""
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+
+
+def _file_sha256(file_path: str) -> str:
+    """Hash SHA-256 của nội dung file"""
+    digest = hashlib.sha256()
+    _update_digest(digest, file_path)
+    return digest.hexdigest()
+
+
+class _ImportPlan:
+    """Manifest đã nạp vào bộ nhớ và các file cần phân tích của một lần import"""
+
+    def __init__(self, session):
+        self.manifest = {entry.file_path: entry for entry in session.query(BacktestImportManifest)}
+        self.by_hash = {}
+        for entry in self.manifest.values():
+            self.by_hash.setdefault(entry.content_hash, entry)
+        self.legacy_paths = {path for (path,) in session.query(BacktestResult.file_path).distinct()} - self.manifest.keys()
+        self.skips = {entry.file_path: entry for entry in session.query(BacktestImportSkip)}
+        self.fingerprints: Dict[str, Dict[str, Any]] = {}
+
+
+def _plan_incremental_import(
+    session,
+    files: List[str],
+    report: Callable[[str, str], None],
+    filter_strategy: Optional[str] = None
+) -> _ImportPlan:
+    """
+    Chọn các file cần phân tích dựa trên manifest (nạp vào bộ nhớ một lần)
     
-    # Kết nối database
-    session = connect_to_database()
-    
-    # Import từng file
-    total_files = len(files)
-    imported_count = 0
-    skipped_count = 0
+    File có kích thước và thời gian sửa khớp với manifest được bỏ qua mà không mở file. File không
+    đổi đã bị bỏ qua ở lần trước (không phân tích được, hoặc thuộc chiến lược khác filter_strategy)
+    cũng được bỏ qua. Các file còn lại được phân tích trên pool worker, nơi hash nội dung được tính
+    trong cùng lượt đọc; quyết định dựa trên hash được đưa ra sau đó bằng _skip_known_content.
     
+    Returns:
+        _ImportPlan với fingerprint (kích thước, thời gian sửa, replace) của các file cần phân tích
+    """
+    plan = _ImportPlan(session)
     for file_path in files:
-        # Kiểm tra xem file đã được import chưa
-        existing = session.query(BacktestResult).filter_by(file_path=file_path).first()
-        if existing:
+        stat = os.stat(file_path)
+        entry = plan.manifest.get(file_path)
+        if entry is not None and entry.file_size == stat.st_size and entry.file_mtime_ns == stat.st_mtime_ns:
             logger.info(f"Bỏ qua file đã import: {os.path.basename(file_path)}")
-            skipped_count += 1
+            report(file_path, IMPORT_STATUS_SKIPPED)
             continue
         
-        # Phân tích file
-        data = parse_backtest_file(file_path)
-        if not data:
-            skipped_count += 1
+        skip = plan.skips.get(file_path)
+        if (
+            skip is not None and skip.file_size == stat.st_size and skip.file_mtime_ns == stat.st_mtime_ns
+            and (skip.strategy_name is None or (filter_strategy and skip.strategy_name != filter_strategy))
+        ):
+            logger.info(f"Bỏ qua file đã bị bỏ qua ở lần import trước: {os.path.basename(file_path)}")
+            report(file_path, IMPORT_STATUS_SKIPPED)
             continue
         
-        # Lọc theo chiến lược nếu được yêu cầu
-        if filter_strategy and data['strategy_name'] != filter_strategy:
-            logger.info(f"Bỏ qua chiến lược không khớp: {data['strategy_name']} != {filter_strategy}")
-            skipped_count += 1
-            continue
+        plan.fingerprints[file_path] = {
+            'file_size': stat.st_size,
+            'file_mtime_ns': stat.st_mtime_ns,
+            'replace': entry is not None
+        }
+    return plan
+
+
+def _record_skipped_file(
+    session,
+    plan: _ImportPlan,
+    file_path: str,
+    fingerprint: Dict[str, Any],
+    strategy_name: Optional[str]
+) -> None:
+    """Ghi nhận file không được import để các lần quét sau bỏ qua khi file không đổi (người gọi commit)"""
+    skip = plan.skips.get(file_path)
+    if skip is None:
+        skip = plan.skips[file_path] = BacktestImportSkip(file_path=file_path)
+        session.add(skip)
+    skip.file_size = fingerprint['file_size']
+    skip.file_mtime_ns = fingerprint['file_mtime_ns']
+    skip.strategy_name = strategy_name
+    skip.import_date = datetime.now()
+
+
+def _skip_known_content(session, plan: _ImportPlan, file_path: str, fingerprint: Dict[str, Any]) -> bool:
+    """
+    Xử lý file đã phân tích có nội dung (hash) đã biết; trả về True nếu file không cần import
+    
+    - Nội dung (hash) không đổi: chỉ cập nhật manifest.
+    - Nội dung đã import dưới đường dẫn khác: file bị đổi tên/di chuyển thì cập nhật đường dẫn,
+      file sao chép thì chỉ ghi nhận vào manifest.
+    - File có trong manifest nhưng nội dung đã đổi: import lại (thay thế dữ liệu cũ).
+    - File đã import trước khi có manifest: ghi nhận vào manifest, không import lại.
+    
+    Thay đổi manifest được ghi vào session (người gọi commit).
+    """
+    manifest = plan.manifest
+    entry = manifest.get(file_path)
+    content_hash = fingerprint['content_hash']
+    if entry is not None and entry.content_hash == content_hash:
+        # Chỉ thời gian sửa thay đổi
+        entry.file_size = fingerprint['file_size']
+        entry.file_mtime_ns = fingerprint['file_mtime_ns']
+        logger.info(f"Bỏ qua file không đổi nội dung: {os.path.basename(file_path)}")
+        return True
+    
+    same_content = plan.by_hash.get(content_hash)
+    if entry is not None or (same_content is None and file_path not in plan.legacy_paths):
+        return False
+    
+    if same_content is not None and not os.path.exists(same_content.file_path):
+        # File đã bị đổi tên hoặc di chuyển: chuyển dữ liệu đã import sang đường dẫn mới
+        logger.info(f"File đã được di chuyển: {same_content.file_path} -> {file_path}")
+        session.query(BacktestResult).filter_by(file_path=same_content.file_path).update(
+            {'file_path': file_path}, synchronize_session=False
+        )
+        del manifest[same_content.file_path]
+        same_content.file_path = file_path
+        same_content.file_size = fingerprint['file_size']
+        same_content.file_mtime_ns = fingerprint['file_mtime_ns']
+        manifest[file_path] = same_content
+    else:
+        manifest[file_path] = BacktestImportManifest(
+            file_path=file_path, content_hash=content_hash,
+            file_size=fingerprint['file_size'], file_mtime_ns=fingerprint['file_mtime_ns']
+        )
+        session.add(manifest[file_path])
+    logger.info(f"Bỏ qua file có nội dung đã import: {os.path.basename(file_path)}")
+    return True
+
+
+def _parse_trade_date(value: Any) -> Optional[datetime]:
+    """Chuyển thời gian của giao dịch (chuỗi ISO hoặc timestamp mili giây) sang datetime UTC không múi giờ"""
+    if value is None or value == '':
+        return None
+    try:
+        if isinstance(value, (int, float)):
+            return datetime.fromtimestamp(value / 1000, tz=timezone.utc).replace(tzinfo=None)
+        parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    except (ValueError, OverflowError, OSError):
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _trade_row(values: Tuple, backtest_result_id: int, strategy_name: str, pair: str) -> Dict[str, Any]:
+    """Giá trị các cột BacktestTrade của một giao dịch (values theo TRADE_VALUE_COLUMNS)"""
+    row = dict(zip(TRADE_VALUE_COLUMNS, values))
+    row.update({'backtest_result_id': backtest_result_id, 'strategy_name': strategy_name, 'pair': pair})
+    return row
+
+
+def _backtest_rows(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Tạo giá trị các cột BacktestResult (mỗi cặp giao dịch một bản ghi) từ dữ liệu đã phân tích"""
+    import_date = datetime.now()
+    return [
+        {
+            'strategy_name': data['strategy_name'],
+            'pair': pair,
+            'start_date': data['start_date'],
+            'end_date': data['end_date'],
+            'timeframe': data['timeframe'],
+            'profit_percent': data['profit_percent'],
+            'profit_abs': data['profit_abs'],
+            'trades_count': data['trades_count'],
+            'win_rate': data['win_rate'],
+            'risk_reward_ratio': data['risk_reward_ratio'],
+            'average_duration': data['average_duration'],
+            # Giao dịch được lưu trong bảng backtest_trades
+            'trades_data': None,
+            'parameters': data['parameters'],
+            'file_path': data['file_path'],
+            'import_date': import_date,
+            'is_used_for_training': False
+        }
+        for pair in data.get('pairs') or ['UNKNOWN']
+    ]
+
+
+def _delete_backtest_file_rows(session, file_paths: List[str]) -> None:
+    """Xóa dữ liệu đã import (kết quả, giao dịch, manifest) của các file (trong transaction hiện tại)"""
+    result_ids = select(BacktestResult.id).where(BacktestResult.file_path.in_(file_paths))
+    session.query(BacktestTrade).filter(BacktestTrade.backtest_result_id.in_(result_ids)).delete(synchronize_session=False)
+    session.query(BacktestResult).filter(BacktestResult.file_path.in_(file_paths)).delete(synchronize_session=False)
+    session.query(BacktestImportManifest).filter(BacktestImportManifest.file_path.in_(file_paths)).delete(synchronize_session=False)
+
+
+def _write_backtest_batch(
+    session,
+    batch: List[Tuple[Dict[str, Any], Optional[Dict[str, Any]]]],
+    row_batch_size: int = DEFAULT_ROW_BATCH_SIZE
+) -> int:
+    """
+    Ghi một lô file backtest vào transaction hiện tại (chưa commit)
+    
+    Bản ghi BacktestResult của cả lô được ghi bằng một câu lệnh INSERT nhiều dòng (trả về id),
+    sau đó giao dịch (đã được worker giải mã vào file spool) được ghi hàng loạt (COPY trên
+    PostgreSQL, INSERT nhiều dòng trên SQLite) theo từng lô row_batch_size dòng. Giao dịch được gắn với bản
+    ghi của cặp tương ứng; giao dịch không thuộc cặp nào trong danh sách được gắn với bản ghi đầu tiên.
+    
+    File có fingerprint 'replace' được xóa dữ liệu cũ trong cùng transaction, nên việc import lại
+    file đã thay đổi là nguyên tử. Manifest được cập nhật cùng transaction.
+    
+    Args:
+        session: SQLAlchemy session
+        batch: Danh sách (dữ liệu của parse_backtest_for_import, fingerprint)
+        row_batch_size: Số dòng của mỗi lô ghi giao dịch
         
-        # Import cho từng cặp giao dịch
-        for pair in data.get('pairs', ['UNKNOWN']):
-            backtest_entry = BacktestResult(
-                strategy_name=data['strategy_name'],
-                pair=pair,
-                start_date=data['start_date'],
-                end_date=data['end_date'],
-                timeframe=data['timeframe'],
-                profit_percent=data['profit_percent'],
-                profit_abs=data['profit_abs'],
-                trades_count=data['trades_count'],
-                win_rate=data['win_rate'],
-                risk_reward_ratio=data['risk_reward_ratio'],
-                average_duration=data['average_duration'],
-                trades_data=data['trades_data'],
-                parameters=data['parameters'],
-                file_path=file_path,
-                import_date=datetime.now(),
-                is_used_for_training=False
-            )
-            
-            session.add(backtest_entry)
+    Returns:
+        Số giao dịch đã ghi
+    """
+    replaced = [data['file_path'] for data, fingerprint in batch if fingerprint['replace']]
+    if replaced:
+        logger.info(f"Import lại {len(replaced)} file đã thay đổi")
+        _delete_backtest_file_rows(session, replaced)
+    
+    result_rows = [row for data, _ in batch for row in _backtest_rows(data)]
+    result_ids = {
+        (file_path, pair): result_id
+        for result_id, file_path, pair in insert_returning(
+            session, BacktestResult.__table__, result_rows, ('id', 'file_path', 'pair')
+        )
+    }
+    
+    trades = BulkInserter(session, BacktestTrade.__table__, row_batch_size)
+    for data, _ in batch:
+        file_path = data['file_path']
+        pairs = data.get('pairs') or ['UNKNOWN']
+        default_id = result_ids[(file_path, pairs[0])]
         
-        # Lưu vào database
+        for chunk in iter_spooled_trades(data['trades_spool']):
+            for values in chunk:
+                pair = values[0] or pairs[0]
+                trades.add(_trade_row(values, result_ids.get((file_path, pair), default_id), data['strategy_name'], pair))
+    trades.flush()
+    
+    import_date = datetime.now()
+    bulk_insert(session, BacktestImportManifest.__table__, [
+        {
+            'file_path': data['file_path'],
+            'content_hash': fingerprint['content_hash'],
+            'file_size': fingerprint['file_size'],
+            'file_mtime_ns': fingerprint['file_mtime_ns'],
+            'import_date': import_date
+        }
+        for data, fingerprint in batch
+    ])
+    return trades.written
+
+
+def _iter_parsed_files(
+    files: List[str],
+    workers: int,
+    spool_dir: str,
+    filter_strategy: Optional[str] = None
+) -> Iterator[Tuple[str, Optional[Dict[str, Any]]]]:
+    """
+    Phân tích các file backtest (xem parse_backtest_for_import), song song trên một pool tiến
+    trình nếu workers > 1
+
+    Kết quả được trả về theo đúng thứ tự của files. Số file đang phân tích cùng lúc được giới hạn
+    để file spool chưa ghi không chiếm quá nhiều đĩa khi việc ghi database chậm hơn việc phân tích.
+    """
+    parse = partial(parse_backtest_for_import, spool_dir=spool_dir, filter_strategy=filter_strategy)
+    if workers <= 1:
+        for file_path in files:
+            yield file_path, parse(file_path)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        remaining = iter(files)
+        for file_path in itertools.islice(remaining, workers * 2):
+            in_flight.append((file_path, executor.submit(parse, file_path)))
+
+        while in_flight:
+            file_path, future = in_flight.popleft()
+            for next_path in itertools.islice(remaining, 1):
+                in_flight.append((next_path, executor.submit(parse, next_path)))
+            try:
+                yield file_path, future.result()
+            except Exception as e:
+                logger.error(f"Lỗi khi phân tích file backtest {file_path}: {str(e)}")
+                yield file_path, None
+
+
+def _write_backtest_results(
+    session,
+    plan: _ImportPlan,
+    items: queue.Queue,
+    report: Callable[[str, str], None],
+    batch_size: int,
+    row_batch_size: int
+):
+    """
+    Luồng ghi duy nhất: gom batch_size file vào một transaction
+    
+    Lô chỉ giữ phần tổng quan của các file; giao dịch được đọc từ file spool khi lô được ghi nên
+    bộ nhớ không phụ thuộc vào kích thước file. File có nội dung đã import (theo hash do worker
+    tính) chỉ cập nhật manifest. Nếu một lô thất bại, các file trong lô được ghi lại từng file
+    một để chỉ file lỗi bị bỏ qua.
+    """
+    batch = []
+    
+    def write_batch():
+        if not batch:
+            return
+        try:
+            _write_batch_with_retry()
+        finally:
+            for data, _ in batch:
+                _remove_file_quietly(data.get('trades_spool'))
+            batch.clear()
+    
+    def _write_batch_with_retry():
         try:
+            _write_backtest_batch(session, batch, row_batch_size)
             session.commit()
-            logger.info(f"Đã import backtest: {os.path.basename(file_path)}")
-            imported_count += 1
         except Exception as e:
             session.rollback()
-            logger.error(f"Lỗi khi import backtest {file_path}: {str(e)}")
-            skipped_count += 1
+            if len(batch) == 1:
+                logger.error(f"Lỗi khi import backtest {batch[0][0]['file_path']}: {str(e)}")
+                report(batch[0][0]['file_path'], IMPORT_STATUS_FAILED)
+            else:
+                logger.warning(f"Lỗi khi ghi lô {len(batch)} file, thử ghi từng file: {str(e)}")
+                for item in batch:
+                    file_path = item[0]['file_path']
+                    try:
+                        _write_backtest_batch(session, [item], row_batch_size)
+                        session.commit()
+                    except Exception as file_error:
+                        session.rollback()
+                        logger.error(f"Lỗi khi import backtest {file_path}: {str(file_error)}")
+                        report(file_path, IMPORT_STATUS_FAILED)
+                    else:
+                        report(file_path, IMPORT_STATUS_IMPORTED)
+        else:
+            for data, _ in batch:
+                report(data['file_path'], IMPORT_STATUS_IMPORTED)
     
-    session.close()
-    logger.info(f"Hoàn tất: Đã import {imported_count}/{total_files} files, bỏ qua {skipped_count} files")
+    while True:
+        item = items.get()
+        if item is None:
+            break
+        file_path, data, status, fingerprint = item
+        if status is not None:
+            if data is not None:
+                _remove_file_quietly(data.get('trades_spool'))
+            try:
+                _record_skipped_file(session, plan, file_path, fingerprint, data['strategy_name'] if data else None)
+                session.commit()
+            except Exception as e:
+                session.rollback()
+                plan.skips.pop(file_path, None)
+                logger.error(f"Lỗi khi ghi nhận file bỏ qua {file_path}: {str(e)}")
+            report(file_path, status)
+            continue
+        
+        # File đã từng bị bỏ qua nay được xét lại: xóa bản ghi cùng transaction với lần ghi kế tiếp
+        skip = plan.skips.pop(file_path, None)
+        if skip is not None:
+            session.delete(skip)
+        
+        fingerprint = {**fingerprint, 'content_hash': data['content_hash']}
+        if _skip_known_content(session, plan, file_path, fingerprint):
+            _remove_file_quietly(data.get('trades_spool'))
+            session.commit()
+            report(file_path, IMPORT_STATUS_SKIPPED)
+            continue
+        
+        batch.append((data, fingerprint))
+        if len(batch) >= batch_size:
+            write_batch()
+    write_batch()
 
 
-def prepare_training_data(strategy_name: str, pair: str, min_trades: int = 20) -> Optional[pd.DataFrame]:
+def import_backtest_results(
+    directory: str,
+    filter_strategy: Optional[str] = None,
+    workers: int = 1,
+    progress: Optional[ImportProgressCallback] = None,
+    batch_size: int = IMPORT_BATCH_SIZE,
+    row_batch_size: int = DEFAULT_ROW_BATCH_SIZE,
+    files: Optional[List[str]] = None
+) -> Dict[str, int]:
     """
-    Chuẩn bị dữ liệu huấn luyện từ kết quả backtest
+    Import tất cả kết quả backtest từ một thư mục
+    
+    Import tăng dần: file không đổi (theo manifest kích thước, thời gian sửa và hash nội dung)
+    được bỏ qua, file đã thay đổi được import lại. Các file cần import được phân tích trên một
+    pool gồm workers tiến trình, còn việc ghi database do một luồng ghi duy nhất đảm nhận,
+    gom batch_size file vào mỗi transaction và ghi giao dịch hàng loạt theo lô row_batch_size dòng.
     
     Args:
-        strategy_name: Tên chiến lược
-        pair: Cặp giao dịch
-        min_trades: Số lượng giao dịch tối thiểu để đưa vào huấn luyện
+        directory: Thư mục chứa kết quả backtest
+        filter_strategy: Chỉ import kết quả của chiến lược này (tùy chọn)
+        workers: Số tiến trình phân tích file song song (1 = phân tích tuần tự)
+        progress: Hàm báo tiến độ sau mỗi file (số file đã xử lý, tổng số file, đường dẫn, trạng thái)
+        batch_size: Số file tối đa được ghi trong một transaction
+        row_batch_size: Số dòng giao dịch của mỗi lệnh ghi hàng loạt (COPY hoặc INSERT nhiều dòng)
+        files: Chỉ xét các file này (mặc định: mọi file kết quả backtest trong thư mục)
         
     Returns:
-        DataFrame chứa dữ liệu đã chuẩn bị hoặc None nếu không đủ dữ liệu
+        Dictionary gồm tổng số file và số file đã import, bỏ qua, lỗi
     """
-    # Kết nối database
+    summary = {
+        'total_files': 0,
+        IMPORT_STATUS_IMPORTED: 0,
+        IMPORT_STATUS_SKIPPED: 0,
+        IMPORT_STATUS_FAILED: 0
+    }
+    
+    # Tìm tất cả file kết quả backtest trong thư mục
+    if files is None:
+        files = find_backtest_files(directory)
+    else:
+        files = sorted(files)
+    if not files:
+        logger.warning(f"Không tìm thấy file backtest nào trong {directory}")
+        return summary
+    
+    total_files = len(files)
+    summary['total_files'] = total_files
+    processed = 0
+    
+    def report(file_path: str, status: str):
+        nonlocal processed
+        processed += 1
+        summary[status] += 1
+        if status == IMPORT_STATUS_IMPORTED:
+            logger.info(f"Đã import backtest ({processed}/{total_files}): {os.path.basename(file_path)}")
+        if progress is not None:
+            progress(processed, total_files, file_path, status)
+    
+    # Kết nối database và chọn các file mới hoặc đã thay đổi theo manifest
     session = connect_to_database()
+    try:
+        plan = _plan_incremental_import(session, files, report, filter_strategy)
+    except Exception:
+        session.close()
+        raise
+    pending = list(plan.fingerprints)
+    
+    # Luồng ghi chạy song song với việc phân tích; hàng đợi có giới hạn để không giữ quá nhiều file
+    workers = max(1, int(workers))
+    items = queue.Queue(maxsize=max(batch_size, workers * 2))
+    writer = threading.Thread(
+        target=_write_backtest_results,
+        args=(session, plan, items, report, max(1, int(batch_size)), max(1, int(row_batch_size))),
+        name='backtest-import-writer'
+    )
+    writer.start()
+    
+    # Giao dịch đã giải mã được worker ghi vào file spool trong thư mục tạm này
+    spool_dir = tempfile.mkdtemp(prefix='backtest-import-')
+    try:
+        for file_path, data in _iter_parsed_files(pending, workers, spool_dir, filter_strategy):
+            if not data:
+                items.put((file_path, None, IMPORT_STATUS_FAILED, plan.fingerprints[file_path]))
+            elif filter_strategy and data['strategy_name'] != filter_strategy:
+                # Lọc theo chiến lược nếu được yêu cầu
+                logger.info(f"Bỏ qua chiến lược không khớp: {data['strategy_name']} != {filter_strategy}")
+                items.put((file_path, data, IMPORT_STATUS_SKIPPED, plan.fingerprints[file_path]))
+            else:
+                items.put((file_path, data, None, plan.fingerprints[file_path]))
+    finally:
+        items.put(None)
+        writer.join()
+        session.close()
+        shutil.rmtree(spool_dir, ignore_errors=True)
     
-    # Lấy tất cả kết quả backtest cho chiến lược và cặp giao dịch
+    logger.info(
+        f"Hoàn tất: Đã import {summary[IMPORT_STATUS_IMPORTED]}/{total_files} files, "
+        f"bỏ qua {summary[IMPORT_STATUS_SKIPPED]} files, lỗi {summary[IMPORT_STATUS_FAILED]} files"
+    )
+    return summary
+
+
+def _legacy_trade_records(session, strategy_name: str, pair: str) -> List[Dict[str, Any]]:
+    """Đọc giao dịch từ cột trades_data của các kết quả import trước khi có bảng backtest_trades"""
     results = session.query(BacktestResult).filter_by(
         strategy_name=strategy_name,
         pair=pair
     ).all()
     
-    if not results:
-        logger.error(f"Không tìm thấy kết quả backtest cho {strategy_name} với cặp {pair}")
-        session.close()
-        return None
-    
-    # Tổng hợp dữ liệu từ tất cả các kết quả
-    all_trades = []
-    
+    records = []
     for result in results:
         # Kiểm tra xem có dữ liệu giao dịch không
         if not result.trades_data:
             continue
         
-        # Thêm tham số chiến lược vào mỗi giao dịch
-        parameters = result.parameters or {}
-        trades = result.trades_data
-        
-        for trade in trades:
+        for trade in result.trades_data:
             # Chỉ lấy các giao dịch của cặp đang xét
             if trade.get('pair') != pair:
                 continue
-                
-            # Kết hợp thông tin giao dịch với tham số
-            trade_data = {
+            records.append({
+                'backtest_result_id': result.id,
                 'trade_id': trade.get('trade_id'),
                 'pair': trade.get('pair'),
                 'open_time': trade.get('open_date'),
@@ -267,39 +1056,198 @@ def prepare_training_data(strategy_name: str, pair: str, min_trades: int = 20) -
                 'profit_percent': trade.get('profit_percent'),
                 'profit_abs': trade.get('profit_abs'),
                 'trade_duration': trade.get('trade_duration'),
-                'is_profitable': trade.get('profit_percent', 0) > 0,
-            }
-            
-            # Thêm các thông số chiến lược
-            for param_name, param_value in parameters.items():
-                # Chỉ lấy các tham số số học để huấn luyện
-                if isinstance(param_value, (int, float)):
-                    trade_data[f'param_{param_name}'] = param_value
-            
-            all_trades.append(trade_data)
+                'is_profitable': (trade.get('profit_percent') or 0) > 0,
+                'parameters': result.parameters or {}
+            })
+    return records
+
+
+def training_data_version(session, strategy_name: str) -> str:
+    """
+    Phiên bản dữ liệu huấn luyện của một chiến lược, dùng để làm mất hiệu lực cache
     
-    session.close()
+    Tính từ id các kết quả backtest của chiến lược và hash nội dung file trong manifest import,
+    nên thay đổi khi có file được import, import lại hoặc bị xóa (nhưng không đổi khi file
+    chỉ được di chuyển).
     
-    # Kiểm tra đủ dữ liệu
-    if len(all_trades) < min_trades:
-        logger.warning(f"Không đủ giao dịch để huấn luyện ({len(all_trades)}/{min_trades})")
+    Returns:
+        Chuỗi hex SHA-256
+    """
+    rows = session.query(BacktestResult.id, BacktestImportManifest.content_hash).outerjoin(
+        BacktestImportManifest, BacktestImportManifest.file_path == BacktestResult.file_path
+    ).filter(
+        BacktestResult.strategy_name == strategy_name
+    ).order_by(BacktestResult.id)
+    
+    digest = hashlib.sha256()
+    for result_id, content_hash in rows:
+        digest.update(f"{result_id}:{content_hash or ''};".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def _numeric_parameters(session, strategy_name: str, pair: str) -> Dict[int, Dict[str, float]]:
+    """
+    Tham số chiến lược dạng số của các kết quả backtest có giao dịch của (chiến lược, cặp giao dịch)
+    
+    Trên SQLite và PostgreSQL việc lọc tham số số học được thực hiện bằng hàm JSON trong SQL,
+    nên chỉ các cặp (id kết quả, tên tham số, giá trị) cần thiết được trả về.
+    
+    Returns:
+        Dictionary id kết quả -> {tên tham số: giá trị}, giữ thứ tự tham số trong file backtest
+    """
+    params = {'strategy_name': strategy_name, 'pair': pair}
+    statement = _NUMERIC_PARAMETERS_SQL.get(session.get_bind().dialect.name)
+    parameters_by_result: Dict[int, Dict[str, float]] = {}
+    
+    if statement is not None:
+        for result_id, name, value in session.execute(text(statement), params):
+            parameters_by_result.setdefault(result_id, {})[name] = float(value)
+        return parameters_by_result
+    
+    # Database khác: lọc tham số số học trong Python
+    result_ids = select(BacktestTrade.backtest_result_id).where(
+        BacktestTrade.strategy_name == strategy_name,
+        BacktestTrade.pair == pair
+    ).distinct()
+    for result_id, parameters in session.execute(
+        select(BacktestResult.id, BacktestResult.parameters).where(BacktestResult.id.in_(result_ids))
+    ):
+        parameters_by_result[result_id] = {
+            name: float(value) for name, value in (parameters or {}).items() if isinstance(value, (int, float))
+        }
+    return parameters_by_result
+
+
+def _legacy_training_frame(records: List[Dict[str, Any]]) -> pd.DataFrame:
+    """Dựng DataFrame từ các giao dịch đọc bằng _legacy_trade_records"""
+    for record in records:
+        parameters = record.pop('parameters')
+        
+        # Thêm các thông số chiến lược
+        for param_name, param_value in parameters.items():
+            # Chỉ lấy các tham số số học để huấn luyện
+            if isinstance(param_value, (int, float)):
+                record[f'param_{param_name}'] = param_value
+    
+    return pd.DataFrame(records)
+
+
+def _load_training_frame(session, strategy_name: str, pair: str) -> Optional[pd.DataFrame]:
+    """
+    Đọc giao dịch và tham số chiến lược của (chiến lược, cặp giao dịch) từ database
+    
+    Giao dịch được đọc theo từng nhóm TRAINING_FETCH_SIZE dòng (yield_per) và DataFrame được
+    dựng theo cột từ các mảng numpy.
+    """
+    statement = select(
+        *(getattr(BacktestTrade, column) for _, column in TRAINING_TRADE_COLUMNS),
+        BacktestTrade.backtest_result_id
+    ).where(
+        BacktestTrade.strategy_name == strategy_name,
+        BacktestTrade.pair == pair
+    ).order_by(BacktestTrade.open_date, BacktestTrade.id).execution_options(yield_per=TRAINING_FETCH_SIZE)
+    
+    values: List[List[Any]] = [[] for _ in range(len(TRAINING_TRADE_COLUMNS) + 1)]
+    for partition in session.execute(statement).partitions():
+        for column_values, partition_values in zip(values, zip(*partition)):
+            column_values.extend(partition_values)
+    
+    if not values[0]:
+        records = _legacy_trade_records(session, strategy_name, pair)
+        return _legacy_training_frame(records) if records else None
+    
+    *trade_values, result_ids = values
+    # Lần backtest của mỗi giao dịch (các features trượt được tính riêng cho từng lần backtest)
+    columns: Dict[str, Any] = {'backtest_result_id': np.array(result_ids, dtype=np.int64)}
+    for (name, _), column_values in zip(TRAINING_TRADE_COLUMNS, trade_values):
+        if name in ('open_time', 'close_time'):
+            columns[name] = pd.to_datetime(column_values)
+        elif name in ('trade_id', 'pair'):
+            columns[name] = column_values
+        else:
+            columns[name] = np.array(column_values, dtype=float)
+    # Giao dịch không có lợi nhuận (kể cả không có giá trị) được coi là lỗ
+    columns['is_profitable'] = np.nan_to_num(columns['profit_percent'], nan=0.0) > 0
+    
+    # Mỗi tham số trở thành một cột param_*, theo thứ tự kết quả backtest xuất hiện đầu tiên
+    result_ids = columns['backtest_result_id']
+    unique_ids, first_index, inverse = np.unique(result_ids, return_index=True, return_inverse=True)
+    parameters_by_result = _numeric_parameters(session, strategy_name, pair)
+    parameter_names: Dict[str, None] = {}
+    for result_id in unique_ids[np.argsort(first_index, kind='stable')]:
+        parameter_names.update(dict.fromkeys(parameters_by_result.get(int(result_id), {})))
+    for param_name in parameter_names:
+        per_result = np.array([
+            parameters_by_result.get(int(result_id), {}).get(param_name, np.nan) for result_id in unique_ids
+        ])
+        columns[f'param_{param_name}'] = per_result[inverse]
+    
+    return pd.DataFrame(columns, copy=False)
+
+
+def prepare_training_data(strategy_name: str, pair: str, min_trades: int = 20, use_cache: bool = True) -> Optional[pd.DataFrame]:
+    """
+    Chuẩn bị dữ liệu huấn luyện từ kết quả backtest
+    
+    Chỉ các giao dịch của chiến lược và cặp giao dịch cần thiết được đọc từ bảng backtest_trades
+    (theo index strategy_name, pair, open_date); kết quả import cũ chỉ có trades_data vẫn được hỗ trợ.
+    DataFrame được lưu vào cache dạng cột (xem training_cache) và được đọc lại từ cache cho đến khi
+    manifest import thay đổi.
+    
+    Args:
+        strategy_name: Tên chiến lược
+        pair: Cặp giao dịch
+        min_trades: Số lượng giao dịch tối thiểu để đưa vào huấn luyện
+        use_cache: Dùng cache dữ liệu huấn luyện (thư mục theo TRAINING_DATA_CACHE_DIR)
+        
+    Returns:
+        DataFrame chứa dữ liệu đã chuẩn bị hoặc None nếu không đủ dữ liệu
+    """
+    cache = TrainingDataCache.from_env() if use_cache else None
+    
+    # Kết nối database
+    session = connect_to_database()
+    
+    try:
+        df = None
+        if cache is not None:
+            version = training_data_version(session, strategy_name)
+            df = cache.load(strategy_name, pair, version)
+            if df is not None:
+                logger.info(f"Đọc dữ liệu huấn luyện {strategy_name} {pair} từ cache")
+        if df is None:
+            df = _load_training_frame(session, strategy_name, pair)
+            if df is not None and cache is not None:
+                cache.store(strategy_name, pair, version, df)
+    finally:
+        session.close()
+    
+    if df is None:
+        logger.error(f"Không tìm thấy kết quả backtest cho {strategy_name} với cặp {pair}")
         return None
     
-    # Chuyển thành DataFrame
-    df = pd.DataFrame(all_trades)
+    # Kiểm tra đủ dữ liệu
+    if len(df) < min_trades:
+        logger.warning(f"Không đủ giao dịch để huấn luyện ({len(df)}/{min_trades})")
+        return None
     
-    # Xử lý dữ liệu nếu cần
     logger.info(f"Đã chuẩn bị {len(df)} giao dịch cho huấn luyện")
     
     return df
 
 
-def generate_training_features(df: pd.DataFrame) -> Optional[tuple]:
+def generate_training_features(
+    df: pd.DataFrame,
+    trade_features: bool = True,
+    window: int = DEFAULT_ROLLING_WINDOW
+) -> Optional[tuple]:
     """
     Tạo features và target cho huấn luyện AI
     
     Args:
         df: DataFrame chứa dữ liệu giao dịch từ backtest
+        trade_features: Thêm các features theo ngữ cảnh của từng giao dịch (xem trade_features)
+        window: Số giao dịch trước đó dùng cho các features trượt
         
     Returns:
         Tuple (X, y) cho huấn luyện AI hoặc None nếu không tạo được
@@ -316,8 +1264,13 @@ def generate_training_features(df: pd.DataFrame) -> Optional[tuple]:
         X = df[param_columns].copy()
         y = df['is_profitable'].astype(int).copy()
         
+        if trade_features:
+            context = build_trade_features(df, window=window)
+            if context is not None:
+                X = pd.concat([X, context], axis=1)
+        
         # Thông tin về feature engineering
-        logger.info(f"Đã tạo {len(X.columns)} features từ các tham số chiến lược:")
+        logger.info(f"Đã tạo {len(X.columns)} features từ tham số chiến lược và ngữ cảnh giao dịch:")
         for col in X.columns:
             logger.info(f"  - {col}")
             
@@ -354,6 +1307,55 @@ def parse_args():
         type=str,
         help="Chỉ import cho chiến lược cụ thể"
     )
+    import_parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Số tiến trình phân tích file song song"
+    )
+    import_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=IMPORT_BATCH_SIZE,
+        help="Số file được ghi trong một transaction"
+    )
+    import_parser.add_argument(
+        "--row-batch-size",
+        type=int,
+        default=DEFAULT_ROW_BATCH_SIZE,
+        help="Số dòng giao dịch của mỗi lệnh ghi hàng loạt"
+    )
+    
+    # Lệnh watch
+    watch_parser = subparsers.add_parser("watch", help="Theo dõi thư mục và import kết quả backtest mới")
+    watch_parser.add_argument(
+        "--strategy",
+        type=str,
+        help="Chỉ import cho chiến lược cụ thể"
+    )
+    watch_parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Số tiến trình phân tích file song song"
+    )
+    watch_parser.add_argument(
+        "--debounce",
+        type=float,
+        default=2.0,
+        help="Số giây file phải không thay đổi trước khi được import"
+    )
+    watch_parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=1.0,
+        help="Chu kỳ kiểm tra thư mục (giây)"
+    )
+    watch_parser.add_argument(
+        "--polling",
+        action="store_true",
+        help="Luôn quét định kỳ thay vì dùng inotify"
+    )
     
     # Lệnh prepare
     prepare_parser = subparsers.add_parser("prepare", help="Chuẩn bị dữ liệu huấn luyện")
@@ -380,6 +1382,11 @@ def parse_args():
         type=str,
         help="File CSV để lưu dữ liệu đã chuẩn bị"
     )
+    prepare_parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Đọc lại từ database, không dùng cache dữ liệu huấn luyện"
+    )
     
     return parser.parse_args()
 
@@ -389,10 +1396,27 @@ def main():
     args = parse_args()
     
     if args.command == "import":
-        import_backtest_results(args.dir, args.strategy)
+        import_backtest_results(
+            args.dir, args.strategy, workers=args.workers,
+            batch_size=args.batch_size, row_batch_size=args.row_batch_size
+        )
+        
+    elif args.command == "watch":
+        try:
+            from backtest_watcher import watch_backtest_directory
+        except ImportError:
+            from freqtrade_integration.backtest_watcher import watch_backtest_directory
+        
+        try:
+            watch_backtest_directory(
+                args.dir, args.strategy, workers=args.workers, debounce=args.debounce,
+                poll_interval=args.poll_interval, use_inotify=not args.polling
+            )
+        except KeyboardInterrupt:
+            logger.info("Đã dừng theo dõi thư mục backtest")
         
     elif args.command == "prepare":
-        df = prepare_training_data(args.strategy, args.pair, args.min_trades)
+        df = prepare_training_data(args.strategy, args.pair, args.min_trades, use_cache=not args.no_cache)
         
         if df is not None and args.output:
             # Lưu DataFrame ra file CSV nếu có đường dẫn đầu ra
@@ -406,7 +1430,7 @@ def main():
                 logger.info(f"Đã chuẩn bị thành công dữ liệu huấn luyện: {X.shape[0]} mẫu, {X.shape[1]} features")
     
     else:
-        logger.error("Hãy chọn lệnh: import hoặc prepare")
+        logger.error("Hãy chọn lệnh: import, watch hoặc prepare")
 
 
 if __name__ == "__main__":
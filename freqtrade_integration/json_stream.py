@@ -0,0 +1,155 @@
+"""
+Đọc tăng dần (streaming) các file JSON lớn.
+
+File được đọc theo từng khối; mỗi giá trị được giải mã bằng bộ giải mã C của module json
+(JSONDecoder.raw_decode) ngay khi đã nằm trọn trong bộ đệm. Nhờ vậy có thể duyệt các khóa
+của object gốc, giải mã từng phần tử của một mảng lớn hoặc bỏ qua cả một giá trị mà không
+cần nạp toàn bộ file vào bộ nhớ.
+"""
+import json
+import re
+from typing import Any, Iterator, List, TextIO
+
+# Kích thước mỗi lần đọc file (ký tự)
+DEFAULT_READ_SIZE = 1 << 20
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+# Ký tự có thể đứng ngay sau một giá trị hoàn chỉnh
+_VALUE_TERMINATORS = frozenset(' \t\n\r,:]}')
+
+# Dãy ký tự không chứa dấu ngoặc ngoài chuỗi (chuỗi phải đóng trong bộ đệm)
+_SKIP_RUN = re.compile(r'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*')
+
+
+class JsonStreamReader:
+    """Bộ đọc JSON tăng dần trên một file văn bản"""
+
+    def __init__(self, fp: TextIO, read_size: int = DEFAULT_READ_SIZE):
+        """
+        Args:
+            fp: File đã mở ở chế độ văn bản
+            read_size: Số ký tự đọc mỗi lần
+        """
+        self._fp = fp
+        self._read_size = int(read_size)
+        self._buffer = ''
+        self._pos = 0
+        self._eof = False
+        self._decoder = json.JSONDecoder()
+
+    def _fill(self, min_size: int = 0) -> bool:
+        """Đọc thêm dữ liệu vào bộ đệm; trả về False nếu đã hết file"""
+        if self._eof:
+            return False
+        chunk = self._fp.read(max(self._read_size, min_size))
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Ký tự khác khoảng trắng kế tiếp (không tiêu thụ), chuỗi rỗng nếu hết file"""
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ''
+
+    def _expect(self, char: str) -> None:
+        found = self._peek()
+        if found != char:
+            raise ValueError(f"JSON không hợp lệ: cần '{char}', gặp '{found or 'EOF'}'")
+        self._pos += 1
+
+    def read_value(self) -> Any:
+        """Giải mã giá trị JSON kế tiếp"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+                # Số bị cắt ở ranh giới khối (ví dụ '0.' hoặc '2.5e') vẫn giải mã được phần đầu,
+                # nên chỉ nhận giá trị khi ký tự theo sau nó cho thấy giá trị đã kết thúc
+                if self._eof or (end < len(self._buffer) and self._buffer[end] in _VALUE_TERMINATORS):
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            # Đọc ít nhất bằng phần đang chờ để giá trị lớn không bị giải mã lại quá nhiều lần
+            self._fill(len(self._buffer) - self._pos)
+
+    def skip_value(self) -> None:
+        """Bỏ qua giá trị JSON kế tiếp mà không giải mã nó"""
+        if self._peek() not in '[{':
+            self.read_value()
+            return
+
+        depth = 0
+        while True:
+            # Bỏ qua một lượt mọi ký tự không phải dấu ngoặc, kể cả các chuỗi đã đóng
+            self._pos = _SKIP_RUN.match(self._buffer, self._pos).end()
+            # Hết bộ đệm hoặc gặp chuỗi bị cắt ở cuối bộ đệm: đọc thêm rồi quét tiếp
+            if self._pos >= len(self._buffer) or self._buffer[self._pos] == '"':
+                if not self._fill():
+                    raise ValueError("JSON không hợp lệ: kết thúc file giữa chừng")
+                continue
+
+            char = self._buffer[self._pos]
+            self._pos += 1
+            depth += 1 if char in '[{' else -1
+            if depth == 0:
+                return
+
+    def iter_object(self) -> Iterator[str]:
+        """
+        Duyệt các khóa của object kế tiếp
+
+        Sau mỗi khóa được trả về, người gọi phải đọc (read_value, iter_array, ...) hoặc
+        bỏ qua (skip_value) đúng một giá trị trước khi lấy khóa tiếp theo.
+        """
+        self._expect('{')
+        if self._peek() == '}':
+            self._pos += 1
+            return
+        while True:
+            key = self.read_value()
+            if not isinstance(key, str):
+                raise ValueError("JSON không hợp lệ: khóa của object phải là chuỗi")
+            self._expect(':')
+            yield key
+            separator = self._peek()
+            self._pos += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError(f"JSON không hợp lệ: gặp '{separator or 'EOF'}' trong object")
+
+    def iter_array(self) -> Iterator[Any]:
+        """Giải mã lần lượt từng phần tử của mảng kế tiếp"""
+        self._expect('[')
+        if self._peek() == ']':
+            self._pos += 1
+            return
+        while True:
+            yield self.read_value()
+            separator = self._peek()
+            self._pos += 1
+            if separator == ']':
+                return
+            if separator != ',':
+                raise ValueError(f"JSON không hợp lệ: gặp '{separator or 'EOF'}' trong mảng")
+
+    def iter_array_chunks(self, chunk_size: int) -> Iterator[List[Any]]:
+        """Giải mã mảng kế tiếp theo từng nhóm tối đa chunk_size phần tử"""
+        chunk = []
+        for item in self.iter_array():
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
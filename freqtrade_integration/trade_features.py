@@ -0,0 +1,151 @@
+"""
+Tạo features theo ngữ cảnh của từng giao dịch cho việc huấn luyện AI.
+
+Tham số chiến lược không đổi trong một lần backtest, nên nếu chỉ dùng param_* thì mô hình chỉ
+thấy vài dòng khác nhau lặp lại hàng nghìn lần. Module này bổ sung các features của từng giao
+dịch, chỉ dùng thông tin đã biết tại thời điểm vào lệnh:
+
+- trade_entry_hour, trade_entry_weekday: giờ và thứ trong tuần (UTC) lúc vào lệnh
+- trade_recent_win_rate, trade_recent_profit_mean: tỷ lệ thắng và lợi nhuận trung bình của N
+  giao dịch gần nhất cùng lần backtest và cặp giao dịch đã đóng trước thời điểm vào lệnh
+- trade_recent_duration_bucket: nhóm thời gian giữ lệnh trung bình của N giao dịch đó
+  (thời gian giữ của chính giao dịch chỉ biết khi đóng lệnh nên không được dùng)
+- trade_open_rate_vs_recent: giá vào lệnh so với giá vào lệnh trung bình của N giao dịch đó
+
+Cửa sổ là cửa sổ "as-of": chỉ các giao dịch có thời gian đóng lệnh <= thời gian vào lệnh hiện tại
+được tính, nên giao dịch mở trước nhưng còn đang mở (lợi nhuận chưa biết) bị loại. Giao dịch được
+nhóm theo (backtest_result_id, cặp giao dịch) để các lần backtest khác nhau (tham số khác, khoảng
+thời gian chồng nhau) không trộn vào lịch sử của nhau.
+
+Các cửa sổ được tính trên mảng NumPy đã sắp xếp theo (nhóm, thời gian đóng lệnh) bằng tổng tích
+lũy và searchsorted, nên chi phí là O(n log n).
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Số giao dịch trước đó trong cửa sổ trượt
+DEFAULT_ROLLING_WINDOW = 20
+
+# Ngưỡng (phút) của các nhóm thời gian giữ lệnh: <30 phút, <1 giờ, <4 giờ, <12 giờ, <1 ngày, còn lại
+DURATION_BUCKET_EDGES = (30, 60, 240, 720, 1440)
+
+FEATURE_PREFIX = 'trade_'
+
+
+def window_mean(values: np.ndarray, starts: np.ndarray, stops: np.ndarray) -> np.ndarray:
+    """
+    Trung bình của values[starts[i]:stops[i]] cho mỗi i (NaN được bỏ qua)
+
+    Args:
+        values: Giá trị theo thứ tự đã sắp xếp
+        starts: Vị trí bắt đầu (bao gồm) của mỗi cửa sổ
+        stops: Vị trí kết thúc (không bao gồm) của mỗi cửa sổ
+
+    Returns:
+        Mảng trung bình, NaN nếu cửa sổ không có giá trị
+    """
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+
+    window_counts = counts[stops] - counts[starts]
+    window_sums = sums[stops] - sums[starts]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(window_counts > 0, window_sums / np.maximum(window_counts, 1), np.nan)
+
+
+def _time_values(times: pd.Series) -> np.ndarray:
+    """Thời gian dạng int64 (nano giây UTC); giá trị thiếu là int64 lớn nhất"""
+    values = times.to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    return np.where(times.isna().to_numpy(), np.iinfo(np.int64).max, values)
+
+
+def duration_bucket(minutes: np.ndarray) -> np.ndarray:
+    """Nhóm thời gian giữ lệnh (0..len(DURATION_BUCKET_EDGES)), NaN nếu không có giá trị"""
+    minutes = np.asarray(minutes, dtype=float)
+    buckets = np.searchsorted(DURATION_BUCKET_EDGES, minutes, side='right').astype(float)
+    buckets[np.isnan(minutes)] = np.nan
+    return buckets
+
+
+def build_trade_features(df: pd.DataFrame, window: int = DEFAULT_ROLLING_WINDOW) -> Optional[pd.DataFrame]:
+    """
+    Tạo features ngữ cảnh cho từng giao dịch
+
+    Args:
+        df: DataFrame giao dịch (kết quả của prepare_training_data) với các cột backtest_result_id,
+            pair, open_time, close_time, open_rate, profit_percent, trade_duration
+        window: Số giao dịch trước đó trong cửa sổ trượt
+
+    Returns:
+        DataFrame các feature (cùng index với df) hoặc None nếu thiếu thời gian vào lệnh
+    """
+    if 'open_time' not in df.columns or len(df) == 0:
+        return None
+    window = max(1, int(window))
+
+    open_time = pd.to_datetime(df['open_time'], errors='coerce', utc=True)
+    features = {
+        f'{FEATURE_PREFIX}entry_hour': open_time.dt.hour.to_numpy(dtype=float, na_value=np.nan),
+        f'{FEATURE_PREFIX}entry_weekday': open_time.dt.weekday.to_numpy(dtype=float, na_value=np.nan),
+    }
+
+    n = len(df)
+
+    def column(name):
+        if name not in df.columns:
+            return np.full(n, np.nan)
+        return pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+
+    # Thời gian đóng lệnh: close_time, hoặc open_time + trade_duration (phút) nếu thiếu
+    close_time = (pd.to_datetime(df['close_time'], errors='coerce', utc=True) if 'close_time' in df.columns
+                  else pd.Series(pd.NaT, index=df.index, dtype='datetime64[ns, UTC]'))
+    close_time = close_time.fillna(open_time + pd.to_timedelta(column('trade_duration'), unit='min'))
+    open_values = _time_values(open_time)
+    close_values = _time_values(close_time)
+    # Giao dịch đóng ngay lúc mở chỉ được tính từ thời điểm kế tiếp, không tính cho chính nó
+    known_open = ~open_time.isna().to_numpy()
+    close_values = np.where(known_open & (close_values <= open_values), open_values + 1, close_values)
+
+    # Nhóm (lần backtest, cặp giao dịch), sắp xếp theo thời gian đóng lệnh
+    group_columns = [name for name in ('backtest_result_id', 'pair') if name in df.columns]
+    if group_columns:
+        group_codes = df.groupby(group_columns, sort=False, dropna=False).ngroup().to_numpy(dtype=np.int64)
+    else:
+        group_codes = np.zeros(n, dtype=np.int64)
+    order = np.lexsort((np.arange(n), close_values, group_codes))
+    sorted_groups = group_codes[order]
+    sorted_close = close_values[order]
+
+    # Số giao dịch của nhóm đã đóng tại thời điểm vào lệnh của mỗi giao dịch: searchsorted trên khóa
+    # (nhóm, thời gian đóng), đưa về một mảng bằng thứ hạng thời gian trong toàn bộ dữ liệu
+    times = np.unique(np.concatenate((sorted_close, open_values)))
+    stride = len(times) + 1
+    sorted_keys = sorted_groups * stride + np.searchsorted(times, sorted_close)
+    query_keys = group_codes * stride + np.searchsorted(times, open_values)
+    stops = np.searchsorted(sorted_keys, query_keys, side='right')
+    group_starts = np.searchsorted(sorted_keys, group_codes * stride, side='left')
+    # Giao dịch không có thời gian vào lệnh không có lịch sử
+    stops = np.where(known_open, stops, group_starts)
+    starts = np.maximum(stops - window, group_starts)
+
+    def recent_mean(values):
+        return window_mean(values[order], starts, stops)
+
+    profit = column('profit_percent')
+    wins = np.where(np.isnan(profit), np.nan, (profit > 0).astype(float))
+    open_rate = column('open_rate')
+    recent_open_rate = recent_mean(open_rate)
+
+    features[f'{FEATURE_PREFIX}recent_win_rate'] = recent_mean(wins)
+    features[f'{FEATURE_PREFIX}recent_profit_mean'] = recent_mean(profit)
+    features[f'{FEATURE_PREFIX}recent_duration_bucket'] = duration_bucket(recent_mean(column('trade_duration')))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        features[f'{FEATURE_PREFIX}open_rate_vs_recent'] = np.where(
+            recent_open_rate > 0, open_rate / recent_open_rate - 1.0, np.nan
+        )
+
+    return pd.DataFrame(features, index=df.index)
@@ -9,16 +9,30 @@ import logging
 import pickle
 import json
 from datetime import datetime
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, Callable, List, Optional, Tuple
 
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.model_selection import train_test_split
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, roc_auc_score
 import lightgbm as lgb
 
-from import_backtest import prepare_training_data, generate_training_features
+try:
+    from import_backtest import prepare_training_data, generate_training_features
+    from dataset_cache import DatasetCache
+    from hyperparameter_tuning import (
+        BASE_PARAMS, DEFAULT_MAX_TRIALS, DEFAULT_TIME_BUDGET, HyperbandTuner, SQLTrialStore,
+        data_fingerprint, make_study_key, warm_start
+    )
+except ImportError:
+    # Khi được import như một module của package (ví dụ từ backtest_ai.routes)
+    from freqtrade_integration.import_backtest import prepare_training_data, generate_training_features
+    from freqtrade_integration.dataset_cache import DatasetCache
+    from freqtrade_integration.hyperparameter_tuning import (
+        BASE_PARAMS, DEFAULT_MAX_TRIALS, DEFAULT_TIME_BUDGET, HyperbandTuner, SQLTrialStore,
+        data_fingerprint, make_study_key, warm_start
+    )
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
@@ -38,7 +52,14 @@ logger = logging.getLogger(__name__)
 Base = declarative_base()
 
 
-def train_lightgbm_model(X: pd.DataFrame, y: pd.Series, params: Dict[str, Any] = None) -> Tuple[Any, Dict[str, float]]:
+def train_lightgbm_model(
+    X: pd.DataFrame,
+    y: pd.Series,
+    params: Dict[str, Any] = None,
+    dataset_cache: Optional[DatasetCache] = None,
+    num_threads: Optional[int] = None,
+    callbacks: Optional[List[Callable]] = None
+) -> Tuple[Any, Dict[str, float]]:
     """
     Huấn luyện mô hình LightGBM cho dự đoán kết quả giao dịch
     
@@ -46,6 +67,9 @@ def train_lightgbm_model(X: pd.DataFrame, y: pd.Series, params: Dict[str, Any] =
         X: Features (tham số chiến lược)
         y: Target (giao dịch có lợi nhuận hay không)
         params: Tham số LightGBM (tùy chọn)
+        dataset_cache: Cache các lgb.Dataset đã chia bin (mặc định theo LIGHTGBM_DATASET_CACHE_DIR)
+        num_threads: Số thread LightGBM (mặc định: tất cả các core)
+        callbacks: Các callback LightGBM bổ sung (ví dụ báo tiến độ theo từng vòng boosting)
         
     Returns:
         Tuple (model, metrics): Mô hình đã huấn luyện và chỉ số đánh giá
@@ -71,10 +95,19 @@ def train_lightgbm_model(X: pd.DataFrame, y: pd.Series, params: Dict[str, Any] =
             'bagging_freq': 5,
             'verbose': -1
         }
-    
-    # Tạo dataset cho LightGBM
-    train_data = lgb.Dataset(X_train_scaled, label=y_train)
-    test_data = lgb.Dataset(X_test_scaled, label=y_test, reference=train_data)
+    if num_threads:
+        params = {**params, 'num_threads': num_threads}
+    
+    # Tạo dataset cho LightGBM (đọc lại Dataset đã chia bin nếu đã huấn luyện trên cùng dữ liệu)
+    if dataset_cache is None:
+        dataset_cache = DatasetCache.from_env()
+    feature_names = [str(column) for column in X.columns]
+    if dataset_cache is not None:
+        train_data = dataset_cache.dataset(X_train_scaled, y_train, params, feature_name=feature_names)
+        test_data = dataset_cache.dataset(X_test_scaled, y_test, params, reference=train_data, feature_name=feature_names)
+    else:
+        train_data = lgb.Dataset(X_train_scaled, label=y_train, feature_name=feature_names)
+        test_data = lgb.Dataset(X_test_scaled, label=y_test, reference=train_data)
     
     # Huấn luyện mô hình
     logger.info("Bắt đầu huấn luyện mô hình LightGBM")
@@ -83,8 +116,7 @@ def train_lightgbm_model(X: pd.DataFrame, y: pd.Series, params: Dict[str, Any] =
         train_data,
         num_boost_round=500,
         valid_sets=[test_data],
-        early_stopping_rounds=50,
-        verbose_eval=100
+        callbacks=[lgb.early_stopping(50, verbose=False), lgb.log_evaluation(100), *(callbacks or [])]
     )
     
     # Dự đoán và đánh giá
@@ -113,72 +145,122 @@ def train_lightgbm_model(X: pd.DataFrame, y: pd.Series, params: Dict[str, Any] =
     return model, metrics
 
 
-def optimize_hyperparameters(X: pd.DataFrame, y: pd.Series) -> Dict[str, Any]:
+def optimize_hyperparameters(
+    X: pd.DataFrame,
+    y: pd.Series,
+    max_trials: int = DEFAULT_MAX_TRIALS,
+    time_budget: float = DEFAULT_TIME_BUDGET,
+    seed: int = 42,
+    store: Optional[SQLTrialStore] = None,
+    study_name: Optional[str] = None,
+    dataset_cache: Optional[DatasetCache] = None,
+    num_threads: Optional[int] = None,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
     """
     Tối ưu hóa hyperparameters cho mô hình LightGBM
     
+    Dùng Hyperband (xem hyperparameter_tuning): các cấu hình kém bị loại sau ít vòng boosting,
+    việc tìm kiếm dừng khi hết số cấu hình hoặc hết thời gian cho phép. Nếu có store, các cấu
+    hình đã thử được lưu lại; lần tìm kiếm sau của cùng study bắt đầu từ các cấu hình tốt nhất
+    và không huấn luyện lại các điểm đã đánh giá trên cùng dữ liệu.
+    
     Args:
         X: Features
         y: Target
+        max_trials: Số cấu hình tối đa được thử
+        time_budget: Thời gian tối đa (giây, 0 = không giới hạn)
+        seed: Seed cho việc chia dữ liệu và lấy mẫu cấu hình
+        store: Nơi lưu các cấu hình đã thử (tùy chọn)
+        study_name: Tên study, thường là "chiến lược:cặp giao dịch" (cần khi có store)
+        dataset_cache: Cache các lgb.Dataset đã chia bin (mặc định theo LIGHTGBM_DATASET_CACHE_DIR)
+        num_threads: Số thread LightGBM cho mỗi cấu hình (mặc định: tất cả các core)
+        progress: Callback báo tiến độ sau mỗi cấu hình được đánh giá (xem HyperbandTuner)
         
     Returns:
         Parameters tốt nhất tìm được
     """
-    logger.info("Bắt đầu tối ưu hóa hyperparameters")
+    logger.info(f"Bắt đầu tối ưu hóa hyperparameters (tối đa {max_trials} cấu hình, {time_budget} giây)")
     
-    # Chia dữ liệu
+    # Chia dữ liệu (tập test giống train_lightgbm_model, không được dùng khi tìm kiếm)
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
     
-    # Chuẩn hóa dữ liệu
-    scaler = StandardScaler()
-    X_train_scaled = scaler.fit_transform(X_train)
-    
-    # Tham số cần tối ưu
-    param_grid = {
-        'num_leaves': [15, 31, 63],
-        'learning_rate': [0.01, 0.05, 0.1],
-        'n_estimators': [100, 200, 300],
-        'colsample_bytree': [0.6, 0.8, 1.0],
-        'subsample': [0.6, 0.8, 1.0],
-        'reg_alpha': [0, 0.1, 0.5],
-        'reg_lambda': [0, 0.1, 0.5]
-    }
-    
-    # Tạo mô hình LightGBM cho GridSearchCV
-    lgbm = lgb.LGBMClassifier(objective='binary', metric='binary_logloss', verbose=-1)
-    
-    # Tìm kiếm lưới
-    grid_search = GridSearchCV(
-        estimator=lgbm,
-        param_grid=param_grid,
-        cv=3,
-        scoring='roc_auc',
-        n_jobs=-1,
-        verbose=1
+    # Tách tập validation từ tập train để so sánh các cấu hình
+    stratify = y_train if y_train.value_counts().min() >= 2 and y_train.nunique() > 1 else None
+    X_fit, X_valid, y_fit, y_valid = train_test_split(
+        X_train, y_train, test_size=0.25, random_state=seed, stratify=stratify
     )
     
-    grid_search.fit(X_train_scaled, y_train)
-    
-    logger.info(f"Tham số tốt nhất: {grid_search.best_params_}")
-    logger.info(f"AUC tốt nhất: {grid_search.best_score_:.4f}")
-    
-    # Chuyển đổi sang định dạng tham số cho lightgbm.train
-    best_params = {
-        'objective': 'binary',
-        'metric': 'binary_logloss',
-        'boosting_type': 'gbdt',
-        'verbose': -1,
-        'num_leaves': grid_search.best_params_.get('num_leaves', 31),
-        'learning_rate': grid_search.best_params_.get('learning_rate', 0.05),
-        'feature_fraction': grid_search.best_params_.get('colsample_bytree', 0.8),
-        'bagging_fraction': grid_search.best_params_.get('subsample', 0.8),
-        'lambda_l1': grid_search.best_params_.get('reg_alpha', 0),
-        'lambda_l2': grid_search.best_params_.get('reg_lambda', 0),
-    }
+    # Khởi động ấm từ các lần tìm kiếm trước của cùng study
+    study_key, fingerprint, initial_configs, known_scores = None, None, [], {}
+    if store is not None and study_name:
+        study_key = make_study_key(study_name, list(X.columns))
+        fingerprint = data_fingerprint(X, y, seed)
+        try:
+            initial_configs, known_scores = warm_start(store.load(study_key), fingerprint)
+            logger.info(
+                f"Khởi động ấm với {len(initial_configs)} cấu hình, "
+                f"{sum(len(scores) for scores in known_scores.values())} kết quả đã biết trên cùng dữ liệu"
+            )
+        except Exception as e:
+            logger.warning(f"Không thể đọc các lần tối ưu trước: {str(e)}")
+    
+    best = None
+    if y_fit.nunique() > 1 and y_valid.nunique() > 1:
+        tuner = HyperbandTuner(
+            X_fit, y_fit, X_valid, y_valid, max_trials=max_trials, time_budget=time_budget, seed=seed,
+            initial_configs=initial_configs, known_scores=known_scores,
+            dataset_cache=dataset_cache if dataset_cache is not None else DatasetCache.from_env(),
+            num_threads=num_threads, progress=progress
+        )
+        best = tuner.run()
+        if study_key is not None:
+            try:
+                saved = store.save(study_key, study_name, fingerprint, tuner.trials)
+                logger.info(f"Đã lưu {saved} cấu hình vào study {study_name}")
+            except Exception as e:
+                logger.warning(f"Không thể lưu các cấu hình đã thử: {str(e)}")
+    
+    if best is None:
+        logger.warning("Không thể tối ưu hyperparameters (dữ liệu chỉ có một lớp hoặc hết thời gian), dùng tham số mặc định")
+        best_found = {}
+    else:
+        best_found = best['params']
+        logger.info(f"Tham số tốt nhất: {best_found}")
+        logger.info(f"AUC tốt nhất: {best['score']:.4f} sau {best['rounds']} vòng")
+    
+    # Định dạng tham số cho lightgbm.train
+    best_params = dict(BASE_PARAMS)
+    best_params.update({
+        'num_leaves': best_found.get('num_leaves', 31),
+        'learning_rate': best_found.get('learning_rate', 0.05),
+        'feature_fraction': best_found.get('feature_fraction', 0.8),
+        'bagging_fraction': best_found.get('bagging_fraction', 0.8),
+        'bagging_freq': 1,
+        'lambda_l1': best_found.get('lambda_l1', 0),
+        'lambda_l2': best_found.get('lambda_l2', 0),
+    })
     
     return best_params
 
 
+def open_trial_store() -> Optional[SQLTrialStore]:
+    """Mở nơi lưu các cấu hình đã thử trong database DATABASE_URL (None nếu không dùng được)"""
+    db_url = os.getenv('DATABASE_URL')
+    if not db_url:
+        return None
+    try:
+        from models import TuningTrial
+    except ImportError:
+        logger.warning("Không tìm thấy models.TuningTrial, các lần tối ưu sẽ không được lưu lại")
+        return None
+    
+    engine = create_engine(db_url)
+    TuningTrial.__table__.create(engine, checkfirst=True)
+    Session = sessionmaker(bind=engine)
+    return SQLTrialStore(Session(), TuningTrial)
+
+
 def save_model(model, strategy_name: str, pair: str, metrics: Dict[str, float]) -> str:
     """
     Lưu mô hình và thông tin liên quan
@@ -233,7 +315,8 @@ def register_model_in_database(
     strategy_name: str, 
     pair: str, 
     timeframe: str, 
-    metrics: Dict[str, float]
+    metrics: Dict[str, float],
+    session=None
 ) -> bool:
     """
     Đăng ký mô hình trong database
@@ -244,11 +327,16 @@ def register_model_in_database(
         pair: Cặp giao dịch
         timeframe: Khung thời gian
         metrics: Các chỉ số đánh giá mô hình
+        session: Session SQLAlchemy dùng để ghi (mặc định db.session của ứng dụng Flask)
         
     Returns:
         True nếu đăng ký thành công, False nếu không
     """
-    from main import ModelBackup, db
+    if session is None:
+        from main import ModelBackup, db
+        session = db.session
+    else:
+        from models import ModelBackup
     
     try:
         # Tạo entry mới trong database
@@ -263,14 +351,15 @@ def register_model_in_database(
         )
         
         # Thêm vào database
-        db.session.add(new_model)
-        db.session.commit()
+        session.add(new_model)
+        session.commit()
         
         logger.info(f"Đã đăng ký mô hình trong database với ID {new_model.id}")
         return True
         
     except Exception as e:
         logger.error(f"Lỗi khi đăng ký mô hình trong database: {str(e)}")
+        session.rollback()
         return False
 
 
@@ -305,6 +394,20 @@ def parse_args():
         help="Tối ưu hóa hyperparameters"
     )
     
+    parser.add_argument(
+        "--tuning-trials",
+        type=int,
+        default=DEFAULT_MAX_TRIALS,
+        help="Số cấu hình tối đa khi tối ưu hóa hyperparameters"
+    )
+    
+    parser.add_argument(
+        "--tuning-time",
+        type=float,
+        default=DEFAULT_TIME_BUDGET,
+        help="Thời gian tối đa (giây) khi tối ưu hóa hyperparameters"
+    )
+    
     parser.add_argument(
         "--min-trades",
         type=int,
@@ -344,7 +447,10 @@ def main():
     # Tối ưu hóa hyperparameters nếu được yêu cầu
     params = None
     if args.optimize:
-        params = optimize_hyperparameters(X, y)
+        params = optimize_hyperparameters(
+            X, y, max_trials=args.tuning_trials, time_budget=args.tuning_time,
+            store=open_trial_store(), study_name=f"{args.strategy}:{args.pair}"
+        )
     
     # Huấn luyện mô hình
     model, metrics = train_lightgbm_model(X, y, params)
@@ -0,0 +1,137 @@
+"""
+Cache dạng cột trên đĩa cho dữ liệu huấn luyện (kết quả của prepare_training_data).
+
+Mỗi cặp (chiến lược, cặp giao dịch) được lưu thành một thư mục gồm một file .npy cho mỗi cột
+và file meta.json mô tả thứ tự, tên cột. Khi đọc, các cột số và thời gian được memory-map
+(mmap_mode='c': chỉ nạp các trang được dùng, ghi vào DataFrame không ảnh hưởng file), nên lần
+huấn luyện sau không phải truy vấn database và dựng lại DataFrame từ JSON.
+
+Phiên bản của dữ liệu do người gọi cung cấp (xem training_data_version trong import_backtest,
+tính từ manifest import); mỗi phiên bản nằm trong một thư mục con riêng nên khi có kết quả
+backtest mới, cache cũ tự động không còn được dùng và bị xóa ở lần ghi tiếp theo.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Tăng khi thay đổi cách lưu hoặc các cột của dữ liệu huấn luyện
+CACHE_FORMAT_VERSION = 3
+
+META_FILE = 'meta.json'
+
+
+def default_cache_dir() -> Optional[str]:
+    """Thư mục cache từ biến môi trường TRAINING_DATA_CACHE_DIR (chuỗi rỗng = tắt cache)"""
+    cache_dir = os.environ.get('TRAINING_DATA_CACHE_DIR', os.path.join(os.getcwd(), 'cache', 'training_data'))
+    return cache_dir or None
+
+
+def _remove_quietly(path: str) -> None:
+    shutil.rmtree(path, ignore_errors=True)
+
+
+class TrainingDataCache:
+    """Cache các DataFrame huấn luyện theo (chiến lược, cặp giao dịch, phiên bản dữ liệu)"""
+
+    def __init__(self, cache_dir: str):
+        """
+        Args:
+            cache_dir: Thư mục lưu cache
+        """
+        self.cache_dir = cache_dir
+
+    @classmethod
+    def from_env(cls) -> Optional['TrainingDataCache']:
+        """Tạo cache theo TRAINING_DATA_CACHE_DIR, hoặc None nếu cache bị tắt"""
+        cache_dir = default_cache_dir()
+        return cls(cache_dir) if cache_dir else None
+
+    def _entry_dir(self, strategy_name: str, pair: str) -> str:
+        key = hashlib.sha256(f"{strategy_name}\0{pair}".encode('utf-8')).hexdigest()[:32]
+        return os.path.join(self.cache_dir, key)
+
+    def _version_name(self, version: str) -> str:
+        return f"v{CACHE_FORMAT_VERSION}-{version}"
+
+    def load(self, strategy_name: str, pair: str, version: str) -> Optional[pd.DataFrame]:
+        """
+        Đọc DataFrame đã lưu
+
+        Args:
+            strategy_name: Tên chiến lược
+            pair: Cặp giao dịch
+            version: Phiên bản dữ liệu hiện tại
+
+        Returns:
+            DataFrame (các cột được memory-map) hoặc None nếu chưa có trong cache
+        """
+        path = os.path.join(self._entry_dir(strategy_name, pair), self._version_name(version))
+        try:
+            with open(os.path.join(path, META_FILE), 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            columns = {}
+            for column in meta['columns']:
+                file_path = os.path.join(path, column['file'])
+                if column['mmap']:
+                    # view(): ndarray thường dùng chung vùng nhớ đã map, không sao chép
+                    columns[column['name']] = np.load(file_path, mmap_mode='c').view(np.ndarray)
+                else:
+                    columns[column['name']] = np.load(file_path, allow_pickle=True)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Bỏ qua cache dữ liệu huấn luyện hỏng {path}: {str(e)}")
+            _remove_quietly(path)
+            return None
+        return pd.DataFrame(columns, columns=[column['name'] for column in meta['columns']], copy=False)
+
+    def store(self, strategy_name: str, pair: str, version: str, df: pd.DataFrame) -> None:
+        """
+        Lưu DataFrame và xóa các phiên bản cũ của cùng (chiến lược, cặp giao dịch)
+
+        Args:
+            strategy_name: Tên chiến lược
+            pair: Cặp giao dịch
+            version: Phiên bản dữ liệu của df
+            df: Dữ liệu huấn luyện
+        """
+        entry_dir = self._entry_dir(strategy_name, pair)
+        name = self._version_name(version)
+        path = os.path.join(entry_dir, name)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(tmp_path, exist_ok=True)
+            columns: List[Dict[str, Any]] = []
+            for index, column_name in enumerate(df.columns):
+                values = df[column_name].to_numpy()
+                file_name = f"{index}.npy"
+                # Cột object (chuỗi, giá trị hỗn hợp) không memory-map được
+                mmap = values.dtype != object
+                np.save(os.path.join(tmp_path, file_name), values, allow_pickle=not mmap)
+                columns.append({'name': str(column_name), 'file': file_name, 'mmap': mmap})
+            with open(os.path.join(tmp_path, META_FILE), 'w', encoding='utf-8') as f:
+                json.dump({'strategy': strategy_name, 'pair': pair, 'version': version, 'columns': columns}, f)
+            # Đổi tên thư mục tạm để tiến trình khác không đọc phải cache ghi dở
+            os.rename(tmp_path, path)
+        except OSError as e:
+            _remove_quietly(tmp_path)
+            if not os.path.isdir(path):
+                logger.warning(f"Không thể ghi cache dữ liệu huấn luyện {path}: {str(e)}")
+            return
+
+        for entry in os.listdir(entry_dir):
+            if entry != name and not entry.endswith('.tmp'):
+                _remove_quietly(os.path.join(entry_dir, entry))
+
+    def clear(self) -> None:
+        """Xóa toàn bộ cache"""
+        _remove_quietly(self.cache_dir)
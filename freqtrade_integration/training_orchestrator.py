@@ -0,0 +1,415 @@
+#!/usr/bin/env python
+"""
+Huấn luyện song song nhiều mô hình (nhiều cặp giao dịch / nhóm chiến lược) trên một pool tiến trình.
+
+Mỗi job gồm danh sách chiến lược, cặp giao dịch và khung thời gian; job được chạy trọn vẹn
+(chuẩn bị dữ liệu, tối ưu hyperparameters, huấn luyện, lưu mô hình) trong một tiến trình con.
+Số thread LightGBM của mỗi job được chia theo số job chạy đồng thời để tổng số thread không
+vượt quá số core (số job x số thread <= số core). Kết quả và thời gian của từng job được trả về
+tiến trình chính, nơi mô hình được đăng ký vào database (registry) kèm thời gian huấn luyện.
+"""
+import os
+import json
+import argparse
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+try:
+    from import_backtest import prepare_training_data, generate_training_features
+    from hyperparameter_tuning import DEFAULT_MAX_TRIALS, DEFAULT_TIME_BUDGET
+    from train_model import (
+        open_trial_store, optimize_hyperparameters, register_model_in_database, save_model, train_lightgbm_model
+    )
+except ImportError:
+    # Khi được import như một module của package (ví dụ từ backtest_ai.routes)
+    from freqtrade_integration.import_backtest import prepare_training_data, generate_training_features
+    from freqtrade_integration.hyperparameter_tuning import DEFAULT_MAX_TRIALS, DEFAULT_TIME_BUDGET
+    from freqtrade_integration.train_model import (
+        open_trial_store, optimize_hyperparameters, register_model_in_database, save_model, train_lightgbm_model
+    )
+
+logger = logging.getLogger(__name__)
+
+# Tùy chọn mặc định của một job huấn luyện
+DEFAULT_JOB_OPTIONS = {
+    'timeframe': '1h',
+    'min_trades': 100,
+    'optimize': True,
+    'tuning_max_trials': DEFAULT_MAX_TRIALS,
+    'tuning_time_budget': DEFAULT_TIME_BUDGET
+}
+
+# Tên chiến lược dùng cho mô hình huấn luyện từ nhiều chiến lược
+ENSEMBLE_STRATEGY_NAME = "EnsembleStrategy"
+
+
+class TrainingCancelled(Exception):
+    """Job huấn luyện bị hủy (được ném từ callback tiến độ)"""
+
+
+def normalize_job(spec: Dict[str, Any], defaults: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Kiểm tra và điền giá trị mặc định cho một job huấn luyện
+
+    Args:
+        spec: Job dạng {'strategies' (hoặc 'strategy'), 'pair', 'timeframe', ...}
+        defaults: Tùy chọn mặc định cho các khóa không có trong spec
+
+    Returns:
+        Job đã chuẩn hóa
+
+    Raises:
+        ValueError: Nếu job thiếu chiến lược/cặp giao dịch hoặc có tùy chọn không hợp lệ
+    """
+    job = {**DEFAULT_JOB_OPTIONS, **(defaults or {}), **spec}
+    strategies = job.pop('strategy', None)
+    strategies = job.get('strategies') or ([strategies] if strategies else [])
+    if isinstance(strategies, str):
+        strategies = [strategies]
+    if not strategies or not all(isinstance(s, str) and s for s in strategies):
+        raise ValueError("Job phải có ít nhất một chiến lược")
+    if not job.get('pair'):
+        raise ValueError("Job phải có cặp giao dịch")
+
+    job['strategies'] = list(strategies)
+    job['min_trades'] = int(job['min_trades'])
+    job['tuning_max_trials'] = int(job['tuning_max_trials'])
+    job['tuning_time_budget'] = float(job['tuning_time_budget'])
+    if job['min_trades'] < 1 or job['tuning_max_trials'] < 1 or job['tuning_time_budget'] < 0:
+        raise ValueError("min_trades và tuning_max_trials phải >= 1, tuning_time_budget phải >= 0")
+    # Chuỗi "false" từ JSON/form là truthy, nên chỉ chấp nhận giá trị boolean thật
+    if not isinstance(job['optimize'], bool):
+        raise ValueError("optimize phải là true hoặc false")
+    return job
+
+
+def plan_workers(n_jobs: int, max_workers: Optional[int] = None, cpu_count: Optional[int] = None) -> Tuple[int, int]:
+    """
+    Số job chạy đồng thời và số thread LightGBM của mỗi job
+
+    Args:
+        n_jobs: Số job cần chạy
+        max_workers: Số job đồng thời tối đa (mặc định bằng số core)
+        cpu_count: Số core (mặc định os.cpu_count())
+
+    Returns:
+        Tuple (workers, threads) với workers * threads <= số core
+    """
+    cores = max(1, int(cpu_count or os.cpu_count() or 1))
+    workers = max(1, min(int(max_workers or cores), int(n_jobs), cores))
+    return workers, max(1, cores // workers)
+
+
+def load_training_set(strategies: List[str], pair: str, min_trades: int):
+    """
+    Features và target từ kết quả backtest của các chiến lược cho một cặp giao dịch
+
+    Returns:
+        Tuple (X, y), hoặc None nếu không đủ dữ liệu
+    """
+    features, targets = [], []
+    for strategy in strategies:
+        df = prepare_training_data(strategy, pair, min_trades=max(1, min_trades // len(strategies)))
+        if df is None:
+            continue
+        result = generate_training_features(df)
+        if result is not None:
+            X, y = result
+            features.append(X)
+            targets.append(y)
+
+    if not features:
+        return None
+    return pd.concat(features, ignore_index=True), pd.concat(targets, ignore_index=True)
+
+
+def _boosting_progress(progress: Callable[[Dict[str, Any]], None]) -> Callable:
+    """Callback LightGBM báo vòng boosting hiện tại và loss trên tập validation"""
+    def callback(env) -> None:
+        event = {'stage': 'training', 'iteration': env.iteration + 1, 'total': env.end_iteration}
+        if env.evaluation_result_list:
+            _, metric, value, _ = env.evaluation_result_list[0][:4]
+            event.update({'metric': metric, 'valid_loss': float(value)})
+        progress(event)
+    return callback
+
+
+def run_training_job(
+    job: Dict[str, Any],
+    num_threads: Optional[int] = None,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None
+) -> Dict[str, Any]:
+    """
+    Chạy một job huấn luyện (trong tiến trình con của pool hoặc worker của hàng đợi)
+
+    Args:
+        job: Job đã chuẩn hóa bởi normalize_job
+        num_threads: Số thread LightGBM của job
+        progress: Callback nhận sự kiện tiến độ {'stage', ...}: 'preparing', 'tuning' (mỗi cấu hình),
+            'training' (mỗi vòng boosting, kèm valid_loss) và 'saving'
+
+    Returns:
+        Kết quả dạng JSON: success, message, model_path, metrics, feature_names và timing
+        (thời gian chuẩn bị dữ liệu, tối ưu, huấn luyện và tổng, tính bằng giây)
+
+    Raises:
+        TrainingCancelled: Nếu callback tiến độ báo job đã bị hủy
+    """
+    report = progress or (lambda event: None)
+    strategies, pair = job['strategies'], job['pair']
+    strategy_name = strategies[0] if len(strategies) == 1 else ENSEMBLE_STRATEGY_NAME
+    result = {
+        'strategies': strategies, 'pair': pair, 'timeframe': job['timeframe'], 'strategy_name': strategy_name,
+        'success': False, 'num_threads': num_threads, 'pid': os.getpid()
+    }
+    timing = {'prepare_seconds': 0.0, 'tuning_seconds': 0.0, 'training_seconds': 0.0}
+    started = time.perf_counter()
+    try:
+        report({'stage': 'preparing'})
+        training_set = load_training_set(strategies, pair, job['min_trades'])
+        timing['prepare_seconds'] = time.perf_counter() - started
+        if training_set is None:
+            result['message'] = f'Không đủ dữ liệu để huấn luyện cho cặp {pair} với các chiến lược đã chọn'
+            return result
+        X, y = training_set
+
+        params = None
+        if job['optimize']:
+            step = time.perf_counter()
+            store = open_trial_store()
+            try:
+                params = optimize_hyperparameters(
+                    X, y, max_trials=job['tuning_max_trials'], time_budget=job['tuning_time_budget'],
+                    store=store, study_name=f"{'+'.join(sorted(strategies))}:{pair}", num_threads=num_threads,
+                    progress=progress
+                )
+            finally:
+                if store is not None:
+                    store.session.close()
+            timing['tuning_seconds'] = time.perf_counter() - step
+
+        step = time.perf_counter()
+        model, metrics = train_lightgbm_model(
+            X, y, params, num_threads=num_threads, callbacks=[_boosting_progress(progress)] if progress else None
+        )
+        timing['training_seconds'] = time.perf_counter() - step
+
+        report({'stage': 'saving'})
+        result.update({
+            'success': True,
+            'message': f'Đã huấn luyện mô hình cho {pair} ({X.shape[0]} mẫu, {X.shape[1]} features)',
+            'model_path': save_model(model, strategy_name, pair, metrics),
+            'metrics': metrics,
+            'feature_names': model.feature_name()
+        })
+    except TrainingCancelled:
+        raise
+    except Exception as e:
+        logger.error(f"Lỗi khi huấn luyện {pair} ({', '.join(strategies)}): {str(e)}")
+        result['message'] = f'Lỗi khi huấn luyện mô hình: {str(e)}'
+    finally:
+        timing['total_seconds'] = time.perf_counter() - started
+        result['timing'] = timing
+    return result
+
+
+def register_result(result: Dict[str, Any], session=None) -> bool:
+    """Đăng ký mô hình của một job thành công vào database, kèm thời gian huấn luyện trong metrics"""
+    metrics = {**result['metrics'], 'timing': result['timing'], 'num_threads': result['num_threads']}
+    return register_model_in_database(
+        result['model_path'], result['strategy_name'], result['pair'], result['timeframe'], metrics, session=session
+    )
+
+
+class TrainingOrchestrator:
+    """Chạy danh sách job huấn luyện trên một pool tiến trình"""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        cpu_count: Optional[int] = None,
+        worker: Callable[[Dict[str, Any], Optional[int]], Dict[str, Any]] = run_training_job
+    ):
+        """
+        Args:
+            max_workers: Số job chạy đồng thời tối đa (mặc định bằng số core)
+            cpu_count: Số core dùng để chia thread (mặc định os.cpu_count())
+            worker: Hàm chạy một job (phải pickle được), nhận job và số thread
+        """
+        self.max_workers = max_workers
+        self.cpu_count = cpu_count
+        self.worker = worker
+
+    def run(
+        self,
+        jobs: List[Dict[str, Any]],
+        register: Optional[Callable[[Dict[str, Any]], bool]] = None,
+        on_result: Optional[Callable[[int, int, Dict[str, Any]], None]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Chạy các job và trả về kết quả theo đúng thứ tự của jobs
+
+        Args:
+            jobs: Các job đã chuẩn hóa bởi normalize_job
+            register: Hàm đăng ký mô hình của job thành công (gọi trong tiến trình chính),
+                trả về True nếu đăng ký thành công
+            on_result: Callback (số job đã xong, tổng số job, kết quả) sau mỗi job; nếu callback
+                ném exception, các job chưa bắt đầu bị hủy
+
+        Returns:
+            Danh sách kết quả của run_training_job, thêm 'registered' nếu có register
+        """
+        if not jobs:
+            return []
+        workers, threads = plan_workers(len(jobs), self.max_workers, self.cpu_count)
+        logger.info(f"Huấn luyện {len(jobs)} mô hình với {workers} tiến trình x {threads} thread LightGBM")
+
+        # Dùng spawn thay vì fork: OpenMP của LightGBM không an toàn sau fork khi tiến trình chính
+        # đã huấn luyện mô hình (ví dụ web server đã xử lý /api/train_model)
+        context = multiprocessing.get_context('spawn')
+        results: List[Optional[Dict[str, Any]]] = [None] * len(jobs)
+        executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+        try:
+            futures = {executor.submit(self.worker, job, threads): index for index, job in enumerate(jobs)}
+            done = 0
+            for future in as_completed(futures):
+                index = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    job = jobs[index]
+                    logger.error(f"Tiến trình huấn luyện {job['pair']} bị lỗi: {str(e)}")
+                    result = {
+                        'strategies': job['strategies'], 'pair': job['pair'], 'timeframe': job['timeframe'],
+                        'success': False, 'message': f'Lỗi khi huấn luyện mô hình: {str(e)}'
+                    }
+                if register is not None:
+                    result['registered'] = bool(result['success'] and register(result))
+                results[index] = result
+                done += 1
+                logger.info(
+                    f"[{done}/{len(jobs)}] {result['pair']}: {result['message']} "
+                    f"({result.get('timing', {}).get('total_seconds', 0.0):.1f} giây)"
+                )
+                if on_result is not None:
+                    on_result(done, len(jobs), result)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        return [result for result in results if result is not None]
+
+
+def parse_args():
+    """Phân tích tham số dòng lệnh"""
+    parser = argparse.ArgumentParser(description="Huấn luyện song song mô hình AI cho nhiều cặp giao dịch")
+
+    parser.add_argument(
+        "--strategy",
+        type=str,
+        nargs="+",
+        help="Tên chiến lược (nhiều chiến lược được kết hợp thành một mô hình)"
+    )
+
+    parser.add_argument(
+        "--pairs",
+        type=str,
+        nargs="+",
+        help="Các cặp giao dịch, mỗi cặp là một job"
+    )
+
+    parser.add_argument(
+        "--jobs-file",
+        type=str,
+        help="File JSON chứa danh sách job [{\"strategies\": [...], \"pair\": ..., \"timeframe\": ...}]"
+    )
+
+    parser.add_argument(
+        "--timeframe",
+        type=str,
+        default=DEFAULT_JOB_OPTIONS['timeframe'],
+        help="Khung thời gian"
+    )
+
+    parser.add_argument(
+        "--min-trades",
+        type=int,
+        default=DEFAULT_JOB_OPTIONS['min_trades'],
+        help="Số giao dịch tối thiểu để huấn luyện"
+    )
+
+    parser.add_argument(
+        "--no-optimize",
+        action="store_true",
+        help="Bỏ qua tối ưu hyperparameters"
+    )
+
+    parser.add_argument(
+        "--tuning-trials",
+        type=int,
+        default=DEFAULT_MAX_TRIALS,
+        help="Số cấu hình tối đa khi tối ưu hyperparameters"
+    )
+
+    parser.add_argument(
+        "--tuning-time",
+        type=float,
+        default=DEFAULT_TIME_BUDGET,
+        help="Thời gian tối đa (giây) khi tối ưu hyperparameters, 0 = không giới hạn"
+    )
+
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        default=None,
+        help="Số job huấn luyện đồng thời tối đa (mặc định bằng số core)"
+    )
+
+    parser.add_argument(
+        "--register",
+        action="store_true",
+        help="Đăng ký mô hình trong database"
+    )
+
+    return parser.parse_args()
+
+
+def main():
+    """Hàm chính"""
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    args = parse_args()
+
+    specs = []
+    if args.jobs_file:
+        with open(args.jobs_file, 'r') as f:
+            specs.extend(json.load(f))
+    if args.pairs:
+        if not args.strategy:
+            logger.error("Cần --strategy khi dùng --pairs")
+            return
+        specs.extend({'strategies': args.strategy, 'pair': pair} for pair in args.pairs)
+    if not specs:
+        logger.error("Không có job nào (dùng --pairs hoặc --jobs-file)")
+        return
+
+    defaults = {
+        'timeframe': args.timeframe,
+        'min_trades': args.min_trades,
+        'optimize': not args.no_optimize,
+        'tuning_max_trials': args.tuning_trials,
+        'tuning_time_budget': args.tuning_time
+    }
+    jobs = [normalize_job(spec, defaults) for spec in specs]
+    results = TrainingOrchestrator(max_workers=args.max_workers).run(
+        jobs, register=register_result if args.register else None
+    )
+
+    succeeded = sum(1 for result in results if result['success'])
+    logger.info(f"Hoàn thành: {succeeded}/{len(results)} mô hình được huấn luyện thành công")
+
+
+if __name__ == "__main__":
+    main()
@@ -470,4 +470,19 @@ def restore_model():
 
 # Chạy ứng dụng
 if __name__ == '__main__':
+    # Worker cho hàng đợi job huấn luyện (TRAINING_QUEUE_WORKERS=0 để tắt, ví dụ khi chạy worker riêng bằng
+    # `python -m backtest_ai.training_queue`). Chỉ khởi động trong tiến trình phục vụ request của reloader.
+    # Khi chạy bằng gunicorn / `flask run`, khối này không chạy: worker phải được chạy thành tiến trình riêng.
+    training_workers = int(os.environ.get('TRAINING_QUEUE_WORKERS', 1))
+    if BACKTEST_AI_AVAILABLE and training_workers > 0 and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        import subprocess
+        import sys
+        with app.app_context():
+            database_url = db.engine.url.render_as_string(hide_password=False)
+        subprocess.Popen([
+            sys.executable, '-m', 'backtest_ai.training_queue', '--workers', str(training_workers),
+            '--database-url', database_url, '--exit-with-parent'
+        ], cwd=os.path.dirname(os.path.abspath(__file__)))
+        logger.info(f"Đã khởi động {training_workers} worker huấn luyện nền")
+    
     app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
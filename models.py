@@ -34,6 +34,55 @@ class TrainingConfig(db.Model):
     is_default = db.Column(db.Boolean, nullable=True)
     description = db.Column(db.String(255), nullable=True)
 
+# Model for storing hyperparameter tuning trials
+class TuningTrial(db.Model):
+    """Model lưu các cấu hình đã thử khi tối ưu hyperparameters (dùng để khởi động ấm lần tìm kiếm sau)"""
+    id = db.Column(db.Integer, primary_key=True)
+    study_key = db.Column(db.String(64), nullable=False, index=True)
+    study_name = db.Column(db.String(255), nullable=True)
+    data_fingerprint = db.Column(db.String(64), nullable=False, index=True)
+    params = db.Column(db.JSON, nullable=False)
+    rounds = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=True)
+    scores = db.Column(db.JSON, nullable=True)
+    duration = db.Column(db.Float, nullable=True)
+    created_date = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+# Model for storing background training jobs
+class TrainingJob(db.Model):
+    """Model lưu các job huấn luyện chạy nền (hàng đợi bền vững, xem backtest_ai.training_queue)"""
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='queued', index=True)
+    spec = db.Column(db.JSON, nullable=False)
+    stage = db.Column(db.String(20), nullable=True)
+    progress = db.Column(db.Float, nullable=False, default=0.0)
+    details = db.Column(db.JSON, nullable=True)
+    result = db.Column(db.JSON, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)
+    worker_id = db.Column(db.String(100), nullable=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    created_date = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    started_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+# Model for storing log lines of background training jobs
+class TrainingJobLog(db.Model):
+    """Model lưu log của các job huấn luyện chạy nền"""
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.Integer, db.ForeignKey('training_job.id'), nullable=False, index=True)
+    created_date = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    level = db.Column(db.String(10), nullable=False)
+    message = db.Column(db.Text, nullable=False)
+
+# Model for tracking live background training workers
+class TrainingWorker(db.Model):
+    """Model lưu heartbeat của các worker huấn luyện đang chạy (để biết job có được xử lý không)"""
+    worker_id = db.Column(db.String(100), primary_key=True)
+    started_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    heartbeat_at = db.Column(db.DateTime, nullable=False, default=datetime.now, index=True)
+
 # Model for storing trading metrics
 class TradingMetrics(db.Model):
     """Model lưu trữ thông tin hiệu suất giao dịch"""
@@ -0,0 +1,88 @@
+"""
+Unit tests for the backtest result directory watcher.
+"""
+import json
+import os
+import sys
+import threading
+import time
+import zipfile
+
+import pytest
+
+# Add the project directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from freqtrade_integration.backtest_watcher import InotifySource, is_complete_json, watch_backtest_directory
+
+
+def backtest_json(strategy='WatchedStrategy'):
+    return json.dumps({
+        'strategy': strategy,
+        'trades': [{'pair': 'BTC/USDT', 'trade_id': 1, 'profit_ratio': 0.01}],
+        'strategy_comparison': [{'profit_total_pct': 1.0, 'trades': 1, 'win_ratio': 1.0}],
+        'strategy_comparison_per_pair': [{'key': 'BTC/USDT'}]
+    })
+
+
+def inotify_available(directory):
+    try:
+        InotifySource(str(directory)).close()
+    except (OSError, AttributeError):
+        return False
+    return True
+
+
+def test_is_complete_json(tmp_path):
+    """Only files ending with a closing brace count as fully written."""
+    path = tmp_path / 'result.json'
+    path.write_text(backtest_json()[:-5])
+    assert not is_complete_json(str(path))
+
+    path.write_text(backtest_json() + '\n')
+    assert is_complete_json(str(path))
+    assert not is_complete_json(str(tmp_path / 'missing.json'))
+
+    archive = tmp_path / 'result.zip'
+    with zipfile.ZipFile(archive, 'w') as f:
+        f.writestr('result.json', backtest_json())
+    assert is_complete_json(str(archive))
+    archive.write_bytes(archive.read_bytes()[:-30])
+    assert not is_complete_json(str(archive))
+
+
+@pytest.mark.parametrize('use_inotify', [True, False])
+def test_watcher_imports_new_files_once_complete(tmp_path, monkeypatch, use_inotify):
+    """A partially written file is held back and imported once it is complete and stable."""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'backtests.db'}")
+    source = tmp_path / 'results'
+    source.mkdir()
+    if use_inotify and not inotify_available(source):
+        pytest.skip('inotify is not available')
+
+    summaries = []
+    stop = threading.Event()
+    watcher = threading.Thread(target=watch_backtest_directory, args=(str(source),), kwargs={
+        'debounce': 0.2, 'poll_interval': 0.05, 'use_inotify': use_inotify,
+        'stop_event': stop, 'on_import': summaries.append
+    })
+    watcher.start()
+    try:
+        time.sleep(0.2)
+        path = source / 'backtest-result.json'
+        content = backtest_json()
+        path.write_text(content[:20])
+        time.sleep(0.6)
+        imported_while_partial = sum(s['imported'] for s in summaries)
+
+        path.write_text(content)
+        deadline = time.time() + 5
+        while time.time() < deadline and sum(s['imported'] for s in summaries) == 0:
+            time.sleep(0.05)
+    finally:
+        stop.set()
+        watcher.join(timeout=5)
+
+    assert imported_while_partial == 0
+    assert sum(s['imported'] for s in summaries) == 1
+    assert sum(s['failed'] for s in summaries) == 0
@@ -0,0 +1,86 @@
+"""
+Unit tests for the bulk-write layer used by backtest imports.
+"""
+import os
+import sys
+from datetime import datetime
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add the project directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from freqtrade_integration import bulk_write
+from freqtrade_integration.bulk_write import BulkInserter, bulk_insert, copy_text_value, insert_returning
+from freqtrade_integration.import_backtest import Base, BacktestResult, BacktestTrade
+
+
+def make_session():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+
+def result_row(pair):
+    return {
+        'strategy_name': 'Demo', 'pair': pair, 'start_date': datetime(2024, 1, 1), 'end_date': datetime(2024, 1, 2),
+        'timeframe': '5m', 'profit_percent': 1.0, 'profit_abs': 10.0, 'trades_count': 2, 'win_rate': 50.0,
+        'parameters': {'buy_rsi': 30}, 'file_path': 'demo.json', 'import_date': datetime(2024, 1, 3)
+    }
+
+
+def test_copy_text_value_escapes_postgres_text_format():
+    """Values are encoded for COPY ... FROM STDIN in text format."""
+    assert copy_text_value(None) == '\\N'
+    assert copy_text_value(True) == 't'
+    assert copy_text_value(float('nan')) == 'NaN'
+    assert copy_text_value(float('-inf')) == '-Infinity'
+    assert copy_text_value(0.1) == '0.1'
+    assert copy_text_value('a\tb\nc\\d') == 'a\\tb\\nc\\\\d'
+    assert copy_text_value(datetime(2024, 1, 1, 12, 30)) == '2024-01-01T12:30:00'
+    assert copy_text_value({'k': [1, 2]}) == '{"k": [1, 2]}'
+
+
+def test_bulk_insert_splits_statements_on_sqlite(monkeypatch):
+    """Rows are written with multi-row INSERTs that respect the SQLite variable limit."""
+    monkeypatch.setattr(bulk_write, 'SQLITE_MAX_VARIABLES', 30)
+    session = make_session()
+    rows = [{'backtest_result_id': 1, 'strategy_name': 'Demo', 'pair': 'BTC/USDT', 'trade_id': i} for i in range(25)]
+
+    written = bulk_insert(session, BacktestTrade.__table__, rows, batch_size=1000)
+    session.commit()
+
+    assert written == 25
+    assert [t.trade_id for t in session.query(BacktestTrade).order_by(BacktestTrade.trade_id)] == list(range(25))
+    session.close()
+
+
+def test_insert_returning_reports_generated_ids():
+    """Generated primary keys come back with the identifying columns of each row."""
+    session = make_session()
+
+    returned = insert_returning(session, BacktestResult.__table__, [result_row('BTC/USDT'), result_row('ETH/USDT')],
+                                ('id', 'pair'))
+    session.commit()
+
+    ids = {pair: result_id for result_id, pair in returned}
+    assert set(ids) == {'BTC/USDT', 'ETH/USDT'}
+    assert session.get(BacktestResult, ids['ETH/USDT']).parameters == {'buy_rsi': 30}
+    session.close()
+
+
+def test_bulk_inserter_flushes_full_batches():
+    """The buffer writes every batch_size rows and once more on flush."""
+    session = make_session()
+    inserter = BulkInserter(session, BacktestTrade.__table__, batch_size=4)
+
+    for i in range(10):
+        inserter.add({'backtest_result_id': 1, 'strategy_name': 'Demo', 'pair': 'BTC/USDT', 'trade_id': i})
+    assert inserter.written == 8
+    inserter.flush()
+    session.commit()
+
+    assert inserter.written == 10
+    assert session.query(BacktestTrade).count() == 10
+    session.close()
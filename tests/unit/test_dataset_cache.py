@@ -0,0 +1,101 @@
+"""
+Unit tests for the on-disk cache of constructed LightGBM datasets.
+"""
+import os
+import sys
+
+import lightgbm as lgb
+import numpy as np
+import pandas as pd
+
+# Add the project directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from freqtrade_integration.dataset_cache import CACHE_FILE_SUFFIX, DatasetCache
+from freqtrade_integration.train_model import train_lightgbm_model
+
+
+def make_dataset(n=800, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n, 5)), columns=[f'param_{i}' for i in range(5)])
+    y = pd.Series((X['param_0'] - X['param_2'] + rng.normal(scale=0.5, size=n) > 0).astype(int))
+    return X, y
+
+
+def cached_files(cache_dir):
+    return sorted(name for name in os.listdir(cache_dir) if name.endswith(CACHE_FILE_SUFFIX))
+
+
+def test_second_build_loads_binary_and_trains_identically(tmp_path):
+    """A cached dataset is read from its binary file and yields the same model as a fresh build."""
+    X, y = make_dataset()
+    cache = DatasetCache(str(tmp_path))
+    params = {'objective': 'binary', 'verbose': -1, 'seed': 1}
+
+    fresh = cache.dataset(X[:600], y[:600], params)
+    fresh_valid = cache.dataset(X[600:], y[600:], params, reference=fresh)
+    files = cached_files(tmp_path)
+    loaded = cache.dataset(X[:600], y[:600], params)
+    loaded_valid = cache.dataset(X[600:], y[600:], params, reference=loaded)
+
+    assert len(files) == 2
+    assert cached_files(tmp_path) == files
+    assert isinstance(loaded.data, str) and isinstance(loaded_valid.data, str)
+    assert loaded.get_feature_name() == list(X.columns)
+    np.testing.assert_array_equal(loaded.get_label(), y[:600])
+
+    models = [
+        lgb.train(params, train, num_boost_round=20, valid_sets=[valid])
+        for train, valid in ((fresh, fresh_valid), (loaded, loaded_valid))
+    ]
+    np.testing.assert_allclose(models[0].predict(X.values), models[1].predict(X.values))
+    assert models[1].best_score['valid_0']['binary_logloss'] == models[0].best_score['valid_0']['binary_logloss']
+
+
+def test_key_depends_on_data_and_binning_params(tmp_path):
+    """Changed rows or binning parameters build a new dataset; tree parameters do not."""
+    X, y = make_dataset(n=300)
+    cache = DatasetCache(str(tmp_path))
+
+    cache.dataset(X, y, {'num_leaves': 15})
+    cache.dataset(X, y, {'num_leaves': 63})
+    assert len(cached_files(tmp_path)) == 1
+
+    cache.dataset(X, y, {'max_bin': 63})
+    X_changed = X.copy()
+    X_changed.iloc[0, 0] += 1
+    cache.dataset(X_changed, y, {})
+    assert len(cached_files(tmp_path)) == 3
+
+
+def test_corrupt_file_is_rebuilt_and_cache_is_bounded(tmp_path):
+    """Unreadable cache files are rebuilt, and old files are evicted beyond the size limit."""
+    X, y = make_dataset(n=300)
+    cache = DatasetCache(str(tmp_path))
+    dataset = cache.dataset(X, y)
+    path = os.path.join(str(tmp_path), dataset.cache_key + CACHE_FILE_SUFFIX)
+    with open(path, 'wb') as f:
+        f.write(b'not a dataset')
+
+    rebuilt = cache.dataset(X, y)
+    assert not isinstance(rebuilt.data, str)
+    assert os.path.getsize(path) > len(b'not a dataset')
+
+    small = DatasetCache(str(tmp_path), max_disk_bytes=os.path.getsize(path))
+    small.dataset(X, y, {'max_bin': 31})
+    assert len(cached_files(tmp_path)) == 1
+
+
+def test_train_lightgbm_model_reuses_cached_dataset(tmp_path):
+    """Retraining on the same data loads the binned datasets and keeps the feature names."""
+    X, y = make_dataset()
+    cache = DatasetCache(str(tmp_path))
+
+    model, metrics = train_lightgbm_model(X, y, dataset_cache=cache)
+    files = cached_files(tmp_path)
+    retrained, retrained_metrics = train_lightgbm_model(X, y, dataset_cache=cache)
+
+    assert len(files) == 2
+    assert cached_files(tmp_path) == files
+    assert model.feature_name() == list(X.columns)
+    assert retrained_metrics['auc'] == metrics['auc'] > 0.8
@@ -0,0 +1,105 @@
+"""
+Unit tests for the Hyperband hyperparameter search used to tune LightGBM models.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+# Add the project directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from freqtrade_integration import hyperparameter_tuning
+from freqtrade_integration.hyperparameter_tuning import (
+    HyperbandTuner, SQLTrialStore, hyperband_brackets, make_study_key, params_key
+)
+from freqtrade_integration.train_model import optimize_hyperparameters
+from models import TuningTrial
+
+
+@pytest.fixture(autouse=True)
+def dataset_cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv('LIGHTGBM_DATASET_CACHE_DIR', str(tmp_path / 'datasets'))
+
+
+def make_dataset(n=1200, seed=0):
+    rng = np.random.default_rng(seed)
+    X = pd.DataFrame(rng.normal(size=(n, 4)), columns=[f'param_{i}' for i in range(4)])
+    y = pd.Series((X['param_0'] + 0.5 * X['param_1'] + rng.normal(scale=0.5, size=n) > 0).astype(int))
+    return X, y
+
+
+def test_hyperband_brackets_shrink_by_eta():
+    """Each rung keeps 1/eta of the configurations and trains them eta times longer."""
+    brackets = hyperband_brackets(min_rounds=10, max_rounds=90, eta=3)
+
+    assert brackets[0] == [(9, 10), (3, 30), (1, 90)]
+    assert brackets[-1] == [(3, 90)]
+    assert all(rungs[-1][1] == 90 for rungs in brackets)
+
+
+def test_tuner_prunes_configurations_within_trial_budget():
+    """Only the best configurations reach max_rounds and the trial budget is respected."""
+    X, y = make_dataset()
+    tuner = HyperbandTuner(X[:900], y[:900], X[900:], y[900:], max_trials=12, time_budget=0,
+                           min_rounds=5, max_rounds=45, seed=1)
+
+    best = tuner.run()
+
+    assert len(tuner.trials) == 12
+    assert best['score'] == max(score for trial in tuner.trials for score in trial['scores'].values())
+    assert best['score'] > 0.8
+    first_bracket = tuner.trials[:9]
+    assert sum(trial['rounds'] == 45 for trial in first_bracket) == 1
+    assert sorted(trial['rounds'] for trial in first_bracket)[:6] == [5] * 6
+    assert all(trial['booster'] is None for trial in tuner.trials)
+
+
+def test_optimize_hyperparameters_returns_lightgbm_params():
+    """The result keeps the lightgbm.train parameter format used by train_lightgbm_model."""
+    X, y = make_dataset(n=600)
+
+    params = optimize_hyperparameters(X, y, max_trials=4, time_budget=30)
+
+    assert params['objective'] == 'binary'
+    assert {'num_leaves', 'learning_rate', 'feature_fraction', 'bagging_fraction', 'lambda_l1', 'lambda_l2'} <= set(params)
+    assert isinstance(params['num_leaves'], int)
+
+
+def make_store(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'tuning.db'}")
+    TuningTrial.__table__.create(engine)
+    return SQLTrialStore(sessionmaker(bind=engine)(), TuningTrial)
+
+
+def test_study_store_reuses_scores_and_warm_starts(tmp_path, monkeypatch):
+    """Same data reuses stored scores without training; changed data starts from the best prior configurations."""
+    store = make_store(tmp_path)
+    X, y = make_dataset(n=600)
+    kwargs = {'max_trials': 6, 'time_budget': 0, 'store': store, 'study_name': 'TestStrategy:BTC/USDT'}
+
+    first = optimize_hyperparameters(X, y, **kwargs)
+    stored = store.session.query(TuningTrial).count()
+
+    created = []
+    original_tuner = hyperparameter_tuning.HyperbandTuner._create_booster
+    monkeypatch.setattr(hyperparameter_tuning.HyperbandTuner, '_create_booster',
+                        lambda self, params: created.append(params) or original_tuner(self, params))
+    second = optimize_hyperparameters(X, y, **kwargs)
+
+    assert stored == 6
+    assert created == []
+    assert second == first
+    assert store.session.query(TuningTrial).count() == stored
+
+    prior = store.load(make_study_key('TestStrategy:BTC/USDT', list(X.columns)))
+    best_prior = max(prior, key=lambda trial: (trial['rounds'], trial['score']))['params']
+    X_new, y_new = make_dataset(n=620, seed=1)
+    optimize_hyperparameters(X_new, y_new, **kwargs)
+
+    assert params_key(created[0]) == params_key(best_prior)
+    assert store.session.query(TuningTrial).count() == stored + 6
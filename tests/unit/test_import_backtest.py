@@ -0,0 +1,367 @@
+"""
+Unit tests for importing Freqtrade backtest results.
+"""
+import gzip
+import json
+import os
+import sys
+import zipfile
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+# Add the project directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from freqtrade_integration.import_backtest import (
+    BacktestImportManifest, BacktestImportSkip, BacktestResult, BacktestTrade, connect_to_database, import_backtest_results,
+    iter_backtest_trades, parse_backtest_file, prepare_training_data
+)
+
+
+def write_backtest_file(path, strategy='TestStrategy', pairs=('BTC/USDT',), n_trades=3, parameters=None, hour=0):
+    """Write a minimal Freqtrade backtest export."""
+    data = {
+        'strategy': strategy,
+        'timeframe': '5m',
+        'backtest_start_time': 1600000000,
+        'backtest_end_time': 1600086400,
+        'strategy_parameters': {'buy_rsi': 30} if parameters is None else parameters,
+        'trades': [
+            {
+                'pair': pairs[i % len(pairs)], 'trade_id': i, 'open_date': f'2024-01-01 {hour + i:02d}:00:00+00:00',
+                'profit_ratio': 0.01 * (i - 1), 'profit_percent': 0.01 * (i - 1)
+            }
+            for i in range(n_trades)
+        ],
+        'strategy_comparison': [{'profit_total_pct': 1.5, 'profit_total': 15.0, 'trades': n_trades, 'win_ratio': 0.5}],
+        'strategy_comparison_per_pair': [{'key': pair} for pair in pairs]
+    }
+    path.write_text(json.dumps(data))
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Point DATABASE_URL at a fresh sqlite database."""
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'backtests.db'}")
+    monkeypatch.setenv('TRAINING_DATA_CACHE_DIR', str(tmp_path / 'training_cache'))
+    return tmp_path
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_import_reports_progress_per_file(database, workers):
+    """Every file is reported once and valid files are written with one row per pair."""
+    source = database / 'results'
+    source.mkdir()
+    for i in range(5):
+        write_backtest_file(source / f'backtest-{i}.json', pairs=('BTC/USDT', 'ETH/USDT'))
+    (source / 'broken.json').write_text('{not json')
+
+    events = []
+    summary = import_backtest_results(
+        str(source), workers=workers, batch_size=2,
+        progress=lambda done, total, path, status: events.append((done, total, os.path.basename(path), status))
+    )
+
+    assert summary == {'total_files': 6, 'imported': 5, 'skipped': 0, 'failed': 1}
+    assert [done for done, _, _, _ in events] == list(range(1, 7))
+    assert ('broken.json', 'failed') in [(name, status) for _, _, name, status in events]
+
+    session = connect_to_database()
+    try:
+        assert session.query(BacktestResult).count() == 10
+    finally:
+        session.close()
+
+
+def test_import_skips_imported_files_and_other_strategies(database):
+    """A second run skips files already in the database; filter_strategy skips other strategies."""
+    source = database / 'results'
+    source.mkdir()
+    write_backtest_file(source / 'first.json')
+    write_backtest_file(source / 'other.json', strategy='OtherStrategy')
+
+    first = import_backtest_results(str(source), filter_strategy='TestStrategy', workers=2)
+    second = import_backtest_results(str(source), filter_strategy='TestStrategy', workers=2)
+
+    assert first == {'total_files': 2, 'imported': 1, 'skipped': 1, 'failed': 0}
+    assert second == {'total_files': 2, 'imported': 0, 'skipped': 2, 'failed': 0}
+
+
+def test_trades_are_stored_once_in_trades_table(database):
+    """Trades are streamed into backtest_trades once each, linked to the row of their pair."""
+    source = database / 'results'
+    source.mkdir()
+    path = source / 'multi.json'
+    write_backtest_file(path, pairs=('BTC/USDT', 'ETH/USDT'), n_trades=7)
+
+    summary = parse_backtest_file(str(path), include_trades=False)
+    chunks = list(iter_backtest_trades(str(path), chunk_size=3))
+    import_backtest_results(str(source))
+
+    assert summary['trades_data'] is None
+    assert summary['pairs'] == ['BTC/USDT', 'ETH/USDT']
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+
+    session = connect_to_database()
+    try:
+        result_pairs = {row.id: row.pair for row in session.query(BacktestResult)}
+        trades = session.query(BacktestTrade).order_by(BacktestTrade.trade_id).all()
+        assert all(row.trades_data is None for row in session.query(BacktestResult))
+    finally:
+        session.close()
+
+    assert [trade.trade_id for trade in trades] == list(range(7))
+    assert all(result_pairs[trade.backtest_result_id] == trade.pair for trade in trades)
+    assert trades[0].open_date == datetime(2024, 1, 1, 0, 0)
+
+
+def test_prepare_training_data_reads_only_requested_pair(database):
+    """Training data comes from the trades table, filtered by strategy and pair."""
+    source = database / 'results'
+    source.mkdir()
+    write_backtest_file(source / 'multi.json', pairs=('BTC/USDT', 'ETH/USDT'), n_trades=8)
+    import_backtest_results(str(source))
+
+    df = prepare_training_data('TestStrategy', 'ETH/USDT', min_trades=1)
+
+    assert list(df['trade_id']) == [1, 3, 5, 7]
+    assert set(df['pair']) == {'ETH/USDT'}
+    assert df['backtest_result_id'].nunique() == 1
+    assert list(df['param_buy_rsi']) == [30] * 4
+    assert list(df['is_profitable']) == [False, True, True, True]
+
+
+def test_prepare_training_data_projects_numeric_parameters(database, monkeypatch):
+    """Only numeric parameters become param_* columns; results without a parameter get NaN."""
+    from freqtrade_integration import import_backtest
+
+    source = database / 'results'
+    source.mkdir()
+    write_backtest_file(source / 'first.json', n_trades=2,
+                        parameters={'buy_rsi': 30, 'mode': 'fast', 'use_exit': True, 'bands': [1, 2]})
+    write_backtest_file(source / 'second.json', n_trades=2, parameters={'sell_rsi': 70.5}, hour=10)
+    import_backtest_results(str(source))
+
+    df = prepare_training_data('TestStrategy', 'BTC/USDT', min_trades=1, use_cache=False)
+    monkeypatch.setattr(import_backtest, '_NUMERIC_PARAMETERS_SQL', {})
+    fallback = prepare_training_data('TestStrategy', 'BTC/USDT', min_trades=1, use_cache=False)
+
+    assert [c for c in df.columns if c.startswith('param_')] == ['param_buy_rsi', 'param_use_exit', 'param_sell_rsi']
+    assert list(df['param_buy_rsi'].fillna(-1)) == [30, 30, -1, -1]
+    assert list(df['param_use_exit'].fillna(-1)) == [1, 1, -1, -1]
+    assert list(df['param_sell_rsi'].fillna(-1)) == [-1, -1, 70.5, 70.5]
+    pd.testing.assert_frame_equal(fallback, df)
+
+
+def test_prepare_training_data_is_cached_until_manifest_changes(database, monkeypatch):
+    """A second call reads memory-mapped columns; importing a changed file invalidates the cache."""
+    from freqtrade_integration import import_backtest
+
+    source = database / 'results'
+    source.mkdir()
+    path = source / 'first.json'
+    write_backtest_file(path, n_trades=4)
+    import_backtest_results(str(source))
+    first = prepare_training_data('TestStrategy', 'BTC/USDT', min_trades=1)
+
+    load_frame = import_backtest._load_training_frame
+    calls = []
+    monkeypatch.setattr(import_backtest, '_load_training_frame', lambda *args: calls.append(args) or load_frame(*args))
+
+    cached = prepare_training_data('TestStrategy', 'BTC/USDT', min_trades=1)
+    assert calls == []
+    pd.testing.assert_frame_equal(cached, first)
+    cached.loc[0, 'profit_percent'] = 99.0
+
+    write_backtest_file(path, n_trades=6)
+    os.utime(path, ns=(0, 10 ** 9))
+    import_backtest_results(str(source))
+    refreshed = prepare_training_data('TestStrategy', 'BTC/USDT', min_trades=1)
+
+    assert len(calls) == 1
+    assert list(refreshed['trade_id']) == list(range(6))
+    assert prepare_training_data('TestStrategy', 'BTC/USDT', min_trades=1)['profit_percent'].iloc[0] != 99.0
+
+
+def test_manifest_skips_unchanged_files_without_opening_them(database, monkeypatch):
+    """Files whose size and mtime match the manifest are neither hashed nor parsed."""
+    from freqtrade_integration import import_backtest
+
+    source = database / 'results'
+    source.mkdir()
+    write_backtest_file(source / 'first.json')
+    import_backtest_results(str(source))
+
+    def fail(*args, **kwargs):
+        raise AssertionError('unchanged file was opened')
+
+    monkeypatch.setattr(import_backtest, '_file_sha256', fail)
+    monkeypatch.setattr(import_backtest, 'open_backtest_file', fail)
+    monkeypatch.setattr(import_backtest, 'parse_backtest_for_import', fail)
+
+    assert import_backtest_results(str(source)) == {'total_files': 1, 'imported': 0, 'skipped': 1, 'failed': 0}
+
+
+def test_filtered_and_broken_files_are_not_parsed_again_until_changed(database, monkeypatch):
+    """Files skipped by the strategy filter or that failed to parse are remembered by size and mtime."""
+    from freqtrade_integration import import_backtest
+
+    source = database / 'results'
+    source.mkdir()
+    write_backtest_file(source / 'first.json')
+    write_backtest_file(source / 'other.json', strategy='OtherStrategy')
+    (source / 'broken.json').write_text('{not json')
+
+    first = import_backtest_results(str(source), filter_strategy='TestStrategy')
+    assert first == {'total_files': 3, 'imported': 1, 'skipped': 1, 'failed': 1}
+
+    parse = import_backtest.parse_backtest_for_import
+    parsed = []
+    monkeypatch.setattr(import_backtest, 'parse_backtest_for_import',
+                        lambda file_path, *args, **kwargs: parsed.append(os.path.basename(file_path)) or parse(file_path, *args, **kwargs))
+
+    second = import_backtest_results(str(source), filter_strategy='TestStrategy')
+    assert second == {'total_files': 3, 'imported': 0, 'skipped': 3, 'failed': 0}
+    assert parsed == []
+
+    # Without the filter the other strategy is imported; a fixed file is parsed again
+    write_backtest_file(source / 'broken.json', hour=5)
+    third = import_backtest_results(str(source))
+    assert third == {'total_files': 3, 'imported': 2, 'skipped': 1, 'failed': 0}
+    assert sorted(parsed) == ['broken.json', 'other.json']
+
+    session = connect_to_database()
+    try:
+        assert session.query(BacktestImportSkip).count() == 0
+        assert session.query(BacktestImportManifest).count() == 3
+    finally:
+        session.close()
+
+
+def test_each_file_is_read_once_and_hashed_while_parsing(database, monkeypatch):
+    """Workers hash and decode trades in one read; the writer only inserts the spooled rows."""
+    import hashlib
+    import tempfile
+
+    from freqtrade_integration import import_backtest
+
+    source = database / 'results'
+    source.mkdir()
+    write_backtest_file(source / 'plain.json', pairs=('BTC/USDT', 'ETH/USDT'), n_trades=7)
+    with gzip.open(source / 'packed.json.gz', 'wb') as f:
+        f.write((source / 'plain.json').read_bytes().replace(b'TestStrategy', b'OtherStrategy'))
+
+    opened = []
+    original_open = import_backtest.open_backtest_file
+
+    def counting_open(file_path, *args, **kwargs):
+        opened.append(os.path.basename(file_path))
+        return original_open(file_path, *args, **kwargs)
+
+    def fail(*args, **kwargs):
+        raise AssertionError('file was hashed in a separate pass')
+
+    monkeypatch.setattr(import_backtest, 'open_backtest_file', counting_open)
+    monkeypatch.setattr(import_backtest, '_file_sha256', fail)
+    monkeypatch.setattr(import_backtest, 'iter_backtest_trades', fail)
+    spool_root = database / 'spool'
+    spool_root.mkdir()
+    monkeypatch.setattr(tempfile, 'tempdir', str(spool_root))
+
+    assert import_backtest_results(str(source))['imported'] == 2
+    assert sorted(opened) == ['packed.json.gz', 'plain.json']
+    session = connect_to_database()
+    try:
+        hashes = {os.path.basename(entry.file_path): entry.content_hash for entry in session.query(BacktestImportManifest)}
+        assert hashes == {
+            name: hashlib.sha256((source / name).read_bytes()).hexdigest() for name in ('plain.json', 'packed.json.gz')
+        }
+        assert session.query(BacktestTrade).filter_by(strategy_name='OtherStrategy', pair='ETH/USDT').count() == 3
+    finally:
+        session.close()
+    assert os.listdir(spool_root) == []
+
+
+def test_modified_file_is_reimported_in_place(database):
+    """A changed file replaces its previous rows instead of adding duplicates."""
+    source = database / 'results'
+    source.mkdir()
+    path = source / 'first.json'
+    write_backtest_file(path, n_trades=3)
+    import_backtest_results(str(source))
+
+    write_backtest_file(path, n_trades=5)
+    os.utime(path, ns=(0, 10 ** 9))
+    summary = import_backtest_results(str(source))
+
+    assert summary['imported'] == 1
+    session = connect_to_database()
+    try:
+        assert session.query(BacktestResult).count() == 1
+        assert session.query(BacktestTrade).count() == 5
+        assert session.query(BacktestImportManifest).one().file_mtime_ns == 10 ** 9
+    finally:
+        session.close()
+
+
+def test_moved_and_copied_files_are_not_imported_again(database):
+    """Content already imported under another path is recognised by its hash."""
+    source = database / 'results'
+    source.mkdir()
+    write_backtest_file(source / 'first.json')
+    import_backtest_results(str(source))
+
+    (source / 'first.json').rename(source / 'renamed.json')
+    moved = import_backtest_results(str(source))
+    (source / 'copy.json').write_bytes((source / 'renamed.json').read_bytes())
+    copied = import_backtest_results(str(source))
+
+    assert moved == {'total_files': 1, 'imported': 0, 'skipped': 1, 'failed': 0}
+    assert copied == {'total_files': 2, 'imported': 0, 'skipped': 2, 'failed': 0}
+    session = connect_to_database()
+    try:
+        assert [row.file_path for row in session.query(BacktestResult)] == [str(source / 'renamed.json')]
+        assert session.query(BacktestImportManifest).count() == 2
+    finally:
+        session.close()
+
+
+def test_compressed_and_zipped_results_are_streamed(database):
+    """Results inside .json.gz files and .zip archives are imported; sidecar files are ignored."""
+    source = database / 'results'
+    source.mkdir()
+    plain = database / 'plain.json'
+    write_backtest_file(plain, pairs=('BTC/USDT', 'ETH/USDT'), n_trades=6)
+    with gzip.open(source / 'gzipped.json.gz', 'wb') as f:
+        f.write(plain.read_bytes())
+    with zipfile.ZipFile(source / 'backtest-result-2024.zip', 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('backtest-result-2024_config.json', '{"stake_currency": "USDT"}')
+        archive.writestr('backtest-result-2024.json', plain.read_bytes())
+    (source / 'backtest-result-2024.meta.json').write_text('{"TestStrategy": {}}')
+
+    chunks = list(iter_backtest_trades(str(source / 'backtest-result-2024.zip'), chunk_size=4))
+    summary = import_backtest_results(str(source), workers=2)
+
+    assert [len(chunk) for chunk in chunks] == [4, 2]
+    assert summary == {'total_files': 2, 'imported': 2, 'skipped': 0, 'failed': 0}
+    session = connect_to_database()
+    try:
+        assert session.query(BacktestResult).count() == 4
+        assert session.query(BacktestTrade).count() == 12
+    finally:
+        session.close()
+
+
+def test_zstd_results_are_streamed(database):
+    """Results compressed with zstandard are imported when the package is installed."""
+    zstandard = pytest.importorskip('zstandard')
+    source = database / 'results'
+    source.mkdir()
+    plain = database / 'plain.json'
+    write_backtest_file(plain, n_trades=4)
+    (source / 'result.json.zst').write_bytes(zstandard.ZstdCompressor().compress(plain.read_bytes()))
+
+    assert import_backtest_results(str(source))['imported'] == 1
+    assert parse_backtest_file(str(source / 'result.json.zst'))['trades_count'] == 4
@@ -0,0 +1,158 @@
+"""
+Unit tests for the background Monte Carlo job manager.
+"""
+import os
+import sys
+import threading
+import time
+
+# Add the project directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from backtest_ai.jobs import CANCELLED, COMPLETED, FAILED, JobManager, JobQueueFull
+
+
+def wait_for(job, timeout=5.0):
+    """Wait until a job reaches a finished state."""
+    deadline = time.time() + timeout
+    while job.status not in (COMPLETED, FAILED, CANCELLED) and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+def test_job_reports_progress_and_result():
+    """A finished job exposes its result and full progress."""
+    manager = JobManager(max_workers=1)
+
+    def task(progress):
+        for done in (250, 500, 1000):
+            progress(done, 1000)
+        return {'success': True, 'value': 42}
+
+    job = wait_for(manager.submit(task, 1000))
+
+    assert job.status == COMPLETED
+    assert job.result == {'success': True, 'value': 42}
+    status = job.to_dict()
+    assert status['progress'] == 100.0
+    assert status['eta_seconds'] == 0.0
+
+
+def test_running_job_reports_eta():
+    """A running job estimates the remaining time from its progress."""
+    manager = JobManager(max_workers=1)
+    halfway = threading.Event()
+    release = threading.Event()
+
+    def task(progress):
+        progress(500, 1000)
+        halfway.set()
+        release.wait(5)
+        return {}
+
+    job = manager.submit(task, 1000)
+    assert halfway.wait(5)
+    status = job.to_dict()
+    release.set()
+
+    assert status['status'] == 'running'
+    assert status['progress'] == 50.0
+    assert status['eta_seconds'] is not None and status['eta_seconds'] >= 0
+    wait_for(job)
+
+
+def test_cancel_stops_running_job():
+    """Cancelling makes the next progress report abort the task."""
+    manager = JobManager(max_workers=1)
+    started = threading.Event()
+
+    def task(progress):
+        for done in range(1, 10000):
+            started.set()
+            progress(done, 10000)
+            time.sleep(0.001)
+        return {}
+
+    job = manager.submit(task, 10000)
+    assert started.wait(5)
+    manager.cancel(job.id)
+
+    assert wait_for(job).status == CANCELLED
+    assert job.result is None
+
+
+def test_failed_job_records_error():
+    """Exceptions raised by the task mark the job as failed."""
+    manager = JobManager(max_workers=1)
+
+    def task(progress):
+        raise ValueError('boom')
+
+    job = wait_for(manager.submit(task, 10))
+
+    assert job.status == FAILED
+    assert job.error == 'boom'
+
+
+def test_pending_jobs_are_bounded():
+    """Submitting beyond max_pending is rejected and queued jobs can be cancelled."""
+    manager = JobManager(max_workers=1, max_pending=2)
+    release = threading.Event()
+
+    running = manager.submit(lambda progress: release.wait(5), 1)
+    queued = manager.submit(lambda progress: {}, 1)
+    try:
+        manager.submit(lambda progress: {}, 1)
+        assert False, 'expected JobQueueFull'
+    except JobQueueFull:
+        pass
+
+    manager.cancel(queued.id)
+    release.set()
+
+    assert queued.status == CANCELLED
+    assert wait_for(running).status == COMPLETED
+    assert wait_for(queued).status == CANCELLED
+
+
+def test_default_sized_simulation_job_reports_progress_and_cancels():
+    """A 100k path x 30 day Monte Carlo job reports progress per chunk and stops when cancelled."""
+    from types import SimpleNamespace
+
+    from backtest_ai.monte_carlo_routes import _parse_simulation_params, _run_job
+
+    params = _parse_simulation_params({'simulations': 100000, 'trading_days': 30, 'seed': 1},
+                                      SimpleNamespace(metrics=None))
+    prepared = {
+        'pair': 'BTC/USDT',
+        'params': params,
+        'trade_returns': None,
+        'bootstrap_params': None,
+        'total_paths': params['simulations'],
+        'use_cache': False,
+        'cache_key': None
+    }
+    manager = JobManager(max_workers=1)
+    first_chunk = threading.Event()
+    release = threading.Event()
+    reports = []
+
+    def task(progress):
+        def report(done, total):
+            reports.append(done)
+            progress(done, total)
+            if not first_chunk.is_set():
+                first_chunk.set()
+                release.wait(5)
+        return _run_job(prepared, report)
+
+    job = manager.submit(task, prepared['total_paths'])
+    assert first_chunk.wait(30)
+    status = job.to_dict()
+    manager.cancel(job.id)
+    release.set()
+
+    assert 0 < status['progress'] < 100
+    assert wait_for(job, timeout=30).status == CANCELLED
+    assert job.result is None
+    assert reports[-1] < prepared['total_paths']
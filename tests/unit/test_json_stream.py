@@ -0,0 +1,85 @@
+"""
+Unit tests for the incremental JSON reader.
+"""
+import io
+import json
+import os
+import sys
+
+import pytest
+
+# Add the project directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from freqtrade_integration.json_stream import JsonStreamReader
+
+DOCUMENT = {
+    'strategy': 'Tricky "quoted" [strategy] {name}',
+    'trades': [
+        {'pair': 'BTC/USDT', 'profit_ratio': 0.0123456789, 'tags': ['a]', '{b', 'c\\\\"d']},
+        {'pair': 'ETH/USDT', 'profit_ratio': -1.5e-05, 'nested': {'x': [1, [2, [3]]]}},
+        {'pair': 'XRP/USDT', 'profit_ratio': 123456789012, 'note': 'unicode é 中'}
+    ],
+    'empty_list': [],
+    'empty_object': {},
+    'count': 1234567,
+    'flag': True,
+    'nothing': None
+}
+
+
+@pytest.mark.parametrize('read_size', [1, 3, 7, 64, 1 << 20])
+def test_reads_every_top_level_value(read_size):
+    """Values match json.loads regardless of where buffer boundaries fall."""
+    text = json.dumps(DOCUMENT, indent=2)
+    reader = JsonStreamReader(io.StringIO(text), read_size=read_size)
+
+    parsed = {key: reader.read_value() for key in reader.iter_object()}
+
+    assert parsed == DOCUMENT
+
+
+@pytest.mark.parametrize('read_size', [1, 5, 1 << 20])
+def test_skips_values_and_streams_array_chunks(read_size):
+    """Skipped values leave the reader positioned on the next key; arrays stream in chunks."""
+    text = json.dumps(DOCUMENT)
+    reader = JsonStreamReader(io.StringIO(text), read_size=read_size)
+
+    seen = {}
+    for key in reader.iter_object():
+        if key == 'trades':
+            seen[key] = list(reader.iter_array_chunks(2))
+        elif key == 'count':
+            seen[key] = reader.read_value()
+        else:
+            reader.skip_value()
+
+    assert seen['trades'] == [DOCUMENT['trades'][:2], DOCUMENT['trades'][2:]]
+    assert seen['count'] == DOCUMENT['count']
+
+
+def test_truncated_document_raises():
+    """A file cut off in the middle of a value is reported as invalid."""
+    text = json.dumps(DOCUMENT)[:-20]
+    reader = JsonStreamReader(io.StringIO(text), read_size=8)
+
+    with pytest.raises(ValueError):
+        for key in reader.iter_object():
+            reader.skip_value()
+
+
+@pytest.mark.parametrize('read_size', range(1, 9))
+@pytest.mark.parametrize('document', [
+    DOCUMENT,
+    {'a': 0.1, 'b': 1},
+    {'a': -2.5e10, 'b': 1},
+    {'values': [1.25, -0.5e-3, 10, 3E+2], 'last': 7.75}
+])
+def test_numbers_split_across_reads(document, read_size):
+    """A number cut by a buffer boundary after '.', 'e' or a digit is read whole."""
+    for text in (json.dumps(document), json.dumps(document, indent=2)):
+        reader = JsonStreamReader(io.StringIO(text), read_size=read_size)
+
+        parsed = {key: reader.read_value() for key in reader.iter_object()}
+
+        assert parsed == document
@@ -0,0 +1,552 @@
+"""
+Unit tests for the shared Monte Carlo simulation engine.
+"""
+import os
+import sys
+
+import pytest
+
+# Add the project directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+np = pytest.importorskip('numpy')
+
+from backtest_ai.simulation import (
+    BootstrapModel,
+    DailyPoissonModel,
+    MAX_ADAPTIVE_PATHS,
+    MAX_CURVE_POINTS,
+    MAX_SWEEP_PATHS,
+    PathSummary,
+    PerTradeModel,
+    QuantileSketch,
+    SimulationCancelled,
+    check_adaptive_budget,
+    check_sweep_size,
+    drawdown_profile,
+    estimate_standard_errors,
+    histogram_stats,
+    load_trade_returns,
+    plan_shards,
+    request_workers,
+    run_adaptive_simulation,
+    run_parameter_sweep,
+    run_simulation,
+    simulate_paths,
+    trade_returns_from_records,
+)
+
+
+def test_run_simulation_is_reproducible_with_seed():
+    """The same seed must give identical results."""
+    model = DailyPoissonModel(trading_days=20)
+
+    first = run_simulation(model, simulations=500, seed=7)
+    second = run_simulation(model, simulations=500, seed=7)
+
+    assert first['percentiles'] == second['percentiles']
+    assert first['final_distribution'] == second['final_distribution']
+
+
+def test_simulate_paths_shape_and_start():
+    """Equity curves start at the initial capital and have one column per step."""
+    model = PerTradeModel(trading_days=10, trades_per_day=2)
+    rng = np.random.default_rng(0)
+
+    equity = simulate_paths(model, 50, 1000.0, rng)
+
+    assert equity.shape == (50, 21)
+    assert np.all(equity[:, 0] == 1000.0)
+    assert np.all(equity >= 0)
+
+
+def test_daily_poisson_matches_expected_growth():
+    """Mean daily log growth matches the analytical expectation of the model."""
+    model = DailyPoissonModel(
+        trading_days=1, trades_per_day=3.0, risk_per_trade=0.01, base_win_rate=0.5,
+        win_rate_variance=0.0, risk_reward_ratio=2.0, risk_reward_variance=0.0,
+        consider_fees=False
+    )
+    rng = np.random.default_rng(1)
+
+    factors = model.sample_factors(rng, 200000)
+
+    expected = 1.5 * np.log(1.02) + 1.5 * np.log(0.99)
+    assert np.mean(np.log(factors)) == pytest.approx(expected, abs=2e-4)
+
+
+def test_loss_larger_than_capital_ruins_account():
+    """A single loss risking the whole account keeps equity at zero afterwards."""
+    model = DailyPoissonModel(trading_days=30, risk_per_trade=1.0, base_win_rate=0.5)
+    rng = np.random.default_rng(3)
+
+    equity = simulate_paths(model, 200, 1000.0, rng)
+
+    ruined = equity[:, -1] == 0
+    assert ruined.any()
+    first_zero = np.argmax(equity == 0, axis=1)
+    for row, start in zip(equity[ruined], first_zero[ruined]):
+        assert np.all(row[start:] == 0)
+
+
+def test_per_trade_win_and_loss_factors():
+    """Without variance every trade multiplies equity by one of two factors."""
+    model = PerTradeModel(
+        trading_days=5, trades_per_day=4, risk_per_trade=0.02, base_win_rate=0.5,
+        win_rate_variance=0.0, risk_reward_ratio=1.5, risk_reward_variance=0.0,
+        consider_fees=True
+    )
+    rng = np.random.default_rng(5)
+
+    factors = model.sample_factors(rng, 100)
+
+    expected = {round(1.03 * 0.999, 12), round(0.98 * 0.999, 12)}
+    assert set(np.round(np.unique(factors), 12)) == expected
+
+
+def test_bootstrap_only_uses_observed_returns():
+    """Bootstrap paths are built from the supplied trade returns only."""
+    returns = [0.02, -0.01, 0.05]
+    model = BootstrapModel(returns, n_trades=40, stake_fraction=0.5)
+
+    summary = run_simulation(model, simulations=300, initial_capital=100.0, seed=11)
+
+    assert summary['n_steps'] == 40
+    assert summary['parameters']['model'] == 'bootstrap'
+    factors = model.sample_factors(np.random.default_rng(0), 10)
+    assert set(np.round(np.unique(factors), 12)) <= {1.01, 0.995, 1.025}
+
+
+def test_block_bootstrap_keeps_consecutive_trades():
+    """Block bootstrap copies runs of consecutive trades, wrapping around the sample."""
+    returns = np.arange(10) / 100.0
+    model = BootstrapModel(returns, n_trades=25, block_size=5)
+
+    factors = model.sample_factors(np.random.default_rng(2), 200)
+
+    assert factors.shape == (200, 25)
+    positions = np.rint((factors - 1.0) * 100).astype(int)
+    steps = np.diff(positions, axis=1)
+    within_block = np.ones(24, dtype=bool)
+    within_block[4::5] = False
+    assert np.all(steps[:, within_block] % 10 == 1)
+    assert model.parameters()['block_size'] == 5
+
+
+def test_trade_returns_from_records():
+    """Trade returns prefer profit_ratio and filter by pair."""
+    trades = [
+        {'pair': 'BTC/USDT', 'profit_ratio': 0.02, 'profit_percent': 2.0},
+        {'pair': 'ETH/USDT', 'profit_percent': -0.01},
+        {'pair': 'BTC/USDT', 'profit_percent': 0.03},
+        {'pair': 'BTC/USDT'},
+    ]
+
+    returns = trade_returns_from_records(trades, 'BTC/USDT')
+
+    assert returns.tolist() == [0.02, 0.03]
+    assert returns.flags['C_CONTIGUOUS']
+    assert trade_returns_from_records(trades).tolist() == [0.02, -0.01, 0.03]
+
+
+def test_load_trade_returns_from_database():
+    """Imported backtest trades are loaded in backtest order."""
+    from datetime import datetime
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from freqtrade_integration.import_backtest import Base, BacktestResult
+
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    for start, trades in ((datetime(2024, 2, 1), [0.03]), (datetime(2024, 1, 1), [0.01, -0.02])):
+        session.add(BacktestResult(
+            strategy_name='Demo', pair='BTC/USDT', start_date=start, end_date=start, timeframe='5m',
+            profit_percent=0.0, profit_abs=0.0, trades_count=len(trades), win_rate=0.0,
+            trades_data=[{'pair': 'BTC/USDT', 'profit_ratio': r} for r in trades], file_path='demo.json'
+        ))
+    session.commit()
+
+    assert load_trade_returns(session, 'Demo', 'BTC/USDT').tolist() == [0.01, -0.02, 0.03]
+    assert load_trade_returns(session, 'Other').size == 0
+    session.close()
+
+
+def test_load_trade_returns_counts_legacy_file_once():
+    """Legacy per-pair rows of one file share its full trade list; all-pair loads read it once."""
+    from datetime import datetime
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from freqtrade_integration.import_backtest import Base, BacktestResult
+
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    trades = [{'pair': 'BTC/USDT', 'profit_ratio': 0.01}, {'pair': 'ETH/USDT', 'profit_ratio': -0.02}]
+    for pair, file_path in (('BTC/USDT', 'multi.json'), ('ETH/USDT', 'multi.json'), ('BTC/USDT', 'other.json')):
+        session.add(BacktestResult(
+            strategy_name='Demo', pair=pair, start_date=datetime(2024, 1, 1), end_date=datetime(2024, 1, 2),
+            timeframe='5m', profit_percent=0.0, profit_abs=0.0, trades_count=len(trades), win_rate=0.0,
+            trades_data=trades, file_path=file_path
+        ))
+    session.commit()
+
+    assert load_trade_returns(session, 'Demo').tolist() == [0.01, -0.02, 0.01, -0.02]
+    assert load_trade_returns(session, 'Demo', 'ETH/USDT').tolist() == [-0.02]
+    session.close()
+
+
+def test_load_trade_returns_from_trades_table():
+    """Normalized trade rows are loaded by open date, preferring profit_ratio."""
+    from datetime import datetime
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    from freqtrade_integration.import_backtest import Base, BacktestResult, BacktestTrade
+
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    result = BacktestResult(
+        strategy_name='Demo', pair='BTC/USDT', start_date=datetime(2024, 1, 1), end_date=datetime(2024, 1, 2),
+        timeframe='5m', profit_percent=0.0, profit_abs=0.0, trades_count=3, win_rate=0.0, file_path='demo.json'
+    )
+    session.add(result)
+    session.flush()
+    for hour, pair, ratio, percent in ((3, 'BTC/USDT', None, 0.05), (1, 'BTC/USDT', 0.01, 9.0), (2, 'ETH/USDT', 0.02, None)):
+        session.add(BacktestTrade(
+            backtest_result_id=result.id, strategy_name='Demo', pair=pair,
+            open_date=datetime(2024, 1, 1, hour), profit_ratio=ratio, profit_percent=percent
+        ))
+    session.commit()
+
+    assert load_trade_returns(session, 'Demo').tolist() == [0.01, 0.02, 0.05]
+    assert load_trade_returns(session, 'Demo', 'BTC/USDT').tolist() == [0.01, 0.05]
+    session.close()
+
+
+def test_summary_statistics_are_consistent():
+    """Counts, percentiles and drawdowns agree with each other."""
+    summary = run_simulation(DailyPoissonModel(), simulations=1000, seed=2)
+
+    assert summary['simulations'] == 1000
+    assert summary['success_count'] >= summary['profitable_count']
+    assert summary['profitable_count'] + summary['losing_count'] <= 1000
+    assert len(summary['percentiles']['p50']) == summary['n_steps'] + 1
+    assert summary['final_percentiles']['p10'] <= summary['final_percentiles']['p90']
+    assert 0 <= summary['max_drawdown_pct']['median'] <= summary['max_drawdown_pct']['p90']
+    assert len(summary['sample_curves']) == 20
+    assert len(summary['final_distribution']) == 1000
+
+
+def test_drawdown_profile_on_known_curves():
+    """Depth, duration, recovery and ulcer index match a hand-computed example."""
+    equity = np.array([
+        [100, 110, 105, 100, 112, 111, 115, 90, 95],
+        [100, 90, 80, 85, 100, 100, 101, 101, 100],
+    ], dtype=float)
+
+    profile = drawdown_profile(equity)
+
+    np.testing.assert_allclose(profile['max_drawdown_pct'], [25 / 115 * 100, 20.0])
+    np.testing.assert_allclose(profile['max_drawdown_abs'], [25.0, 20.0])
+    np.testing.assert_array_equal(profile['max_duration'], [2, 3])
+    assert np.isnan(profile['recovery_steps'][0])
+    assert profile['recovery_steps'][1] == 2
+    assert sorted(profile['episode_durations'].tolist()) == [1, 1, 2, 2, 3]
+    expected_ulcer = np.sqrt(np.mean((np.array([0, 0, 5, 10, 0, 1, 0, 25, 20]) / np.array(
+        [1, 1, 110, 110, 1, 112, 1, 115, 115]) * 100) ** 2))
+    assert profile['ulcer_index'][0] == pytest.approx(expected_ulcer)
+
+
+def test_drawdown_profile_without_drawdown():
+    """A monotonically rising curve has no drawdown and recovers immediately."""
+    profile = drawdown_profile([100.0, 101.0, 102.0])
+
+    assert profile['max_drawdown_pct'][0] == 0
+    assert profile['max_duration'][0] == 0
+    assert profile['recovery_steps'][0] == 0
+    assert profile['ulcer_index'][0] == 0
+    assert profile['episode_durations'].size == 0
+
+
+def test_histogram_stats():
+    """Histogram statistics follow the lower-rank percentile convention."""
+    stats = histogram_stats(np.array([0, 2, 1, 0, 1]))
+
+    assert stats == {'mean': 2.0, 'median': 1.0, 'p90': 2.0, 'max': 4.0}
+    assert histogram_stats(np.zeros(3))['median'] is None
+
+
+def test_streaming_drawdown_summary_agrees_with_exact():
+    """Mergeable drawdown histograms match the exact drawdown summary."""
+    model = DailyPoissonModel(trading_days=40)
+
+    exact = run_simulation(model, simulations=10000, seed=6, streaming=False)['drawdown']
+    streamed = run_simulation(model, simulations=10000, seed=6, streaming=True,
+                              shard_size=2500, chunk_cells=20000)['drawdown']
+
+    assert set(streamed) == set(exact)
+    assert streamed['max_duration']['median'] == pytest.approx(exact['max_duration']['median'], abs=1)
+    assert streamed['recovered_rate'] == pytest.approx(exact['recovered_rate'], abs=2)
+    assert streamed['ulcer_index']['mean'] == pytest.approx(exact['ulcer_index']['mean'], rel=0.05)
+    assert len(streamed['duration_distribution']) <= 41
+
+
+def test_quantile_sketch_relative_accuracy():
+    """Sketch quantiles stay within the configured relative accuracy."""
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(mean=9, sigma=0.4, size=(20000, 3))
+    sketch = QuantileSketch(n_columns=3, relative_accuracy=0.005, min_value=1.0, max_value=1e7)
+
+    sketch.update(values)
+
+    expected = np.percentile(values, [10, 50, 90], axis=0)
+    np.testing.assert_allclose(sketch.quantiles([10, 50, 90]), expected, rtol=0.01)
+    np.testing.assert_allclose(sketch.mean(), values.mean(axis=0))
+
+
+def test_quantile_sketch_merge_matches_single_update():
+    """Merging sketches of two halves equals sketching all values at once."""
+    rng = np.random.default_rng(1)
+    values = np.concatenate([rng.exponential(100, 5000), np.zeros(50)])
+    whole = QuantileSketch()
+    first = QuantileSketch()
+    second = QuantileSketch()
+
+    whole.update(values)
+    first.update(values[:2000])
+    second.update(values[2000:])
+    first.merge(second)
+
+    np.testing.assert_array_equal(first.counts, whole.counts)
+    assert first.quantiles([0.5])[0, 0] == 0.0
+
+
+def test_plan_shards_covers_all_simulations():
+    """Shards cover every simulation and never exceed the shard size."""
+    sizes = plan_shards(250001, 100000)
+
+    assert sum(sizes) == 250001
+    assert len(sizes) == 3
+    assert max(sizes) <= 100000
+
+
+def test_sharded_run_is_independent_of_worker_count():
+    """A sharded run gives identical results for any number of workers."""
+    model = DailyPoissonModel(trading_days=15)
+
+    sequential = run_simulation(model, simulations=4000, seed=21, shard_size=1000, workers=1)
+    parallel = run_simulation(model, simulations=4000, seed=21, shard_size=1000, workers=2)
+
+    assert sequential['simulations'] == 4000
+    assert sequential['percentiles'] == parallel['percentiles']
+    assert sequential['max_drawdown_pct'] == parallel['max_drawdown_pct']
+    assert sequential['final_distribution'] == parallel['final_distribution']
+    assert sequential['gross_profit'] == parallel['gross_profit']
+
+
+def test_request_workers_default_is_small_and_configurable(monkeypatch):
+    """Request-path runs use a small worker count unless MONTE_CARLO_REQUEST_WORKERS overrides it."""
+    monkeypatch.delenv('MONTE_CARLO_REQUEST_WORKERS', raising=False)
+    assert request_workers() == 2
+
+    monkeypatch.setenv('MONTE_CARLO_REQUEST_WORKERS', '4')
+    assert request_workers() == 4
+
+    monkeypatch.setenv('MONTE_CARLO_REQUEST_WORKERS', '0')
+    assert request_workers() == 1
+
+
+def test_sharded_run_agrees_with_exact_run():
+    """Sketch-based statistics agree with the exact single-matrix statistics."""
+    model = PerTradeModel(trading_days=10)
+
+    exact = run_simulation(model, simulations=20000, seed=4)
+    sharded = run_simulation(model, simulations=20000, seed=4, shard_size=5000)
+
+    assert sharded['mean_profit_pct'] == pytest.approx(exact['mean_profit_pct'], abs=0.5)
+    assert sharded['percentiles']['p50'][0] == 10000.0
+    for key in ('p10', 'p50', 'p90'):
+        assert sharded['final_percentiles'][key] == pytest.approx(exact['final_percentiles'][key], rel=0.01)
+    assert len(sharded['sample_curves']) == 20
+    assert len(sharded['final_distribution']) == 1000
+
+
+def test_streaming_run_has_same_shape_as_exact_run():
+    """Streaming mode returns the same keys and curve lengths as the exact mode."""
+    model = DailyPoissonModel(trading_days=12)
+
+    exact = run_simulation(model, simulations=3000, seed=8, streaming=False)
+    streamed = run_simulation(model, simulations=3000, seed=8, streaming=True, chunk_cells=5000)
+
+    assert set(streamed) == set(exact)
+    assert len(streamed['percentiles']['p90']) == len(exact['percentiles']['p90'])
+    assert streamed['simulations'] == 3000
+
+
+def test_long_paths_sketch_a_bounded_number_of_curve_points():
+    """Long bootstrap paths keep at most MAX_CURVE_POINTS curve columns but still return every step."""
+    returns = np.random.default_rng(0).normal(0.0005, 0.002, size=500)
+    model = BootstrapModel(returns, n_trades=5000)
+    rng = np.random.default_rng(2)
+    equity = simulate_paths(model, 300, 10000.0, rng)
+
+    summary = PathSummary(model.n_steps, 10000.0).add_paths(equity, rng)
+    assert summary.curve_sketch.n_columns <= MAX_CURVE_POINTS
+    assert summary.curve_steps[0] == 0 and summary.curve_steps[-1] == model.n_steps
+
+    median = summary.to_dict()['percentiles']['p50']
+    assert len(median) == model.n_steps + 1
+    np.testing.assert_allclose(median, np.percentile(equity, 50, axis=0), rtol=0.02)
+
+
+def test_streaming_peak_memory_is_bounded():
+    """Peak memory in streaming mode does not grow with the number of simulations."""
+    import tracemalloc
+
+    model = DailyPoissonModel(trading_days=30)
+
+    def peak(simulations):
+        tracemalloc.start()
+        try:
+            run_simulation(model, simulations=simulations, seed=1, streaming=True, chunk_cells=100000)
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    assert peak(80000) < 1.5 * peak(10000)
+
+
+def test_adaptive_simulation_stops_when_converged():
+    """Adaptive mode stops once every target statistic is within tolerance."""
+    model = DailyPoissonModel(trading_days=20)
+
+    loose = run_adaptive_simulation(model, seed=3, tolerance=0.02, batch_size=1000)
+    tight = run_adaptive_simulation(model, seed=3, tolerance=0.005, batch_size=1000)
+
+    assert loose['convergence']['converged']
+    assert loose['simulations'] == loose['convergence']['paths_used']
+    assert tight['convergence']['paths_used'] > loose['convergence']['paths_used']
+    errors = tight['convergence']['standard_errors']
+    assert errors['median_final_equity'] * 1.96 <= 0.005 * 10000.0 * 1.001
+    assert errors['success_rate'] * 1.96 <= 0.5 * 1.001
+
+
+def test_adaptive_simulation_respects_path_budget():
+    """An unreachable tolerance stops at the path budget and is reproducible."""
+    model = DailyPoissonModel(trading_days=10)
+
+    first = run_adaptive_simulation(model, seed=9, tolerance=1e-6, max_paths=2500, batch_size=1000)
+    second = run_adaptive_simulation(model, seed=9, tolerance=1e-6, max_paths=2500, batch_size=1000)
+
+    assert first['convergence']['stop_reason'] == 'max_paths'
+    assert first['convergence']['paths_used'] == 2500
+    assert first['convergence']['batches'] == 3
+    assert first['final_percentiles'] == second['final_percentiles']
+
+
+def test_adaptive_budget_is_bounded():
+    """Path and time budgets outside the allowed range are rejected before allocating anything."""
+    check_adaptive_budget(MAX_ADAPTIVE_PATHS, 1.0)
+
+    for max_paths, time_budget in ((0, None), (MAX_ADAPTIVE_PATHS + 1, None), (1000, 0), (1000, -1.0),
+                                   (1000, 1e9)):
+        with pytest.raises(ValueError):
+            check_adaptive_budget(max_paths, time_budget)
+
+    with pytest.raises(ValueError):
+        run_adaptive_simulation(DailyPoissonModel(trading_days=10), max_paths=10 ** 12)
+
+
+def test_standard_errors_shrink_with_more_paths():
+    """Standard errors fall roughly with the square root of the number of paths."""
+    rng = np.random.default_rng(0)
+    values = rng.lognormal(mean=np.log(10000), sigma=0.1, size=40000)
+
+    small = estimate_standard_errors(values[:10000], 10000.0)
+    large = estimate_standard_errors(values, 10000.0)
+
+    for key in ('median_final_equity', 'p10_final_equity', 'success_rate'):
+        assert large[key] == pytest.approx(small[key] / 2, rel=0.25)
+
+
+def test_progress_is_reported_per_chunk():
+    """Streaming runs report monotonically increasing progress up to the total."""
+    reports = []
+
+    run_simulation(DailyPoissonModel(trading_days=9), simulations=3000, seed=1, streaming=True,
+                   shard_size=1000, chunk_cells=5000, progress=lambda done, total: reports.append((done, total)))
+
+    assert len(reports) == 6
+    assert [done for done, _ in reports] == sorted(done for done, _ in reports)
+    assert reports[-1] == (3000, 3000)
+
+
+def test_progress_callback_can_cancel():
+    """Raising SimulationCancelled from the progress callback stops the run."""
+    def cancel_after_first_chunk(done, total):
+        raise SimulationCancelled()
+
+    with pytest.raises(SimulationCancelled):
+        run_simulation(DailyPoissonModel(trading_days=9), simulations=3000, seed=1, streaming=True,
+                       chunk_cells=5000, progress=cancel_after_first_chunk)
+
+
+def test_sweep_returns_heatmap_matrices():
+    """Every metric is a rows x columns matrix over the parameter grid."""
+    sweep = run_parameter_sweep(DailyPoissonModel(trading_days=10), [0.005, 0.01, 0.02], [1.0, 2.0],
+                                simulations=2000, seed=5)
+
+    assert sweep['rows']['values'] == [0.005, 0.01, 0.02]
+    assert sweep['columns']['values'] == [1.0, 2.0]
+    for matrix in sweep['metrics'].values():
+        assert np.array(matrix).shape == (3, 2)
+
+
+def test_sweep_uses_common_random_numbers():
+    """With shared draws, a higher R:R never lowers any path, so medians are monotonic."""
+    sweep = run_parameter_sweep(PerTradeModel(trading_days=5), [0.01, 0.02], [1.0, 1.5, 2.0, 3.0],
+                                simulations=3000, seed=8)
+
+    medians = np.array(sweep['metrics']['median_final_equity'])
+    assert np.all(np.diff(medians, axis=1) > 0)
+
+
+def test_sweep_point_matches_single_model_on_same_draws():
+    """A grid point equals the model evaluated directly on the same outcomes."""
+    base = DailyPoissonModel(trading_days=8)
+    outcomes = base.sample_outcomes(np.random.default_rng(0), 500)
+    variant = base.with_parameters(risk_per_trade=0.03, risk_reward_ratio=2.5)
+
+    np.testing.assert_allclose(
+        np.exp(variant.log_factors_from_outcomes(outcomes)),
+        variant.factors_from_outcomes(outcomes)
+    )
+    assert variant.risk_per_trade == 0.03 and base.risk_per_trade == 0.01
+
+    sweep = run_parameter_sweep(base, [0.03], [2.5], simulations=500, seed=0)
+    expected = 10000.0 * np.prod(variant.factors_from_outcomes(outcomes), axis=1)
+    assert sweep['metrics']['median_final_equity'][0][0] == pytest.approx(np.median(expected))
+
+
+def test_sweep_size_is_bounded():
+    """Oversized grids, path counts and step counts are rejected before any path is simulated."""
+    check_sweep_size(20, 1000, 30)
+
+    with pytest.raises(ValueError):
+        check_sweep_size(101, 10, 30)
+    with pytest.raises(ValueError):
+        check_sweep_size(10, 0, 30)
+    with pytest.raises(ValueError):
+        check_sweep_size(10, MAX_SWEEP_PATHS // 10 + 1, 1)
+    with pytest.raises(ValueError):
+        check_sweep_size(100, 10000, 365)
+    with pytest.raises(ValueError):
+        run_parameter_sweep(DailyPoissonModel(trading_days=10), [0.01] * 10, [1.0] * 10,
+                            simulations=MAX_SWEEP_PATHS)
@@ -0,0 +1,77 @@
+"""
+Unit tests for the Monte Carlo result cache.
+"""
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+# Add the project directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from backtest_ai.result_cache import ResultCache, make_cache_key, model_fingerprint
+
+
+def test_cache_key_is_canonical():
+    """Parameter order does not change the key, but any value does."""
+    first = make_cache_key('mc', params={'a': 1, 'b': 2.0}, seed=1)
+    second = make_cache_key('mc', seed=1, params={'b': 2.0, 'a': 1})
+
+    assert first == second
+    assert first != make_cache_key('mc', params={'a': 1, 'b': 2.5}, seed=1)
+    assert first != make_cache_key('other', params={'a': 1, 'b': 2.0}, seed=1)
+
+
+def test_memory_tier_is_lru():
+    """The least recently used entry is evicted first."""
+    cache = ResultCache(max_entries=2)
+    cache.set('a', {'value': 1})
+    cache.set('b', {'value': 2})
+    cache.get('a')
+    cache.set('c', {'value': 3})
+
+    assert cache.get('b') is None
+    assert cache.get('a')[0] == {'value': 1}
+    assert cache.get('c')[0] == {'value': 3}
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    """Entries written to disk are found by a fresh cache and report their age."""
+    writer = ResultCache(cache_dir=str(tmp_path))
+    writer.set('key', {'results': [1.0, 2.0], 'profit_factor': float('inf')})
+    time.sleep(0.01)
+
+    value, age = ResultCache(cache_dir=str(tmp_path)).get('key')
+
+    assert value['results'] == [1.0, 2.0]
+    assert value['profit_factor'] == float('inf')
+    assert age > 0
+
+
+def test_disk_tier_evicts_oldest_files(tmp_path):
+    """The disk tier stays under its size limit by removing the oldest entries."""
+    cache = ResultCache(max_entries=0, cache_dir=str(tmp_path), max_disk_bytes=1500)
+    payload = {'data': [float(i) for i in range(300)]}
+    for i, key in enumerate(('first', 'second', 'third')):
+        cache.set(key, payload)
+        os.utime(tmp_path / f'{key}.json.gz', (i, i))
+
+    cache.set('fourth', payload)
+
+    remaining = sorted(f.name for f in tmp_path.iterdir())
+    assert 'first.json.gz' not in remaining
+    assert 'fourth.json.gz' in remaining
+    assert sum(os.path.getsize(tmp_path / name) for name in remaining) <= 1500
+
+
+def test_model_fingerprint_changes_with_backup_file(tmp_path):
+    """Retraining (a newer backup file) changes the model fingerprint."""
+    backup = tmp_path / 'model.pkl'
+    backup.write_bytes(b'v1')
+    model = SimpleNamespace(id=1, version='1.0', backup_path=str(backup), metrics={'win_rate': 55})
+
+    before = make_cache_key('mc', model=model_fingerprint(model))
+    os.utime(backup, (time.time() + 10, time.time() + 10))
+    after = make_cache_key('mc', model=model_fingerprint(model))
+
+    assert before != after
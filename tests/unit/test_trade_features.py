@@ -0,0 +1,99 @@
+"""
+Unit tests for per-trade context features used in AI training.
+"""
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# Add the project directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from freqtrade_integration.import_backtest import generate_training_features
+from freqtrade_integration.trade_features import build_trade_features, duration_bucket
+
+
+def make_trades(n=200, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'trade_id': np.arange(n),
+        'pair': rng.choice(['BTC/USDT', 'ETH/USDT'], n),
+        'open_time': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.permutation(n) * 37, unit='min'),
+        'open_rate': rng.uniform(90, 110, n),
+        'profit_percent': rng.normal(0, 1, n),
+        'trade_duration': rng.integers(5, 2000, n).astype(float),
+        'is_profitable': rng.random(n) > 0.5,
+        'param_buy_rsi': 30.0
+    })
+
+
+def expected_recent_means(df, window):
+    """Brute-force as-of window: the last `window` trades of the same run and pair closed by entry time."""
+    close_time = df['open_time'] + pd.to_timedelta(df['trade_duration'], unit='min')
+    rows = []
+    for i in df.index:
+        same_group = (df['backtest_result_id'] == df.at[i, 'backtest_result_id']) & (df['pair'] == df.at[i, 'pair'])
+        closed = df[same_group & (close_time <= df.at[i, 'open_time']) & (df.index != i)]
+        recent = closed.loc[close_time[closed.index].sort_values(kind='stable').index[-window:]]
+        rows.append({
+            'trade_recent_profit_mean': recent['profit_percent'].mean(),
+            'trade_recent_win_rate': (recent['profit_percent'] > 0).mean() if len(recent) else np.nan,
+            'trade_open_rate_vs_recent': df.at[i, 'open_rate'] / recent['open_rate'].mean() - 1
+        })
+    return pd.DataFrame(rows, index=df.index)
+
+
+def test_rolling_features_only_use_trades_closed_before_entry():
+    """Rolling features use the latest trades of the same run and pair that closed by entry time."""
+    df = make_trades()
+    df['backtest_result_id'] = np.arange(len(df)) % 2 + 1
+    features = build_trade_features(df, window=5)
+
+    expected = expected_recent_means(df, window=5)
+    for name in expected.columns:
+        np.testing.assert_allclose(features[name], expected[name])
+    assert list(features['trade_entry_hour']) == list(df['open_time'].dt.hour)
+
+
+def test_overlapping_trades_and_other_runs_do_not_leak():
+    """A still-open earlier trade and trades from another run never enter the window."""
+    df = pd.DataFrame({
+        'backtest_result_id': [1, 1, 1, 2],
+        'pair': 'BTC/USDT',
+        'open_time': pd.to_datetime(['2024-01-01 00:00', '2024-01-01 01:00', '2024-01-01 03:00', '2024-01-01 00:30']),
+        'close_time': pd.to_datetime(['2024-01-01 05:00', '2024-01-01 02:00', '2024-01-01 06:00', '2024-01-01 00:45']),
+        'open_rate': [100.0, 110.0, 120.0, 90.0],
+        'profit_percent': [5.0, -1.0, 2.0, 9.0],
+        'trade_duration': [300.0, 60.0, 180.0, 15.0],
+    })
+    features = build_trade_features(df, window=20)
+
+    # Trade 0 is still open when trade 2 enters and the run-2 trade belongs to another backtest
+    assert features['trade_recent_profit_mean'].tolist()[2] == -1.0
+    assert features['trade_recent_win_rate'].tolist()[2] == 0.0
+    assert features['trade_open_rate_vs_recent'].tolist()[2] == pytest.approx(120.0 / 110.0 - 1)
+    assert features['trade_recent_profit_mean'].isna().tolist() == [True, True, False, True]
+
+
+def test_duration_bucket_edges():
+    """Durations are bucketed by the configured minute thresholds; missing values stay NaN."""
+    buckets = duration_bucket(np.array([0, 29, 30, 239, 1440, 5000, np.nan]))
+
+    assert list(buckets[:-1]) == [0, 0, 1, 2, 5, 5]
+    assert np.isnan(buckets[-1])
+
+
+def test_generate_training_features_adds_trade_context():
+    """Context features are appended to the parameter columns and can be switched off."""
+    df = make_trades(n=50)
+
+    X, y = generate_training_features(df)
+    X_params, _ = generate_training_features(df, trade_features=False)
+
+    assert list(X_params.columns) == ['param_buy_rsi']
+    assert X.columns[0] == 'param_buy_rsi'
+    assert {'trade_entry_hour', 'trade_entry_weekday', 'trade_recent_win_rate',
+            'trade_recent_duration_bucket', 'trade_open_rate_vs_recent'} <= set(X.columns)
+    assert len(X) == len(y) == 50
@@ -0,0 +1,103 @@
+"""
+Unit tests for the parallel multi-pair training orchestrator.
+"""
+import json
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add the project directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from freqtrade_integration.import_backtest import import_backtest_results
+from freqtrade_integration.training_orchestrator import TrainingOrchestrator, normalize_job, plan_workers
+
+
+def write_backtest_file(path, pairs, n_trades=240, seed=0):
+    """Write a Freqtrade backtest export with random profits spread over the day."""
+    rng = np.random.default_rng(seed)
+    data = {
+        'strategy': 'TestStrategy',
+        'timeframe': '1h',
+        'backtest_start_time': 1600000000,
+        'backtest_end_time': 1600086400,
+        'strategy_parameters': {'buy_rsi': 30},
+        'trades': [
+            {
+                'pair': pairs[i % len(pairs)], 'trade_id': i,
+                'open_date': f'2024-01-{1 + i // 24:02d} {i % 24:02d}:00:00+00:00',
+                'open_rate': float(rng.uniform(90, 110)), 'trade_duration': int(rng.integers(5, 600)),
+                'profit_ratio': float(rng.normal()), 'profit_percent': float(rng.normal())
+            }
+            for i in range(n_trades)
+        ],
+        'strategy_comparison': [{'profit_total_pct': 1.5, 'profit_total': 15.0, 'trades': n_trades, 'win_ratio': 0.5}],
+        'strategy_comparison_per_pair': [{'key': pair} for pair in pairs]
+    }
+    path.write_text(json.dumps(data))
+
+
+@pytest.mark.parametrize('n_jobs, max_workers, cores, expected', [
+    (40, None, 8, (8, 1)),
+    (2, None, 8, (2, 4)),
+    (10, 3, 16, (3, 5)),
+    (5, 4, 1, (1, 1)),
+])
+def test_plan_workers_never_oversubscribes_cores(n_jobs, max_workers, cores, expected):
+    """Jobs x threads never exceeds the number of cores and every job gets at least one thread."""
+    workers, threads = plan_workers(n_jobs, max_workers, cores)
+
+    assert (workers, threads) == expected
+    assert workers * threads <= max(cores, 1)
+
+
+def test_normalize_job_fills_defaults_and_validates():
+    """A single strategy is accepted, defaults are applied and incomplete jobs are rejected."""
+    job = normalize_job({'strategy': 'TestStrategy', 'pair': 'BTC/USDT'}, {'timeframe': '5m', 'optimize': False})
+
+    assert job['strategies'] == ['TestStrategy']
+    assert job['timeframe'] == '5m' and job['optimize'] is False
+    with pytest.raises(ValueError):
+        normalize_job({'strategies': [], 'pair': 'BTC/USDT'})
+    with pytest.raises(ValueError):
+        normalize_job({'strategies': ['TestStrategy']})
+    with pytest.raises(ValueError):
+        normalize_job({'strategies': ['TestStrategy'], 'pair': 'BTC/USDT', 'tuning_max_trials': 0})
+    with pytest.raises(ValueError):
+        normalize_job({'strategies': ['TestStrategy'], 'pair': 'BTC/USDT', 'optimize': 'false'})
+
+
+def test_orchestrator_trains_pairs_in_parallel_and_registers_results(tmp_path, monkeypatch):
+    """Each job runs in a worker process with its share of threads; only trained models are registered."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'backtests.db'}")
+    monkeypatch.setenv('TRAINING_DATA_CACHE_DIR', str(tmp_path / 'training_cache'))
+    monkeypatch.setenv('LIGHTGBM_DATASET_CACHE_DIR', str(tmp_path / 'datasets'))
+    source = tmp_path / 'results'
+    source.mkdir()
+    write_backtest_file(source / 'backtest.json', pairs=('BTC/USDT', 'ETH/USDT'))
+    import_backtest_results(str(source))
+
+    jobs = [
+        normalize_job({'strategies': ['TestStrategy'], 'pair': pair}, {'optimize': False, 'min_trades': 50})
+        for pair in ('BTC/USDT', 'ETH/USDT', 'XRP/USDT')
+    ]
+    registered, progress = [], []
+    results = TrainingOrchestrator(max_workers=2, cpu_count=4).run(
+        jobs,
+        register=lambda result: registered.append(result['pair']) or True,
+        on_result=lambda done, total, result: progress.append((done, total))
+    )
+
+    assert [result['pair'] for result in results] == ['BTC/USDT', 'ETH/USDT', 'XRP/USDT']
+    assert [result['success'] for result in results] == [True, True, False]
+    assert sorted(registered) == ['BTC/USDT', 'ETH/USDT']
+    assert [result['registered'] for result in results] == [True, True, False]
+    assert progress == [(1, 3), (2, 3), (3, 3)]
+    assert all(result['num_threads'] == 2 and result['pid'] != os.getpid() for result in results)
+    for result in results[:2]:
+        assert os.path.exists(result['model_path'])
+        assert result['timing']['total_seconds'] >= result['timing']['training_seconds'] > 0
+        assert 'auc' in result['metrics']
@@ -0,0 +1,216 @@
+"""
+Unit tests for the persistent background training job queue.
+"""
+import json
+import os
+import signal
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import update
+
+# Add the project directory to the Python path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from backtest_ai.jobs import CANCELLED, COMPLETED, FAILED, QUEUED, RUNNING
+from backtest_ai import training_queue
+from backtest_ai.training_queue import MAX_ATTEMPTS, JobReporter, TrainingQueue, run_worker
+from freqtrade_integration.import_backtest import import_backtest_results
+from freqtrade_integration.training_orchestrator import TrainingCancelled, normalize_job
+from models import ModelBackup, TrainingJob
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """Point DATABASE_URL at a fresh sqlite database and keep caches and models in tmp_path."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('DATABASE_URL', f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setenv('TRAINING_DATA_CACHE_DIR', str(tmp_path / 'training_cache'))
+    monkeypatch.setenv('LIGHTGBM_DATASET_CACHE_DIR', str(tmp_path / 'datasets'))
+    return f"sqlite:///{tmp_path / 'app.db'}"
+
+
+def import_trades(directory, n_trades=200, seed=0):
+    """Import a backtest export with random profits for BTC/USDT."""
+    rng = np.random.default_rng(seed)
+    source = directory / 'results'
+    source.mkdir()
+    (source / 'backtest.json').write_text(json.dumps({
+        'strategy': 'TestStrategy',
+        'timeframe': '1h',
+        'backtest_start_time': 1600000000,
+        'backtest_end_time': 1600086400,
+        'strategy_parameters': {'buy_rsi': 30},
+        'trades': [
+            {
+                'pair': 'BTC/USDT', 'trade_id': i, 'open_date': f'2024-01-{1 + i // 24:02d} {i % 24:02d}:00:00+00:00',
+                'open_rate': float(rng.uniform(90, 110)), 'trade_duration': int(rng.integers(5, 600)),
+                'profit_ratio': float(rng.normal()), 'profit_percent': float(rng.normal())
+            }
+            for i in range(n_trades)
+        ],
+        'strategy_comparison': [{'profit_total_pct': 1.5, 'profit_total': 15.0, 'trades': n_trades, 'win_ratio': 0.5}],
+        'strategy_comparison_per_pair': [{'key': 'BTC/USDT'}]
+    }))
+    import_backtest_results(str(source))
+
+
+def make_job(**options):
+    return normalize_job({'strategies': ['TestStrategy'], 'pair': 'BTC/USDT', 'optimize': False, 'min_trades': 50, **options})
+
+
+def test_each_job_is_claimed_once_and_queued_jobs_cancel_immediately(database):
+    """Claims are exclusive and in submission order; a queued job is cancelled without running."""
+    queue = TrainingQueue.from_url(database)
+    first = queue.enqueue(make_job())
+    second = queue.enqueue(make_job())
+
+    claimed = queue.claim('worker-a')
+    cancelled = queue.cancel(second['job_id'])
+
+    assert claimed['job_id'] == first['job_id'] and claimed['status'] == RUNNING and claimed['attempts'] == 1
+    assert cancelled['status'] == CANCELLED
+    assert queue.claim('worker-b') is None
+    assert queue.cancel(first['job_id'])['cancel_requested'] is True
+    assert queue.get(first['job_id'])['status'] == RUNNING
+    assert queue.get(12345) is None
+
+
+def test_stale_jobs_are_requeued_until_max_attempts(database):
+    """A job whose worker stopped sending heartbeats goes back to the queue, then fails after MAX_ATTEMPTS."""
+    queue = TrainingQueue.from_url(database)
+    job_id = queue.enqueue(make_job())['job_id']
+
+    def expire_heartbeat():
+        with queue.Session() as session:
+            session.execute(update(TrainingJob).where(TrainingJob.id == job_id)
+                            .values(heartbeat_at=datetime.now() - timedelta(minutes=10)))
+            session.commit()
+
+    for attempt in range(1, MAX_ATTEMPTS):
+        assert queue.claim(f'worker-{attempt}')['attempts'] == attempt
+        expire_heartbeat()
+        assert queue.requeue_stale(timeout=60) == 1
+        assert queue.get(job_id)['status'] == QUEUED
+
+    queue.claim('worker-last')
+    expire_heartbeat()
+    assert queue.requeue_stale(timeout=60) == 0
+    assert queue.get(job_id)['status'] == FAILED
+    assert queue.report(job_id, 'worker-last', stage='training') is True
+
+
+def test_worker_reports_boosting_progress_logs_and_registers_model(database, tmp_path):
+    """A worker runs the job to completion, streaming per-iteration validation loss and log lines."""
+    import_trades(tmp_path)
+    queue = TrainingQueue.from_url(database)
+    job_id = queue.enqueue({**make_job(), 'register_in_db': True})['job_id']
+    seen = []
+    original_report = TrainingQueue.report
+
+    def recording_report(self, job_id, worker_id, stage=None, progress=None, details=None, logs=None):
+        seen.append((stage, progress, details))
+        return original_report(self, job_id, worker_id, stage, progress, details, logs)
+
+    TrainingQueue.report = recording_report
+    try:
+        assert run_worker(database, worker_id='worker-test', num_threads=1, exit_when_idle=True) == 1
+    finally:
+        TrainingQueue.report = original_report
+
+    job = queue.get(job_id)
+    assert job['status'] == COMPLETED and job['progress'] == 100.0
+    assert job['result']['registered'] is True and os.path.exists(job['result']['model_path'])
+    training = [details for stage, _, details in seen if stage == 'training']
+    assert training and training[0]['iteration'] >= 1 and 'valid_loss' in training[0]
+    progress = [value for _, value, _ in seen if value is not None]
+    assert progress == sorted(progress)
+
+    logs = queue.logs(job_id)
+    assert any('Bắt đầu huấn luyện mô hình LightGBM' in line['message'] for line in logs)
+    assert queue.logs(job_id, after=logs[-1]['id']) == []
+    with queue.Session() as session:
+        assert session.query(ModelBackup).filter_by(pair='BTC/USDT').count() == 1
+
+
+def test_cancel_request_stops_running_job(database, tmp_path):
+    """A running job stops at its next progress report once cancellation is requested."""
+    queue = TrainingQueue.from_url(database)
+    job_id = queue.enqueue(make_job())['job_id']
+    queue.claim('worker-test')
+    reporter = JobReporter(queue, job_id, 'worker-test')
+    reporter.progress({'stage': 'preparing'})
+
+    queue.cancel(job_id)
+    with pytest.raises(TrainingCancelled):
+        reporter.progress({'stage': 'training', 'iteration': 1, 'total': 500})
+
+    import_trades(tmp_path)
+    queued = queue.enqueue(make_job())['job_id']
+    queue.cancel(queued)
+    assert run_worker(database, worker_id='worker-idle', exit_when_idle=True) == 0
+    assert queue.get(queued)['status'] == CANCELLED
+
+
+def test_worker_heartbeats_are_tracked(database):
+    """Workers record a heartbeat while alive and are removed when they stop."""
+    queue = TrainingQueue.from_url(database)
+    assert queue.active_workers() == 0
+
+    queue.worker_heartbeat('worker-a')
+    queue.worker_heartbeat('worker-a')
+    queue.worker_heartbeat('worker-b')
+    assert queue.active_workers() == 2
+    assert queue.active_workers(timeout=-1) == 0
+
+    queue.remove_worker('worker-a')
+    assert queue.active_workers() == 1
+
+    assert run_worker(database, worker_id='worker-idle', exit_when_idle=True) == 0
+    assert queue.active_workers() == 1
+
+
+def test_released_jobs_return_to_the_queue_without_using_an_attempt(database):
+    """A job released by a stopping worker is queued again, or cancelled if cancellation was requested."""
+    queue = TrainingQueue.from_url(database)
+    job_id = queue.enqueue(make_job())['job_id']
+    cancelled_id = queue.enqueue(make_job())['job_id']
+
+    queue.claim('worker-a')
+    queue.release(job_id, 'worker-a')
+    job = queue.get(job_id)
+    assert job['status'] == QUEUED and job['attempts'] == 0 and job['worker_id'] is None
+
+    queue.claim('worker-b')
+    queue.claim('worker-b')
+    queue.cancel(cancelled_id)
+    queue.release(cancelled_id, 'worker-b')
+    assert queue.get(cancelled_id)['status'] == CANCELLED
+    assert queue.get(job_id)['attempts'] == 1
+
+
+def test_sigterm_requeues_running_job(database, monkeypatch):
+    """A worker that receives SIGTERM mid-job puts the job back in the queue and exits cleanly."""
+    queue = TrainingQueue.from_url(database)
+    job_id = queue.enqueue(make_job())['job_id']
+
+    def interrupted_training(*args, **kwargs):
+        os.kill(os.getpid(), signal.SIGTERM)
+        time.sleep(5)
+        raise AssertionError('SIGTERM did not stop the job')
+
+    monkeypatch.setattr(training_queue, 'run_training_job', interrupted_training)
+    handlers = signal.getsignal(signal.SIGTERM), signal.getsignal(signal.SIGINT)
+    signal.signal(signal.SIGTERM, training_queue._raise_worker_stopped)
+    try:
+        assert run_worker(database, worker_id='worker-stopping', exit_when_idle=True) == 0
+    finally:
+        signal.signal(signal.SIGTERM, handlers[0])
+        signal.signal(signal.SIGINT, handlers[1])
+
+    job = queue.get(job_id)
+    assert job['status'] == QUEUED and job['attempts'] == 0
+    assert queue.active_workers() == 0